@@ -0,0 +1,74 @@
+"""
+Client-disconnect handling for API requests.
+
+Starlette doesn't cancel a regular (non-streaming) handler when the
+client goes away, so expensive work such as uncached BigQuery queries or
+an LLM call would run to completion for nobody. `cancel_on_disconnect`
+races the work against the client's disconnect message and cancels it
+if the client leaves first.
+"""
+
+import asyncio
+from typing import Awaitable, Dict, TypeVar
+
+from fastapi import Request
+
+T = TypeVar("T")
+
+_disconnect_stats: Dict[str, int] = {"requests_cancelled": 0}
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client disconnected before the response was ready."""
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The body has already been read, so the next message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    Args:
+        request: The incoming request
+        awaitable: Work whose result becomes the response
+
+    Returns:
+        The awaitable's result
+
+    Raises:
+        ClientDisconnected: If the client left before the work finished
+    """
+    work = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        work.cancel()
+        watcher.cancel()
+        raise
+
+    if work.done():
+        watcher.cancel()
+        return work.result()
+
+    if watcher.exception() is not None:
+        # Couldn't watch the connection; just finish the work
+        return await work
+
+    work.cancel()
+    try:
+        await work
+    except asyncio.CancelledError:
+        pass
+    _disconnect_stats["requests_cancelled"] += 1
+    raise ClientDisconnected()
+
+
+def get_disconnect_stats() -> Dict[str, int]:
+    """Count of requests whose work was cancelled by a client disconnect."""
+    return dict(_disconnect_stats)
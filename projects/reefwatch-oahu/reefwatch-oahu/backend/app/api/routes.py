@@ -5,6 +5,7 @@ Defines all REST API endpoints for the application including
 ocean conditions, sites, alerts, forecasts, and chat.
 """
 
+import asyncio
 import logging
 from datetime import date, datetime
 from typing import Optional
@@ -14,6 +15,8 @@ from fastapi.responses import StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from app.api.disconnect import cancel_on_disconnect, get_disconnect_stats
+from app.api.sse import encode_chat_stream
 from app.core.config import get_settings, OAHU_SITES, get_site_by_id
 from app.models.schemas import (
     AlertsResponse,
@@ -29,13 +32,25 @@ from app.models.schemas import (
     SiteDifficulty,
     SiteHistoryResponse,
     SiteListResponse,
+    SiteRankingResponse,
     SiteType,
 )
 from app.services import bigquery_service, chat_service, forecast_service
+from app.services.admission_controller import get_admission_controller
+from app.services.answer_cache import get_answer_cache
+from app.services.chat_analytics import get_chat_analytics
+from app.services.stream_buffer import get_stream_registry
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop proxies (nginx) re-buffering the coalesced frames
+    "X-Accel-Buffering": "no",
+}
+
 # Rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
@@ -146,6 +161,7 @@ async def get_site(site_id: str):
 
 @router.get("/sites/{site_id}/history", response_model=SiteHistoryResponse, tags=["Sites"])
 async def get_site_history(
+    request: Request,
     site_id: str,
     days: int = Query(30, ge=1, le=365, description="Number of days of history")
 ):
@@ -159,8 +175,11 @@ async def get_site_history(
     if not site_data:
         raise HTTPException(status_code=404, detail=f"Site not found: {site_id}")
 
-    history = await bigquery_service.get_site_history(site_id, days)
-    statistics = await bigquery_service.get_site_statistics(site_id, days)
+    # Queries are cancelled if the client leaves before they finish
+    history, statistics = await cancel_on_disconnect(request, asyncio.gather(
+        bigquery_service.get_site_history(site_id, days),
+        bigquery_service.get_site_statistics(site_id, days)
+    ))
 
     # Calculate period
     if history:
@@ -223,16 +242,29 @@ async def get_alerts():
 
 # Forecast Endpoints
 
+def _check_forecast_days(days: int) -> None:
+    """Reject horizons the loaded climatology can't support."""
+    max_days = forecast_service.max_forecast_days()
+    if days > max_days:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Forecasts are limited to {max_days} days (no climatology loaded)"
+        )
+
+
 @router.get("/forecast", response_model=ForecastResponse, tags=["Forecast"])
 async def get_forecast(
-    days: int = Query(7, ge=1, le=7, description="Number of days to forecast")
+    days: int = Query(7, ge=1, le=settings.forecast_max_days, description="Number of days to forecast")
 ):
     """
-    Get 7-day forecast for all sites.
+    Get forecast for all sites (7 days by default, up to 30).
 
     Forecasts include predicted SST, DHW, and risk levels
     with confidence scores that decrease over the forecast horizon.
+    Beyond the first week, predictions relax toward climatology; without
+    a climatology table, requests beyond the first week are rejected.
     """
+    _check_forecast_days(days)
     forecasts = await forecast_service.get_all_forecasts(days)
 
     return ForecastResponse(
@@ -244,12 +276,13 @@ async def get_forecast(
 @router.get("/forecast/{site_id}", tags=["Forecast"])
 async def get_site_forecast(
     site_id: str,
-    days: int = Query(7, ge=1, le=7, description="Number of days to forecast")
+    days: int = Query(7, ge=1, le=settings.forecast_max_days, description="Number of days to forecast")
 ):
     """Get forecast for a specific site."""
     site_data = get_site_by_id(site_id)
     if not site_data:
         raise HTTPException(status_code=404, detail=f"Site not found: {site_id}")
+    _check_forecast_days(days)
 
     forecast = await forecast_service.get_site_forecast(site_id, days)
 
@@ -284,6 +317,57 @@ async def get_recommendations(
     }
 
 
+@router.get("/recommendations/range", response_model=SiteRankingResponse, tags=["Forecast"])
+async def get_recommendations_range(
+    start_date: date = Query(..., description="First day of the trip"),
+    end_date: date = Query(..., description="Last day of the trip (inclusive)"),
+    top_k: Optional[int] = Query(None, ge=1, le=len(OAHU_SITES), description="Best sites to return per day"),
+    type: Optional[SiteType] = Query(None, description="Filter by site type"),
+    difficulty: Optional[SiteDifficulty] = Query(None, description="Filter by difficulty"),
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitude of your location"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitude of your location")
+):
+    """
+    Get ranked sites for every day in a date range.
+
+    Computes one forecast run for the whole range and ranks sites per
+    day by a combined score of predicted risk, forecast confidence and,
+    if a location is given, distance from it.
+    """
+    first_lead = (start_date - date.today()).days
+    last_lead = (end_date - date.today()).days
+
+    if first_lead < 1:
+        raise HTTPException(status_code=400, detail="start_date must be in the future")
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    max_days = forecast_service.max_forecast_days()
+    if last_lead > max_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot recommend beyond {max_days} days"
+        )
+    if (lat is None) != (lon is None):
+        raise HTTPException(status_code=400, detail="lat and lon must be supplied together")
+
+    days = await forecast_service.rank_sites_for_range(
+        start_date,
+        end_date,
+        top_k=top_k,
+        site_type=type,
+        difficulty=difficulty,
+        latitude=lat,
+        longitude=lon
+    )
+
+    return SiteRankingResponse(
+        start_date=start_date,
+        end_date=end_date,
+        days=days,
+        generated_at=datetime.utcnow()
+    )
+
+
 # Chat Endpoints
 
 @router.post("/chat", response_model=ChatResponse, tags=["Chat"])
@@ -296,11 +380,11 @@ async def chat(request: Request, chat_request: ChatRequest):
     coral health, and provide recommendations for visitors.
     Detects Hawaiian Pidgin and responds in kind.
     """
-    response_text, session_id = await chat_service.chat(
+    response_text, session_id = await cancel_on_disconnect(request, chat_service.chat(
         message=chat_request.message,
         session_id=chat_request.session_id,
         include_context=chat_request.include_context
-    )
+    ))
 
     return ChatResponse(
         response=response_text,
@@ -316,35 +400,56 @@ async def chat_stream(request: Request, chat_request: ChatRequest):
     """
     Stream a chat response for better UX.
 
-    Returns Server-Sent Events with response chunks.
+    Returns Server-Sent Events with response chunks. Frames carry event
+    IDs; a client that reconnects with a Last-Event-ID header gets the
+    chunks it missed and the rest of the answer, without a new model call.
     """
-    async def generate():
-        async for chunk, is_final, session_id in chat_service.chat_stream(
-            message=chat_request.message,
-            session_id=chat_request.session_id,
-            include_context=chat_request.include_context
-        ):
-            if is_final:
-                yield f"data: {{\"done\": true, \"session_id\": \"{session_id}\"}}\n\n"
-            else:
-                # Escape for JSON
-                escaped = chunk.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
-                yield f"data: {{\"content\": \"{escaped}\"}}\n\n"
+    registry = get_stream_registry() if settings.chat_stream_resume else None
+
+    last_event_id = request.headers.get("last-event-id")
+    if registry is not None and last_event_id:
+        resumed = registry.resume(last_event_id, chat_request.session_id)
+        if resumed is not None:
+            return StreamingResponse(
+                encode_chat_stream(resumed), media_type="text/event-stream", headers=SSE_HEADERS
+            )
+        # Unknown or expired stream: answer the message afresh
+
+    stream = chat_service.chat_stream(
+        message=chat_request.message,
+        session_id=chat_request.session_id,
+        include_context=chat_request.include_context
+    )
+    # Wait for the first event before sending headers, so a turn the
+    # admission controller rejects gets a real 429/503 response
+    first_event = await stream.__anext__()
+
+    # The answer runs in its own task; this response is one subscriber
+    buffered = registry.start(first_event, stream) if registry is not None else None
+    if buffered is not None:
+        return StreamingResponse(
+            encode_chat_stream(buffered.subscribe()), media_type="text/event-stream", headers=SSE_HEADERS
+        )
+
+    async def events():
+        try:
+            yield first_event
+            async for event in stream:
+                yield event
+        finally:
+            # On disconnect, stop pulling tokens from the model right away
+            # rather than whenever the abandoned generator is collected
+            await stream.aclose()
 
     return StreamingResponse(
-        generate(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        }
+        encode_chat_stream(events()), media_type="text/event-stream", headers=SSE_HEADERS
     )
 
 
 @router.delete("/chat/{session_id}", tags=["Chat"])
 async def clear_chat_session(session_id: str):
     """Clear a chat session and its history."""
-    success = chat_service.clear_session(session_id)
+    success = await chat_service.clear_session(session_id)
 
     if not success:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -380,11 +485,25 @@ async def refresh_data(request: Request, refresh_request: DataRefreshRequest):
 async def get_admin_stats():
     """Get administrative statistics about the data."""
     summary = await bigquery_service.get_data_summary()
+    analytics = get_chat_analytics()
 
     return {
         "data_summary": summary,
         "cache_info": {
             "max_size": settings.cache_max_size,
             "ttl_seconds": settings.cache_ttl_seconds
+        },
+        "chat_sessions": await chat_service.get_session_stats(),
+        "llm_admission": get_admission_controller().stats(),
+        "chat_answer_cache": {"enabled": settings.chat_answer_cache, **get_answer_cache().stats()},
+        "chat_streams": get_stream_registry().stats(),
+        "disconnects": {
+            **get_disconnect_stats(),
+            "chat": chat_service.get_cancellation_stats(),
+            "bigquery": bigquery_service.get_cancellation_stats()
+        },
+        "chat_analytics": {
+            "sink": settings.chat_analytics_sink if analytics else "off",
+            **(analytics.stats() if analytics else {})
         }
     }
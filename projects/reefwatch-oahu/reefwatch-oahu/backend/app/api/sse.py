@@ -0,0 +1,147 @@
+"""
+Server-Sent Events framing for chat streams.
+
+The model emits text a few characters at a time; sending each delta as
+its own frame means one small write (and syscall) per delta. The encoder
+coalesces deltas into a frame per time window or byte budget, serializes
+with orjson (correct for quotes, backslashes and control characters),
+sends comment heartbeats while the model is quiet, and reads only a
+bounded number of deltas ahead of the client, so a slow reader slows the
+upstream stream instead of growing a buffer.
+"""
+
+import asyncio
+from contextlib import suppress
+from typing import AsyncIterator, List, Optional, Tuple
+
+import orjson
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# SSE comment line; EventSource and the frontend parser ignore it
+HEARTBEAT = b": ping\n\n"
+
+# (chunk_text, is_final, session_id), optionally followed by an event ID
+ChatEvent = Tuple
+
+_END = object()
+
+
+def encode_event(payload: dict, event_id: Optional[str] = None) -> bytes:
+    """Encode one SSE data frame, with an id line when the stream is resumable."""
+    frame = b"data: " + orjson.dumps(payload) + b"\n\n"
+    if event_id is None:
+        return frame
+    return b"id: " + event_id.encode() + b"\n" + frame
+
+
+def _content_frame(parts: List[str], event_id: Optional[str]) -> bytes:
+    return encode_event({"content": "".join(parts)}, event_id)
+
+
+async def encode_chat_stream(
+    events: AsyncIterator[ChatEvent],
+    flush_interval: Optional[float] = None,
+    flush_bytes: Optional[int] = None,
+    heartbeat_seconds: Optional[float] = None,
+    buffer_events: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Turn (chunk, is_final, session_id[, event_id]) chat events into SSE frames.
+
+    The first text is sent immediately (time to first token matters);
+    after that, text is buffered until flush_interval has passed since
+    the oldest buffered delta or flush_bytes characters are waiting.
+    The final event flushes any buffered text and the done frame in a
+    single write. When events carry IDs, each frame is tagged with the ID
+    of the last event it contains, so Last-Event-ID resumes after it.
+
+    Args:
+        events: Chat events, as yielded by chat_service.chat_stream
+        flush_interval: Seconds a delta may wait to be coalesced
+        flush_bytes: Buffered characters that force a flush
+        heartbeat_seconds: Idle time before a heartbeat comment is sent
+        buffer_events: Deltas read ahead of the client at most
+
+    Yields:
+        Encoded SSE bytes, one write each
+    """
+    if flush_interval is None:
+        flush_interval = settings.chat_stream_flush_ms / 1000
+    flush_bytes = flush_bytes or settings.chat_stream_flush_bytes
+    heartbeat_seconds = heartbeat_seconds or settings.chat_stream_heartbeat_seconds
+    queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_events or settings.chat_stream_buffer_events)
+
+    async def produce() -> None:
+        # Runs the whole upstream stream in one task; blocks when the queue
+        # is full, which pauses reading from the model for slow clients
+        try:
+            async for event in events:
+                await queue.put(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_END)
+        finally:
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    loop = asyncio.get_running_loop()
+    producer = asyncio.create_task(produce())
+
+    parts: List[str] = []
+    parts_id: Optional[str] = None
+    buffered = 0
+    oldest = 0.0
+    last_write = loop.time()
+    sent_text = False
+
+    try:
+        while True:
+            deadline = oldest + flush_interval if parts else last_write + heartbeat_seconds
+            try:
+                item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                if parts:
+                    yield _content_frame(parts, parts_id)
+                    parts, buffered = [], 0
+                else:
+                    yield HEARTBEAT
+                last_write = loop.time()
+                continue
+
+            if item is _END:
+                if parts:
+                    yield _content_frame(parts, parts_id)
+                return
+            if isinstance(item, Exception):
+                raise item
+
+            chunk, is_final, session_id = item[:3]
+            event_id = item[3] if len(item) > 3 else None
+            if chunk:
+                if not parts:
+                    oldest = loop.time()
+                parts.append(chunk)
+                parts_id = event_id
+                buffered += len(chunk)
+
+            if is_final:
+                frame = _content_frame(parts, parts_id) if parts else b""
+                yield frame + encode_event({"done": True, "session_id": session_id}, event_id)
+                return
+
+            if parts and (not sent_text or buffered >= flush_bytes):
+                yield _content_frame(parts, parts_id)
+                parts, buffered = [], 0
+                sent_text = True
+                last_write = loop.time()
+    finally:
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
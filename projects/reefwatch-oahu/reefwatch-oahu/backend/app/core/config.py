@@ -6,7 +6,7 @@ Uses Pydantic Settings for validation and type coercion.
 """
 
 from functools import lru_cache
-from typing import List
+from typing import Any, Dict, List
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -60,11 +60,64 @@ class Settings(BaseSettings):
     chat_model: str = "claude-sonnet-4-20250514"
     chat_max_tokens: int = 1024
     chat_temperature: float = 0.7
+    chat_max_concurrency: int = 16  # Upstream LLM calls in flight per instance
+    chat_max_queue: int = 64  # Turns waiting for a slot before new ones get 503
+    chat_max_queue_per_session: int = 2  # Waiting turns per session before 429
+    chat_queue_timeout_seconds: float = 20.0
+    chat_session_turn_wait_seconds: float = 90.0  # Wait behind the session's previous turn (429 after)
+    chat_max_connections: int = 20
+    chat_max_keepalive_connections: int = 10
+    chat_keepalive_expiry_seconds: float = 30.0
+    chat_timeout_seconds: float = 60.0
+    chat_stream_flush_ms: int = 40  # Coalesce text deltas into one SSE frame per window...
+    chat_stream_flush_bytes: int = 256  # ...or once this much text is buffered
+    chat_stream_heartbeat_seconds: float = 15.0  # Comment frame when idle, keeps proxies open
+    chat_stream_buffer_events: int = 32  # Deltas read ahead of a slow client before pausing
+    chat_stream_resume: bool = True  # Buffer streamed answers for Last-Event-ID reconnects
+    chat_stream_resume_max_streams: int = 1000
+    chat_stream_resume_ttl_seconds: float = 60.0  # Replay window after an answer completes
+    chat_stream_resume_grace_seconds: float = 15.0  # Generation continues this long after a drop
+    chat_prompt_caching: bool = True  # Mark static prompt prefixes as cacheable
+    chat_pidgin_markers: List[str] = []  # Empty uses the built-in vocabulary
+    chat_pidgin_threshold: int = 2  # Distinct markers needed to switch to Pidgin mode
+    chat_context_mode: str = "full"  # "full" (all sites), "relevant" (mentioned sites) or "tools"
+    chat_max_tool_rounds: int = 4  # Tool-call round trips allowed per turn
+    chat_history_token_budget: int = 3000  # Estimated input tokens of history sent per turn
+    chat_summary_mode: str = "off"  # "off", "extractive" or "model" for turns dropped from history
+    chat_summary_model: str = "claude-3-5-haiku-20241022"
+    chat_summary_max_tokens: int = 400
+    chat_summary_max_chars: int = 1500
+    chat_answer_cache: bool = False  # Reuse answers to repeated first-turn questions
+    chat_answer_cache_max_entries: int = 500
+    chat_answer_cache_ttl_seconds: int = 900
+    chat_answer_cache_max_question_chars: int = 200  # Longer questions are never cached
+
+    # Chat sessions
+    chat_session_backend: str = "memory"  # "memory" or "redis"
+    chat_session_redis_url: str = "redis://localhost:6379/0"
+    chat_session_ttl_seconds: int = 86400  # 24 hours idle
+    chat_session_max_sessions: int = 10000
+    chat_session_max_bytes: int = 64 * 1024 * 1024  # Stored message text, in-memory store
+    chat_session_max_messages: int = 20
+    chat_session_max_age_hours: int = 24  # Sweeper removes sessions idle this long
+    chat_session_sweep_interval_seconds: int = 300
+
+    # Chat analytics (chat_sessions table)
+    chat_analytics_sink: str = "off"  # "off", "bigquery", "file" or "memory"
+    chat_analytics_file_path: str = "chat_analytics.jsonl"
+    chat_analytics_max_queue: int = 10000  # Events beyond this are dropped, never waited on
+    chat_analytics_batch_size: int = 500
+    chat_analytics_flush_seconds: float = 30.0
 
     # Data
     default_history_days: int = 30
     forecast_days: int = 7
 
+    # Climatology (extended-range outlooks)
+    climatology_path: str = "app/data/climatology.npz"
+    forecast_max_days: int = 30
+    climatology_blend_days: float = 7.0  # e-folding time from persistence to climatology
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -73,7 +126,7 @@ def get_settings() -> Settings:
 
 
 # Oahu dive/snorkel sites configuration
-OAHU_SITES = [
+OAHU_SITES: List[Dict[str, Any]] = [
     {
         "id": "hanauma-bay",
         "name": "Hanauma Bay",
@@ -11,14 +11,17 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+from app.api.disconnect import ClientDisconnected
 from app.api.routes import router
 from app.core.config import get_settings
-from app.services import chat_service
+from app.services import chat_service, climatology_service
+from app.services.admission_controller import AdmissionRejected
+from app.services.chat_analytics import get_chat_analytics
 
 # Configure logging
 logging.basicConfig(
@@ -42,12 +45,34 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment: {settings.environment}")
     logger.info(f"Debug mode: {settings.debug}")
 
+    # Load precomputed climatology for extended-range outlooks
+    if climatology_service.load_climatology() is None:
+        logger.warning(
+            f"Long-range outlook disabled: forecasts are limited to "
+            f"{settings.forecast_days} days without a climatology table"
+        )
+
+    # Shared async LLM client with a pooled, keep-alive connection set
+    chat_service.init_client()
+
+    # Periodically drop idle chat sessions so memory stays flat
+    chat_service.start_session_sweeper()
+
+    # Background writer for chat analytics (no-op when CHAT_ANALYTICS_SINK=off)
+    analytics = get_chat_analytics()
+    if analytics is not None:
+        analytics.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down...")
+    await chat_service.stop_session_sweeper()
+    if analytics is not None:
+        await analytics.stop()
+    await chat_service.close_client()
     # Clean up old chat sessions
-    cleaned = chat_service.cleanup_old_sessions(max_age_hours=24)
+    cleaned = await chat_service.cleanup_old_sessions(max_age_hours=settings.chat_session_max_age_hours)
     logger.info(f"Cleaned up {cleaned} old chat sessions")
 
 
@@ -61,7 +86,7 @@ app = FastAPI(
     ## Features
     - Current ocean conditions (SST, anomaly, DHW)
     - Coral bleaching risk assessments
-    - 7-day forecasts
+    - 7-day forecasts and 30-day climatology-blended outlooks
     - Active alerts and warnings
     - AI-powered chat assistance
 
@@ -92,6 +117,24 @@ app.add_middleware(
 )
 
 
+# Chat turns rejected by the LLM admission controller
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Return 429/503 with a Retry-After hint instead of queueing further."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": "Chat unavailable", "message": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+# Work cancelled because the client went away; nobody reads this response
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    """Close out the request quietly (499, as nginx logs it)."""
+    return Response(status_code=499)
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
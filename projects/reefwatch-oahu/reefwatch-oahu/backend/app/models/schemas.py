@@ -110,6 +110,7 @@ class HistoricalDataPoint(BaseModel):
     date: date
     sst: Optional[float] = None
     sst_anomaly: Optional[float] = None
+    hotspot: Optional[float] = None
     dhw: Optional[float] = None
     risk_level: Optional[RiskLevel] = None
 
@@ -148,6 +149,35 @@ class ForecastResponse(BaseModel):
     generated_at: datetime
 
 
+class RankedSite(BaseModel):
+    """A site's predicted conditions and rank for one day."""
+    rank: int = Field(..., ge=1, description="Rank within the day (1 = best)")
+    site_id: str
+    site_name: str
+    type: SiteType
+    difficulty: SiteDifficulty
+    predicted_sst: float
+    predicted_dhw: float
+    predicted_risk: RiskLevel
+    confidence: float = Field(..., ge=0, le=1, description="Prediction confidence")
+    distance_km: Optional[float] = Field(None, ge=0, description="Distance from the supplied location")
+    score: float = Field(..., ge=0, le=1, description="Combined ranking score (higher is better)")
+
+
+class DailySiteRanking(BaseModel):
+    """Ranked sites for a single day."""
+    date: date
+    sites: List[RankedSite]
+
+
+class SiteRankingResponse(BaseModel):
+    """Ranked sites for every day in a date range."""
+    start_date: date
+    end_date: date
+    days: List[DailySiteRanking]
+    generated_at: datetime
+
+
 class AlertSeverity(str, Enum):
     """Alert severity levels."""
     WATCH = "watch"
@@ -0,0 +1,219 @@
+"""
+Admission control for upstream LLM calls.
+
+Caps the number of chat turns in flight to the LLM provider from this
+instance and queues the rest fairly: waiting turns are admitted
+round-robin across sessions, so one busy session can't starve others.
+When the queue is too deep, callers are rejected immediately with a
+Retry-After hint instead of piling up into provider rate limits.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Smoothing factor for the running service-time estimate
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a chat turn can't be admitted.
+
+    Attributes:
+        status_code: 429 when the session has too many turns queued,
+            503 when the instance is saturated
+        retry_after: Suggested wait before retrying, in whole seconds
+        reason: Short human-readable cause
+    """
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Global concurrency cap with fair per-key queuing.
+
+    Args:
+        max_concurrency: Turns allowed in flight at once
+        max_queue: Turns allowed to wait across all keys
+        max_queue_per_key: Turns one key (session) may have waiting
+        max_wait_seconds: How long a queued turn waits before giving up
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        max_queue_per_key: int,
+        max_wait_seconds: float
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_key = max_queue_per_key
+        self.max_wait_seconds = max_wait_seconds
+
+        self._in_flight = 0
+        self._waiting = 0
+        # Round-robin order of keys with waiters; each holds its FIFO of futures
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_observed = 0.0
+        self.service_time_estimate = 5.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a newly queued turn would be admitted."""
+        turns_ahead = self._waiting + 1
+        wait = self.service_time_estimate * turns_ahead / max(self.max_concurrency, 1)
+        return max(1, math.ceil(wait))
+
+    def _reject(self, status_code: int, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(status_code, self.retry_after(), reason)
+
+    def _record_wait(self, waited: float) -> None:
+        self.admitted += 1
+        self.total_wait_seconds += waited
+        self.max_wait_observed = max(self.max_wait_observed, waited)
+
+    def _remove_waiter(self, key: str, future: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[key]
+
+    async def acquire(self, key: str) -> None:
+        """
+        Wait for a slot for `key`.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait times out
+        """
+        if self._in_flight < self.max_concurrency and not self._waiting:
+            self._in_flight += 1
+            self._record_wait(0.0)
+            return
+
+        if len(self._queues.get(key, ())) >= self.max_queue_per_key:
+            raise self._reject(429, "Too many messages in progress for this session")
+        if self._waiting >= self.max_queue:
+            raise self._reject(503, "Chat is busy, please retry shortly")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+        self._waiting += 1
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Slot was handed over as we gave up; pass it on
+                self.release()
+            else:
+                future.cancel()
+                self._remove_waiter(key, future)
+
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            raise self._reject(503, "Chat is busy, please retry shortly") from None
+
+        self._record_wait(time.monotonic() - started)
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """
+        Free a slot, handing it to the next session in round-robin order.
+
+        Args:
+            service_seconds: How long the turn held the slot (updates the
+                Retry-After estimate)
+        """
+        if service_seconds is not None:
+            self.service_time_estimate += SERVICE_TIME_ALPHA * (
+                service_seconds - self.service_time_estimate
+            )
+
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+
+            if not future.done():
+                # Slot transfers to the waiter; in-flight count is unchanged
+                future.set_result(None)
+                return
+
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, key: str) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        await self.acquire(key)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, float]:
+        """Concurrency, queue depth and wait-time metrics."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "queued_sessions": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.admitted, 3) if self.admitted else 0.0,
+            "max_wait_seconds": round(self.max_wait_observed, 3),
+            "service_time_estimate_seconds": round(self.service_time_estimate, 3)
+        }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get the instance-wide admission controller for LLM calls."""
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController(
+            max_concurrency=settings.chat_max_concurrency,
+            max_queue=settings.chat_max_queue,
+            max_queue_per_key=settings.chat_max_queue_per_session,
+            max_wait_seconds=settings.chat_queue_timeout_seconds
+        )
+    return _controller
@@ -0,0 +1,141 @@
+"""
+Answer cache for repeated first-turn chat questions.
+
+Much of the chat traffic is the same handful of opening questions ("what
+is DHW?", "is it safe to snorkel today?"). Answers to a session's first
+message are cached by normalized question text, Pidgin mode, context mode
+and the current-conditions snapshot version, so a new data snapshot
+naturally stops serving old answers. Entries also expire after a TTL and
+are evicted least-recently-used when the cache is full.
+"""
+
+import re
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Approximate size of replayed stream chunks, split on word boundaries
+REPLAY_CHUNK_CHARS = 24
+
+_APOSTROPHES = re.compile(r"['’ʻ‘`]")
+_WORD = re.compile(r"\w+")
+_REPLAY_PIECE = re.compile(r"\s*\S+")
+
+AnswerKey = Tuple[str, bool, Hashable, Optional[int]]
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase a question and reduce it to its words ("What is DHW?" -> "what is dhw")."""
+    return " ".join(_WORD.findall(_APOSTROPHES.sub("", text.lower())))
+
+
+def replay_chunks(text: str, chunk_chars: int = REPLAY_CHUNK_CHARS) -> Iterator[str]:
+    """Split a cached answer into stream-sized chunks that join back to the original."""
+    chunk = ""
+    for piece in _REPLAY_PIECE.findall(text):
+        chunk += piece
+        if len(chunk) >= chunk_chars:
+            yield chunk
+            chunk = ""
+
+    tail = text[len(text.rstrip()):]
+    if chunk or tail:
+        yield chunk + tail
+
+
+class AnswerCache:
+    """
+    TTL + LRU cache of assistant answers with hit-rate counters.
+
+    Args:
+        max_entries: Maximum cached answers
+        ttl_seconds: How long an answer stays valid
+        max_question_chars: Longer questions are never looked up or stored
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, max_question_chars: int):
+        self.max_question_chars = max_question_chars
+        self._entries: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def key(
+        self,
+        question: str,
+        pidgin_mode: bool,
+        context: Hashable,
+        data_version: Optional[int]
+    ) -> Optional[AnswerKey]:
+        """
+        Build the cache key for a question.
+
+        Args:
+            question: The user's message
+            pidgin_mode: Whether the reply is in Pidgin style
+            context: How ocean data reaches the model (e.g. context mode)
+            data_version: Current-conditions snapshot version
+
+        Returns:
+            Key, or None if the question shouldn't be cached
+        """
+        if len(question) > self.max_question_chars:
+            return None
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        return (normalized, pidgin_mode, context, data_version)
+
+    def get(self, key: AnswerKey) -> Optional[str]:
+        """Cached answer for key, counting the hit or miss."""
+        answer = self._entries.get(key)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def put(self, key: AnswerKey, answer: str) -> None:
+        """Store an answer."""
+        if answer.strip():
+            self._entries[key] = answer
+            self.stores += 1
+
+    def clear(self) -> None:
+        """Drop all cached answers (counters are kept)."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        """Entry count and hit-rate metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": int(self._entries.maxsize),
+            "ttl_seconds": int(self._entries.ttl),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+_answer_cache: Optional[AnswerCache] = None
+
+
+def get_answer_cache() -> AnswerCache:
+    """Get the instance-wide answer cache built from settings."""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache(
+            max_entries=settings.chat_answer_cache_max_entries,
+            ttl_seconds=settings.chat_answer_cache_ttl_seconds,
+            max_question_chars=settings.chat_answer_cache_max_question_chars
+        )
+    return _answer_cache
@@ -6,9 +6,10 @@ historical data, and alerts. Uses connection pooling and caching
 for optimal performance.
 """
 
+import asyncio
 import logging
 from datetime import date, datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from cachetools import TTLCache
 from google.cloud import bigquery
@@ -37,6 +38,16 @@ _cache = TTLCache(maxsize=settings.cache_max_size, ttl=settings.cache_ttl_second
 # BigQuery client singleton
 _bq_client: Optional[bigquery.Client] = None
 
+# Queries cancelled because the caller went away (e.g. client disconnect)
+_cancellation_stats: Dict[str, int] = {"jobs_cancelled": 0, "bytes_saved_estimate": 0}
+
+# Changes whenever the content of the current-conditions snapshot does, so
+# consumers can memoize anything derived from it; None while the uncached
+# error fallback is served
+_data_version: Optional[int] = 0
+_data_fingerprint: Optional[int] = None
+_snapshot_count = 0
+
 
 def get_bq_client() -> bigquery.Client:
     """Get or create BigQuery client with connection pooling."""
@@ -46,6 +57,87 @@ def get_bq_client() -> bigquery.Client:
     return _bq_client
 
 
+def get_data_version() -> Optional[int]:
+    """Get the version of the current-conditions snapshot (None if data is unavailable)."""
+    return _data_version
+
+
+def _record_snapshot(sites: Optional[List[SiteWithConditions]]) -> None:
+    """
+    Update the data version for a freshly fetched snapshot.
+
+    Refetching identical data keeps the version; None marks the error
+    fallback, which downstream caches must not memoize.
+    """
+    global _data_version, _data_fingerprint, _snapshot_count
+    if sites is None:
+        _data_version = None
+        return
+
+    fingerprint = hash(tuple(site.model_dump_json() for site in sites))
+    if fingerprint != _data_fingerprint:
+        _data_fingerprint = fingerprint
+        _snapshot_count += 1
+    _data_version = _snapshot_count
+
+
+def _cancel_job(job: bigquery.QueryJob) -> None:
+    """Cancel a query job and estimate the bytes it didn't bill (runs in a worker thread)."""
+    try:
+        job.cancel()
+        job.reload()
+        estimated = job.estimated_bytes_processed or 0
+        billed = job.total_bytes_billed or 0
+        _cancellation_stats["bytes_saved_estimate"] += max(estimated - billed, 0)
+    except Exception as e:
+        logger.warning(f"Could not cancel BigQuery job {job.job_id}: {e}")
+
+
+def _cancel_submitted_job(submission: asyncio.Future) -> None:
+    """Cancel a job whose submission finished after its caller went away."""
+    if submission.cancelled() or submission.exception() is not None:
+        return
+    asyncio.get_running_loop().run_in_executor(None, _cancel_job, submission.result())
+
+
+async def run_query(query: str, job_config: Optional[bigquery.QueryJobConfig] = None) -> list:
+    """
+    Run a query without blocking the event loop.
+
+    If the awaiting task is cancelled (e.g. the HTTP client disconnected),
+    the BigQuery job is cancelled too instead of running to completion.
+
+    Args:
+        query: SQL to run
+        job_config: Optional job configuration (query parameters etc.)
+
+    Returns:
+        Result rows
+    """
+    client = get_bq_client()
+    # Shielded so a caller cancelled mid-submission still gets the job to cancel
+    submission = asyncio.ensure_future(asyncio.to_thread(client.query, query, job_config=job_config))
+    try:
+        job = await asyncio.shield(submission)
+    except asyncio.CancelledError:
+        _cancellation_stats["jobs_cancelled"] += 1
+        submission.add_done_callback(_cancel_submitted_job)
+        raise
+
+    try:
+        return await asyncio.to_thread(lambda: list(job.result()))
+    except asyncio.CancelledError:
+        _cancellation_stats["jobs_cancelled"] += 1
+        # Fire and forget: the caller is already gone
+        asyncio.get_running_loop().run_in_executor(None, _cancel_job, job)
+        raise
+
+
+def get_cancellation_stats() -> Dict[str, int]:
+    """Counts of queries cancelled mid-flight and the bytes they didn't scan."""
+    return dict(_cancellation_stats)
+
+
 def _build_risk(row: dict) -> BleachingRisk:
     """Build BleachingRisk from database row."""
     risk_level = row.get("risk_level", "Unknown")
@@ -91,8 +183,6 @@ async def get_current_conditions() -> List[SiteWithConditions]:
     if cache_key in _cache:
         return _cache[cache_key]
 
-    client = get_bq_client()
-
     # Query for latest data per site
     query = f"""
     SELECT
@@ -120,8 +210,7 @@ async def get_current_conditions() -> List[SiteWithConditions]:
     """
 
     try:
-        query_job = client.query(query)
-        results = query_job.result()
+        results = await run_query(query)
 
         # Build lookup from DB results
         db_data = {row["site_name"]: dict(row) for row in results}
@@ -177,10 +266,13 @@ async def get_current_conditions() -> List[SiteWithConditions]:
             sites_with_conditions.append(site_with_conditions)
 
         _cache[cache_key] = sites_with_conditions
+        _record_snapshot(sites_with_conditions)
         return sites_with_conditions
 
     except GoogleAPIError as e:
         logger.error(f"BigQuery error fetching current conditions: {e}")
+        # Uncached fallback: no version, so nothing derived from it is memoized
+        _record_snapshot(None)
         # Return sites without conditions data on error
         return [
             SiteWithConditions(
@@ -211,7 +303,6 @@ async def _get_temperature_trend(site_name: str) -> str:
 
     Returns: "rising", "falling", or "stable"
     """
-    client = get_bq_client()
 
     query = f"""
     SELECT
@@ -229,8 +320,7 @@ async def _get_temperature_trend(site_name: str) -> str:
     )
 
     try:
-        query_job = client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        results = await run_query(query, job_config=job_config)
 
         if results:
             row = results[0]
@@ -274,13 +364,13 @@ async def get_site_history(
         return []
 
     site_name = site["name"]
-    client = get_bq_client()
 
     query = f"""
     SELECT
         date,
         sst,
         sst_anomaly,
+        hotspot,
         dhw,
         risk_level
     FROM `{settings.gcp_project_id}.{settings.bigquery_dataset}.ocean_conditions_daily`
@@ -297,8 +387,7 @@ async def get_site_history(
     )
 
     try:
-        query_job = client.query(query, job_config=job_config)
-        results = query_job.result()
+        results = await run_query(query, job_config=job_config)
 
         history = []
         for row in results:
@@ -311,6 +400,7 @@ async def get_site_history(
                 date=row["date"],
                 sst=row.get("sst"),
                 sst_anomaly=row.get("sst_anomaly"),
+                hotspot=row.get("hotspot"),
                 dhw=row.get("dhw"),
                 risk_level=risk
             ))
@@ -330,7 +420,6 @@ async def get_site_statistics(site_id: str, days: int = 30) -> dict:
         return {}
 
     site_name = site["name"]
-    client = get_bq_client()
 
     query = f"""
     SELECT
@@ -354,8 +443,7 @@ async def get_site_statistics(site_id: str, days: int = 30) -> dict:
     )
 
     try:
-        query_job = client.query(query, job_config=job_config)
-        results = list(query_job.result())
+        results = await run_query(query, job_config=job_config)
 
         if results:
             row = results[0]
@@ -389,7 +477,6 @@ async def get_active_alerts() -> List[Alert]:
         return _cache[cache_key]
 
     alerts = []
-    client = get_bq_client()
 
     # Check for stored alerts
     try:
@@ -401,8 +488,7 @@ async def get_active_alerts() -> List[Alert]:
         ORDER BY created_at DESC
         """
 
-        query_job = client.query(query)
-        for row in query_job.result():
+        for row in await run_query(query):
             alerts.append(Alert(
                 id=row["alert_id"],
                 type=AlertType(row["alert_type"]),
@@ -0,0 +1,319 @@
+"""
+Chat analytics for ReefWatch Oahu.
+
+Chat turns drop a small event on an in-process bounded queue and move
+on; a background worker batches the events, condenses them into rows for
+the chat_sessions table and hands each batch to a sink (BigQuery load
+job, JSON-lines file or memory). Requests never wait on analytics I/O:
+when the queue is full, events are dropped and counted.
+
+Rows are additive: each covers the turns of one session seen in one
+batch, so per-session totals are SUM(message_count) and the union of
+topics_discussed grouped by session_id.
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.language_detector import tokenize
+from app.services.site_matcher import get_site_matcher
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Topic labels recorded alongside the site IDs a message mentions
+TOPIC_KEYWORDS: Dict[str, frozenset] = {
+    "bleaching": frozenset({"bleaching", "bleach", "bleached", "dhw", "hotspot"}),
+    "water_temperature": frozenset({"sst", "temperature", "temp", "warm", "cold", "anomaly"}),
+    "forecast": frozenset({"forecast", "tomorrow", "weekend", "week", "next", "later"}),
+    "safety": frozenset({"safe", "safety", "dangerous", "current", "currents", "waves", "surf"}),
+    "marine_life": frozenset({"turtle", "turtles", "honu", "fish", "coral", "dolphin", "dolphins", "eel"}),
+    "recommendations": frozenset({"best", "recommend", "where", "beginner", "beginners", "kids", "keiki"}),
+}
+
+
+def detect_topics(text: str) -> List[str]:
+    """Topic labels and site IDs mentioned in a message."""
+    tokens = tokenize(text)
+    topics = [topic for topic, words in TOPIC_KEYWORDS.items() if tokens & words]
+    return topics + get_site_matcher().match(text)
+
+
+def _timestamp(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def build_rows(events: List[dict]) -> List[dict]:
+    """
+    Condense turn events into one chat_sessions row per session.
+
+    Args:
+        events: Turn events from ChatAnalytics.record, oldest first
+
+    Returns:
+        Rows matching the chat_sessions schema
+    """
+    rows: Dict[str, dict] = {}
+    for event in events:
+        row = rows.get(event["session_id"])
+        if row is None:
+            row = rows[event["session_id"]] = {
+                "session_id": event["session_id"],
+                "created_at": _timestamp(event["created_at"]),
+                "last_activity": _timestamp(event["timestamp"]),
+                "message_count": 0,
+                "topics_discussed": []
+            }
+
+        row["last_activity"] = _timestamp(event["timestamp"])
+        row["message_count"] += event["message_count"]
+        for topic in detect_topics(event["message"]):
+            if topic not in row["topics_discussed"]:
+                row["topics_discussed"].append(topic)
+
+    return list(rows.values())
+
+
+class AnalyticsSink(ABC):
+    """Destination for batches of chat_sessions rows."""
+
+    @abstractmethod
+    async def write(self, rows: List[dict]) -> None:
+        """Persist a batch of rows (may raise; the writer logs and counts failures)."""
+
+
+class MemorySink(AnalyticsSink):
+    """Keeps rows in a list (tests and local debugging)."""
+
+    def __init__(self):
+        self.rows: List[dict] = []
+        self.batches = 0
+
+    async def write(self, rows: List[dict]) -> None:
+        self.rows.extend(rows)
+        self.batches += 1
+
+
+class FileSink(AnalyticsSink):
+    """Appends rows to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, rows: List[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+    async def write(self, rows: List[dict]) -> None:
+        await asyncio.to_thread(self._append, rows)
+
+
+class BigQuerySink(AnalyticsSink):
+    """
+    Appends rows to a BigQuery table with a load job (free, unlike streaming inserts).
+
+    Args:
+        table_id: Fully qualified table ID (project.dataset.table)
+    """
+
+    def __init__(self, table_id: str):
+        self.table_id = table_id
+
+    def _load(self, rows: List[dict]) -> None:
+        from google.cloud import bigquery
+        from app.services.bigquery_service import get_bq_client
+
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND
+        )
+        job = get_bq_client().load_table_from_json(rows, self.table_id, job_config=job_config)
+        job.result()
+
+    async def write(self, rows: List[dict]) -> None:
+        await asyncio.to_thread(self._load, rows)
+
+
+class ChatAnalytics:
+    """
+    Bounded, non-blocking event queue with a batching background writer.
+
+    Batches are flushed when they reach batch_size or flush_seconds after
+    their first event, whichever comes first.
+
+    Args:
+        sink: Where batches are written
+        max_queue: Events held before new ones are dropped
+        batch_size: Events per flush, at most
+        flush_seconds: Maximum time an event waits before being flushed
+    """
+
+    def __init__(self, sink: AnalyticsSink, max_queue: int, batch_size: int, flush_seconds: float):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._batch: List[dict] = []
+        self._worker: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written_events = 0
+        self.written_rows = 0
+        self.flushes = 0
+        self.failed_events = 0
+
+    def record(
+        self,
+        session_id: str,
+        created_at: datetime,
+        message: str,
+        message_count: int = 2
+    ) -> bool:
+        """
+        Queue a chat turn without waiting.
+
+        Args:
+            session_id: Chat session ID
+            created_at: When the session started
+            message: The user's message (topics are extracted by the worker)
+            message_count: Messages the turn added to the session
+
+        Returns:
+            False if the queue was full and the event was dropped
+        """
+        event = {
+            "session_id": session_id,
+            "created_at": created_at,
+            "timestamp": datetime.utcnow(),
+            "message": message,
+            "message_count": message_count
+        }
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        self.enqueued += 1
+        return True
+
+    async def _write(self, events: List[dict]) -> None:
+        try:
+            rows = build_rows(events)
+            await self.sink.write(rows)
+        except Exception as e:
+            self.failed_events += len(events)
+            logger.error(f"Chat analytics flush of {len(events)} events failed: {e}")
+            return
+
+        self.flushes += 1
+        self.written_events += len(events)
+        self.written_rows += len(rows)
+
+    async def _flush(self) -> None:
+        events, self._batch = self._batch, []
+        write = asyncio.ensure_future(self._write(events))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # Let an in-progress write finish so stop() doesn't repeat it
+            await write
+            raise
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = loop.time() + self.flush_seconds
+
+            while len(self._batch) < self.batch_size:
+                try:
+                    self._batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush()
+
+    def start(self) -> asyncio.Task:
+        """Start the background writer."""
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return self._worker
+
+    async def stop(self) -> None:
+        """Stop the writer and flush everything still queued."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+            if len(self._batch) >= self.batch_size:
+                await self._flush()
+        if self._batch:
+            await self._flush()
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and delivery counters."""
+        return {
+            "queued": self._queue.qsize() + len(self._batch),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "written_events": self.written_events,
+            "written_rows": self.written_rows,
+            "flushes": self.flushes,
+            "failed_events": self.failed_events
+        }
+
+
+def create_analytics_sink() -> Optional[AnalyticsSink]:
+    """Build the sink selected by settings, or None when analytics are off."""
+    backend = settings.chat_analytics_sink
+    if backend == "bigquery":
+        return BigQuerySink(f"{settings.gcp_project_id}.{settings.bigquery_dataset}.chat_sessions")
+    if backend == "file":
+        return FileSink(settings.chat_analytics_file_path)
+    if backend == "memory":
+        return MemorySink()
+    if backend != "off":
+        logger.warning(f"Unknown chat analytics sink {backend!r}; analytics disabled")
+    return None
+
+
+_analytics: Optional[ChatAnalytics] = None
+
+
+def get_chat_analytics() -> Optional[ChatAnalytics]:
+    """Get the analytics writer, or None when analytics are off."""
+    global _analytics
+    if _analytics is None:
+        sink = create_analytics_sink()
+        if sink is None:
+            return None
+        _analytics = ChatAnalytics(
+            sink,
+            max_queue=settings.chat_analytics_max_queue,
+            batch_size=settings.chat_analytics_batch_size,
+            flush_seconds=settings.chat_analytics_flush_seconds
+        )
+    return _analytics
@@ -0,0 +1,154 @@
+"""
+Conversation history shaping for ReefWatch Oahu chat.
+
+Selects which stored turns are sent upstream on each request so the
+input stays within a token budget while remaining a valid alternating
+user/assistant conversation, and condenses turns that are no longer sent
+into a running summary.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+# Rough English average for Claude tokenizers; errs slightly high on prose
+CHARS_PER_TOKEN = 4
+
+# Per-message framing overhead (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Extractive summaries keep one clipped sentence per evicted message
+SUMMARY_LINE_CHARS = 160
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a string without calling a tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Estimate the input tokens a single chat message costs."""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _merge_consecutive(messages: List[dict]) -> List[dict]:
+    """Join runs of same-role messages (e.g. a user retry after a failed reply)."""
+    merged: List[dict] = []
+    for message in messages:
+        if merged and merged[-1]["role"] == message["role"]:
+            merged[-1] = {
+                "role": message["role"],
+                "content": merged[-1]["content"] + "\n\n" + message["content"]
+            }
+        else:
+            merged.append({"role": message["role"], "content": message["content"]})
+    return merged
+
+
+def _from_first_user(turns: List[dict]) -> List[dict]:
+    """Drop leading assistant turns; the Messages API wants a user turn first."""
+    while len(turns) > 1 and turns[0]["role"] != "user":
+        turns.pop(0)
+    return turns
+
+
+def split_history(
+    messages: List[dict],
+    token_budget: int,
+    unsummarized: Optional[List[dict]] = None
+) -> Tuple[int, List[dict]]:
+    """
+    Split stored history into the turns sent upstream and the ones dropped.
+
+    The newest message is always kept, even if it alone exceeds the
+    budget. The kept turns alternate roles and start with a user message,
+    as the Messages API requires.
+
+    With a running summary, pass unsummarized: turns already removed from
+    storage whose summary hasn't been written yet. They, and the turns
+    dropped now, stay in the request until the stored summary covers
+    them, so the model never loses a turn while the summary catches up
+    (the request runs over budget for that turn instead).
+
+    Args:
+        messages: Stored history, oldest first
+        token_budget: Maximum estimated input tokens for the history
+        unsummarized: Earlier dropped turns awaiting their summary, oldest first
+
+    Returns:
+        Tuple of (number of oldest stored messages dropped, new list of
+        messages to send upstream)
+    """
+    turns = _merge_consecutive(messages)
+
+    kept: List[dict] = []
+    used = 0
+    for message in reversed(turns):
+        cost = estimate_message_tokens(message)
+        if kept and used + cost > token_budget:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    kept = _from_first_user(kept)
+
+    # Each kept turn covers a run of same-role stored messages
+    covered = 0
+    runs = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if index == len(messages) - 1 or messages[index]["role"] != messages[index + 1]["role"]:
+            runs += 1
+            if runs > len(kept):
+                break
+        covered += 1
+
+    dropped = len(messages) - covered
+    if unsummarized is not None:
+        kept = _from_first_user(_merge_consecutive(unsummarized + messages))
+    return dropped, kept
+
+
+def trim_history(messages: List[dict], token_budget: int) -> List[dict]:
+    """
+    Keep the most recent turns that fit within a token budget.
+
+    See split_history; this returns only the messages to send upstream.
+    """
+    return split_history(messages, token_budget)[1]
+
+
+def _first_sentence(text: str, max_chars: int = SUMMARY_LINE_CHARS) -> str:
+    """First sentence of a message, collapsed to one line and clipped."""
+    sentence = _SENTENCE_END.split(" ".join(text.split()), maxsplit=1)[0]
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars - 1].rstrip() + "…"
+    return sentence
+
+
+def summarize_extractive(previous: str, messages: List[dict], max_chars: int) -> str:
+    """
+    Fold evicted turns into a running summary without calling a model.
+
+    Each turn contributes its first sentence; when the summary grows past
+    max_chars, the oldest lines are dropped.
+
+    Args:
+        previous: Existing summary text (may be empty)
+        messages: Evicted messages, oldest first
+        max_chars: Maximum summary length
+
+    Returns:
+        Updated summary
+    """
+    labels = {"user": "User asked", "assistant": "Assistant said"}
+    lines = previous.splitlines() if previous else []
+    lines.extend(
+        f"- {labels.get(m['role'], m['role'])}: {_first_sentence(m['content'])}"
+        for m in messages
+        if m["content"].strip()
+    )
+
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+
+    return "\n".join(lines)[:max_chars]
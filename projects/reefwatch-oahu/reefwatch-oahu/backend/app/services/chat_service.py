@@ -6,22 +6,78 @@ The assistant can answer questions about ocean conditions, coral health,
 and provide recommendations for visitors.
 """
 
+import asyncio
 import logging
-import re
 import uuid
-from datetime import datetime
-from typing import AsyncGenerator, Dict, List, Optional
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Optional, Tuple, TypeVar, cast
 
 import anthropic
+import httpx
+from anthropic.types import MessageParam, ToolResultBlockParam
 
 from app.core.config import get_settings
-from app.services.bigquery_service import get_data_summary, get_current_conditions
+from app.services.admission_controller import AdmissionRejected, get_admission_controller
+from app.services.answer_cache import AnswerKey, get_answer_cache, replay_chunks
+from app.services.bigquery_service import (
+    get_current_conditions,
+    get_data_summary,
+    get_data_version,
+)
+from app.services.chat_analytics import get_chat_analytics
+from app.services.chat_history import estimate_tokens, split_history, summarize_extractive, trim_history
+from app.services.chat_tools import TOOLS_NOTE, execute_tool, get_tools
+from app.services.language_detector import get_pidgin_detector
+from app.services.session_locks import KeyedLocks
+from app.services.session_store import SessionStore, create_session_store
+from app.services.site_matcher import get_site_matcher
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# In-memory session storage (use Redis in production for scalability)
-_sessions: Dict[str, dict] = {}
+T = TypeVar("T")
+
+# Session storage (bounded in-memory by default, Redis when configured)
+_sessions: SessionStore = create_session_store()
+
+# One turn at a time per session; locks exist only while a turn is in progress
+_turn_locks = KeyedLocks()
+
+# In-flight background summary updates, one chain per session
+_summary_tasks: Dict[str, asyncio.Task] = {}
+
+# Turns removed from a session whose summary hasn't been stored yet, oldest first
+_unsummarized: Dict[str, List[dict]] = {}
+
+# Turns completed vs. abandoned mid-response (client disconnected), with
+# estimated output tokens; used to report how much generation was cut short
+_turn_stats: Dict[str, int] = {
+    "completed_turns": 0,
+    "completed_output_tokens": 0,
+    "cancelled_turns": 0,
+    "output_tokens_saved_estimate": 0
+}
+
+# Periodic session sweeper (started in the app lifespan)
+_sweeper_task: Optional[asyncio.Task] = None
+
+# Long-lived async Anthropic client (created in the app lifespan)
+_client: Optional[anthropic.AsyncAnthropic] = None
+
+# Rendered system prompt blocks keyed by (data version, pidgin mode, include context,
+# context mode); only entries for the latest data snapshot are kept
+_system_prompt_cache: Dict[Tuple[Optional[int], bool, bool, str], List[dict]] = {}
+
+PIDGIN_NOTE = "(User is using Hawaiian Pidgin - respond in a friendly Pidgin style!)"
+CONTEXT_UNAVAILABLE = "\n(Current ocean data temporarily unavailable)\n"
+SUMMARY_HEADER = "Summary of the earlier conversation with this user:\n"
+INCOMPLETE_ANSWER = "Sorry, I couldn't finish looking that up. Please try asking again."
+
+SUMMARY_PROMPT = """Update the running summary of a chat between a visitor and the ReefWatch Oahu assistant.
+Keep facts the assistant will need later: sites and dates discussed, the visitor's plans,
+experience level and preferences, and any recommendations already given. Be brief and
+write plain bullet points only."""
 
 # System prompt for the AI assistant
 SYSTEM_PROMPT = """You are ReefBot, a friendly and knowledgeable ocean scientist assistant for ReefWatch Oahu. Your role is to help visitors understand ocean conditions and make informed decisions about snorkeling and diving around Oahu.
@@ -72,55 +128,215 @@ Always remind users about:
 - Following lifeguard instructions"""
 
 
+def init_client() -> anthropic.AsyncAnthropic:
+    """
+    Create the shared async Anthropic client.
+
+    The client keeps a pooled HTTP connection set with keep-alive so
+    chat turns reuse warm connections instead of opening new ones.
+    """
+    global _client
+
+    _client = anthropic.AsyncAnthropic(
+        api_key=settings.anthropic_api_key,
+        timeout=settings.chat_timeout_seconds,
+        http_client=anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.chat_max_connections,
+                max_keepalive_connections=settings.chat_max_keepalive_connections,
+                keepalive_expiry=settings.chat_keepalive_expiry_seconds
+            )
+        )
+    )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client and its connection pool."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_client() -> anthropic.AsyncAnthropic:
+    """Get the shared async Anthropic client, creating it if needed."""
+    if _client is None:
+        return init_client()
+    return _client
+
+
 def detect_pidgin(text: str) -> bool:
     """
     Detect if the user is writing in Hawaiian Pidgin English.
 
-    Looks for common Pidgin words and phrases.
+    Looks for common Pidgin words (see language_detector for the
+    configurable vocabulary and threshold).
     """
-    pidgin_markers = [
-        r'\bbrah\b', r'\bbruddah\b', r'\bsista\b', r'\bdah\b', r'\bda\b',
-        r'\bstay\b', r'\bshoots\b', r'\brain\b', r'\brajah\b', r'\bhowzit\b',
-        r'\bchoke\b', r'\bono\b', r'\bkine\b', r'\bwea\b', r'\bwen\b',
-        r'\bmoke\b', r'\bhaole\b', r'\bkeiki\b', r'\btutu\b', r'\bpuka\b',
-        r'\bpau\b', r'\bmahalos?\b', r'\beh\b'
-    ]
+    return get_pidgin_detector().detect(text)
+
+
+async def _store_call(method: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Call a session store method without stalling the event loop.
 
-    text_lower = text.lower()
-    matches = sum(1 for pattern in pidgin_markers if re.search(pattern, text_lower))
-    return matches >= 2
+    Stores that do network I/O (Redis) run in a worker thread; the
+    in-memory store is called directly, as a thread hop would cost more
+    than the call itself.
+    """
+    if _sessions.blocking:
+        return await asyncio.to_thread(method, *args, **kwargs)
+    return method(*args, **kwargs)
 
 
-def get_session(session_id: str) -> dict:
+async def get_session(session_id: str) -> dict:
     """Get or create a chat session."""
-    if session_id not in _sessions:
-        _sessions[session_id] = {
-            "id": session_id,
-            "messages": [],
-            "created_at": datetime.utcnow(),
-            "last_activity": datetime.utcnow(),
-            "pidgin_mode": False
-        }
-    return _sessions[session_id]
+    return await _store_call(_sessions.get_or_create, session_id)
+
+
+async def update_session(session_id: str, role: str, content: str) -> None:
+    """Add a message to the session history, keeping the most recent messages."""
+    dropped = await _store_call(
+        _sessions.append_message, session_id, role, content, settings.chat_session_max_messages
+    )
 
+    if dropped and settings.chat_summary_mode != "off":
+        _schedule_summary(session_id, dropped)
 
-def update_session(session_id: str, role: str, content: str) -> None:
-    """Add a message to the session history."""
-    session = get_session(session_id)
-    session["messages"].append({"role": role, "content": content})
-    session["last_activity"] = datetime.utcnow()
 
-    # Keep only last 20 messages to manage context size
-    if len(session["messages"]) > 20:
-        session["messages"] = session["messages"][-20:]
+async def _summarize_with_model(previous: str, messages: List[dict]) -> str:
+    """Fold evicted turns into the summary using the (cheaper) summary model."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    response = await get_client().messages.create(
+        model=settings.chat_summary_model,
+        max_tokens=settings.chat_summary_max_tokens,
+        system=SUMMARY_PROMPT,
+        messages=[{
+            "role": "user",
+            "content": f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"
+        }]
+    )
+    return _response_text(response.content).strip()[:settings.chat_summary_max_chars]
 
 
-async def build_context_prompt() -> str:
+async def summarize_turns(previous: str, messages: List[dict]) -> str:
+    """
+    Fold evicted turns into a session's running summary.
+
+    Uses the summary model when chat_summary_mode is "model" (falling
+    back to the extractive summarizer on error), otherwise the local
+    extractive summarizer.
+    """
+    if settings.chat_summary_mode == "model":
+        try:
+            return await _summarize_with_model(previous, messages)
+        except Exception as e:
+            logger.warning(f"Model summary failed, using extractive summary: {e}")
+
+    return summarize_extractive(previous, messages, settings.chat_summary_max_chars)
+
+
+async def _update_summary(
+    session_id: str,
+    dropped: List[dict],
+    previous_task: Optional[asyncio.Task]
+) -> None:
+    """Background task: merge evicted turns into the stored summary."""
+    # Apply updates for a session in eviction order
+    if previous_task is not None:
+        await asyncio.gather(previous_task, return_exceptions=True)
+
+    try:
+        session = await _store_call(_sessions.get, session_id)
+        if session is None:
+            return
+        summary = await summarize_turns(session.get("summary", ""), dropped)
+        await _store_call(_sessions.update, session_id, summary=summary)
+    except Exception as e:
+        logger.error(f"Failed to update summary for session {session_id}: {e}")
+    finally:
+        # Stored (or given up on): requests stop sending these turns verbatim
+        pending = _unsummarized.get(session_id, [])
+        del pending[:len(dropped)]
+        if not pending:
+            _unsummarized.pop(session_id, None)
+
+
+def _schedule_summary(session_id: str, dropped: List[dict]) -> None:
+    """Summarize evicted turns off the request path."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.debug("No running event loop; evicted turns not summarized")
+        return
+
+    _unsummarized.setdefault(session_id, []).extend(dropped)
+    task = loop.create_task(_update_summary(session_id, dropped, _summary_tasks.get(session_id)))
+    _summary_tasks[session_id] = task
+
+    def _forget(finished: asyncio.Task) -> None:
+        if _summary_tasks.get(session_id) is finished:
+            del _summary_tasks[session_id]
+
+    task.add_done_callback(_forget)
+
+
+async def _history_for_request(session_id: str) -> Tuple[str, List[dict]]:
+    """
+    Stored summary and history trimmed to the token budget for the next upstream call.
+
+    With summaries on, turns that no longer fit are removed from the
+    session and folded into its summary in the background; the summary is
+    never waited for. Until it is stored, those turns are still sent
+    verbatim, so the model sees every turn at the cost of one request
+    over budget.
+
+    Returns:
+        Tuple of (stored summary, messages to send upstream)
+    """
+    if settings.chat_summary_mode == "off":
+        history = await _store_call(_sessions.get_messages, session_id)
+        return "", trim_history(history, settings.chat_history_token_budget)
+
+    # Snapshot pending turns before reading the summary: a summary stored
+    # in between then covers turns also sent verbatim, never neither
+    unsummarized = list(_unsummarized.get(session_id, []))
+    session = await _store_call(_sessions.get_or_create, session_id)
+    dropped_count, messages = split_history(
+        session["messages"], settings.chat_history_token_budget, unsummarized
+    )
+
+    if dropped_count:
+        dropped = await _store_call(_sessions.drop_oldest, session_id, dropped_count)
+        if dropped:
+            _schedule_summary(session_id, dropped)
+    return session.get("summary", ""), messages
+
+
+def _with_summary(system_content: List[dict], summary: str) -> List[dict]:
+    """Append the session's running summary (if any) after the cached prompt blocks."""
+    if not summary:
+        return system_content
+    return system_content + [_text_block(SUMMARY_HEADER + summary)]
+
+
+def _site_line(name: str, sst: Optional[float], dhw: Optional[float], risk: str) -> str:
+    """One site's conditions as a context bullet."""
+    sst_str = f"{sst}°C" if sst else "N/A"
+    dhw_str = f"{dhw}" if dhw else "N/A"
+    return f"- {name}: SST {sst_str}, DHW {dhw_str}, Risk: {risk}\n"
+
+
+async def build_context_prompt(include_sites: bool = True) -> str:
     """
     Build context string with current ocean conditions.
 
     This is injected into each chat request to give the AI
     up-to-date information to reference.
+
+    Args:
+        include_sites: Include a detail line per site; otherwise only the
+            island-wide summary
     """
     try:
         summary = await get_data_summary()
@@ -141,89 +357,350 @@ async def build_context_prompt() -> str:
 - Moderate risk sites: {summary['risk_distribution']['moderate']}
 - High risk sites: {summary['risk_distribution']['high']}
 - Severe risk sites: {summary['risk_distribution']['severe']}
-
-**Site Details:**
 """
+        if not include_sites:
+            return context
+
+        context += "\n**Site Details:**\n"
         for site in summary['sites']:
-            sst_str = f"{site['sst']}°C" if site['sst'] else "N/A"
-            dhw_str = f"{site['dhw']}" if site['dhw'] else "N/A"
-            context += f"- {site['name']}: SST {sst_str}, DHW {dhw_str}, Risk: {site['risk']}\n"
+            context += _site_line(site['name'], site['sst'], site['dhw'], site['risk'])
 
         return context
 
     except Exception as e:
         logger.error(f"Error building context: {e}")
-        return "\n(Current ocean data temporarily unavailable)\n"
+        return CONTEXT_UNAVAILABLE
 
 
-async def chat(
-    message: str,
-    session_id: Optional[str] = None,
-    include_context: bool = True
-) -> tuple[str, str]:
+async def build_relevant_sites_prompt(message: str) -> Optional[str]:
     """
-    Send a message and get a response from the AI assistant.
+    Build detail lines for only the sites a message mentions.
+
+    Returns:
+        Context text, or None if no site was mentioned or data is unavailable
+    """
+    site_ids = get_site_matcher().match(message)
+    if not site_ids:
+        return None
+
+    try:
+        conditions = {site.id: site for site in await get_current_conditions()}
+    except Exception as e:
+        logger.error(f"Error building site context: {e}")
+        return None
+
+    lines = []
+    for site_id in site_ids:
+        site = conditions.get(site_id)
+        if site is not None:
+            sst = site.conditions.sst if site.conditions else None
+            dhw = site.conditions.dhw if site.conditions else None
+            lines.append(_site_line(site.name, sst, dhw, site.risk.level.value))
+
+    if not lines:
+        return None
+    return "**Sites mentioned in this message:**\n" + "".join(lines)
+
+
+def _text_block(text: str, cacheable: bool = False) -> dict:
+    """Build a system prompt text block, optionally marked for prompt caching."""
+    block: Dict[str, Any] = {"type": "text", "text": text}
+    if cacheable and settings.chat_prompt_caching:
+        block["cache_control"] = {"type": "ephemeral"}
+    return block
+
+
+async def build_system_prompt(
+    pidgin_mode: bool,
+    include_context: bool = True,
+    context_mode: str = "full"
+) -> List[dict]:
+    """
+    Build the system prompt as a list of content blocks.
+
+    The static SYSTEM_PROMPT and the ocean-data context are marked as
+    cacheable prefixes so the provider can reuse them across turns; the
+    small Pidgin note goes last so it doesn't split the cached prefix.
+    Rendered blocks are memoized per data snapshot and Pidgin mode.
 
     Args:
-        message: User's message
-        session_id: Optional session ID for conversation continuity
-        include_context: Whether to include current ocean data in context
+        pidgin_mode: Whether to ask for a Pidgin-style reply
+        include_context: Whether to include current ocean data
+        context_mode: "full" for every site's details, "relevant" for the
+            island-wide summary only (site lines are added per message), or
+            "tools" to describe the data tools instead of injecting data
 
     Returns:
-        Tuple of (response_text, session_id)
+        System prompt content blocks for the Messages API
     """
-    # Create or retrieve session
-    if not session_id:
-        session_id = str(uuid.uuid4())
+    use_tools = context_mode == "tools"
+    if use_tools:
+        include_context = False
+
+    version = None
+    if include_context:
+        try:
+            # Cache hit unless the conditions snapshot has expired
+            await get_current_conditions()
+            version = get_data_version()
+        except Exception as e:
+            logger.error(f"Error checking data snapshot: {e}")
+
+    key = (version, pidgin_mode, include_context, context_mode)
+    cached = _system_prompt_cache.get(key)
+    if cached is not None:
+        return cached
+
+    blocks = [_text_block(SYSTEM_PROMPT, cacheable=True)]
+
+    context = None
+    if include_context:
+        context = await build_context_prompt(include_sites=context_mode != "relevant")
+        blocks.append(_text_block(context, cacheable=True))
+    elif use_tools:
+        blocks.append(_text_block(TOOLS_NOTE, cacheable=True))
+
+    if pidgin_mode:
+        blocks.append(_text_block(PIDGIN_NOTE))
+
+    # Don't memoize fallbacks; retry on the next turn instead
+    if not include_context or (version is not None and context != CONTEXT_UNAVAILABLE):
+        if any(k[0] != version for k in _system_prompt_cache if k[2]):
+            _system_prompt_cache.clear()
+        _system_prompt_cache[key] = blocks
+
+    return blocks
+
+
+def _context_mode(include_context: bool) -> str:
+    """How ocean data reaches the model for this request (see build_system_prompt)."""
+    return settings.chat_context_mode if include_context else "full"
+
 
-    session = get_session(session_id)
+async def _with_relevant_sites(system_content: List[dict], message: str, context_mode: str) -> List[dict]:
+    """Append detail lines for the sites the message mentions (relevant mode only)."""
+    if context_mode != "relevant":
+        return system_content
 
-    # Detect Pidgin and adjust system prompt
-    is_pidgin = detect_pidgin(message)
-    if is_pidgin:
-        session["pidgin_mode"] = True
+    site_context = await build_relevant_sites_prompt(message)
+    if not site_context:
+        return system_content
+    return system_content + [_text_block(site_context)]
 
-    # Build system prompt with optional context
-    system_content = SYSTEM_PROMPT
 
-    if session["pidgin_mode"]:
-        system_content += "\n\n(User is using Hawaiian Pidgin - respond in a friendly Pidgin style!)"
+def _response_text(content: List) -> str:
+    """Concatenate the text blocks of a response."""
+    return "".join(block.text for block in content if block.type == "text")
 
+
+async def _run_tool_calls(content: List) -> List[ToolResultBlockParam]:
+    """Execute a response's tool_use blocks concurrently and build tool_result blocks."""
+    calls = [block for block in content if block.type == "tool_use"]
+    results = await asyncio.gather(*(execute_tool(call.name, call.input) for call in calls))
+    return [
+        {"type": "tool_result", "tool_use_id": call.id, "content": result}
+        for call, result in zip(calls, results)
+    ]
+
+
+async def _answer_cache_key(
+    message: str,
+    session: dict,
+    include_context: bool,
+    context_mode: str
+) -> Optional[AnswerKey]:
+    """Answer cache key for a session's first message, or None to bypass the cache."""
+    if not settings.chat_answer_cache or session["messages"] or session.get("summary"):
+        return None
+
+    version = None
     if include_context:
-        context = await build_context_prompt()
-        system_content += f"\n\n{context}"
+        try:
+            # Makes sure the version reflects an unexpired snapshot
+            await get_current_conditions()
+            version = get_data_version()
+        except Exception as e:
+            logger.error(f"Error checking data snapshot for answer cache: {e}")
+            return None
+        # Answers written without ocean data aren't worth repeating
+        if version is None:
+            return None
 
-    # Add user message to history
-    update_session(session_id, "user", message)
+    return get_answer_cache().key(message, session["pidgin_mode"], (include_context, context_mode), version)
 
-    # Build messages for API call
-    messages = session["messages"].copy()
 
-    try:
-        client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+def _record_completed(response_text: str) -> None:
+    _turn_stats["completed_turns"] += 1
+    _turn_stats["completed_output_tokens"] += estimate_tokens(response_text)
 
-        response = client.messages.create(
-            model=settings.chat_model,
-            max_tokens=settings.chat_max_tokens,
-            system=system_content,
-            messages=messages
-        )
 
-        assistant_message = response.content[0].text
+def _record_cancelled(partial_text: str) -> None:
+    """Count a turn cut short by a disconnect and the output it didn't generate."""
+    completed = _turn_stats["completed_turns"]
+    typical = (
+        _turn_stats["completed_output_tokens"] // completed if completed else settings.chat_max_tokens
+    )
+    _turn_stats["cancelled_turns"] += 1
+    _turn_stats["output_tokens_saved_estimate"] += max(
+        min(typical, settings.chat_max_tokens) - estimate_tokens(partial_text), 0
+    )
 
-        # Add assistant response to history
-        update_session(session_id, "assistant", assistant_message)
 
-        return assistant_message, session_id
+def get_cancellation_stats() -> Dict[str, int]:
+    """Turns abandoned by disconnected clients and the output tokens that saved."""
+    return {
+        "cancelled_turns": _turn_stats["cancelled_turns"],
+        "output_tokens_saved_estimate": _turn_stats["output_tokens_saved_estimate"]
+    }
 
-    except anthropic.APIError as e:
-        logger.error(f"Anthropic API error: {e}")
-        error_message = "I apologize, but I'm having trouble connecting right now. Please try again in a moment."
-        return error_message, session_id
 
-    except Exception as e:
-        logger.error(f"Chat error: {e}")
-        return "An unexpected error occurred. Please try again.", session_id
+def _record_analytics(session: dict, message: str) -> None:
+    """Queue an analytics event for a completed turn (never waits on I/O)."""
+    analytics = get_chat_analytics()
+    if analytics is not None:
+        analytics.record(session["id"], session["created_at"], message)
+
+
+async def _record_cached_turn(session_id: str, message: str, answer: str) -> None:
+    """Store a turn answered from the cache so follow-ups see it in history."""
+    await update_session(session_id, "user", message)
+    await update_session(session_id, "assistant", answer)
+
+
+@asynccontextmanager
+async def _session_turn(session_id: str) -> AsyncIterator[None]:
+    """
+    Run a turn after any earlier turns in the same session have finished.
+
+    The wait has its own timeout, sized to a whole turn (a long streamed
+    answer or tool round) rather than to the upstream queue.
+
+    Raises:
+        AdmissionRejected: 429 if too many turns are already waiting on
+            this session, or the earlier turn outlasts the wait
+    """
+    controller = get_admission_controller()
+    if _turn_locks.waiting(session_id) >= settings.chat_max_queue_per_session:
+        raise AdmissionRejected(429, controller.retry_after(), "Too many messages in progress for this session")
+    if not await _turn_locks.acquire(session_id, settings.chat_session_turn_wait_seconds):
+        raise AdmissionRejected(429, controller.retry_after(), "Previous message is still being answered")
+
+    try:
+        yield
+    finally:
+        _turn_locks.release(session_id)
+
+
+async def chat(
+    message: str,
+    session_id: Optional[str] = None,
+    include_context: bool = True
+) -> tuple[str, str]:
+    """
+    Send a message and get a response from the AI assistant.
+
+    Args:
+        message: User's message
+        session_id: Optional session ID for conversation continuity
+        include_context: Whether to include current ocean data in context
+
+    Returns:
+        Tuple of (response_text, session_id)
+    """
+    # Create or retrieve session
+    if not session_id:
+        session_id = str(uuid.uuid4())
+
+    # Earlier turns in this session finish (and are stored) before this one reads the history
+    async with _session_turn(session_id):
+        session = await get_session(session_id)
+
+        # Detect Pidgin and adjust system prompt
+        is_pidgin = detect_pidgin(message)
+        if is_pidgin and not session["pidgin_mode"]:
+            await _store_call(_sessions.update, session_id, pidgin_mode=True)
+            session["pidgin_mode"] = True
+
+        context_mode = _context_mode(include_context)
+        use_tools = context_mode == "tools"
+
+        # Repeated opening questions skip the model entirely
+        cache_key = await _answer_cache_key(message, session, include_context, context_mode)
+        cached_answer = get_answer_cache().get(cache_key) if cache_key else None
+        if cached_answer is not None:
+            await _record_cached_turn(session_id, message, cached_answer)
+            _record_analytics(session, message)
+            return cached_answer, session_id
+
+        # Build system prompt with optional context
+        system_content = await build_system_prompt(session["pidgin_mode"], include_context, context_mode)
+        system_content = await _with_relevant_sites(system_content, message, context_mode)
+
+        # Wait for an upstream slot before recording the turn, so a rejected
+        # turn (AdmissionRejected) leaves the history untouched
+        async with get_admission_controller().slot(session_id):
+            # Add user message to history
+            await update_session(session_id, "user", message)
+
+            # Build messages for API call within the history token budget;
+            # the summary stands in for the turns left out
+            summary, history = await _history_for_request(session_id)
+            messages = cast(List[MessageParam], history)
+            system_content = _with_summary(system_content, summary)
+
+            try:
+                client = get_client()
+
+                request: Dict[str, Any] = {
+                    "model": settings.chat_model,
+                    "max_tokens": settings.chat_max_tokens,
+                    "system": system_content
+                }
+                if use_tools:
+                    request["tools"] = get_tools()
+
+                for tool_round in range(settings.chat_max_tool_rounds + 1):
+                    response = await client.messages.create(messages=messages, **request)
+
+                    if response.stop_reason != "tool_use" or tool_round == settings.chat_max_tool_rounds:
+                        break
+
+                    # Tool turns stay local to this request; only text is stored
+                    messages = messages + [
+                        {"role": "assistant", "content": response.content},
+                        {"role": "user", "content": await _run_tool_calls(response.content)}
+                    ]
+
+                assistant_message = _response_text(response.content)
+
+                # Out of tool rounds (or no text): an empty or half-finished
+                # answer would break the next turn, so nothing is stored
+                if response.stop_reason == "tool_use" or not assistant_message.strip():
+                    logger.warning(f"No complete answer for session {session_id} (stop reason: {response.stop_reason})")
+                    return INCOMPLETE_ANSWER, session_id
+
+                # Add assistant response to history
+                await update_session(session_id, "assistant", assistant_message)
+                if cache_key:
+                    get_answer_cache().put(cache_key, assistant_message)
+                _record_analytics(session, message)
+                _record_completed(assistant_message)
+
+                return assistant_message, session_id
+
+            except asyncio.CancelledError:
+                # Client disconnected; the upstream request is closed with the task
+                _record_cancelled("")
+                raise
+
+            except anthropic.APIError as e:
+                logger.error(f"Anthropic API error: {e}")
+                error_message = "I apologize, but I'm having trouble connecting right now. Please try again in a moment."
+                return error_message, session_id
+
+            except Exception as e:
+                logger.error(f"Chat error: {e}")
+                return "An unexpected error occurred. Please try again.", session_id
 
 
 async def chat_stream(
@@ -239,82 +716,174 @@ async def chat_stream(
     if not session_id:
         session_id = str(uuid.uuid4())
 
-    session = get_session(session_id)
-
-    # Detect Pidgin
-    is_pidgin = detect_pidgin(message)
-    if is_pidgin:
-        session["pidgin_mode"] = True
-
-    # Build system prompt
-    system_content = SYSTEM_PROMPT
+    # Earlier turns in this session finish (and are stored) before this one reads the history
+    async with _session_turn(session_id):
+        session = await get_session(session_id)
+
+        # Detect Pidgin
+        is_pidgin = detect_pidgin(message)
+        if is_pidgin and not session["pidgin_mode"]:
+            await _store_call(_sessions.update, session_id, pidgin_mode=True)
+            session["pidgin_mode"] = True
+
+        context_mode = _context_mode(include_context)
+        use_tools = context_mode == "tools"
+
+        # Cached answers are replayed in chunks so the client sees a normal stream
+        cache_key = await _answer_cache_key(message, session, include_context, context_mode)
+        cached_answer = get_answer_cache().get(cache_key) if cache_key else None
+        if cached_answer is not None:
+            await _record_cached_turn(session_id, message, cached_answer)
+            _record_analytics(session, message)
+            for chunk in replay_chunks(cached_answer):
+                yield (chunk, False, session_id)
+            yield ("", True, session_id)
+            return
+
+        # Build system prompt
+        system_content = await build_system_prompt(session["pidgin_mode"], include_context, context_mode)
+        system_content = await _with_relevant_sites(system_content, message, context_mode)
+
+        # Wait for an upstream slot (raises AdmissionRejected before the first chunk)
+        async with get_admission_controller().slot(session_id):
+            # Add user message
+            await update_session(session_id, "user", message)
+            summary, history = await _history_for_request(session_id)
+            messages = cast(List[MessageParam], history)
+            system_content = _with_summary(system_content, summary)
+
+            full_response = ""
+            completed = False
+            try:
+                client = get_client()
+
+                request: Dict[str, Any] = {
+                    "model": settings.chat_model,
+                    "max_tokens": settings.chat_max_tokens,
+                    "system": system_content
+                }
+                if use_tools:
+                    request["tools"] = get_tools()
+
+                for tool_round in range(settings.chat_max_tool_rounds + 1):
+                    async with client.messages.stream(messages=messages, **request) as stream:
+                        async for text in stream.text_stream:
+                            full_response += text
+                            yield (text, False, session_id)
+                        final_message = await stream.get_final_message() if use_tools else None
+
+                    if (
+                        final_message is None
+                        or final_message.stop_reason != "tool_use"
+                        or tool_round == settings.chat_max_tool_rounds
+                    ):
+                        break
+
+                    messages = messages + [
+                        {"role": "assistant", "content": final_message.content},
+                        {"role": "user", "content": await _run_tool_calls(final_message.content)}
+                    ]
+
+                # Out of tool rounds (or no text): don't store or cache a
+                # half-finished answer
+                if (final_message is not None and final_message.stop_reason == "tool_use") or not full_response.strip():
+                    logger.warning(f"No complete streamed answer for session {session_id}")
+                    yield (INCOMPLETE_ANSWER, True, session_id)
+                    return
+
+                # Save full response to session
+                await update_session(session_id, "assistant", full_response)
+                if cache_key:
+                    get_answer_cache().put(cache_key, full_response)
+                _record_analytics(session, message)
+                _record_completed(full_response)
+                completed = True
+
+                # Final chunk
+                yield ("", True, session_id)
+
+            except (asyncio.CancelledError, GeneratorExit):
+                # Client disconnected (task cancelled or generator closed);
+                # leaving the stream context closes the upstream response
+                if not completed:
+                    _record_cancelled(full_response)
+                raise
+
+            except Exception as e:
+                logger.error(f"Stream error: {e}")
+                yield ("Sorry, I encountered an error. Please try again.", True, session_id)
+
+
+async def get_session_history(session_id: str) -> List[dict]:
+    """Get the message history for a session."""
+    return await _store_call(_sessions.get_messages, session_id)
 
-    if session["pidgin_mode"]:
-        system_content += "\n\n(User is using Hawaiian Pidgin - respond in a friendly Pidgin style!)"
 
-    if include_context:
-        context = await build_context_prompt()
-        system_content += f"\n\n{context}"
+async def clear_session(session_id: str) -> bool:
+    """Clear a chat session."""
+    _unsummarized.pop(session_id, None)
+    return await _store_call(_sessions.delete, session_id)
 
-    # Add user message
-    update_session(session_id, "user", message)
-    messages = session["messages"].copy()
 
-    try:
-        client = anthropic.Anthropic(api_key=settings.anthropic_api_key)
+async def cleanup_old_sessions(max_age_hours: int = 24) -> int:
+    """Remove sessions older than max_age_hours."""
+    removed = await _store_call(_sessions.sweep, timedelta(hours=max_age_hours))
 
-        full_response = ""
+    if removed:
+        logger.info(f"Cleaned up {removed} old chat sessions")
 
-        with client.messages.stream(
-            model=settings.chat_model,
-            max_tokens=settings.chat_max_tokens,
-            system=system_content,
-            messages=messages
-        ) as stream:
-            for text in stream.text_stream:
-                full_response += text
-                yield (text, False, session_id)
+    return removed
 
-        # Save full response to session
-        update_session(session_id, "assistant", full_response)
 
-        # Final chunk
-        yield ("", True, session_id)
+async def get_session_stats() -> Dict[str, int]:
+    """Get session count, stored message bytes and eviction counters."""
+    return await _store_call(_sessions.stats)
 
-    except Exception as e:
-        logger.error(f"Stream error: {e}")
-        yield ("Sorry, I encountered an error. Please try again.", True, session_id)
 
+async def _sweep_sessions_periodically(interval_seconds: float, max_age_hours: int) -> None:
+    """Sweep idle sessions every interval_seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await cleanup_old_sessions(max_age_hours=max_age_hours)
+        except Exception as e:
+            logger.error(f"Session sweep failed: {e}")
 
-def get_session_history(session_id: str) -> List[dict]:
-    """Get the message history for a session."""
-    if session_id in _sessions:
-        return _sessions[session_id]["messages"]
-    return []
 
+def start_session_sweeper(
+    interval_seconds: Optional[float] = None,
+    max_age_hours: Optional[int] = None
+) -> asyncio.Task:
+    """
+    Start the background task that removes idle chat sessions.
 
-def clear_session(session_id: str) -> bool:
-    """Clear a chat session."""
-    if session_id in _sessions:
-        del _sessions[session_id]
-        return True
-    return False
+    Args:
+        interval_seconds: Time between sweeps (default from settings)
+        max_age_hours: Idle age at which sessions are removed (default from settings)
 
+    Returns:
+        The running sweeper task
+    """
+    global _sweeper_task
 
-def cleanup_old_sessions(max_age_hours: int = 24) -> int:
-    """Remove sessions older than max_age_hours."""
-    from datetime import timedelta
+    if _sweeper_task is not None and not _sweeper_task.done():
+        return _sweeper_task
 
-    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
-    old_sessions = [
-        sid for sid, session in _sessions.items()
-        if session["last_activity"] < cutoff
-    ]
+    _sweeper_task = asyncio.create_task(_sweep_sessions_periodically(
+        interval_seconds or settings.chat_session_sweep_interval_seconds,
+        max_age_hours or settings.chat_session_max_age_hours
+    ))
+    return _sweeper_task
 
-    for sid in old_sessions:
-        del _sessions[sid]
 
-    if old_sessions:
-        logger.info(f"Cleaned up {len(old_sessions)} old chat sessions")
+async def stop_session_sweeper() -> None:
+    """Cancel the background sweeper task."""
+    global _sweeper_task
 
-    return len(old_sessions)
+    if _sweeper_task is not None:
+        _sweeper_task.cancel()
+        try:
+            await _sweeper_task
+        except asyncio.CancelledError:
+            pass
+        _sweeper_task = None
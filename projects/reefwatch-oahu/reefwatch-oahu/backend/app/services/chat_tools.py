@@ -0,0 +1,265 @@
+"""
+Chat tools for ReefWatch Oahu.
+
+Tool definitions and handlers that let the assistant pull ocean data on
+demand instead of receiving every site's conditions in the system
+prompt. Handlers read from the same cached service calls the REST API
+uses, so repeated lookups don't reach BigQuery.
+"""
+
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import get_settings, OAHU_SITES, get_site_by_id, get_site_by_name
+from app.services.bigquery_service import get_active_alerts, get_current_conditions
+from app.services.forecast_service import distance_km, get_site_forecast, max_forecast_days
+from app.services.site_matcher import get_site_matcher
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+NEAREST_SITES_DEFAULT = 3
+NEAREST_SITES_MAX = 10
+
+TOOLS_NOTE = """
+## Ocean Data Tools
+Current conditions are not included above. Use the tools to look up conditions,
+forecasts, alerts or nearby sites for the sites the user asks about, and only
+call the tools you need. Refer to sites by name or ID.
+"""
+
+TOOLS: List[dict] = [
+    {
+        "name": "get_site_conditions",
+        "description": (
+            "Get current ocean conditions for one Oahu dive/snorkel site: SST, SST anomaly, "
+            "HotSpot, Degree Heating Weeks, temperature trend and bleaching risk."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "site": {"type": "string", "description": "Site name or ID, e.g. 'Hanauma Bay'"}
+            },
+            "required": ["site"]
+        }
+    },
+    {
+        "name": "get_site_forecast",
+        "description": "Get the daily SST, DHW and bleaching risk forecast for one site.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "site": {"type": "string", "description": "Site name or ID"},
+                "days": {
+                    "type": "integer",
+                    "description": "Days ahead to forecast (default 7)",
+                    "minimum": 1,
+                    "maximum": settings.forecast_max_days
+                }
+            },
+            "required": ["site"]
+        }
+    },
+    {
+        "name": "get_alerts",
+        "description": "Get active coral bleaching and ocean condition alerts across Oahu.",
+        "input_schema": {"type": "object", "properties": {}}
+    },
+    {
+        "name": "find_nearest_sites",
+        "description": (
+            "Find the sites closest to a location, with their current bleaching risk. "
+            "Optionally filter by site type."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "latitude": {"type": "number"},
+                "longitude": {"type": "number"},
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": NEAREST_SITES_MAX,
+                    "description": f"Number of sites (default {NEAREST_SITES_DEFAULT})"
+                },
+                "site_type": {
+                    "type": "string",
+                    "enum": sorted({site["type"] for site in OAHU_SITES})
+                }
+            },
+            "required": ["latitude", "longitude"]
+        }
+    },
+]
+
+
+def get_tools() -> List[dict]:
+    """Tool definitions, with the last one marked as a cacheable prefix."""
+    if not settings.chat_prompt_caching:
+        return TOOLS
+    return TOOLS[:-1] + [{**TOOLS[-1], "cache_control": {"type": "ephemeral"}}]
+
+
+def resolve_site(query: str) -> Optional[dict]:
+    """Find a site by ID, name (case-insensitive, partial allowed) or alias."""
+    query = query.strip()
+    site = get_site_by_id(query.lower()) or get_site_by_name(query)
+    if site:
+        return site
+
+    needle = query.lower()
+    site = next(
+        (s for s in OAHU_SITES if needle in s["name"].lower() or needle in s["id"]),
+        None
+    )
+    if site:
+        return site
+
+    # Aliases and typos ("Kaimana", "Hanuma"), only when unambiguous
+    matches = get_site_matcher().match(query)
+    return get_site_by_id(matches[0]) if len(matches) == 1 else None
+
+
+async def _conditions_by_site_id() -> Dict[str, Any]:
+    return {site.id: site for site in await get_current_conditions()}
+
+
+def _conditions_summary(site: Any) -> dict:
+    """Compact, model-facing view of a SiteWithConditions."""
+    conditions = site.conditions
+    return {
+        "site_id": site.id,
+        "name": site.name,
+        "type": site.type.value,
+        "difficulty": site.difficulty.value,
+        "sst_c": conditions.sst if conditions else None,
+        "sst_anomaly_c": conditions.sst_anomaly if conditions else None,
+        "hotspot_c": conditions.hotspot if conditions else None,
+        "dhw": conditions.dhw if conditions else None,
+        "temperature_trend": conditions.temperature_trend if conditions else None,
+        "risk_level": site.risk.level.value,
+        "risk_description": site.risk.description,
+        "last_updated": site.last_updated
+    }
+
+
+async def _get_site_conditions(site: str) -> dict:
+    match = resolve_site(site)
+    if match is None:
+        return {"error": f"Unknown site: {site}"}
+
+    current = (await _conditions_by_site_id()).get(match["id"])
+    if current is None:
+        return {"error": f"No current data for {match['name']}"}
+    return _conditions_summary(current)
+
+
+async def _get_site_forecast(site: str, days: int = 7) -> dict:
+    match = resolve_site(site)
+    if match is None:
+        return {"error": f"Unknown site: {site}"}
+
+    days = max(1, min(int(days), max_forecast_days(match["id"])))
+    forecast = await get_site_forecast(match["id"], days=days)
+    if forecast is None:
+        return {"error": f"No forecast available for {match['name']}"}
+
+    return {
+        "site_id": forecast.site_id,
+        "name": forecast.site_name,
+        "forecast": [
+            {
+                "date": point.date,
+                "sst_c": point.predicted_sst,
+                "dhw": point.predicted_dhw,
+                "risk_level": point.predicted_risk.value,
+                "confidence": point.confidence
+            }
+            for point in forecast.forecast
+        ]
+    }
+
+
+async def _get_alerts() -> dict:
+    alerts = await get_active_alerts()
+    return {
+        "count": len(alerts),
+        "alerts": [
+            {
+                "severity": alert.severity.value,
+                "title": alert.title,
+                "description": alert.description,
+                "affected_sites": alert.affected_sites
+            }
+            for alert in alerts
+        ]
+    }
+
+
+async def _find_nearest_sites(
+    latitude: float,
+    longitude: float,
+    limit: int = NEAREST_SITES_DEFAULT,
+    site_type: Optional[str] = None
+) -> dict:
+    candidates = [s for s in OAHU_SITES if site_type is None or s["type"] == site_type]
+    if not candidates:
+        return {"sites": []}
+
+    distances = distance_km(
+        latitude,
+        longitude,
+        np.array([s["lat"] for s in candidates]),
+        np.array([s["lon"] for s in candidates])
+    )
+    limit = max(1, min(int(limit), NEAREST_SITES_MAX))
+    conditions = await _conditions_by_site_id()
+
+    nearest = []
+    for i in np.argsort(distances)[:limit]:
+        site = candidates[i]
+        current = conditions.get(site["id"])
+        nearest.append({
+            "site_id": site["id"],
+            "name": site["name"],
+            "distance_km": round(float(distances[i]), 1),
+            "type": site["type"],
+            "difficulty": site["difficulty"],
+            "risk_level": current.risk.level.value if current else None
+        })
+    return {"sites": nearest}
+
+
+_HANDLERS: Dict[str, Callable[..., Awaitable[dict]]] = {
+    "get_site_conditions": _get_site_conditions,
+    "get_site_forecast": _get_site_forecast,
+    "get_alerts": _get_alerts,
+    "find_nearest_sites": _find_nearest_sites,
+}
+
+
+async def execute_tool(name: str, tool_input: dict) -> str:
+    """
+    Run a tool call from the model.
+
+    Args:
+        name: Tool name
+        tool_input: Arguments supplied by the model
+
+    Returns:
+        JSON-encoded result (errors are returned to the model, not raised)
+    """
+    handler = _HANDLERS.get(name)
+    if handler is None:
+        return json.dumps({"error": f"Unknown tool: {name}"})
+
+    try:
+        result = await handler(**tool_input)
+    except Exception as e:
+        logger.error(f"Tool {name} failed: {e}")
+        result = {"error": f"{name} is temporarily unavailable"}
+
+    return json.dumps(result, default=str)
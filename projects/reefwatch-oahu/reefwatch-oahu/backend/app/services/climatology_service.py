@@ -0,0 +1,226 @@
+"""
+Climatology Service for ReefWatch Oahu.
+
+Holds a precomputed per-site, day-of-year SST climatology (mean and
+percentiles) plus each site's Maximum Monthly Mean (MMM). The table is
+built offline from the historical archive (see
+infrastructure/scripts/build_climatology.py), saved as a compact NumPy
+archive, and loaded once at startup so lookups never touch BigQuery.
+"""
+
+import logging
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Day-of-year slots (leap years included)
+DAYS_PER_YEAR = 366
+
+# Statistics stored per (site, day-of-year), in column order
+CLIMATOLOGY_FIELDS = ("sst_mean", "sst_p10", "sst_p50", "sst_p90")
+
+# Loaded climatology table (None until load_climatology() succeeds)
+_climatology: Optional["Climatology"] = None
+
+
+class Climatology:
+    """
+    Dense per-site, day-of-year climatology table.
+
+    Values are stored in a float32 array of shape
+    (n_sites, 366, len(CLIMATOLOGY_FIELDS)) so that each lookup is a
+    dictionary hit for the site row plus a direct array index.
+    """
+
+    def __init__(self, site_ids: List[str], table: np.ndarray, mmm: np.ndarray):
+        expected = (len(site_ids), DAYS_PER_YEAR, len(CLIMATOLOGY_FIELDS))
+        if table.shape != expected:
+            raise ValueError(f"Climatology table has shape {table.shape}, expected {expected}")
+        if mmm.shape != (len(site_ids),):
+            raise ValueError(f"MMM array has shape {mmm.shape}, expected ({len(site_ids)},)")
+
+        self.site_ids = list(site_ids)
+        self.table = table.astype(np.float32, copy=False)
+        self.mmm = mmm.astype(np.float32, copy=False)
+        self._site_index = {site_id: i for i, site_id in enumerate(self.site_ids)}
+
+    def has_site(self, site_id: str) -> bool:
+        """Check whether the table covers a site."""
+        return site_id in self._site_index
+
+    def lookup(self, site_id: str, day: date) -> Optional[Dict[str, float]]:
+        """
+        Get climatology statistics for a site on a calendar day.
+
+        Returns:
+            Dict keyed by CLIMATOLOGY_FIELDS, or None when the site is
+            unknown or has no data for that day of year.
+        """
+        row = self._site_index.get(site_id)
+        if row is None:
+            return None
+
+        values = self.table[row, _day_index(day)]
+        if np.isnan(values[0]):
+            return None
+
+        return {field: float(v) for field, v in zip(CLIMATOLOGY_FIELDS, values)}
+
+    def mean_sst(self, site_id: str, day: date) -> Optional[float]:
+        """Get the climatological mean SST for a site on a calendar day."""
+        row = self._site_index.get(site_id)
+        if row is None:
+            return None
+
+        value = self.table[row, _day_index(day), 0]
+        return None if np.isnan(value) else float(value)
+
+    def maximum_monthly_mean(self, site_id: str) -> Optional[float]:
+        """Get a site's Maximum Monthly Mean SST."""
+        row = self._site_index.get(site_id)
+        if row is None or np.isnan(self.mmm[row]):
+            return None
+        return float(self.mmm[row])
+
+
+def _day_index(day: date) -> int:
+    """Map a calendar date to its day-of-year slot (0-365)."""
+    return day.timetuple().tm_yday - 1
+
+
+def build_climatology(
+    records: Iterable[Tuple[str, date, Optional[float]]],
+    window_days: int = 15
+) -> Climatology:
+    """
+    Build a climatology table from historical daily SST observations.
+
+    Each day-of-year slot pools all observations within +/- window_days
+    (wrapping around the year end) so that a few years of archive are
+    enough for stable percentiles.
+
+    Args:
+        records: Iterable of (site_id, date, sst) tuples
+        window_days: Half-width of the pooling window in days
+
+    Returns:
+        Climatology covering every site present in the records
+    """
+    by_site: Dict[str, List[Tuple[date, float]]] = {}
+    for site_id, day, sst in records:
+        if sst is None or np.isnan(sst):
+            continue
+        by_site.setdefault(site_id, []).append((day, float(sst)))
+
+    site_ids = sorted(by_site)
+    table = np.full((len(site_ids), DAYS_PER_YEAR, len(CLIMATOLOGY_FIELDS)), np.nan, dtype=np.float32)
+    mmm = np.full(len(site_ids), np.nan, dtype=np.float32)
+
+    slots = np.arange(DAYS_PER_YEAR)
+
+    for row, site_id in enumerate(site_ids):
+        observations = by_site[site_id]
+        doy = np.array([_day_index(d) for d, _ in observations])
+        sst_values = np.array([v for _, v in observations], dtype=np.float64)
+
+        # Circular distance between every slot and every observation
+        distance = np.abs(slots[:, None] - doy[None, :])
+        distance = np.minimum(distance, DAYS_PER_YEAR - distance)
+        in_window = distance <= window_days
+
+        for slot in slots:
+            values = sst_values[in_window[slot]]
+            if values.size == 0:
+                continue
+            table[row, slot] = (
+                values.mean(),
+                np.percentile(values, 10),
+                np.percentile(values, 50),
+                np.percentile(values, 90),
+            )
+
+        # MMM: warmest of the twelve climatological monthly means
+        months = np.array([d.month for d, _ in observations])
+        years = np.array([d.year for d, _ in observations])
+        monthly_means = []
+        for month in range(1, 13):
+            month_mask = months == month
+            if not month_mask.any():
+                continue
+            # Average per year first so well-sampled years don't dominate
+            yearly = [sst_values[month_mask & (years == y)].mean() for y in np.unique(years[month_mask])]
+            monthly_means.append(float(np.mean(yearly)))
+        if monthly_means:
+            mmm[row] = max(monthly_means)
+
+    return Climatology(site_ids, table, mmm)
+
+
+def save_climatology(climatology: Climatology, path: str) -> None:
+    """Write a climatology table to a compressed NumPy archive."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(
+        path,
+        site_ids=np.array(climatology.site_ids),
+        fields=np.array(CLIMATOLOGY_FIELDS),
+        table=climatology.table,
+        mmm=climatology.mmm
+    )
+
+
+def load_climatology(path: Optional[str] = None) -> Optional[Climatology]:
+    """
+    Load the climatology table into memory.
+
+    Called once at application startup. A missing or unreadable file
+    is not fatal: forecasts are limited to settings.forecast_days.
+
+    Args:
+        path: Archive path. Defaults to settings.climatology_path.
+
+    Returns:
+        The loaded Climatology, or None if unavailable
+    """
+    global _climatology
+
+    path = path or settings.climatology_path
+    if not Path(path).exists():
+        logger.info(f"No climatology table at {path}")
+        _climatology = None
+        return None
+
+    try:
+        with np.load(path) as archive:
+            fields = tuple(str(f) for f in archive["fields"])
+            if fields != CLIMATOLOGY_FIELDS:
+                raise ValueError(f"Unexpected climatology fields: {fields}")
+            _climatology = Climatology(
+                site_ids=[str(s) for s in archive["site_ids"]],
+                table=archive["table"],
+                mmm=archive["mmm"]
+            )
+    except Exception as e:
+        logger.error(f"Error loading climatology from {path}: {e}")
+        _climatology = None
+        return None
+
+    logger.info(f"Loaded climatology for {len(_climatology.site_ids)} sites from {path}")
+    return _climatology
+
+
+def get_climatology() -> Optional[Climatology]:
+    """Get the loaded climatology table, if any."""
+    return _climatology
+
+
+def set_climatology(climatology: Optional[Climatology]) -> None:
+    """Replace the loaded climatology table (used by tests and reloads)."""
+    global _climatology
+    _climatology = climatology
@@ -0,0 +1,153 @@
+"""
+Degree Heating Week engine for ReefWatch Oahu.
+
+DHW is the 12-week (84-day) running sum of daily Coral Bleaching
+HotSpots of at least 1°C, expressed in °C-weeks. This module keeps
+that sum incrementally with a ring buffer, so each new day costs O(1)
+per site (or grid cell) regardless of window length, and works on
+arrays of any shape so one accumulator can track every site at once.
+"""
+
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# NOAA Coral Reef Watch DHW definition
+DHW_WINDOW_DAYS = 84
+HOTSPOT_THRESHOLD = 1.0
+
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def hotspot_from_sst(sst: ArrayLike, mmm: ArrayLike) -> np.ndarray:
+    """
+    Compute Coral Bleaching HotSpot from SST and Maximum Monthly Mean.
+
+    HotSpot is the positive excess of SST over MMM; NaN inputs yield NaN.
+    """
+    excess = np.asarray(sst, dtype=np.float64) - np.asarray(mmm, dtype=np.float64)
+    return np.where(np.isnan(excess), np.nan, np.maximum(excess, 0.0))
+
+
+def dhw_contribution(hotspot: ArrayLike) -> np.ndarray:
+    """Daily DHW contribution: HotSpots >= 1°C count in full, others (and NaN) as zero."""
+    values = np.asarray(hotspot, dtype=np.float64)
+    return np.where(values >= HOTSPOT_THRESHOLD, values, 0.0)
+
+
+class DHWAccumulator:
+    """
+    Incremental rolling DHW over a ring buffer of daily HotSpots.
+
+    The accumulator tracks an array of locations of arbitrary shape
+    (e.g. (n_sites,) or a flattened grid). push() adds one day of
+    HotSpot values for every location and returns the updated DHW.
+    """
+
+    def __init__(self, shape: Union[int, Tuple[int, ...]], window: int = DHW_WINDOW_DAYS):
+        self.shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        self.window = window
+        self._buffer = np.zeros((window,) + self.shape, dtype=np.float64)
+        self._sum = np.zeros(self.shape, dtype=np.float64)
+        self._position = 0
+        self.days_seen = 0
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether a full window of days has been pushed."""
+        return self.days_seen >= self.window
+
+    @property
+    def dhw(self) -> np.ndarray:
+        """Current DHW in °C-weeks for every location."""
+        return np.maximum(self._sum, 0.0) / 7.0
+
+    def push(self, hotspot: ArrayLike) -> np.ndarray:
+        """
+        Add one day of HotSpot values and return the updated DHW.
+
+        Args:
+            hotspot: HotSpot values broadcastable to the accumulator shape
+
+        Returns:
+            DHW array of the accumulator shape
+        """
+        contribution = np.broadcast_to(dhw_contribution(hotspot), self.shape)
+
+        self._sum += contribution - self._buffer[self._position]
+        self._buffer[self._position] = contribution
+        self._position = (self._position + 1) % self.window
+        self.days_seen += 1
+
+        # Re-sum once per window to stop floating-point drift accumulating
+        if self._position == 0:
+            self._sum = self._buffer.sum(axis=0)
+
+        return self.dhw
+
+    def copy(self) -> "DHWAccumulator":
+        """Independent copy, e.g. to run a forecast without touching observed state."""
+        clone = DHWAccumulator(self.shape, self.window)
+        clone._buffer = self._buffer.copy()
+        clone._sum = self._sum.copy()
+        clone._position = self._position
+        clone.days_seen = self.days_seen
+        return clone
+
+    @classmethod
+    def from_history(
+        cls,
+        hotspot_history: ArrayLike,
+        window: int = DHW_WINDOW_DAYS
+    ) -> "DHWAccumulator":
+        """
+        Seed an accumulator from past daily HotSpots (oldest first).
+
+        The leading axis of hotspot_history is time; the remaining axes
+        give the location shape. Only the last `window` days are kept.
+        """
+        history = np.asarray(hotspot_history, dtype=np.float64)
+        if history.ndim == 1:
+            history = history[:, None]
+            accumulator = cls((1,), window)
+        else:
+            accumulator = cls(history.shape[1:], window)
+
+        for day in history[-window:]:
+            accumulator.push(day)
+
+        return accumulator
+
+
+def propagate_dhw(
+    current_dhw: Optional[float],
+    hotspot_history: Sequence[Optional[float]],
+    predicted_hotspot: Union[Sequence[float], np.ndarray]
+) -> np.ndarray:
+    """
+    Propagate a site's observed DHW through forecast HotSpots.
+
+    The observed DHW anchors the series; each forecast day adds its own
+    contribution and drops the one leaving the 12-week window, exactly
+    as the accumulator does.
+
+    Args:
+        current_dhw: Latest observed DHW (None to use the reconstructed value)
+        hotspot_history: Past daily HotSpots, oldest first (None = missing)
+        predicted_hotspot: Forecast daily HotSpots
+
+    Returns:
+        Array of forecast DHW values, one per predicted day
+    """
+    history = np.array(
+        [np.nan if h is None else h for h in hotspot_history], dtype=np.float64
+    )
+    accumulator = DHWAccumulator.from_history(history)
+    baseline = float(accumulator.dhw[0])
+    anchor = baseline if current_dhw is None else current_dhw
+
+    forecast = np.empty(len(predicted_hotspot), dtype=np.float64)
+    for i, hotspot in enumerate(predicted_hotspot):
+        forecast[i] = accumulator.push(hotspot)[0]
+
+    return np.maximum(anchor + (forecast - baseline), 0.0)
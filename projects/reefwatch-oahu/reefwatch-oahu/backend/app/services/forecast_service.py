@@ -1,26 +1,55 @@
 """
 Forecast Service for ReefWatch Oahu.
 
-Generates 7-day forecasts for ocean conditions using historical trends
-and persistence modeling. In production, this would integrate with
-NOAA forecast products.
+Generates forecasts for ocean conditions using historical trends
+and persistence modeling. Beyond the first few days, persistence is
+blended into the precomputed day-of-year climatology so outlooks of up
+to settings.forecast_max_days stay anchored to seasonal norms. Without
+a climatology table, forecasts stop at settings.forecast_days. In
+production, this would integrate with NOAA forecast products.
 """
 
 import logging
+import math
 from datetime import date, datetime, timedelta
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+import numpy as np
 
 from app.core.config import get_settings, OAHU_SITES
 from app.models.schemas import (
+    DailySiteRanking,
     ForecastDataPoint,
+    RankedSite,
     RiskLevel,
+    SiteDifficulty,
     SiteForecastResponse,
+    SiteType,
 )
 from app.services.bigquery_service import get_site_history, get_current_conditions
+from app.services.climatology_service import get_climatology
+from app.services.dhw_engine import DHW_WINDOW_DAYS, hotspot_from_sst, propagate_dhw
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Multi-day ranking weights (penalties, lower is better before normalizing)
+RANKING_RISK_WEIGHT = 0.6
+RANKING_CONFIDENCE_WEIGHT = 0.2
+RANKING_DISTANCE_WEIGHT = 0.2
+RANKING_DISTANCE_SCALE_KM = 50.0  # Distance at which the distance penalty saturates
+
+EARTH_RADIUS_KM = 6371.0
+
+# Normalized risk penalty; unknown risk ranks with the worst
+_RISK_PENALTY = {
+    RiskLevel.LOW: 0.0,
+    RiskLevel.MODERATE: 1 / 3,
+    RiskLevel.HIGH: 2 / 3,
+    RiskLevel.SEVERE: 1.0,
+    RiskLevel.UNKNOWN: 1.0,
+}
+
 
 def _calculate_risk_from_dhw(dhw: float) -> RiskLevel:
     """Calculate risk level from DHW value."""
@@ -34,16 +63,46 @@ def _calculate_risk_from_dhw(dhw: float) -> RiskLevel:
         return RiskLevel.SEVERE
 
 
+def max_forecast_days(site_id: Optional[str] = None) -> int:
+    """
+    Longest forecast that can be served.
+
+    Extended outlooks need climatology to relax toward; without it (for
+    the table, or for site_id when given) trends would be extrapolated
+    a month out, so forecasts stop at the short-range horizon.
+    """
+    climatology = get_climatology()
+    if climatology is None or (site_id is not None and not climatology.has_site(site_id)):
+        return settings.forecast_days
+    return settings.forecast_max_days
+
+
+def _climatology_weight(lead_days: int) -> float:
+    """Weight given to climatology (vs. persistence) at a forecast lead time."""
+    return 1 - math.exp(-lead_days / settings.climatology_blend_days)
+
+
 def _simple_persistence_forecast(
     recent_sst: List[float],
     recent_dhw: List[float],
-    days: int = 7
+    days: int = 7,
+    climatology_sst: Optional[Sequence[Optional[float]]] = None,
+    mmm: Optional[float] = None,
+    recent_hotspot: Optional[Sequence[Optional[float]]] = None
 ) -> List[dict]:
     """
     Generate a simple persistence-based forecast.
 
     Uses recent trends to project forward. This is a basic approach;
     in production, you'd use NOAA forecast products or ML models.
+
+    When climatology_sst is given (one climatological mean per forecast
+    day, None where unavailable), the SST anomaly relative to climatology
+    decays exponentially so long leads relax toward seasonal norms.
+
+    When the site's Maximum Monthly Mean is known, DHW is propagated
+    through the 12-week HotSpot window from the predicted SST (seeded
+    with recent_hotspot, oldest first) instead of extrapolating its trend.
     """
     if not recent_sst or not recent_dhw:
         return []
@@ -67,28 +126,50 @@ def _simple_persistence_forecast(
     current_sst = recent_sst[-1]
     current_dhw = recent_dhw[-1]
 
-    forecast = []
-    today = date.today()
+    predicted_ssts = []
+    trend_dhws = []
 
     for i in range(1, days + 1):
-        forecast_date = today + timedelta(days=i)
-
         # Project forward with damping (trend decreases over time)
         damping = 1 - (i * 0.1)  # Reduces confidence each day
         damping = max(damping, 0.3)  # Keep at least 30% of trend
 
         predicted_sst = current_sst + (sst_trend * i * damping)
-        predicted_dhw = max(0, current_dhw + (dhw_trend * i * damping))
+
+        # DHW trend is only projected over the short-range horizon and
+        # held beyond it, since it accumulates over 12 weeks
+        dhw_lead = min(i, settings.forecast_days)
+        trend_dhws.append(max(0, current_dhw + (dhw_trend * dhw_lead * damping)))
+
+        if climatology_sst is not None and i <= len(climatology_sst):
+            clim = climatology_sst[i - 1]
+            if clim is not None:
+                weight = _climatology_weight(i)
+                predicted_sst = (1 - weight) * predicted_sst + weight * clim
 
         # Add some realistic bounds
-        predicted_sst = max(22, min(32, predicted_sst))  # Hawaiian waters range
+        predicted_ssts.append(max(22, min(32, predicted_sst)))  # Hawaiian waters range
+
+    if mmm is not None:
+        predicted_dhws = propagate_dhw(
+            current_dhw,
+            recent_hotspot or [],
+            hotspot_from_sst(predicted_ssts, mmm)
+        ).tolist()
+    else:
+        predicted_dhws = trend_dhws
+
+    forecast = []
+    today = date.today()
+
+    for i, (predicted_sst, predicted_dhw) in enumerate(zip(predicted_ssts, predicted_dhws), start=1):
         predicted_dhw = max(0, min(20, predicted_dhw))
 
         # Confidence decreases with forecast horizon
         confidence = max(0.3, 1 - (i * 0.1))
 
         forecast.append({
-            "date": forecast_date,
+            "date": today + timedelta(days=i),
             "predicted_sst": round(predicted_sst, 1),
             "predicted_dhw": round(predicted_dhw, 1),
             "predicted_risk": _calculate_risk_from_dhw(predicted_dhw),
@@ -107,19 +188,34 @@ async def get_site_forecast(
 
     Args:
         site_id: Site identifier
-        days: Number of days to forecast (1-7)
+        days: Number of days to forecast, capped at max_forecast_days(site_id)
 
     Returns:
         SiteForecastResponse with forecast data
     """
+    days = min(days, max_forecast_days(site_id))
+
     # Get site metadata
     site = next((s for s in OAHU_SITES if s["id"] == site_id), None)
     if not site:
         logger.warning(f"Site not found: {site_id}")
         return None
 
-    # Get recent historical data for trend analysis
-    history = await get_site_history(site_id, days=14)
+    # Get recent historical data: a full DHW window seeds the HotSpot
+    # accumulator, the tail drives the trend analysis
+    history = await get_site_history(site_id, days=DHW_WINDOW_DAYS)
+
+    # Climatological SST per forecast day (in-memory lookups, no queries)
+    climatology = get_climatology()
+    climatology_sst = None
+    mmm = None
+    if climatology is not None and climatology.has_site(site_id):
+        today = date.today()
+        climatology_sst = [
+            climatology.mean_sst(site_id, today + timedelta(days=i))
+            for i in range(1, days + 1)
+        ]
+        mmm = climatology.maximum_monthly_mean(site_id)
 
     if not history:
         logger.warning(f"No historical data for forecast: {site_id}")
@@ -130,12 +226,16 @@ async def get_site_forecast(
             forecast=[
                 ForecastDataPoint(
                     date=date.today() + timedelta(days=i),
-                    predicted_sst=26.0,  # Average Hawaiian water temp
+                    # Climatological mean if known, else average Hawaiian water temp
+                    predicted_sst=round(clim, 1) if clim is not None else 26.0,
                     predicted_dhw=2.0,   # Low baseline
                     predicted_risk=RiskLevel.LOW,
                     confidence=0.2
                 )
-                for i in range(1, days + 1)
+                for i, clim in zip(
+                    range(1, days + 1),
+                    climatology_sst or [None] * days
+                )
             ],
             generated_at=datetime.utcnow()
         )
@@ -144,8 +244,25 @@ async def get_site_forecast(
     sst_values = [h.sst for h in history if h.sst is not None]
     dhw_values = [h.dhw for h in history if h.dhw is not None]
 
+    # Daily HotSpots, derived from SST where the archive has none
+    hotspot_values = None
+    if mmm is not None:
+        hotspot_values = [
+            h.hotspot if h.hotspot is not None
+            else float(hotspot_from_sst(h.sst, mmm)) if h.sst is not None
+            else None
+            for h in history
+        ]
+
     # Generate forecast
-    forecast_data = _simple_persistence_forecast(sst_values, dhw_values, days)
+    forecast_data = _simple_persistence_forecast(
+        sst_values,
+        dhw_values,
+        days,
+        climatology_sst=climatology_sst,
+        mmm=mmm,
+        recent_hotspot=hotspot_values
+    )
 
     forecast_points = [
         ForecastDataPoint(**f) for f in forecast_data
@@ -159,16 +276,25 @@ async def get_site_forecast(
     )
 
 
-async def get_all_forecasts(days: int = 7) -> List[SiteForecastResponse]:
+async def get_all_forecasts(
+    days: int = 7,
+    site_ids: Optional[List[str]] = None
+) -> List[SiteForecastResponse]:
     """
     Generate forecasts for all sites.
 
+    Args:
+        days: Number of days to forecast
+        site_ids: Optional subset of sites to forecast
+
     Returns:
         List of forecasts for each site
     """
     forecasts = []
 
     for site in OAHU_SITES:
+        if site_ids is not None and site["id"] not in site_ids:
+            continue
         forecast = await get_site_forecast(site["id"], days)
         if forecast:
             forecasts.append(forecast)
@@ -209,3 +335,139 @@ async def get_best_sites_for_date(target_date: date) -> List[dict]:
     )
 
     return site_predictions
+
+
+def distance_km(
+    latitude: float,
+    longitude: float,
+    site_lats: np.ndarray,
+    site_lons: np.ndarray
+) -> np.ndarray:
+    """Great-circle distance from a point to each site, in kilometres."""
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(site_lats), np.radians(site_lons)
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+async def rank_sites_for_range(
+    start_date: date,
+    end_date: date,
+    top_k: Optional[int] = None,
+    site_type: Optional[SiteType] = None,
+    difficulty: Optional[SiteDifficulty] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None
+) -> List[DailySiteRanking]:
+    """
+    Rank sites for every day in a date range from one forecast run.
+
+    All matching sites are forecast once up to end_date and laid out as
+    (site, day) matrices of risk and confidence, so every day is scored
+    in a single vectorized pass. Scores combine risk, confidence and,
+    when a location is supplied, distance; higher is better.
+
+    Args:
+        start_date: First day to rank (must be in the future)
+        end_date: Last day to rank (inclusive)
+        top_k: Keep only the best k sites per day
+        site_type: Only rank sites of this type
+        difficulty: Only rank sites of this difficulty
+        latitude: Latitude of the user's location
+        longitude: Longitude of the user's location
+
+    Returns:
+        One DailySiteRanking per day, in date order
+    """
+    first_lead = (start_date - date.today()).days
+    last_lead = (end_date - date.today()).days
+
+    if first_lead < 1 or last_lead < first_lead or last_lead > max_forecast_days():
+        return []
+
+    sites = [
+        site for site in OAHU_SITES
+        if (site_type is None or site["type"] == site_type.value)
+        and (difficulty is None or site.get("difficulty", "all_levels") == difficulty.value)
+    ]
+    if not sites:
+        return [
+            DailySiteRanking(date=start_date + timedelta(days=d), sites=[])
+            for d in range(last_lead - first_lead + 1)
+        ]
+
+    forecasts = await get_all_forecasts(days=last_lead, site_ids=[s["id"] for s in sites])
+    forecasts_by_id = {f.site_id: f for f in forecasts}
+    sites = [s for s in sites if s["id"] in forecasts_by_id]
+
+    n_days = last_lead - first_lead + 1
+    risk = np.full((len(sites), n_days), np.nan)
+    confidence = np.full((len(sites), n_days), np.nan)
+    points: List[List[Optional[ForecastDataPoint]]] = []
+
+    for row, site in enumerate(sites):
+        forecast = forecasts_by_id[site["id"]].forecast
+        site_points: List[Optional[ForecastDataPoint]] = []
+        for col in range(n_days):
+            lead = first_lead + col
+            point = forecast[lead - 1] if len(forecast) >= lead else None
+            site_points.append(point)
+            if point is not None:
+                risk[row, col] = _RISK_PENALTY.get(point.predicted_risk, 1.0)
+                confidence[row, col] = point.confidence
+        points.append(site_points)
+
+    penalty = RANKING_RISK_WEIGHT * risk + RANKING_CONFIDENCE_WEIGHT * (1 - confidence)
+    total_weight = RANKING_RISK_WEIGHT + RANKING_CONFIDENCE_WEIGHT
+
+    distances = None
+    if latitude is not None and longitude is not None:
+        distances = distance_km(
+            latitude,
+            longitude,
+            np.array([s["lat"] for s in sites]),
+            np.array([s["lon"] for s in sites])
+        )
+        distance_penalty = np.minimum(distances / RANKING_DISTANCE_SCALE_KM, 1.0)
+        penalty = penalty + RANKING_DISTANCE_WEIGHT * distance_penalty[:, None]
+        total_weight += RANKING_DISTANCE_WEIGHT
+
+    scores = 1 - penalty / total_weight
+
+    rankings = []
+    for col in range(n_days):
+        day_scores = scores[:, col]
+        valid = np.flatnonzero(~np.isnan(day_scores))
+        # Stable sort keeps catalog order for ties
+        order = valid[np.argsort(-day_scores[valid], kind="stable")]
+        if top_k is not None:
+            order = order[:top_k]
+
+        ranked = []
+        for rank, row in enumerate(order, start=1):
+            site = sites[row]
+            point = points[row][col]
+            ranked.append(RankedSite(
+                rank=rank,
+                site_id=site["id"],
+                site_name=site["name"],
+                type=site["type"],
+                difficulty=site.get("difficulty", "all_levels"),
+                predicted_sst=point.predicted_sst,
+                predicted_dhw=point.predicted_dhw,
+                predicted_risk=point.predicted_risk,
+                confidence=point.confidence,
+                distance_km=round(float(distances[row]), 1) if distances is not None else None,
+                score=round(float(day_scores[row]), 3)
+            ))
+
+        rankings.append(DailySiteRanking(
+            date=start_date + timedelta(days=col),
+            sites=ranked
+        ))
+
+    return rankings
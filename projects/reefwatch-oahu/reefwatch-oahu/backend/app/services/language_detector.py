@@ -0,0 +1,72 @@
+"""
+Language-mode detection for chat messages.
+
+Tokenizes a message once and scores it against a marker vocabulary with
+a set lookup, so adding words (or further vocabularies, e.g. Hawaiian)
+doesn't add per-message scans.
+"""
+
+import re
+from typing import FrozenSet, Iterable, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Word tokens; matches the \b...\b boundaries the regex markers used
+_TOKEN_RE = re.compile(r"\w+")
+
+DEFAULT_PIDGIN_MARKERS: FrozenSet[str] = frozenset({
+    "brah", "bruddah", "sista", "dah", "da",
+    "stay", "shoots", "rain", "rajah", "howzit",
+    "choke", "ono", "kine", "wea", "wen",
+    "moke", "haole", "keiki", "tutu", "puka",
+    "pau", "mahalo", "mahalos", "eh",
+})
+
+
+def tokenize(text: str) -> FrozenSet[str]:
+    """Lowercase a message and return its distinct word tokens."""
+    return frozenset(_TOKEN_RE.findall(text.lower()))
+
+
+class MarkerDetector:
+    """
+    Flags text containing at least `threshold` distinct marker words.
+
+    Args:
+        vocabulary: Marker words (matched case-insensitively as whole words)
+        threshold: Minimum number of distinct markers to count as a match
+    """
+
+    def __init__(self, vocabulary: Iterable[str], threshold: int = 2):
+        self.vocabulary = frozenset(word.lower() for word in vocabulary)
+        self.threshold = threshold
+
+    def matches(self, text: str) -> FrozenSet[str]:
+        """Marker words present in the text."""
+        return tokenize(text) & self.vocabulary
+
+    def score(self, text: str) -> int:
+        """Number of distinct marker words present in the text."""
+        return len(self.matches(text))
+
+    def detect(self, text: str) -> bool:
+        """Whether the text meets the marker threshold."""
+        return self.score(text) >= self.threshold
+
+    __call__ = detect
+
+
+_pidgin_detector: Optional[MarkerDetector] = None
+
+
+def get_pidgin_detector() -> MarkerDetector:
+    """Get the Pidgin detector built from settings (created on first use)."""
+    global _pidgin_detector
+    if _pidgin_detector is None:
+        _pidgin_detector = MarkerDetector(
+            settings.chat_pidgin_markers or DEFAULT_PIDGIN_MARKERS,
+            settings.chat_pidgin_threshold
+        )
+    return _pidgin_detector
@@ -0,0 +1,87 @@
+"""
+Per-session turn ordering for ReefWatch Oahu chat.
+
+Turns in the same session must run one at a time, or concurrent requests
+read and append the history out of order. Locks are created on first use
+and dropped as soon as no turn holds or waits for them, so the registry
+only ever holds entries for sessions with a turn in progress.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+
+class KeyedLocks:
+    """
+    Async locks keyed by string, reference-counted and freed when idle.
+
+    Waiters on one key are served in arrival order; different keys never
+    block each other.
+    """
+
+    def __init__(self):
+        # key -> [lock, holders + waiters]
+        self._entries: Dict[str, List] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def waiting(self, key: str) -> int:
+        """Number of callers queued behind the current holder of `key`."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0
+        lock, users = entry
+        return users - 1 if lock.locked() else users
+
+    def _forget(self, key: str) -> None:
+        entry = self._entries[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._entries[key]
+
+    async def acquire(self, key: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the lock on `key`.
+
+        Args:
+            key: Lock key (session ID)
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            True once held, False if the timeout expired first
+        """
+        entry = self._entries.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+
+        try:
+            # Acquires in this task, so a lock granted as the timeout fires
+            # is handed back rather than left held by nobody
+            async with asyncio.timeout(timeout):
+                await entry[0].acquire()
+        except TimeoutError:
+            self._forget(key)
+            return False
+        except asyncio.CancelledError:
+            self._forget(key)
+            raise
+
+        return True
+
+    def release(self, key: str) -> None:
+        """Release the lock on `key`, dropping it if nobody else is waiting."""
+        self._entries[key][0].release()
+        self._forget(key)
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        """Hold the lock on `key` for the duration of the block."""
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
@@ -0,0 +1,462 @@
+"""
+Chat session storage for ReefWatch Oahu.
+
+Defines the SessionStore interface used by the chat service and two
+implementations: a bounded in-memory LRU+TTL store (the default, for a
+single instance) and a store backed by a Redis-protocol server so
+sessions survive restarts and follow users across Cloud Run instances.
+The interface is synchronous; stores that do network I/O set blocking,
+and the chat service then runs their calls in a worker thread so a
+Redis round trip never stalls the event loop.
+"""
+
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def _new_session(session_id: str) -> dict:
+    """Build an empty session record."""
+    now = datetime.utcnow()
+    return {
+        "id": session_id,
+        "messages": [],
+        "created_at": now,
+        "last_activity": now,
+        "pidgin_mode": False,
+        "summary": ""
+    }
+
+
+def _message_bytes(content: str) -> int:
+    """Stored size of a message body."""
+    return len(content.encode("utf-8"))
+
+
+class SessionStore(ABC):
+    """Interface for chat session storage."""
+
+    # True when calls do network I/O and must be kept off the event loop
+    blocking = False
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[dict]:
+        """Get a session, or None if it doesn't exist (or has expired)."""
+
+    @abstractmethod
+    def get_or_create(self, session_id: str) -> dict:
+        """Get a session, creating an empty one if needed."""
+
+    @abstractmethod
+    def append_message(self, session_id: str, role: str, content: str, max_messages: int) -> List[dict]:
+        """
+        Atomically append a message and trim history to max_messages.
+
+        Returns:
+            Messages dropped from the front of the history, oldest first
+        """
+
+    @abstractmethod
+    def drop_oldest(self, session_id: str, count: int) -> List[dict]:
+        """
+        Remove the oldest count messages from a session's history.
+
+        Returns:
+            The removed messages, oldest first
+        """
+
+    @abstractmethod
+    def update(self, session_id: str, **fields: Any) -> None:
+        """Update session metadata fields (e.g. pidgin_mode)."""
+
+    @abstractmethod
+    def get_messages(self, session_id: str) -> List[dict]:
+        """Get a session's message history, oldest first."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Delete a session. Returns False if it didn't exist."""
+
+    @abstractmethod
+    def sweep(self, max_age: timedelta) -> int:
+        """Remove sessions idle for longer than max_age. Returns the count removed."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored sessions."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Session count, stored message bytes, evictions and expirations."""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Bounded in-process session store.
+
+    Sessions are kept in least-recently-used order and evicted when the
+    session count or the total stored message bytes exceed their limits,
+    or when they have been idle longer than the TTL.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: int = 86400
+    ):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._bytes: Dict[str, int] = {}
+        self.total_bytes = 0
+        self.evictions = 0  # Removed to stay within max_sessions / max_bytes
+        self.expirations = 0  # Removed for idling past the TTL or by sweep
+
+    def _expired(self, session: dict, now: datetime) -> bool:
+        return now - session["last_activity"] > self.ttl
+
+    def _remove(self, session_id: str) -> None:
+        del self._sessions[session_id]
+        self.total_bytes -= self._bytes.pop(session_id, 0)
+
+    def _enforce_limits(self) -> None:
+        """Evict least-recently-used sessions until within limits."""
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self.total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def get(self, session_id: str) -> Optional[dict]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+
+        if self._expired(session, datetime.utcnow()):
+            self._remove(session_id)
+            self.expirations += 1
+            return None
+
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: str) -> dict:
+        session = self.get(session_id)
+        if session is None:
+            session = _new_session(session_id)
+            self._sessions[session_id] = session
+            self._bytes[session_id] = 0
+            self._enforce_limits()
+        return session
+
+    def append_message(self, session_id: str, role: str, content: str, max_messages: int) -> List[dict]:
+        session = self.get_or_create(session_id)
+        session["messages"].append({"role": role, "content": content})
+        session["last_activity"] = datetime.utcnow()
+
+        dropped: List[dict] = []
+        size = self._bytes.get(session_id, 0) + _message_bytes(content)
+        if len(session["messages"]) > max_messages:
+            dropped = session["messages"][:-max_messages]
+            session["messages"] = session["messages"][-max_messages:]
+            size -= sum(_message_bytes(m["content"]) for m in dropped)
+
+        self.total_bytes += size - self._bytes.get(session_id, 0)
+        self._bytes[session_id] = size
+        self._enforce_limits()
+        return dropped
+
+    def drop_oldest(self, session_id: str, count: int) -> List[dict]:
+        session = self.get(session_id)
+        if session is None or count <= 0:
+            return []
+
+        dropped = session["messages"][:count]
+        session["messages"] = session["messages"][count:]
+        freed = sum(_message_bytes(m["content"]) for m in dropped)
+        self._bytes[session_id] -= freed
+        self.total_bytes -= freed
+        return dropped
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        session = self.get_or_create(session_id)
+        session.update(fields)
+
+    def get_messages(self, session_id: str) -> List[dict]:
+        session = self.get(session_id)
+        return session["messages"] if session else []
+
+    def delete(self, session_id: str) -> bool:
+        if session_id in self._sessions:
+            self._remove(session_id)
+            return True
+        return False
+
+    def sweep(self, max_age: timedelta) -> int:
+        cutoff = datetime.utcnow() - max_age
+        old_sessions = [
+            sid for sid, session in self._sessions.items()
+            if session["last_activity"] < cutoff
+        ]
+        for sid in old_sessions:
+            self._remove(sid)
+        self.expirations += len(old_sessions)
+        return len(old_sessions)
+
+    def clear(self) -> None:
+        """Remove all sessions."""
+        self._sessions.clear()
+        self._bytes.clear()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "message_bytes": self.total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+def _timestamp(moment: datetime) -> float:
+    """Seconds since the epoch for a naive UTC datetime (index scores)."""
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Session store backed by a Redis-protocol server.
+
+    Each session is a metadata hash plus a list of compact message
+    strings (a one-letter role code followed by the content). Appends
+    push and trim in a single MULTI/EXEC transaction, and every write
+    refreshes the keys' TTL so idle sessions expire server-side.
+
+    Sessions are also indexed in a sorted set scored by last activity,
+    and stored message bytes are kept as running counters, so counting
+    and sweeping sessions never walk the keyspace. Index entries for
+    sessions Redis has already expired are pruned when counting.
+    """
+
+    blocking = True
+
+    _ROLE_CODES = {"user": "u", "assistant": "a"}
+    _ROLES = {code: role for role, code in _ROLE_CODES.items()}
+
+    def __init__(self, client: Any, ttl_seconds: int = 86400, prefix: str = "reefwatch:chat:"):
+        # Client must be created with decode_responses=True
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._index_key = f"{prefix}index"  # Sorted set: session ID -> last activity
+        self._bytes_key = f"{prefix}bytes"  # Hash: session ID -> stored message bytes
+        self._stats_key = f"{prefix}stats"  # Hash: message_bytes, expirations
+
+    def _meta_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:meta"
+
+    def _messages_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:msgs"
+
+    def _encode_message(self, role: str, content: str) -> str:
+        return self._ROLE_CODES[role] + content
+
+    def _decode_message(self, raw: str) -> dict:
+        return {"role": self._ROLES[raw[0]], "content": raw[1:]}
+
+    def _decode_meta(self, session_id: str, meta: Dict[str, str], messages: List[str]) -> dict:
+        return {
+            "id": session_id,
+            "messages": [self._decode_message(m) for m in messages],
+            "created_at": datetime.fromisoformat(meta["created_at"]),
+            "last_activity": datetime.fromisoformat(meta["last_activity"]),
+            "pidgin_mode": meta.get("pidgin_mode") == "1",
+            "summary": meta.get("summary", "")
+        }
+
+    def _count_bytes(self, pipe: Any, session_id: str, delta: int) -> None:
+        pipe.hincrby(self._bytes_key, session_id, delta)
+        pipe.hincrby(self._stats_key, "message_bytes", delta)
+
+    def _remove(self, session_ids: List[str]) -> int:
+        """Delete sessions and their index and byte-counter entries. Returns how many had keys."""
+        if not session_ids:
+            return 0
+
+        sizes = self.client.hmget(self._bytes_key, session_ids)
+        pipe = self.client.pipeline(transaction=True)
+        for session_id in session_ids:
+            pipe.delete(self._meta_key(session_id), self._messages_key(session_id))
+        pipe.zrem(self._index_key, *session_ids)
+        pipe.hdel(self._bytes_key, *session_ids)
+        pipe.hincrby(self._stats_key, "message_bytes", -sum(int(size or 0) for size in sizes))
+        results = pipe.execute()
+
+        return sum(1 for removed in results[:len(session_ids)] if removed > 0)
+
+    def get(self, session_id: str) -> Optional[dict]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(self._meta_key(session_id))
+        pipe.lrange(self._messages_key(session_id), 0, -1)
+        meta, messages = pipe.execute()
+
+        if not meta:
+            return None
+        return self._decode_meta(session_id, meta, messages)
+
+    def get_or_create(self, session_id: str) -> dict:
+        session = self.get(session_id)
+        if session is not None:
+            return session
+
+        session = _new_session(session_id)
+        meta_key = self._meta_key(session_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hsetnx(meta_key, "created_at", session["created_at"].isoformat())
+        pipe.hsetnx(meta_key, "last_activity", session["last_activity"].isoformat())
+        pipe.hsetnx(meta_key, "pidgin_mode", "0")
+        pipe.expire(meta_key, self.ttl_seconds)
+        pipe.zadd(self._index_key, {session_id: _timestamp(session["last_activity"])})
+        pipe.execute()
+        return session
+
+    def append_message(self, session_id: str, role: str, content: str, max_messages: int) -> List[dict]:
+        now = datetime.utcnow()
+        meta_key = self._meta_key(session_id)
+        messages_key = self._messages_key(session_id)
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hsetnx(meta_key, "created_at", now.isoformat())
+        pipe.hsetnx(meta_key, "pidgin_mode", "0")
+        pipe.hset(meta_key, "last_activity", now.isoformat())
+        pipe.rpush(messages_key, self._encode_message(role, content))
+        pipe.lrange(messages_key, 0, -max_messages - 1)
+        pipe.ltrim(messages_key, -max_messages, -1)
+        pipe.expire(meta_key, self.ttl_seconds)
+        pipe.expire(messages_key, self.ttl_seconds)
+        pipe.zadd(self._index_key, {session_id: _timestamp(now)})
+        self._count_bytes(pipe, session_id, _message_bytes(content))
+        results = pipe.execute()
+
+        dropped = [self._decode_message(m) for m in results[4]]
+        if dropped:
+            pipe = self.client.pipeline(transaction=True)
+            self._count_bytes(pipe, session_id, -sum(_message_bytes(m["content"]) for m in dropped))
+            pipe.execute()
+        return dropped
+
+    def drop_oldest(self, session_id: str, count: int) -> List[dict]:
+        if count <= 0:
+            return []
+
+        messages_key = self._messages_key(session_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(messages_key, 0, count - 1)
+        pipe.ltrim(messages_key, count, -1)
+        dropped = [self._decode_message(m) for m in pipe.execute()[0]]
+
+        if dropped:
+            pipe = self.client.pipeline(transaction=True)
+            self._count_bytes(pipe, session_id, -sum(_message_bytes(m["content"]) for m in dropped))
+            pipe.execute()
+        return dropped
+
+    def update(self, session_id: str, **fields: Any) -> None:
+        self.get_or_create(session_id)
+        encoded = {
+            key: ("1" if value else "0") if isinstance(value, bool)
+            else value.isoformat() if isinstance(value, datetime)
+            else str(value)
+            for key, value in fields.items()
+        }
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self._meta_key(session_id), mapping=encoded)
+        if isinstance(fields.get("last_activity"), datetime):
+            pipe.zadd(self._index_key, {session_id: _timestamp(fields["last_activity"])})
+        pipe.execute()
+
+    def get_messages(self, session_id: str) -> List[dict]:
+        raw = self.client.lrange(self._messages_key(session_id), 0, -1)
+        return [self._decode_message(m) for m in raw]
+
+    def delete(self, session_id: str) -> bool:
+        return self._remove([session_id]) > 0
+
+    def sweep(self, max_age: timedelta) -> int:
+        # Idle sessions expire server-side; this removes their index and
+        # counter entries, and any keys whose TTL was longer than max_age
+        cutoff = _timestamp(datetime.utcnow() - max_age)
+        idle = self.client.zrangebyscore(self._index_key, "-inf", cutoff)
+        if not idle:
+            return 0
+
+        self._remove(idle)
+        self.client.hincrby(self._stats_key, "expirations", len(idle))
+        return len(idle)
+
+    def __len__(self) -> int:
+        self.sweep(timedelta(seconds=self.ttl_seconds))
+        return self.client.zcard(self._index_key)
+
+    def stats(self) -> Dict[str, int]:
+        # Counters are shared by every instance using this prefix. Sessions
+        # lost to maxmemory eviction aren't seen until they age out of the index.
+        self.sweep(timedelta(seconds=self.ttl_seconds))
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zcard(self._index_key)
+        pipe.hgetall(self._stats_key)
+        sessions, counters = pipe.execute()
+
+        return {
+            "sessions": sessions,
+            "message_bytes": int(counters.get("message_bytes", 0)),
+            "evictions": 0,
+            "expirations": int(counters.get("expirations", 0))
+        }
+
+
+def create_session_store() -> SessionStore:
+    """
+    Create the session store selected by settings.chat_session_backend.
+
+    "memory" (default) keeps sessions in process; "redis" connects to
+    settings.chat_session_redis_url (requires the redis package).
+    """
+    backend = settings.chat_session_backend.lower()
+
+    if backend == "redis":
+        import redis
+
+        client = redis.Redis.from_url(settings.chat_session_redis_url, decode_responses=True)
+        logger.info("Using Redis chat session store")
+        return RedisSessionStore(client, ttl_seconds=settings.chat_session_ttl_seconds)
+
+    if backend != "memory":
+        logger.warning(f"Unknown chat session backend '{backend}', using in-memory store")
+
+    return InMemorySessionStore(
+        max_sessions=settings.chat_session_max_sessions,
+        max_bytes=settings.chat_session_max_bytes,
+        ttl_seconds=settings.chat_session_ttl_seconds
+    )
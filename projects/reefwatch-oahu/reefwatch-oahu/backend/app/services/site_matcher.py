@@ -0,0 +1,181 @@
+"""
+Site mention matching for ReefWatch Oahu chat.
+
+Finds which dive/snorkel sites a chat message refers to, by name, alias
+or region, so only those sites' details need to go into the prompt.
+The phrase table and a one-edit typo index are built once from the site
+catalog; matching a message is a handful of dictionary lookups per word.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import OAHU_SITES
+
+# Local and alternate names, beyond each site's catalog name
+SITE_ALIASES: Dict[str, List[str]] = {
+    "hanauma-bay": ["hanauma"],
+    "sharks-cove": ["shark cove"],
+    "three-tables": ["3 tables"],
+    "electric-beach": ["electric beach", "kahe power plant"],
+    "waikiki-beach": ["waikiki"],
+    "makaha-beach": ["makaha"],
+    "lanikai-beach": ["lanikai"],
+    "haleiwa": ["haleiwa harbor"],
+    "pupukea": ["pupukea beach park"],
+    "ko-olina-lagoons": ["ko olina", "koolina"],
+    "kahe-point": ["kahe"],
+    "sans-souci": ["sans souci", "kaimana", "kaimana beach"],
+    "ala-moana": ["ala moana", "magic island"],
+    "kuilima-cove": ["kuilima", "turtle bay"],
+    "waimea-bay": ["waimea"],
+}
+
+# Region names mapped to the sites they cover
+REGIONS: Dict[str, List[str]] = {
+    "north shore": ["sharks-cove", "three-tables", "haleiwa", "pupukea", "kuilima-cove", "waimea-bay"],
+    "south shore": ["hanauma-bay", "waikiki-beach", "sans-souci", "ala-moana"],
+    "honolulu": ["waikiki-beach", "sans-souci", "ala-moana"],
+    "windward": ["lanikai-beach"],
+    "east side": ["hanauma-bay", "lanikai-beach"],
+    "west side": ["electric-beach", "makaha-beach", "ko-olina-lagoons", "kahe-point"],
+    "leeward": ["electric-beach", "makaha-beach", "ko-olina-lagoons", "kahe-point"],
+    "waianae": ["electric-beach", "makaha-beach", "kahe-point"],
+}
+
+# Words too short or generic to correct for typos
+FUZZY_MIN_LENGTH = 5
+
+# Typo lookups are memoized per word; the cache is reset when it fills
+FUZZY_CACHE_SIZE = 10000
+
+# Apostrophes and ʻokina are dropped so "Ko'olina"/"Koʻolina" read as "koolina"
+_APOSTROPHES = re.compile(r"['’ʻ‘`]")
+_WORD = re.compile(r"\w+")
+
+
+def _words(text: str) -> List[str]:
+    """Normalized word tokens, in order."""
+    return _WORD.findall(_APOSTROPHES.sub("", text.lower()))
+
+
+def _deletions(word: str) -> Set[str]:
+    """All strings one character deletion away from word."""
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class SiteMatcher:
+    """
+    Matches site names, aliases and regions in free text.
+
+    Multi-word phrases match exactly; single distinctive words also match
+    with one typo (insertion, deletion or substitution), using a
+    precomputed deletion index rather than comparing against every word.
+
+    Args:
+        sites: Site catalog entries (need "id" and "name")
+        aliases: Extra names per site ID
+        regions: Region name to site IDs
+    """
+
+    def __init__(
+        self,
+        sites: Iterable[dict],
+        aliases: Optional[Dict[str, List[str]]] = None,
+        regions: Optional[Dict[str, List[str]]] = None
+    ):
+        sites = list(sites)
+        self.site_order = {site["id"]: i for i, site in enumerate(sites)}
+        self.phrases: Dict[Tuple[str, ...], FrozenSet[str]] = {}
+
+        def add(phrase: str, site_ids: Iterable[str]) -> None:
+            key = tuple(_words(phrase))
+            if key:
+                self.phrases[key] = self.phrases.get(key, frozenset()) | frozenset(site_ids)
+
+        for site_id in self.site_order:
+            add(site_id.replace("-", " "), [site_id])
+        for site in sites:
+            add(site["name"], [site["id"]])
+        for site_id, names in (aliases or {}).items():
+            for name in names:
+                add(name, [site_id])
+        for region, site_ids in (regions or {}).items():
+            add(region, site_ids)
+
+        self.max_phrase_words = max((len(key) for key in self.phrases), default=1)
+        self._first_words = {key[0] for key in self.phrases}
+
+        # One-edit typo index over single-word phrases
+        self._fuzzy: Dict[str, Set[str]] = {}
+        for (word, *rest) in self.phrases:
+            if rest or len(word) < FUZZY_MIN_LENGTH:
+                continue
+            for variant in _deletions(word) | {word}:
+                self._fuzzy.setdefault(variant, set()).add(word)
+        self._fuzzy_cache: Dict[str, FrozenSet[str]] = {}
+
+    def _fuzzy_lookup(self, word: str) -> FrozenSet[str]:
+        if len(word) < FUZZY_MIN_LENGTH:
+            return frozenset()
+
+        cached = self._fuzzy_cache.get(word)
+        if cached is not None:
+            return cached
+
+        candidates: Set[str] = set()
+        for variant in _deletions(word) | {word}:
+            candidates |= self._fuzzy.get(variant, set())
+
+        site_ids: FrozenSet[str] = frozenset()
+        for candidate in candidates:
+            site_ids |= self.phrases[(candidate,)]
+
+        if len(self._fuzzy_cache) >= FUZZY_CACHE_SIZE:
+            self._fuzzy_cache.clear()
+        self._fuzzy_cache[word] = site_ids
+        return site_ids
+
+    def match(self, text: str) -> List[str]:
+        """
+        Find the sites a message mentions.
+
+        Args:
+            text: Chat message
+
+        Returns:
+            Matched site IDs, in catalog order
+        """
+        words = _words(text)
+        found: Set[str] = set()
+
+        i = 0
+        while i < len(words):
+            matched = 0
+            if words[i] in self._first_words:
+                # Longest phrase starting here wins ("waimea bay" over "waimea")
+                for length in range(min(self.max_phrase_words, len(words) - i), 0, -1):
+                    site_ids = self.phrases.get(tuple(words[i:i + length]))
+                    if site_ids:
+                        found |= site_ids
+                        matched = length
+                        break
+
+            if matched:
+                i += matched
+            else:
+                found |= self._fuzzy_lookup(words[i])
+                i += 1
+
+        return sorted(found, key=self.site_order.__getitem__)
+
+
+_site_matcher: Optional[SiteMatcher] = None
+
+
+def get_site_matcher() -> SiteMatcher:
+    """Get the matcher for the configured site catalog (built on first use)."""
+    global _site_matcher
+    if _site_matcher is None:
+        _site_matcher = SiteMatcher(OAHU_SITES, SITE_ALIASES, REGIONS)
+    return _site_matcher
@@ -0,0 +1,269 @@
+"""
+Resumable chat streams for ReefWatch Oahu.
+
+Each streamed answer runs in its own task and is buffered with
+sequential event IDs ("<stream id>:<seq>"). The HTTP response is just a
+subscriber: a client whose connection drops can reconnect with
+Last-Event-ID, get the chunks it missed, and follow the live tail without
+a new model call. While a client is attached, reading from the model
+stays at most a few chunks ahead of it, so a slow client still slows the
+upstream read; with nobody attached the answer keeps generating into the
+buffer, but only for a short grace period before the upstream stream is
+cancelled. Finished buffers expire shortly after completion.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# (chunk_text, is_final, session_id, event_id)
+StreamEvent = Tuple[str, bool, str, str]
+
+STREAM_ERROR = "Sorry, I encountered an error. Please try again."
+STREAM_INTERRUPTED = "This answer was interrupted. Please ask again."
+
+
+class BufferedStream:
+    """
+    One streamed answer, buffered for replay.
+
+    Args:
+        stream_id: Random ID embedded in every event ID
+        session_id: Chat session the answer belongs to
+        grace_seconds: How long the upstream keeps running with no subscribers
+        read_ahead: Events buffered beyond what subscribers have taken
+            before reading from the upstream pauses
+    """
+
+    def __init__(self, stream_id: str, session_id: str, grace_seconds: float, read_ahead: int):
+        self.stream_id = stream_id
+        self.session_id = session_id
+        self.grace_seconds = grace_seconds
+        self.read_ahead = read_ahead
+        self.events: List[Tuple[str, bool]] = []
+        self.done = False
+        self.completed_at: Optional[float] = None
+        self.subscribers = 0
+        self.delivered = 0
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._progress = asyncio.Event()
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.stream_id}:{seq}"
+
+    def _notify(self) -> None:
+        wakeup, self._wakeup = self._wakeup, asyncio.Event()
+        wakeup.set()
+
+    def _notify_progress(self) -> None:
+        progress, self._progress = self._progress, asyncio.Event()
+        progress.set()
+
+    def append(self, chunk: str, is_final: bool) -> None:
+        self.events.append((chunk, is_final))
+        self._notify()
+
+    async def wait_for_readers(self) -> None:
+        """Wait while attached subscribers are read_ahead events behind."""
+        while self.subscribers and len(self.events) - self.delivered >= self.read_ahead:
+            await self._progress.wait()
+
+    def finish(self) -> None:
+        self.done = True
+        self.completed_at = time.monotonic()
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._notify()
+
+    def _abandon(self) -> None:
+        self._idle_timer = None
+        if not self.subscribers and self.task is not None and not self.task.done():
+            logger.info(f"Cancelling chat stream {self.stream_id}: no client reconnected")
+            self.task.cancel()
+
+    async def subscribe(self, after: int = 0) -> AsyncIterator[StreamEvent]:
+        """
+        Yield buffered events after sequence number `after`, then the live tail.
+
+        Args:
+            after: Last sequence number the client received (0 for all)
+        """
+        self.subscribers += 1
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+        try:
+            seq = after
+            while True:
+                while seq < len(self.events):
+                    chunk, is_final = self.events[seq]
+                    seq += 1
+                    if seq > self.delivered:
+                        self.delivered = seq
+                        self._notify_progress()
+                    yield (chunk, is_final, self.session_id, self.event_id(seq))
+                    if is_final:
+                        return
+                if self.done:
+                    return
+                await self._wakeup.wait()
+        finally:
+            self.subscribers -= 1
+            if not self.subscribers and not self.done:
+                # Keep generating into the buffer for a reconnect
+                self._notify_progress()
+                self._idle_timer = asyncio.get_running_loop().call_later(
+                    self.grace_seconds, self._abandon
+                )
+
+
+class StreamRegistry:
+    """
+    Bounded set of buffered streams, looked up by event ID.
+
+    Args:
+        max_streams: Buffers kept at once; the oldest finished one is evicted
+            first, and new streams aren't buffered if all are still running
+        ttl_seconds: How long a finished buffer stays available for replay
+        grace_seconds: How long an unwatched stream keeps generating
+        read_ahead: Events read from the model ahead of an attached client
+            (default CHAT_STREAM_BUFFER_EVENTS)
+    """
+
+    def __init__(
+        self,
+        max_streams: int,
+        ttl_seconds: float,
+        grace_seconds: float,
+        read_ahead: Optional[int] = None
+    ):
+        self.max_streams = max_streams
+        self.ttl_seconds = ttl_seconds
+        self.grace_seconds = grace_seconds
+        self.read_ahead = read_ahead or settings.chat_stream_buffer_events
+        self._streams: "OrderedDict[str, BufferedStream]" = OrderedDict()
+        self.started = 0
+        self.resumed = 0
+        self.unbuffered = 0
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for stream_id in [
+            sid for sid, buffer in self._streams.items()
+            if buffer.completed_at is not None and buffer.completed_at < cutoff
+        ]:
+            del self._streams[stream_id]
+
+    def _make_room(self) -> bool:
+        self._expire()
+        if len(self._streams) < self.max_streams:
+            return True
+        oldest_done = next((sid for sid, buffer in self._streams.items() if buffer.done), None)
+        if oldest_done is None:
+            return False
+        del self._streams[oldest_done]
+        return True
+
+    async def _run(self, buffer: BufferedStream, first_event: tuple, stream) -> None:
+        try:
+            buffer.append(first_event[0], first_event[1])
+            if not first_event[1]:
+                async for chunk, is_final, _ in stream:
+                    buffer.append(chunk, is_final)
+                    if is_final:
+                        break
+                    await buffer.wait_for_readers()
+        except asyncio.CancelledError:
+            # Nobody reconnected in time; a late resume still gets an ending
+            if not buffer.events or not buffer.events[-1][1]:
+                buffer.append(STREAM_INTERRUPTED, True)
+            raise
+        except Exception as e:
+            logger.error(f"Buffered chat stream failed: {e}")
+            buffer.append(STREAM_ERROR, True)
+        finally:
+            await stream.aclose()
+            buffer.finish()
+
+    def start(self, first_event: tuple, stream) -> Optional[BufferedStream]:
+        """
+        Start buffering a chat stream whose first event was already read.
+
+        Args:
+            first_event: (chunk, is_final, session_id) already read from stream
+            stream: The chat_service.chat_stream generator
+
+        Returns:
+            The buffer to subscribe to, or None if the registry is full
+            (the caller should stream directly instead)
+        """
+        if not self._make_room():
+            self.unbuffered += 1
+            return None
+
+        buffer = BufferedStream(uuid.uuid4().hex, first_event[2], self.grace_seconds, self.read_ahead)
+        self._streams[buffer.stream_id] = buffer
+        buffer.task = asyncio.create_task(self._run(buffer, first_event, stream))
+        self.started += 1
+        return buffer
+
+    def resume(self, last_event_id: str, session_id: Optional[str] = None) -> Optional[AsyncIterator[StreamEvent]]:
+        """
+        Replay a stream from just after `last_event_id`.
+
+        Args:
+            last_event_id: Value of the client's Last-Event-ID header
+            session_id: Session the client is asking about, if it sent one
+
+        Returns:
+            Event iterator, or None if the stream is unknown or expired
+        """
+        self._expire()
+        stream_id, _, seq = last_event_id.strip().partition(":")
+        buffer = self._streams.get(stream_id)
+        if buffer is None or not seq.isdigit():
+            return None
+        if session_id and session_id != buffer.session_id:
+            return None
+
+        self.resumed += 1
+        return buffer.subscribe(after=int(seq))
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def stats(self) -> Dict[str, int]:
+        """Buffered stream counts."""
+        return {
+            "buffered": len(self._streams),
+            "in_progress": sum(1 for buffer in self._streams.values() if not buffer.done),
+            "started": self.started,
+            "resumed": self.resumed,
+            "unbuffered": self.unbuffered
+        }
+
+
+_registry: Optional[StreamRegistry] = None
+
+
+def get_stream_registry() -> StreamRegistry:
+    """Get the instance-wide registry of resumable chat streams."""
+    global _registry
+    if _registry is None:
+        _registry = StreamRegistry(
+            max_streams=settings.chat_stream_resume_max_streams,
+            ttl_seconds=settings.chat_stream_resume_ttl_seconds,
+            grace_seconds=settings.chat_stream_resume_grace_seconds
+        )
+    return _registry
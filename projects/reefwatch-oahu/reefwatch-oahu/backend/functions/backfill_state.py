@@ -0,0 +1,250 @@
+"""
+Durable checkpoints for resumable backfill jobs.
+
+A backfill job is identified by its date range, so rerunning the same
+request resumes the same job. Progress is recorded as append-only
+checkpoint records (one per job or chunk status change); the latest
+record per job/chunk wins. Dates covered by a completed chunk of any job
+are skipped when planning, so overlapping or repeated backfills only do
+the work that is missing.
+
+Checkpoints live in the BigQuery backfill_checkpoints table, or in a
+local JSON file for development and tests.
+"""
+
+import json
+import threading
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+CHECKPOINT_TABLE = "backfill_checkpoints"
+
+# Chunk statuses; a job record is "running", "incomplete" or "complete"
+CHUNK_LOADING = "loading"
+CHUNK_DONE = "done"
+CHUNK_FAILED = "failed"
+
+
+def backfill_job_id(start: date, end: date) -> str:
+    """Stable job ID for a date range, so reruns resume the same job."""
+    return f"backfill-{start:%Y%m%d}-{end:%Y%m%d}"
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _date_range(start: date, end: date) -> Iterable[date]:
+    current = start
+    while current <= end:
+        yield current
+        current += timedelta(days=1)
+
+
+def plan_chunks(
+    start: date,
+    end: date,
+    completed: Set[date],
+    chunk_days: int
+) -> List[Tuple[date, date]]:
+    """
+    Split the dates in [start, end] that aren't completed into chunks.
+
+    Consecutive pending dates are grouped into runs, and each run is
+    split into slices of at most chunk_days days.
+
+    Args:
+        start: First date of the range
+        end: Last date of the range (inclusive)
+        completed: Dates already loaded
+        chunk_days: Maximum days per chunk
+
+    Returns:
+        (chunk_start, chunk_end) pairs in date order.
+    """
+    chunks: List[Tuple[date, date]] = []
+    run_start: Optional[date] = None
+    previous: Optional[date] = None
+
+    for day in _date_range(start, end):
+        if day in completed:
+            continue
+        if run_start is None or day != previous + timedelta(days=1) or (day - run_start).days >= chunk_days:
+            if run_start is not None:
+                chunks.append((run_start, previous))
+            run_start = day
+        previous = day
+
+    if run_start is not None:
+        chunks.append((run_start, previous))
+    return chunks
+
+
+class CheckpointStore:
+    """
+    Append-only backfill checkpoint records.
+
+    Subclasses implement _append and _load; everything else works on the
+    latest record per (job_id, kind, start_date).
+    """
+
+    def _append(self, record: dict) -> None:
+        raise NotImplementedError
+
+    def _load(self, job_id: Optional[str], start: Optional[date], end: Optional[date]) -> List[dict]:
+        """Records for job_id, plus done chunks overlapping [start, end]."""
+        raise NotImplementedError
+
+    def record(
+        self,
+        job_id: str,
+        kind: str,
+        start: date,
+        end: date,
+        status: str,
+        rows: int = 0,
+        error: Optional[str] = None
+    ) -> None:
+        """
+        Record a job or chunk status.
+
+        Args:
+            job_id: Backfill job ID
+            kind: "job" or "chunk"
+            start: First date covered
+            end: Last date covered (inclusive)
+            status: New status
+            rows: Rows loaded so far
+            error: Error message, if any
+        """
+        self._append({
+            "job_id": job_id,
+            "kind": kind,
+            "start_date": _as_date(start).isoformat(),
+            "end_date": _as_date(end).isoformat(),
+            "status": status,
+            "row_count": rows,
+            "error": error,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    @staticmethod
+    def _latest(records: Iterable[dict]) -> List[dict]:
+        latest: Dict[tuple, dict] = {}
+        for record in sorted(records, key=lambda r: str(r["updated_at"])):
+            latest[(record["job_id"], record["kind"], str(record["start_date"]))] = record
+        return list(latest.values())
+
+    def completed_dates(self, start: date, end: date) -> Set[date]:
+        """Dates in [start, end] covered by a done chunk of any job."""
+        start, end = _as_date(start), _as_date(end)
+        done: Set[date] = set()
+        for record in self._latest(self._load(None, start, end)):
+            if record["kind"] == "chunk" and record["status"] == CHUNK_DONE:
+                chunk_start = max(_as_date(record["start_date"]), start)
+                chunk_end = min(_as_date(record["end_date"]), end)
+                done.update(_date_range(chunk_start, chunk_end))
+        return done
+
+    def job_status(self, job_id: str) -> Optional[dict]:
+        """
+        Summary of a job for status polling.
+
+        Returns:
+            Dict with status, range, completed/total days, rows and the
+            latest state of each chunk, or None if the job is unknown.
+        """
+        records = self._latest(r for r in self._load(job_id, None, None) if r["job_id"] == job_id)
+        job = next((r for r in records if r["kind"] == "job"), None)
+        if job is None:
+            return None
+
+        start, end = _as_date(job["start_date"]), _as_date(job["end_date"])
+        chunks = sorted(
+            (r for r in records if r["kind"] == "chunk"),
+            key=lambda r: str(r["start_date"])
+        )
+        completed = self.completed_dates(start, end)
+        total_days = (end - start).days + 1
+        return {
+            "job_id": job_id,
+            # Overlapping jobs may have loaded the remaining dates since
+            "status": "complete" if len(completed) == total_days else job["status"],
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "updated_at": str(job["updated_at"]),
+            "total_days": total_days,
+            "completed_days": len(completed),
+            "rows": sum(int(r["row_count"] or 0) for r in chunks if r["status"] == CHUNK_DONE),
+            "chunks": [
+                {
+                    "start_date": str(r["start_date"])[:10],
+                    "end_date": str(r["end_date"])[:10],
+                    "status": r["status"],
+                    "rows": int(r["row_count"] or 0),
+                    **({"error": r["error"]} if r.get("error") else {})
+                }
+                for r in chunks
+            ]
+        }
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Checkpoints in a local JSON-lines file (development and tests)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _append(self, record: dict) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def _load(self, job_id, start, end) -> List[dict]:
+        if not self.path.exists():
+            return []
+        with self._lock, self.path.open() as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class BigQueryCheckpointStore(CheckpointStore):
+    """
+    Checkpoints in the BigQuery backfill_checkpoints table.
+
+    Args:
+        client: BigQuery client
+        table_id: Fully qualified checkpoint table ID
+    """
+
+    def __init__(self, client, table_id: str):
+        self.client = client
+        self.table_id = table_id
+
+    def _append(self, record: dict) -> None:
+        errors = self.client.insert_rows_json(self.table_id, [record])
+        if errors:
+            raise RuntimeError(f"Failed to write backfill checkpoint: {errors}")
+
+    def _load(self, job_id, start, end) -> List[dict]:
+        from google.cloud import bigquery
+
+        query = f"""
+            SELECT job_id, kind, start_date, end_date, status, row_count, error, updated_at
+            FROM `{self.table_id}`
+            WHERE job_id = @job_id
+               OR (kind = 'chunk' AND status = @done AND end_date >= @start AND start_date <= @end)
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("job_id", "STRING", job_id),
+            bigquery.ScalarQueryParameter("done", "STRING", CHUNK_DONE),
+            bigquery.ScalarQueryParameter("start", "DATE", start),
+            bigquery.ScalarQueryParameter("end", "DATE", end),
+        ])
+        return [dict(row) for row in self.client.query(query, job_config=job_config).result()]
@@ -0,0 +1,58 @@
+"""
+Incremental Degree Heating Week accumulator for the ingestion functions.
+
+Mirrors backend/app/services/dhw_engine.py (the functions are deployed
+on their own, without the app package). DHW is the 84-day running sum
+of daily HotSpots >= 1°C, in °C-weeks; the ring buffer makes each new
+day O(1) per location for arrays of any shape, e.g. a whole ERDDAP grid.
+"""
+
+from typing import Tuple, Union
+
+import numpy as np
+
+DHW_WINDOW_DAYS = 84
+HOTSPOT_THRESHOLD = 1.0
+
+
+def dhw_contribution(hotspot) -> np.ndarray:
+    """Daily DHW contribution: HotSpots >= 1°C count in full, others (and NaN) as zero."""
+    values = np.asarray(hotspot, dtype=np.float64)
+    return np.where(values >= HOTSPOT_THRESHOLD, values, 0.0)
+
+
+class DHWAccumulator:
+    """Rolling DHW over a ring buffer of daily HotSpots for an array of locations."""
+
+    def __init__(self, shape: Union[int, Tuple[int, ...]], window: int = DHW_WINDOW_DAYS):
+        self.shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        self.window = window
+        self._buffer = np.zeros((window,) + self.shape, dtype=np.float64)
+        self._sum = np.zeros(self.shape, dtype=np.float64)
+        self._position = 0
+        self.days_seen = 0
+
+    @property
+    def is_warm(self) -> bool:
+        """Whether a full window of days has been pushed."""
+        return self.days_seen >= self.window
+
+    @property
+    def dhw(self) -> np.ndarray:
+        """Current DHW in °C-weeks for every location."""
+        return np.maximum(self._sum, 0.0) / 7.0
+
+    def push(self, hotspot) -> np.ndarray:
+        """Add one day of HotSpot values and return the updated DHW."""
+        contribution = np.broadcast_to(dhw_contribution(hotspot), self.shape)
+
+        self._sum += contribution - self._buffer[self._position]
+        self._buffer[self._position] = contribution
+        self._position = (self._position + 1) % self.window
+        self.days_seen += 1
+
+        # Re-sum once per window to stop floating-point drift accumulating
+        if self._position == 0:
+            self._sum = self._buffer.sum(axis=0)
+
+        return self.dhw
@@ -0,0 +1,333 @@
+"""
+ERDDAP griddap transport for the ingestion functions.
+
+ERDDAP's .json output is a table of nested lists (every value a JSON
+token, every row a Python list) and is the most expensive format to
+download and parse. The same query can be requested as .csv, parsed by
+pandas' C reader straight into float64 columns, or as .nc (netCDF-3
+binary), read into NumPy arrays via netCDF4 without any text parsing.
+All parsers return the same frame as the JSON path: one row per grid
+cell in the dataset's (time, latitude, longitude) order. If the compact
+format fails for any reason the request is retried as .json.
+
+Rather than a whole bounding box, plan_site_windows can plan small
+lat/lon windows around the sites (plus an interpolation margin), merging
+windows where one request is cheaper than two; fetch_griddap_windows
+downloads them concurrently and stitches them into one grid, so bytes
+scale with the number of sites rather than the area they span.
+fetch_ahead keeps a few time-range requests in flight for backfills
+while handing results back in order.
+"""
+
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+ERDDAP_FORMATS = ("csv", "nc", "json")
+
+# Fallback format, understood by every ERDDAP server
+FALLBACK_FORMAT = "json"
+
+GRID_DIMENSIONS = ("time", "latitude", "longitude")
+
+# Per-request overhead in the window planner, as an equivalent number of grid cells
+REQUEST_COST_CELLS = 64
+
+T = TypeVar("T")
+
+# (lat_min, lat_max, lon_min, lon_max), inclusive, on grid cell centres
+Window = Tuple[float, float, float, float]
+
+
+def _typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce a griddap table to datetime coordinates and float64 variables."""
+    df["time"] = pd.to_datetime(df["time"], format="ISO8601")
+    for column in df.columns:
+        if column != "time" and df[column].dtype != np.float64:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+    return df
+
+
+def parse_json(content: bytes) -> pd.DataFrame:
+    """Parse an ERDDAP .json table response."""
+    data = json.loads(content)
+    if "table" not in data:
+        logger.warning("No table data in ERDDAP response")
+        return pd.DataFrame()
+
+    table = data["table"]
+    df = pd.DataFrame(table["rows"], columns=table["columnNames"])
+    return _typed_frame(df)
+
+
+def parse_csv(content: bytes) -> pd.DataFrame:
+    """Parse an ERDDAP .csv response (column names, then a units row, then data)."""
+    df = pd.read_csv(
+        io.BytesIO(content),
+        skiprows=[1],
+        na_values=["NaN"],
+        engine="c",
+        dtype={"time": str}
+    )
+    return _typed_frame(df)
+
+
+def parse_nc(content: bytes) -> pd.DataFrame:
+    """
+    Parse an ERDDAP .nc (netCDF-3) griddap response.
+
+    Coordinates are expanded to one row per cell in C order, matching
+    the row order of the tabular formats. Fill values become NaN.
+    """
+    import netCDF4
+
+    with netCDF4.Dataset("erddap.nc", memory=content) as dataset:
+        time = np.asarray(dataset.variables["time"][:], dtype=np.float64)
+        lat = np.asarray(dataset.variables["latitude"][:], dtype=np.float64)
+        lon = np.asarray(dataset.variables["longitude"][:], dtype=np.float64)
+        grid_time, grid_lat, grid_lon = np.meshgrid(time, lat, lon, indexing="ij")
+
+        columns = {
+            "time": pd.to_datetime(grid_time.ravel(), unit="s", utc=True),
+            "latitude": grid_lat.ravel(),
+            "longitude": grid_lon.ravel(),
+        }
+        for name, variable in dataset.variables.items():
+            if variable.dimensions == GRID_DIMENSIONS:
+                values = np.ma.filled(variable[:].astype(np.float64), np.nan)
+                columns[name] = values.ravel()
+
+    return pd.DataFrame(columns)
+
+
+PARSERS: Dict[str, Callable[[bytes], pd.DataFrame]] = {
+    "csv": parse_csv,
+    "nc": parse_nc,
+    "json": parse_json,
+}
+
+
+def fetch_griddap(
+    endpoint: str,
+    query: str,
+    fmt: str = "csv",
+    timeout: float = 60
+) -> pd.DataFrame:
+    """
+    Download and parse a griddap query, falling back to .json.
+
+    Args:
+        endpoint: Dataset URL without extension, e.g. .../griddap/dhw_5km
+        query: Query string (variable constraints) without the leading "?"
+        fmt: Preferred response format, one of ERDDAP_FORMATS
+        timeout: Request timeout in seconds
+
+    Returns:
+        DataFrame with time, latitude, longitude and one column per variable.
+    """
+    if fmt not in PARSERS:
+        raise ValueError(f"Unknown ERDDAP format: {fmt}")
+
+    formats = [fmt] if fmt == FALLBACK_FORMAT else [fmt, FALLBACK_FORMAT]
+    for current in formats:
+        url = f"{endpoint}.{current}?{query}"
+        try:
+            response = requests.get(url, timeout=timeout)
+            response.raise_for_status()
+            df = PARSERS[current](response.content)
+        except Exception as e:
+            if current == FALLBACK_FORMAT:
+                raise
+            logger.warning(f"ERDDAP .{current} request failed ({e}), retrying as .{FALLBACK_FORMAT}")
+            continue
+
+        logger.info(f"Parsed {len(response.content)} byte .{current} response into {len(df)} rows")
+        return df
+
+    return pd.DataFrame()
+
+
+def plan_site_windows(
+    site_lat: Sequence[float],
+    site_lon: Sequence[float],
+    step: float,
+    origin: float = 0.0,
+    margin_cells: int = 2,
+    request_cost_cells: int = REQUEST_COST_CELLS,
+    bounds: Optional[Window] = None
+) -> List[Window]:
+    """
+    Plan grid windows covering every site and its interpolation neighbourhood.
+
+    Each site gets a window of margin_cells cells either side of its cell,
+    snapped to the grid. Windows are then merged greedily whenever the
+    merged window costs less than the two requests it replaces, where a
+    request costs its cell count plus request_cost_cells; so nearby sites
+    share a request and distant ones don't drag in the space between them.
+
+    Args:
+        site_lat: Site latitudes
+        site_lon: Site longitudes
+        step: Grid spacing in degrees (same on both axes)
+        origin: Offset of the grid cell centres, e.g. 0.025 for the CRW 5 km grid
+        margin_cells: Cells around each site's cell to include
+        request_cost_cells: Per-request overhead, in cells
+        bounds: Optional (lat_min, lat_max, lon_min, lon_max) to clip windows to
+
+    Returns:
+        Windows in degrees, sorted by latitude then longitude.
+    """
+    lat_idx = np.rint((np.asarray(site_lat, dtype=np.float64) - origin) / step).astype(np.int64)
+    lon_idx = np.rint((np.asarray(site_lon, dtype=np.float64) - origin) / step).astype(np.int64)
+    if len(lat_idx) == 0:
+        return []
+
+    boxes = np.unique(np.column_stack([
+        lat_idx - margin_cells, lat_idx + margin_cells,
+        lon_idx - margin_cells, lon_idx + margin_cells
+    ]), axis=0)
+
+    if bounds is not None:
+        lat_min, lat_max, lon_min, lon_max = bounds
+        lower = np.ceil((np.array([lat_min, lon_min]) - origin) / step - 1e-9).astype(np.int64)
+        upper = np.floor((np.array([lat_max, lon_max]) - origin) / step + 1e-9).astype(np.int64)
+        boxes[:, 0:2] = np.clip(boxes[:, 0:2], lower[0], upper[0])
+        boxes[:, 2:4] = np.clip(boxes[:, 2:4], lower[1], upper[1])
+        boxes = np.unique(boxes, axis=0)
+
+    def cells(b: np.ndarray) -> np.ndarray:
+        return (b[..., 1] - b[..., 0] + 1) * (b[..., 3] - b[..., 2] + 1)
+
+    merged = True
+    while merged:
+        merged = False
+        keep = np.ones(len(boxes), dtype=bool)
+        for a in range(len(boxes)):
+            if not keep[a]:
+                continue
+            while True:
+                # Union of box a with every other remaining box
+                union = np.column_stack([
+                    np.minimum(boxes[:, 0], boxes[a, 0]), np.maximum(boxes[:, 1], boxes[a, 1]),
+                    np.minimum(boxes[:, 2], boxes[a, 2]), np.maximum(boxes[:, 3], boxes[a, 3])
+                ])
+                saving = cells(boxes) + cells(boxes[a]) + request_cost_cells - cells(union)
+                saving[~keep] = -1
+                saving[a] = -1
+                b = int(saving.argmax())
+                if saving[b] < 0:
+                    break
+                boxes[a] = union[b]
+                keep[b] = False
+                merged = True
+        boxes = boxes[keep]
+
+    boxes = boxes[np.lexsort((boxes[:, 2], boxes[:, 0]))]
+    return [
+        tuple(round(origin + float(index) * step, 6) for index in box)
+        for box in boxes
+    ]
+
+
+def window_query(variables: Sequence[str], time_constraint: str, window: Window) -> str:
+    """griddap query for some variables over one window, e.g. time_constraint "[(t):1:(t)]"."""
+    lat_min, lat_max, lon_min, lon_max = window
+    return ",".join(
+        f"{variable}{time_constraint}[({lat_min}):1:({lat_max})][({lon_min}):1:({lon_max})]"
+        for variable in variables
+    )
+
+
+def fetch_griddap_windows(
+    endpoint: str,
+    variables: Sequence[str],
+    time_constraint: str,
+    windows: Sequence[Window],
+    fmt: str = "csv",
+    timeout: float = 60,
+    max_workers: int = 4
+) -> pd.DataFrame:
+    """
+    Fetch several windows concurrently and stitch them into one grid.
+
+    Cells covered by more than one window are kept once. Rows are sorted
+    by (time, latitude, longitude), so the same windows give the same row
+    order every day.
+
+    Args:
+        endpoint: Dataset URL without extension
+        variables: Grid variables to request
+        time_constraint: Time index constraint, e.g. "[(2024-01-01T12:00:00Z):1:(...)]"
+        windows: Windows from plan_site_windows
+        fmt: Preferred response format, one of ERDDAP_FORMATS
+        timeout: Per-request timeout in seconds
+        max_workers: Concurrent requests
+
+    Returns:
+        DataFrame in the same layout as fetch_griddap.
+    """
+    if not windows:
+        return pd.DataFrame()
+
+    def fetch(window: Window) -> pd.DataFrame:
+        return fetch_griddap(endpoint, window_query(variables, time_constraint, window), fmt, timeout)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as pool:
+        frames = [df for df in pool.map(fetch, windows) if not df.empty]
+
+    if not frames:
+        return pd.DataFrame()
+
+    grid = pd.concat(frames, ignore_index=True)
+    grid = grid.drop_duplicates(subset=list(GRID_DIMENSIONS))
+    return grid.sort_values(list(GRID_DIMENSIONS), kind="stable").reset_index(drop=True)
+
+
+def fetch_ahead(
+    items: Iterable[T],
+    fetch: Callable[[T], object],
+    max_workers: int,
+    deadline: Optional[float] = None
+) -> Iterator[Tuple[T, object]]:
+    """
+    Fetch items concurrently, yielding (item, result or exception) in order.
+
+    At most max_workers fetches are in flight, so a long range doesn't
+    hold every chunk in memory at once. No new fetches start after
+    deadline (a time.monotonic() value); closing the generator early
+    cancels queued fetches and doesn't wait for running ones.
+    """
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    pending = []
+    queue = iter(items)
+
+    def submit_next() -> None:
+        if deadline is not None and time.monotonic() >= deadline:
+            return
+        item = next(queue, None)
+        if item is not None:
+            pending.append((item, pool.submit(fetch, item)))
+
+    try:
+        for _ in range(max(1, max_workers)):
+            submit_next()
+
+        while pending:
+            item, future = pending.pop(0)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            submit_next()
+            yield item, result
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,408 @@
+"""
+Site to grid-cell mapping for the ingestion functions.
+
+The NOAA CRW grid has the same geometry every day, so the nearest grid
+cell for each site only needs working out once. On a regular lat/lon grid
+(the 5 km product, or windows of it) the nearest cell is found per axis
+with index arithmetic; irregular grids fall back to a chunked brute-force
+search. Mappings are cached by grid geometry and site coordinates, so a
+daily ingest or a multi-year backfill reduces to one array gather per day.
+
+Nearest-cell values are NaN when the closest cell is land-masked, which
+is common for nearshore sites. GridWeights instead blends the k nearest
+valid (ocean) cells by inverse distance, or the four surrounding cells
+bilinearly; weights are precomputed per geometry and land mask, so each
+day is one gather and weighted sum over all sites.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+# Distance matrix entries evaluated at once by the brute-force fallback
+BRUTE_FORCE_CHUNK = 4_000_000
+
+# Grid geometries kept in the mapping cache
+INDEX_CACHE_SIZE = 8
+
+# Largest lattice (cells, present or not) handled by index arithmetic
+LATTICE_MAX_CELLS = 4_000_000
+
+INTERPOLATION_MODES = ("nearest", "idw", "bilinear")
+
+# Inverse-distance weighting power
+IDW_POWER = 2.0
+
+
+class GridIndex:
+    """
+    Nearest grid row for each site, for one grid geometry.
+
+    Args:
+        rows: Position of the nearest grid row for each site
+        distances: Euclidean distance to that cell, in degrees
+    """
+
+    def __init__(self, rows: np.ndarray, distances: np.ndarray):
+        self.rows = rows
+        self.distances = distances
+
+    def gather(self, values: np.ndarray) -> np.ndarray:
+        """Pick each site's value (or row of values) from a per-cell array."""
+        return np.asarray(values)[self.rows]
+
+
+def _regular_axis(values: np.ndarray) -> Optional[Tuple[float, float, int]]:
+    """Origin, step and length of the evenly spaced axis the values lie on, else None."""
+    axis = np.unique(values)
+    if len(axis) == 1:
+        return float(axis[0]), 1.0, 1
+    steps = np.diff(axis)
+    step = float(steps.min())
+    multiples = steps / step
+    if not np.allclose(multiples, np.rint(multiples), rtol=0, atol=1e-3):
+        return None
+    return float(axis[0]), step, int(np.rint((axis[-1] - axis[0]) / step)) + 1
+
+
+class _Lattice:
+    """Regular lat/lon lattice with the row position of each present cell (-1 if absent)."""
+
+    def __init__(self, cell_rows: np.ndarray, lat0: float, dlat: float, lon0: float, dlon: float):
+        self.cell_rows = cell_rows
+        self.lat0, self.dlat = lat0, dlat
+        self.lon0, self.dlon = lon0, dlon
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.cell_rows.shape
+
+    def position(self, site_lat: np.ndarray, site_lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fractional lattice coordinates of each site, clamped to the lattice."""
+        y = np.clip((site_lat - self.lat0) / self.dlat, 0, self.shape[0] - 1)
+        x = np.clip((site_lon - self.lon0) / self.dlon, 0, self.shape[1] - 1)
+        return y, x
+
+
+def _lattice(grid_lat: np.ndarray, grid_lon: np.ndarray) -> Optional[_Lattice]:
+    """
+    Lattice for grid rows on a regular lat/lon grid, else None.
+
+    Cells may be missing (e.g. a grid stitched from several windows), and
+    rows may arrive in any order.
+    """
+    lat_axis = _regular_axis(grid_lat)
+    lon_axis = _regular_axis(grid_lon)
+    if lat_axis is None or lon_axis is None:
+        return None
+
+    (lat0, dlat, nlat), (lon0, dlon, nlon) = lat_axis, lon_axis
+    if nlat * nlon > LATTICE_MAX_CELLS:
+        return None
+
+    cell_rows = np.full((nlat, nlon), -1, dtype=np.int64)
+    cell_rows[
+        np.rint((grid_lat - lat0) / dlat).astype(np.int64),
+        np.rint((grid_lon - lon0) / dlon).astype(np.int64)
+    ] = np.arange(len(grid_lat))
+    if (cell_rows >= 0).sum() != len(grid_lat):
+        return None  # Duplicate cells
+    return _Lattice(cell_rows, lat0, dlat, lon0, dlon)
+
+
+def _nearest_regular(
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    site_lat: np.ndarray,
+    site_lon: np.ndarray
+) -> Optional[np.ndarray]:
+    """Nearest rows by per-axis index arithmetic, or None if the grid isn't regular."""
+    lattice = _lattice(grid_lat, grid_lon)
+    if lattice is None:
+        return None
+
+    # On an axis-aligned grid the nearest lattice point is nearest on each
+    # axis; where that cell is missing, search the rows directly
+    y, x = lattice.position(site_lat, site_lon)
+    rows = lattice.cell_rows[np.rint(y).astype(np.int64), np.rint(x).astype(np.int64)]
+    missing = rows < 0
+    if missing.any():
+        rows[missing] = _nearest_brute_force(grid_lat, grid_lon, site_lat[missing], site_lon[missing])
+    return rows
+
+
+def _nearest_brute_force(
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    site_lat: np.ndarray,
+    site_lon: np.ndarray
+) -> np.ndarray:
+    """Nearest rows by comparing every site with every cell, in bounded chunks."""
+    rows = np.empty(len(site_lat), dtype=np.int64)
+    chunk = max(1, BRUTE_FORCE_CHUNK // max(len(grid_lat), 1))
+    for start in range(0, len(site_lat), chunk):
+        stop = start + chunk
+        d2 = (
+            (grid_lat[None, :] - site_lat[start:stop, None]) ** 2 +
+            (grid_lon[None, :] - site_lon[start:stop, None]) ** 2
+        )
+        rows[start:stop] = d2.argmin(axis=1)
+    return rows
+
+
+def _k_nearest(
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    site_lat: np.ndarray,
+    site_lon: np.ndarray,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows and distances of the k nearest cells per site, nearest first."""
+    k = min(k, len(grid_lat))
+    rows = np.empty((len(site_lat), k), dtype=np.int64)
+    distances = np.empty((len(site_lat), k), dtype=np.float64)
+    chunk = max(1, BRUTE_FORCE_CHUNK // max(len(grid_lat), 1))
+    for start in range(0, len(site_lat), chunk):
+        stop = start + chunk
+        d2 = (
+            (grid_lat[None, :] - site_lat[start:stop, None]) ** 2 +
+            (grid_lon[None, :] - site_lon[start:stop, None]) ** 2
+        )
+        part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        part_d2 = np.take_along_axis(d2, part, axis=1)
+        order = np.argsort(part_d2, axis=1)
+        rows[start:stop] = np.take_along_axis(part, order, axis=1)
+        distances[start:stop] = np.sqrt(np.take_along_axis(part_d2, order, axis=1))
+    return rows, distances
+
+
+def build_grid_index(grid_lat, grid_lon, site_lat, site_lon) -> GridIndex:
+    """
+    Map each site to its nearest grid cell.
+
+    Args:
+        grid_lat: Latitude of every grid row
+        grid_lon: Longitude of every grid row
+        site_lat: Site latitudes
+        site_lon: Site longitudes
+
+    Returns:
+        GridIndex for these sites on this grid.
+    """
+    grid_lat = np.asarray(grid_lat, dtype=np.float64)
+    grid_lon = np.asarray(grid_lon, dtype=np.float64)
+    site_lat = np.asarray(site_lat, dtype=np.float64)
+    site_lon = np.asarray(site_lon, dtype=np.float64)
+
+    rows = _nearest_regular(grid_lat, grid_lon, site_lat, site_lon)
+    if rows is None:
+        rows = _nearest_brute_force(grid_lat, grid_lon, site_lat, site_lon)
+
+    distances = np.hypot(grid_lat[rows] - site_lat, grid_lon[rows] - site_lon)
+    return GridIndex(rows, distances)
+
+
+class GridWeights:
+    """
+    Per-site weights over a few grid cells, for one geometry and land mask.
+
+    Args:
+        rows: Grid rows used by each site, shape (sites, k)
+        weights: Matching weights; zero for unused slots
+        distances: Distance to the nearest cell each site uses, in degrees
+            (NaN if no valid cell was found)
+    """
+
+    def __init__(self, rows: np.ndarray, weights: np.ndarray, distances: np.ndarray):
+        self.rows = rows
+        self.weights = weights
+        self.distances = distances
+
+    def interpolate(self, values: np.ndarray) -> np.ndarray:
+        """
+        Weighted values for every site.
+
+        Cells that are NaN for a particular variable that day are dropped
+        and the remaining weights renormalized; a site with no usable cell
+        gets NaN.
+
+        Args:
+            values: Per-cell values, shape (cells,) or (cells, variables)
+
+        Returns:
+            Shape (sites,) or (sites, variables).
+        """
+        picked = np.asarray(values, dtype=np.float64)[self.rows]
+        weights = self.weights if picked.ndim == 2 else self.weights[..., None]
+        present = ~np.isnan(picked) & (weights > 0)
+        total = np.where(present, picked * weights, 0.0).sum(axis=1)
+        norm = np.where(present, weights, 0.0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(norm > 0, total / norm, np.nan)
+
+
+def _idw_weights(distances: np.ndarray) -> np.ndarray:
+    """Inverse-distance weights per row; an exact hit takes all the weight."""
+    with np.errstate(divide="ignore"):
+        weights = 1.0 / distances ** IDW_POWER
+    exact = np.isinf(weights)
+    hits = exact.any(axis=1)
+    weights[hits] = exact[hits].astype(np.float64)
+    return weights
+
+
+def _bilinear_weights(
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    valid: np.ndarray,
+    site_lat: np.ndarray,
+    site_lon: np.ndarray
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Rows and weights of the four surrounding valid cells, or None off a regular grid."""
+    lattice = _lattice(grid_lat, grid_lon)
+    if lattice is None or min(lattice.shape) < 2:
+        return None
+
+    # Lower-left corner and position within the cell, clamped to the grid
+    y, x = lattice.position(site_lat, site_lon)
+    i = np.minimum(np.floor(y).astype(np.int64), lattice.shape[0] - 2)
+    j = np.minimum(np.floor(x).astype(np.int64), lattice.shape[1] - 2)
+    t, u = y - i, x - j
+
+    cells = lattice.cell_rows
+    rows = np.stack([cells[i, j], cells[i, j + 1], cells[i + 1, j], cells[i + 1, j + 1]], axis=1)
+    weights = np.stack([(1 - t) * (1 - u), (1 - t) * u, t * (1 - u), t * u], axis=1)
+
+    # Missing and land corners get no weight
+    present = rows >= 0
+    rows = np.where(present, rows, 0)
+    weights = np.where(present & valid[rows], weights, 0.0)
+    return rows, weights
+
+
+def build_grid_weights(
+    grid_lat,
+    grid_lon,
+    valid,
+    site_lat,
+    site_lon,
+    mode: str = "idw",
+    neighbors: int = 4
+) -> GridWeights:
+    """
+    Precompute interpolation weights from valid grid cells to sites.
+
+    Args:
+        grid_lat: Latitude of every grid row
+        grid_lon: Longitude of every grid row
+        valid: Whether each grid row is an ocean cell with data
+        site_lat: Site latitudes
+        site_lon: Site longitudes
+        mode: "nearest" (nearest valid cell), "idw" (k nearest valid cells
+            by inverse distance) or "bilinear" (surrounding four cells,
+            with land corners dropped; IDW where all four are land or the
+            grid isn't regular)
+        neighbors: Cells blended per site in "idw" mode
+
+    Returns:
+        GridWeights for these sites on this grid.
+    """
+    if mode not in INTERPOLATION_MODES:
+        raise ValueError(f"Unknown interpolation mode: {mode}")
+
+    grid_lat = np.asarray(grid_lat, dtype=np.float64)
+    grid_lon = np.asarray(grid_lon, dtype=np.float64)
+    valid = np.asarray(valid, dtype=bool)
+    site_lat = np.asarray(site_lat, dtype=np.float64)
+    site_lon = np.asarray(site_lon, dtype=np.float64)
+
+    k = 1 if mode == "nearest" else max(neighbors, 1)
+    ocean = np.flatnonzero(valid)
+    if len(ocean) == 0:
+        return GridWeights(
+            np.zeros((len(site_lat), 1), dtype=np.int64),
+            np.zeros((len(site_lat), 1)),
+            np.full(len(site_lat), np.nan)
+        )
+
+    near_rows, near_distances = _k_nearest(grid_lat[ocean], grid_lon[ocean], site_lat, site_lon, k)
+    rows = ocean[near_rows]
+    weights = np.ones_like(near_distances) if mode == "nearest" else _idw_weights(near_distances)
+
+    if mode == "bilinear":
+        bilinear = _bilinear_weights(grid_lat, grid_lon, valid, site_lat, site_lon)
+        if bilinear is not None:
+            bi_rows, bi_weights = bilinear
+            usable = bi_weights.sum(axis=1) > 0
+            width = max(rows.shape[1], 4)
+            rows = np.pad(rows, ((0, 0), (0, width - rows.shape[1])))
+            weights = np.pad(weights, ((0, 0), (0, width - weights.shape[1])))
+            rows[usable] = np.pad(bi_rows[usable], ((0, 0), (0, width - 4)))
+            weights[usable] = np.pad(bi_weights[usable], ((0, 0), (0, width - 4)))
+
+    used = weights > 0
+    cell_distances = np.hypot(grid_lat[rows] - site_lat[:, None], grid_lon[rows] - site_lon[:, None])
+    distances = np.where(used, cell_distances, np.inf).min(axis=1)
+    distances[~used.any(axis=1)] = np.nan
+    return GridWeights(rows, weights, distances)
+
+
+_index_cache: "OrderedDict[str, object]" = OrderedDict()
+
+
+def _geometry_key(*arrays: np.ndarray, extra: str = "") -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(extra.encode())
+    for array in arrays:
+        data = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(data.shape).encode())
+        digest.update(data.tobytes())
+    return digest.hexdigest()
+
+
+def grid_geometry_key(grid_lat, grid_lon) -> str:
+    """Hash of the grid cell coordinates, identifying one grid geometry."""
+    return _geometry_key(grid_lat, grid_lon, extra="grid")
+
+
+def _cached(key: str, build: Callable[[], object]):
+    entry = _index_cache.get(key)
+    if entry is None:
+        entry = build()
+        _index_cache[key] = entry
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    else:
+        _index_cache.move_to_end(key)
+    return entry
+
+
+def get_grid_index(grid_lat, grid_lon, site_lat, site_lon) -> GridIndex:
+    """
+    Cached build_grid_index, keyed by grid geometry and site coordinates.
+
+    Hashing the coordinates is a single pass over the grid, so a day whose
+    grid matches an earlier one skips the nearest-cell search entirely.
+    """
+    key = _geometry_key(grid_lat, grid_lon, site_lat, site_lon, extra="nearest-cell")
+    return _cached(key, lambda: build_grid_index(grid_lat, grid_lon, site_lat, site_lon))
+
+
+def get_grid_weights(
+    grid_lat,
+    grid_lon,
+    valid,
+    site_lat,
+    site_lon,
+    mode: str = "idw",
+    neighbors: int = 4
+) -> GridWeights:
+    """Cached build_grid_weights, keyed by geometry, land mask, sites and mode."""
+    key = _geometry_key(
+        grid_lat, grid_lon, valid, site_lat, site_lon, extra=f"{mode}:{neighbors}"
+    )
+    return _cached(key, lambda: build_grid_weights(
+        grid_lat, grid_lon, valid, site_lat, site_lon, mode, neighbors
+    ))
@@ -10,17 +10,31 @@ Scheduled to run daily via Cloud Scheduler.
 import os
 import json
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 
 import functions_framework
 import requests
 import pandas as pd
-import numpy as np
+from google.api_core.exceptions import Conflict
 from google.cloud import bigquery
 from google.cloud import logging as cloud_logging
 from retry import retry
 
+from backfill_state import (
+    CHECKPOINT_TABLE, CHUNK_DONE, CHUNK_FAILED, CHUNK_LOADING,
+    BigQueryCheckpointStore, CheckpointStore, FileCheckpointStore, backfill_job_id, plan_chunks
+)
+from erddap import fetch_ahead, fetch_griddap, fetch_griddap_windows, plan_site_windows, window_query
+from dhw_engine import DHW_WINDOW_DAYS
+from site_data import (
+    SITE_VARIABLES, backfill_chunk, bleaching_risk_columns, calculate_bleaching_risk, interpolate_site_data,
+    seed_grid_dhw
+)
+from staged_load import MergedLoad, staging_table_id
+
 # Configure logging
 logging_client = cloud_logging.Client()
 logging_client.setup_logging()
@@ -30,6 +44,25 @@ logger = logging.getLogger(__name__)
 GCP_PROJECT_ID = os.environ.get("GCP_PROJECT_ID", "reefwatch-oahu")
 BIGQUERY_DATASET = os.environ.get("BIGQUERY_DATASET", "reefwatch")
 
+# ERDDAP response format for gridded data: "csv", "nc" or "json" (.json is the fallback)
+ERDDAP_FORMAT = os.environ.get("ERDDAP_FORMAT", "csv")
+
+# Grid download area: "sites" (windows around the sites) or "bounds" (all of OAHU_BOUNDS)
+ERDDAP_SUBSET = os.environ.get("ERDDAP_SUBSET", "sites")
+ERDDAP_SITE_MARGIN_CELLS = int(os.environ.get("ERDDAP_SITE_MARGIN_CELLS", "2"))
+ERDDAP_MAX_CONCURRENCY = int(os.environ.get("ERDDAP_MAX_CONCURRENCY", "4"))
+
+# Backfill: days per ERDDAP request / load job, and chunks fetched at once
+BACKFILL_CHUNK_DAYS = int(os.environ.get("BACKFILL_CHUNK_DAYS", "30"))
+BACKFILL_MAX_WORKERS = int(os.environ.get("BACKFILL_MAX_WORKERS", "4"))
+
+# Backfill checkpoints: "bigquery" (backfill_checkpoints table) or "file" (BACKFILL_STATE_FILE)
+BACKFILL_CHECKPOINT_STORE = os.environ.get("BACKFILL_CHECKPOINT_STORE", "bigquery")
+BACKFILL_STATE_FILE = os.environ.get("BACKFILL_STATE_FILE", "/tmp/reefwatch_backfill_state.jsonl")
+
+# Stop starting new chunks after this long, leaving headroom before the function timeout
+BACKFILL_TIME_BUDGET_SECONDS = float(os.environ.get("BACKFILL_TIME_BUDGET_SECONDS", "240"))
+
 # Oahu geographic bounds
 OAHU_BOUNDS = {
     "lat_min": 21.2,
@@ -57,6 +90,10 @@ OAHU_SITES = [
     {"name": "Waimea Bay", "lat": 21.6419, "lon": -158.0656, "type": "bay", "description": "North shore icon, summer snorkeling"}
 ]
 
+# CRW 5 km grid: cell centres at 0.025 + n * 0.05 degrees
+CRW_GRID_STEP = 0.05
+CRW_GRID_ORIGIN = 0.025
+
 # ERDDAP API endpoints
 NOAA_DHW_ENDPOINT = "https://pae-paha.pacioos.hawaii.edu/erddap/griddap/dhw_5km"
 PACIOOS_ENDPOINT = "https://pae-paha.pacioos.hawaii.edu/erddap"
@@ -67,8 +104,33 @@ def get_bigquery_client() -> bigquery.Client:
     return bigquery.Client(project=GCP_PROJECT_ID)
 
 
+def get_checkpoint_store(client: bigquery.Client) -> CheckpointStore:
+    """Return the backfill checkpoint store selected by BACKFILL_CHECKPOINT_STORE."""
+    if BACKFILL_CHECKPOINT_STORE == "file":
+        return FileCheckpointStore(BACKFILL_STATE_FILE)
+    return BigQueryCheckpointStore(client, f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}.{CHECKPOINT_TABLE}")
+
+
+@lru_cache(maxsize=8)
+def _site_windows(site_coords: tuple) -> list:
+    """Grid windows around the given (lat, lon) pairs, planned once per site set."""
+    site_lat = [lat for lat, _ in site_coords]
+    site_lon = [lon for _, lon in site_coords]
+    windows = plan_site_windows(
+        site_lat, site_lon, CRW_GRID_STEP, CRW_GRID_ORIGIN, ERDDAP_SITE_MARGIN_CELLS,
+        bounds=(OAHU_BOUNDS["lat_min"], OAHU_BOUNDS["lat_max"], OAHU_BOUNDS["lon_min"], OAHU_BOUNDS["lon_max"])
+    )
+    logger.info(f"Planned {len(windows)} ERDDAP windows for {len(site_coords)} sites")
+    return windows
+
+
 @retry(tries=3, delay=2, backoff=2, logger=logger)
-def fetch_noaa_coral_reef_data(date: Optional[datetime] = None) -> pd.DataFrame:
+def fetch_noaa_coral_reef_data(
+    date: Optional[datetime] = None,
+    sites: Optional[list] = None,
+    end_date: Optional[datetime] = None,
+    variables: Optional[list] = None
+) -> pd.DataFrame:
     """
     Fetch coral bleaching data from NOAA Coral Reef Watch via PacIOOS ERDDAP.
 
@@ -78,118 +140,54 @@ def fetch_noaa_coral_reef_data(date: Optional[datetime] = None) -> pd.DataFrame:
     - Coral Bleaching HotSpot
     - DHW (Degree Heating Weeks)
 
+    With ERDDAP_SUBSET=sites only windows around the sites (plus
+    ERDDAP_SITE_MARGIN_CELLS cells for interpolation, within OAHU_BOUNDS)
+    are downloaded, concurrently, and stitched into one grid; otherwise
+    the whole OAHU_BOUNDS rectangle is fetched.
+
     Args:
         date: Date to fetch data for. Defaults to yesterday (most recent available).
+        sites: Sites the data is for. Defaults to OAHU_SITES.
+        end_date: Last date of a multi-day slice starting at date (inclusive).
+        variables: Grid variables to download. Defaults to all SITE_VARIABLES.
 
     Returns:
-        DataFrame with ocean conditions for Oahu region.
+        DataFrame with ocean conditions for Oahu region, one row per cell per day.
     """
     if date is None:
         # NOAA data typically has 1-day lag
         date = datetime.utcnow() - timedelta(days=1)
 
     date_str = date.strftime("%Y-%m-%dT12:00:00Z")
+    end_str = (end_date or date).strftime("%Y-%m-%dT12:00:00Z")
+    time_constraint = f"[({date_str}):1:({end_str})]"
+    variables = variables or list(SITE_VARIABLES.values())
+
+    if ERDDAP_SUBSET == "sites":
+        windows = _site_windows(tuple((site["lat"], site["lon"]) for site in sites or OAHU_SITES))
+        logger.info(f"Fetching NOAA DHW data as .{ERDDAP_FORMAT} in {len(windows)} windows for {date_str}")
+        df = fetch_griddap_windows(
+            NOAA_DHW_ENDPOINT, variables, time_constraint, windows,
+            fmt=ERDDAP_FORMAT, timeout=60, max_workers=ERDDAP_MAX_CONCURRENCY
+        )
+    else:
+        # Build ERDDAP query for DHW dataset
+        # Variables: CRW_SST, CRW_SSTANOMALY, CRW_HOTSPOT, CRW_DHW
+        bounds = (
+            OAHU_BOUNDS["lat_min"], OAHU_BOUNDS["lat_max"],
+            OAHU_BOUNDS["lon_min"], OAHU_BOUNDS["lon_max"]
+        )
+        query = window_query(variables, time_constraint, bounds)
+        logger.info(f"Fetching NOAA DHW data as .{ERDDAP_FORMAT}: {query[:100]}...")
+        df = fetch_griddap(NOAA_DHW_ENDPOINT, query, fmt=ERDDAP_FORMAT, timeout=60)
 
-    # Build ERDDAP query for DHW dataset
-    # Variables: CRW_SST, CRW_SSTANOMALY, CRW_HOTSPOT, CRW_DHW
-    query_url = (
-        f"{NOAA_DHW_ENDPOINT}.json?"
-        f"CRW_SST[({date_str}):1:({date_str})]"
-        f"[({OAHU_BOUNDS['lat_min']}):1:({OAHU_BOUNDS['lat_max']})]"
-        f"[({OAHU_BOUNDS['lon_min']}):1:({OAHU_BOUNDS['lon_max']})],"
-        f"CRW_SSTANOMALY[({date_str}):1:({date_str})]"
-        f"[({OAHU_BOUNDS['lat_min']}):1:({OAHU_BOUNDS['lat_max']})]"
-        f"[({OAHU_BOUNDS['lon_min']}):1:({OAHU_BOUNDS['lon_max']})],"
-        f"CRW_HOTSPOT[({date_str}):1:({date_str})]"
-        f"[({OAHU_BOUNDS['lat_min']}):1:({OAHU_BOUNDS['lat_max']})]"
-        f"[({OAHU_BOUNDS['lon_min']}):1:({OAHU_BOUNDS['lon_max']})],"
-        f"CRW_DHW[({date_str}):1:({date_str})]"
-        f"[({OAHU_BOUNDS['lat_min']}):1:({OAHU_BOUNDS['lat_max']})]"
-        f"[({OAHU_BOUNDS['lon_min']}):1:({OAHU_BOUNDS['lon_max']})]"
-    )
-
-    logger.info(f"Fetching NOAA DHW data from: {query_url[:100]}...")
-
-    response = requests.get(query_url, timeout=60)
-    response.raise_for_status()
-
-    data = response.json()
-
-    # Parse ERDDAP JSON response
-    # The response contains table with columns: time, latitude, longitude, and variables
-    if "table" not in data:
-        logger.warning("No table data in NOAA response")
-        return pd.DataFrame()
-
-    table = data["table"]
-    column_names = table["columnNames"]
-    rows = table["rows"]
-
-    df = pd.DataFrame(rows, columns=column_names)
-
-    # Convert types
-    df["time"] = pd.to_datetime(df["time"])
-    df["latitude"] = df["latitude"].astype(float)
-    df["longitude"] = df["longitude"].astype(float)
-
-    for col in ["CRW_SST", "CRW_SSTANOMALY", "CRW_HOTSPOT", "CRW_DHW"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    if df.empty:
+        return df
 
     logger.info(f"Fetched {len(df)} NOAA data points")
     return df
 
 
-def interpolate_site_data(grid_df: pd.DataFrame, sites: list) -> pd.DataFrame:
-    """
-    Interpolate gridded ocean data to specific dive/snorkel site locations.
-
-    Uses nearest-neighbor interpolation for each site based on the grid data.
-
-    Args:
-        grid_df: DataFrame with gridded NOAA data
-        sites: List of site dictionaries with lat/lon coordinates
-
-    Returns:
-        DataFrame with one row per site containing interpolated values.
-    """
-    if grid_df.empty:
-        logger.warning("Empty grid data, cannot interpolate")
-        return pd.DataFrame()
-
-    site_data = []
-
-    for site in sites:
-        site_lat = site["lat"]
-        site_lon = site["lon"]
-
-        # Find nearest grid point using Euclidean distance
-        grid_df["distance"] = np.sqrt(
-            (grid_df["latitude"] - site_lat) ** 2 +
-            (grid_df["longitude"] - site_lon) ** 2
-        )
-
-        nearest = grid_df.loc[grid_df["distance"].idxmin()]
-
-        site_row = {
-            "site_name": site["name"],
-            "latitude": site_lat,
-            "longitude": site_lon,
-            "site_type": site["type"],
-            "description": site["description"],
-            "sst": nearest.get("CRW_SST"),
-            "sst_anomaly": nearest.get("CRW_SSTANOMALY"),
-            "hotspot": nearest.get("CRW_HOTSPOT"),
-            "dhw": nearest.get("CRW_DHW"),
-            "grid_distance_deg": nearest["distance"],
-            "data_source": "NOAA_CRW"
-        }
-
-        site_data.append(site_row)
-
-    return pd.DataFrame(site_data)
-
-
 @retry(tries=3, delay=2, backoff=2, logger=logger)
 def fetch_pacioos_sensor_data() -> pd.DataFrame:
     """
@@ -276,65 +274,6 @@ def fetch_pacioos_sensor_data() -> pd.DataFrame:
     return pd.DataFrame()
 
 
-def calculate_bleaching_risk(dhw: float, sst_anomaly: float) -> dict:
-    """
-    Calculate coral bleaching risk level based on DHW and SST anomaly.
-
-    Risk levels:
-    - DHW < 4: Low Risk (green)
-    - DHW 4-8: Moderate Risk (yellow)
-    - DHW 8-12: High Risk (orange)
-    - DHW > 12: Severe Risk (red)
-
-    Additional factors:
-    - SST anomaly > +1°C adds one risk level
-
-    Args:
-        dhw: Degree Heating Weeks value
-        sst_anomaly: Sea surface temperature anomaly in °C
-
-    Returns:
-        Dictionary with risk_level, risk_color, and risk_description.
-    """
-    if pd.isna(dhw):
-        return {
-            "risk_level": "Unknown",
-            "risk_color": "gray",
-            "risk_score": -1,
-            "risk_description": "Insufficient data to assess risk"
-        }
-
-    # Base risk from DHW
-    if dhw < 4:
-        base_risk = 0
-    elif dhw < 8:
-        base_risk = 1
-    elif dhw < 12:
-        base_risk = 2
-    else:
-        base_risk = 3
-
-    # Adjust for SST anomaly
-    if not pd.isna(sst_anomaly) and sst_anomaly > 1.0:
-        base_risk = min(base_risk + 1, 3)
-
-    risk_levels = [
-        {"level": "Low", "color": "green", "description": "Conditions normal. Safe for coral viewing."},
-        {"level": "Moderate", "color": "yellow", "description": "Elevated temperatures. Monitor conditions."},
-        {"level": "High", "color": "orange", "description": "Significant thermal stress. Bleaching possible."},
-        {"level": "Severe", "color": "red", "description": "Extreme stress. Active bleaching likely."}
-    ]
-
-    risk = risk_levels[base_risk]
-
-    return {
-        "risk_level": risk["level"],
-        "risk_color": risk["color"],
-        "risk_score": base_risk,
-        "risk_description": risk["description"]
-    }
-
-
 def store_ocean_conditions(df: pd.DataFrame, client: bigquery.Client) -> int:
     """
     Store ocean conditions data in BigQuery.
@@ -394,54 +333,45 @@ def store_ocean_conditions(df: pd.DataFrame, client: bigquery.Client) -> int:
     return len(records)
 
 
-def store_ocean_conditions_with_date(df: pd.DataFrame, client: bigquery.Client, date) -> int:
+OCEAN_CONDITIONS_COLUMNS = [
+    "date", "site_name", "latitude", "longitude", "sst", "sst_anomaly", "hotspot",
+    "dhw", "risk_level", "risk_color", "risk_score", "data_source"
+]
+
+
+def load_ocean_conditions(
+    df: pd.DataFrame,
+    client: bigquery.Client,
+    job_id: Optional[str] = None,
+    staging_id: Optional[str] = None
+):
     """
-    Store ocean conditions data in BigQuery with a specific date.
-    Used for backfilling historical data.
+    Start one load job for dated site rows, without waiting for it.
+
+    With a job_id the load is idempotent: if a job with that ID already
+    ran successfully (or is still running) it is returned instead of
+    loading the rows a second time. With a staging_id the rows replace
+    any already stored for the same date and site (see staged_load).
 
     Args:
-        df: DataFrame with site ocean conditions
+        df: Site ocean conditions with a "date" column (YYYY-MM-DD)
         client: BigQuery client
-        date: The date for these records
+        job_id: Optional deterministic BigQuery job ID
+        staging_id: Optional staging table to load into and MERGE from
 
     Returns:
-        Number of rows inserted.
+        The running load (a LoadJob, or a MergedLoad with a staging_id);
+        call .result() to wait for it.
     """
-    if df.empty:
-        logger.warning("No data to store")
-        return 0
-
     table_id = f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}.ocean_conditions_daily"
 
-    # Set date as string for JSON serialization
-    df["date"] = str(date)
-
-    # Calculate bleaching risk for each row
-    risk_data = df.apply(
-        lambda row: calculate_bleaching_risk(row["dhw"], row["sst_anomaly"]),
-        axis=1
-    )
-    df["risk_level"] = risk_data.apply(lambda x: x["risk_level"])
-    df["risk_color"] = risk_data.apply(lambda x: x["risk_color"])
-    df["risk_score"] = risk_data.apply(lambda x: x["risk_score"])
-
-    # Select only the fields that are in the schema
-    columns_to_keep = ["date", "site_name", "latitude", "longitude", "sst",
-                       "sst_anomaly", "hotspot", "dhw", "risk_level",
-                       "risk_color", "risk_score", "data_source"]
-    df_filtered = df[columns_to_keep].copy()
-
-    # Replace NaN values with None for JSON serialization
-    df_filtered = df_filtered.where(pd.notnull(df_filtered), None)
+    df = df.reset_index(drop=True)
+    risk = bleaching_risk_columns(df["dhw"], df["sst_anomaly"])
+    df = pd.concat([df.drop(columns=list(risk.columns), errors="ignore"), risk], axis=1)
 
-    # Prepare for BigQuery
-    records = df_filtered.to_dict("records")
-
-    # Convert any remaining NaN to None (for numeric columns)
-    for record in records:
-        for key, value in record.items():
-            if pd.isna(value):
-                record[key] = None
+    # Select only the fields that are in the schema; NaN becomes null
+    df_filtered = df[OCEAN_CONDITIONS_COLUMNS].astype(object)
+    records = df_filtered.where(pd.notnull(df_filtered), None).to_dict("records")
 
     # Configure load job
     job_config = bigquery.LoadJobConfig(
@@ -462,12 +392,49 @@ def store_ocean_conditions_with_date(df: pd.DataFrame, client: bigquery.Client,
         ]
     )
 
-    # Load data
-    job = client.load_table_from_json(records, table_id, job_config=job_config)
+    if staging_id is not None:
+        job_config.write_disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+        job = client.load_table_from_json(records, staging_id, job_config=job_config)
+        return MergedLoad(client, job, table_id, staging_id, OCEAN_CONDITIONS_COLUMNS)
+
+    if job_id is None:
+        return client.load_table_from_json(records, table_id, job_config=job_config)
+
+    try:
+        return client.load_table_from_json(records, table_id, job_config=job_config, job_id=job_id)
+    except Conflict:
+        existing = client.get_job(job_id)
+        if existing.state != "DONE" or existing.error_result is None:
+            logger.info(f"Load job {job_id} already exists, reusing it")
+            return existing
+        logger.warning(f"Load job {job_id} previously failed, loading again")
+        return client.load_table_from_json(records, table_id, job_config=job_config, job_id_prefix=f"{job_id}_retry_")
+
+
+def store_ocean_conditions_with_date(df: pd.DataFrame, client: bigquery.Client, date) -> int:
+    """
+    Store ocean conditions data in BigQuery with a specific date.
+
+    Args:
+        df: DataFrame with site ocean conditions
+        client: BigQuery client
+        date: The date for these records
+
+    Returns:
+        Number of rows inserted.
+    """
+    if df.empty:
+        logger.warning("No data to store")
+        return 0
+
+    # Set date as string for JSON serialization
+    df["date"] = str(date)
+
+    job = load_ocean_conditions(df, client)
     job.result()  # Wait for completion
 
-    logger.info(f"Stored {len(records)} ocean condition records for {date}")
-    return len(records)
+    logger.info(f"Stored {len(df)} ocean condition records for {date}")
+    return len(df)
 
 
 def store_sensor_readings(df: pd.DataFrame, client: bigquery.Client) -> int:
@@ -589,19 +556,71 @@ def ingest_ocean_data(request):
         }), 500, {"Content-Type": "application/json"}
 
 
+def _fetch_chunk(chunk: Tuple[datetime, datetime]) -> pd.DataFrame:
+    """Download the grid for one backfill chunk (one time-range request)."""
+    return fetch_noaa_coral_reef_data(chunk[0], None, chunk[1])
+
+
+def _fetch_hotspot_history(before: datetime) -> pd.DataFrame:
+    """Download the DHW window of HotSpots before a backfill chunk, to seed gap filling."""
+    return fetch_noaa_coral_reef_data(
+        before - timedelta(days=DHW_WINDOW_DAYS), None, before - timedelta(days=1),
+        variables=[SITE_VARIABLES["hotspot"]]
+    )
+
+
+def backfill_load_job_id(chunk_start: datetime, chunk_end: datetime) -> str:
+    """Deterministic BigQuery load job ID for a backfill chunk."""
+    return f"reefwatch_backfill_{chunk_start:%Y%m%d}_{chunk_end:%Y%m%d}"
+
+
 @functions_framework.http
 def manual_backfill(request):
     """
-    HTTP Cloud Function to backfill historical data.
+    HTTP Cloud Function to backfill historical data as a resumable job.
+
+    The job ID is derived from the date range, and progress is
+    checkpointed per chunk (see backfill_state). Dates already loaded by
+    any backfill are skipped; the rest is split into BACKFILL_CHUNK_DAYS-day
+    slices. Up to BACKFILL_MAX_WORKERS slices are downloaded concurrently
+    (one ERDDAP time-range request per slice), each slice is interpolated
+    to the sites in one vectorized pass, and written with one load job
+    whose ID is derived from the slice, so a load that finished before an
+    interrupted run recorded it isn't repeated. Slices are processed in
+    date order so the grid-wide DHW accumulator carries across them.
+    Before the first slice of a run, and after a gap (skipped dates or a
+    failed slice), it is seeded from the 12 weeks of HotSpots before the
+    slice, so a resumed job fills DHW gaps exactly as an uninterrupted
+    one. If that download fails, the slice's result carries a warning and
+    gap filling starts 12 weeks into the slices that follow.
+
+    No new slices are started after BACKFILL_TIME_BUDGET_SECONDS; the job
+    is then "incomplete" and the same request picks up where it stopped.
 
     Query parameters:
     - start_date: Start date (YYYY-MM-DD)
     - end_date: End date (YYYY-MM-DD)
+    - force: "true" to reload dates that are already checkpointed; the
+      reloaded rows replace the stored ones for those dates and sites
+    - job_id: Without dates, return the status of an existing job
 
     Example: ?start_date=2024-01-01&end_date=2024-01-07
+
+    Returns:
+        JSON with the job ID and status ("complete" or "incomplete"),
+        skipped and remaining days, and per-chunk results (days, rows
+        loaded, seconds, error, warning).
     """
+    started_run = time.monotonic()
     start_date = request.args.get("start_date")
     end_date = request.args.get("end_date")
+    job_id = request.args.get("job_id")
+
+    if job_id and not start_date and not end_date:
+        status = get_checkpoint_store(get_bigquery_client()).job_status(job_id)
+        if status is None:
+            return json.dumps({"error": f"Unknown backfill job: {job_id}"}), 404
+        return json.dumps(status), 200
 
     if not start_date or not end_date:
         return json.dumps({"error": "start_date and end_date required"}), 400
@@ -612,28 +631,112 @@ def manual_backfill(request):
     except ValueError:
         return json.dumps({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
+    force = request.args.get("force", "").lower() == "true"
     client = get_bigquery_client()
-    results = []
+    store = get_checkpoint_store(client)
+    job_id = backfill_job_id(start, end)
+    total_days = (end - start).days + 1
+
+    completed = set() if force else store.completed_dates(start.date(), end.date())
+    chunks = [
+        (datetime.combine(chunk_start, datetime.min.time()), datetime.combine(chunk_end, datetime.min.time()))
+        for chunk_start, chunk_end in plan_chunks(start.date(), end.date(), completed, BACKFILL_CHUNK_DAYS)
+    ]
+    logger.info(f"Backfill {job_id}: {len(completed)}/{total_days} days already loaded, {len(chunks)} chunks to run")
+    store.record(job_id, "job", start, end, "running")
 
-    current = start
-    while current <= end:
-        logger.info(f"Backfilling data for {current.date()}")
+    results = []
+    loads = []
+
+    # Grid-wide DHW computed from the HotSpot stream, used to fill gaps,
+    # and the day it expects next
+    grid_dhw = None
+    dhw_next_day = None
+
+    # No downloads start after the budget; ones still running are abandoned
+    deadline = started_run + BACKFILL_TIME_BUDGET_SECONDS
+
+    for number, ((chunk_start, chunk_end), grid_data) in enumerate(
+        fetch_ahead(chunks, _fetch_chunk, BACKFILL_MAX_WORKERS, deadline), start=1
+    ):
+        if time.monotonic() > deadline:
+            logger.info(f"Backfill {job_id}: time budget reached after {number - 1}/{len(chunks)} chunks")
+            break
+
+        started = time.monotonic()
+        result = {
+            "start_date": str(chunk_start.date()),
+            "end_date": str(chunk_end.date()),
+            "days": (chunk_end - chunk_start).days + 1,
+            "days_with_data": 0,
+            "rows": 0
+        }
+        results.append(result)
 
         try:
-            grid_data = fetch_noaa_coral_reef_data(current)
-            if not grid_data.empty:
-                site_data = interpolate_site_data(grid_data, OAHU_SITES)
-                # Store with proper date string format
-                rows = store_ocean_conditions_with_date(site_data, client, current.date())
-                results.append({"date": str(current.date()), "rows": rows})
+            if isinstance(grid_data, Exception):
+                raise grid_data
+            if grid_data.empty:
+                result["error"] = "No data"
             else:
-                results.append({"date": str(current.date()), "rows": 0, "error": "No data"})
+                if grid_dhw is None or chunk_start != dhw_next_day:
+                    try:
+                        grid_dhw = seed_grid_dhw(_fetch_hotspot_history(chunk_start))
+                    except Exception as e:
+                        grid_dhw = None
+                        result["warning"] = f"DHW gap filling skipped for the next {DHW_WINDOW_DAYS} days: {e}"
+                site_data, grid_dhw = backfill_chunk(grid_data, grid_dhw, OAHU_SITES)
+                dhw_next_day = chunk_end + timedelta(days=1)
+                result["days_with_data"] = int(site_data["date"].nunique())
+                if force:
+                    # Replace the dates already loaded instead of appending a second copy
+                    staging_id = staging_table_id(
+                        f"{GCP_PROJECT_ID}.{BIGQUERY_DATASET}.ocean_conditions_daily", chunk_start, chunk_end
+                    )
+                    load = load_ocean_conditions(site_data, client, staging_id=staging_id)
+                else:
+                    load = load_ocean_conditions(site_data, client, backfill_load_job_id(chunk_start, chunk_end))
+                loads.append((result, len(site_data), load))
+                store.record(job_id, "chunk", chunk_start, chunk_end, CHUNK_LOADING)
         except Exception as e:
-            results.append({"date": str(current.date()), "rows": 0, "error": str(e)})
+            grid_dhw = None
+            result["error"] = str(e)
 
-        current += timedelta(days=1)
+        if "error" in result:
+            store.record(job_id, "chunk", chunk_start, chunk_end, CHUNK_FAILED, error=result["error"])
 
-    return json.dumps({"backfill_results": results}), 200
+        result["seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            f"Backfill chunk {number}/{len(chunks)} {result['start_date']}..{result['end_date']}: "
+            f"{result['days_with_data']}/{result['days']} days"
+            + (f", error: {result['error']}" if "error" in result else "")
+        )
+
+    # Load jobs run in parallel on BigQuery's side; wait for them together
+    for result, rows, job in loads:
+        try:
+            job.result()
+            result["rows"] = rows
+            store.record(job_id, "chunk", result["start_date"], result["end_date"], CHUNK_DONE, rows=rows)
+        except Exception as e:
+            result["error"] = f"Load failed: {e}"
+            store.record(job_id, "chunk", result["start_date"], result["end_date"], CHUNK_FAILED, error=result["error"])
+        logger.info(f"Backfill load {result['start_date']}..{result['end_date']}: {result['rows']} rows")
+
+    remaining_days = total_days - len(store.completed_dates(start.date(), end.date()))
+    status = "complete" if remaining_days == 0 else "incomplete"
+    total_rows = sum(result["rows"] for result in results)
+    store.record(job_id, "job", start, end, status, rows=total_rows)
+
+    return json.dumps({
+        "job_id": job_id,
+        "status": status,
+        "skipped_days": len(completed),
+        "remaining_days": remaining_days,
+        "backfill_results": results,
+        "total_rows": total_rows,
+        "failed_chunks": sum(1 for result in results if "error" in result)
+    }), 200
 
 
 # Export sites data for API
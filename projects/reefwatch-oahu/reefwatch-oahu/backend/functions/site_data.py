@@ -0,0 +1,390 @@
+"""
+Grid-to-site processing for the ingestion functions.
+
+Maps NOAA CRW grids to the dive/snorkel sites, one day at a time for the
+daily ingest or many days in one vectorized pass for backfills, fills
+DHW gaps from the HotSpot stream and scores bleaching risk. Nothing here
+talks to GCP, so it can be exercised without the Cloud Functions runtime.
+"""
+
+import logging
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from dhw_engine import DHWAccumulator
+from grid_index import get_grid_index, get_grid_weights, grid_geometry_key
+
+logger = logging.getLogger(__name__)
+
+# Site interpolation: "nearest" grid cell, or "idw" / "bilinear" over valid ocean cells
+SITE_INTERPOLATION = os.environ.get("SITE_INTERPOLATION", "nearest")
+SITE_INTERPOLATION_NEIGHBORS = int(os.environ.get("SITE_INTERPOLATION_NEIGHBORS", "4"))
+
+# Site columns filled from the NOAA grid variables
+SITE_VARIABLES = {
+    "sst": "CRW_SST",
+    "sst_anomaly": "CRW_SSTANOMALY",
+    "hotspot": "CRW_HOTSPOT",
+    "dhw": "CRW_DHW",
+}
+
+# Bleaching risk levels, indexed by risk score
+BLEACHING_RISK_LEVELS = [
+    {"level": "Low", "color": "green", "description": "Conditions normal. Safe for coral viewing."},
+    {"level": "Moderate", "color": "yellow", "description": "Elevated temperatures. Monitor conditions."},
+    {"level": "High", "color": "orange", "description": "Significant thermal stress. Bleaching possible."},
+    {"level": "Severe", "color": "red", "description": "Extreme stress. Active bleaching likely."}
+]
+
+
+def _site_values(
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    values: np.ndarray,
+    site_lat: np.ndarray,
+    site_lon: np.ndarray,
+    mode: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Map a (cells, n) value matrix to (sites, n) plus the distance used per site."""
+    if mode == "nearest":
+        index = get_grid_index(grid_lat, grid_lon, site_lat, site_lon)
+        return index.gather(values), index.distances
+
+    # Land cells are NaN in every CRW variable
+    valid = ~np.isnan(values).all(axis=1)
+    weights = get_grid_weights(
+        grid_lat, grid_lon, valid, site_lat, site_lon,
+        mode=mode, neighbors=SITE_INTERPOLATION_NEIGHBORS
+    )
+    return weights.interpolate(values), weights.distances
+
+
+def interpolate_site_data(
+    grid_df: pd.DataFrame,
+    sites: list,
+    mode: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Interpolate gridded ocean data to specific dive/snorkel site locations.
+
+    "nearest" takes the values of each site's nearest grid cell, which is
+    NaN when that cell is masked as land. "idw" blends the
+    SITE_INTERPOLATION_NEIGHBORS nearest ocean cells by inverse distance,
+    and "bilinear" the four surrounding cells with land corners dropped.
+    Mappings and weights are cached per grid geometry (and land mask), and
+    all variables are computed for all sites at once; grid_df is not
+    modified. grid_distance_deg is the distance to the nearest cell used.
+
+    Args:
+        grid_df: DataFrame with gridded NOAA data
+        sites: List of site dictionaries with lat/lon coordinates
+        mode: Interpolation mode; defaults to SITE_INTERPOLATION
+
+    Returns:
+        DataFrame with one row per site containing interpolated values.
+    """
+    if grid_df.empty:
+        logger.warning("Empty grid data, cannot interpolate")
+        return pd.DataFrame()
+
+    mode = mode or SITE_INTERPOLATION
+    site_lat = np.array([site["lat"] for site in sites], dtype=float)
+    site_lon = np.array([site["lon"] for site in sites], dtype=float)
+    grid_lat = grid_df["latitude"].to_numpy(dtype=float)
+    grid_lon = grid_df["longitude"].to_numpy(dtype=float)
+
+    columns = [column for column, grid_column in SITE_VARIABLES.items() if grid_column in grid_df.columns]
+    values = grid_df[[SITE_VARIABLES[column] for column in columns]].to_numpy(dtype=float)
+
+    site_values, distances = _site_values(grid_lat, grid_lon, values, site_lat, site_lon, mode)
+
+    site_df = pd.DataFrame({
+        "site_name": [site["name"] for site in sites],
+        "latitude": site_lat,
+        "longitude": site_lon,
+        "site_type": [site["type"] for site in sites],
+        "description": [site["description"] for site in sites],
+    })
+
+    for column in SITE_VARIABLES:
+        site_df[column] = site_values[:, columns.index(column)] if column in columns else None
+
+    site_df["grid_distance_deg"] = distances
+    site_df["data_source"] = "NOAA_CRW"
+    return site_df
+
+
+def grid_days(
+    grid_df: pd.DataFrame
+) -> Optional[Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Split a multi-day grid into per-day arrays over a shared set of cells.
+
+    Args:
+        grid_df: Gridded NOAA data for one or more days
+
+    Returns:
+        (days, cell latitudes, cell longitudes, values) with values shaped
+        (days, cells, len(SITE_VARIABLES)) and NaN for missing variables,
+        or None if the days don't all cover the same cells.
+    """
+    grid_df = grid_df.sort_values(["time", "latitude", "longitude"], kind="stable")
+    days = pd.DatetimeIndex(grid_df["time"].unique())
+    n_days = len(days)
+    if n_days == 0 or len(grid_df) % n_days:
+        return None
+    n_cells = len(grid_df) // n_days
+
+    lat = grid_df["latitude"].to_numpy(dtype=float).reshape(n_days, n_cells)
+    lon = grid_df["longitude"].to_numpy(dtype=float).reshape(n_days, n_cells)
+    if not ((lat == lat[0]).all() and (lon == lon[0]).all()):
+        return None
+
+    values = np.full((len(grid_df), len(SITE_VARIABLES)), np.nan)
+    for i, grid_column in enumerate(SITE_VARIABLES.values()):
+        if grid_column in grid_df.columns:
+            values[:, i] = grid_df[grid_column].to_numpy(dtype=float)
+    return days, lat[0], lon[0], values.reshape(n_days, n_cells, len(SITE_VARIABLES))
+
+
+class GridDHWAccumulator(DHWAccumulator):
+    """DHWAccumulator over every cell of one grid, tagged with its geometry key."""
+
+    def __init__(self, geometry: str, n_cells: int):
+        super().__init__(n_cells)
+        self.geometry = geometry
+
+
+def update_grid_dhw(
+    accumulator: Optional[GridDHWAccumulator],
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    values: np.ndarray
+) -> GridDHWAccumulator:
+    """
+    Advance a grid-wide DHW accumulator through days of gridded HotSpots.
+
+    The accumulator tracks every grid cell at once (in the grid's cell
+    order) and is reset whenever the grid geometry changes, even if the
+    new grid has the same number of cells. Once a full 12-week window
+    has been seen, cells where DHW is missing are filled in place with
+    the DHW computed from the HotSpot stream.
+
+    Args:
+        accumulator: Accumulator from the previous day, or None
+        grid_lat: Cell latitudes
+        grid_lon: Cell longitudes
+        values: (days, cells, variables) array from grid_days (modified in place)
+
+    Returns:
+        The updated accumulator.
+    """
+    hotspot_col = list(SITE_VARIABLES).index("hotspot")
+    dhw_col = list(SITE_VARIABLES).index("dhw")
+
+    geometry = grid_geometry_key(grid_lat, grid_lon)
+    if accumulator is None or accumulator.geometry != geometry:
+        accumulator = GridDHWAccumulator(geometry, len(grid_lat))
+
+    for day in values:
+        dhw = accumulator.push(day[:, hotspot_col])
+        if accumulator.is_warm:
+            missing = np.isnan(day[:, dhw_col])
+            day[missing, dhw_col] = dhw[missing]
+
+    return accumulator
+
+
+def seed_grid_dhw(history: pd.DataFrame) -> Optional[GridDHWAccumulator]:
+    """
+    Grid-wide DHW accumulator warmed up on past days of gridded HotSpots.
+
+    Seeding from the DHW window before a slice gives the slice the same
+    DHW gap filling as a run that streamed through those days, e.g. when
+    a backfill resumes or follows dates that were skipped.
+
+    Args:
+        history: Gridded NOAA data (at least CRW_HOTSPOT) for the days before a slice
+
+    Returns:
+        The accumulator, or None if history is empty.
+    """
+    if history.empty:
+        return None
+
+    split = grid_days(history)
+    if split is not None:
+        _, grid_lat, grid_lon, values = split
+        return update_grid_dhw(None, grid_lat, grid_lon, values)
+
+    grid_dhw = None
+    for _, day_grid in history.groupby("time", sort=True):
+        _, grid_lat, grid_lon, values = grid_days(day_grid)
+        grid_dhw = update_grid_dhw(grid_dhw, grid_lat, grid_lon, values)
+    return grid_dhw
+
+
+def interpolate_site_days(
+    days: pd.DatetimeIndex,
+    grid_lat: np.ndarray,
+    grid_lon: np.ndarray,
+    values: np.ndarray,
+    sites: list,
+    mode: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Interpolate many days of gridded data to the sites in one pass.
+
+    All days and variables are stacked into one (cells, days x variables)
+    matrix, so the cached site mapping is applied once for the whole slice.
+
+    Args:
+        days: Days in the slice, from grid_days
+        grid_lat: Cell latitudes
+        grid_lon: Cell longitudes
+        values: (days, cells, variables) array from grid_days
+        sites: List of site dictionaries with lat/lon coordinates
+        mode: Interpolation mode; defaults to SITE_INTERPOLATION
+
+    Returns:
+        DataFrame with one row per site per day, as interpolate_site_data
+        plus a "date" column (YYYY-MM-DD).
+    """
+    n_days, n_cells, n_vars = values.shape
+    site_lat = np.array([site["lat"] for site in sites], dtype=float)
+    site_lon = np.array([site["lon"] for site in sites], dtype=float)
+
+    matrix = values.transpose(1, 0, 2).reshape(n_cells, n_days * n_vars)
+    site_values, distances = _site_values(
+        grid_lat, grid_lon, matrix, site_lat, site_lon, mode or SITE_INTERPOLATION
+    )
+    site_values = site_values.reshape(len(sites), n_days, n_vars).transpose(1, 0, 2)
+
+    site_df = pd.DataFrame({
+        "date": np.repeat(days.strftime("%Y-%m-%d").to_numpy(), len(sites)),
+        "site_name": np.tile([site["name"] for site in sites], n_days),
+        "latitude": np.tile(site_lat, n_days),
+        "longitude": np.tile(site_lon, n_days),
+        "site_type": np.tile([site["type"] for site in sites], n_days),
+        "description": np.tile([site["description"] for site in sites], n_days),
+    })
+    for i, column in enumerate(SITE_VARIABLES):
+        site_df[column] = site_values[:, :, i].ravel()
+
+    site_df["grid_distance_deg"] = np.tile(distances, n_days)
+    site_df["data_source"] = "NOAA_CRW"
+    return site_df
+
+
+def calculate_bleaching_risk(dhw: float, sst_anomaly: float) -> dict:
+    """
+    Calculate coral bleaching risk level based on DHW and SST anomaly.
+
+    Risk levels:
+    - DHW < 4: Low Risk (green)
+    - DHW 4-8: Moderate Risk (yellow)
+    - DHW 8-12: High Risk (orange)
+    - DHW > 12: Severe Risk (red)
+
+    Additional factors:
+    - SST anomaly > +1°C adds one risk level
+
+    Args:
+        dhw: Degree Heating Weeks value
+        sst_anomaly: Sea surface temperature anomaly in °C
+
+    Returns:
+        Dictionary with risk_level, risk_color, and risk_description.
+    """
+    if pd.isna(dhw):
+        return {
+            "risk_level": "Unknown",
+            "risk_color": "gray",
+            "risk_score": -1,
+            "risk_description": "Insufficient data to assess risk"
+        }
+
+    # Base risk from DHW
+    if dhw < 4:
+        base_risk = 0
+    elif dhw < 8:
+        base_risk = 1
+    elif dhw < 12:
+        base_risk = 2
+    else:
+        base_risk = 3
+
+    # Adjust for SST anomaly
+    if not pd.isna(sst_anomaly) and sst_anomaly > 1.0:
+        base_risk = min(base_risk + 1, 3)
+
+    risk = BLEACHING_RISK_LEVELS[base_risk]
+
+    return {
+        "risk_level": risk["level"],
+        "risk_color": risk["color"],
+        "risk_score": base_risk,
+        "risk_description": risk["description"]
+    }
+
+
+def bleaching_risk_columns(dhw, sst_anomaly) -> pd.DataFrame:
+    """
+    Vectorized calculate_bleaching_risk for whole columns.
+
+    Args:
+        dhw: Degree Heating Weeks values
+        sst_anomaly: SST anomaly values in °C
+
+    Returns:
+        DataFrame with risk_level, risk_color and risk_score columns.
+    """
+    dhw = np.asarray(dhw, dtype=float)
+    sst_anomaly = np.asarray(sst_anomaly, dtype=float)
+
+    score = np.select([dhw < 4, dhw < 8, dhw < 12], [0, 1, 2], default=3)
+    with np.errstate(invalid="ignore"):
+        score = np.where(sst_anomaly > 1.0, np.minimum(score + 1, 3), score)
+    unknown = np.isnan(dhw)
+
+    levels = np.array([risk["level"] for risk in BLEACHING_RISK_LEVELS], dtype=object)
+    colors = np.array([risk["color"] for risk in BLEACHING_RISK_LEVELS], dtype=object)
+    return pd.DataFrame({
+        "risk_level": np.where(unknown, "Unknown", levels[score]),
+        "risk_color": np.where(unknown, "gray", colors[score]),
+        "risk_score": np.where(unknown, -1, score),
+    })
+
+
+def backfill_chunk(
+    grid_data: pd.DataFrame,
+    grid_dhw: Optional[GridDHWAccumulator],
+    sites: list
+) -> Tuple[pd.DataFrame, Optional[GridDHWAccumulator]]:
+    """
+    Fill DHW gaps and interpolate one multi-day slice to the sites.
+
+    Args:
+        grid_data: Gridded NOAA data for the slice
+        grid_dhw: Grid-wide DHW accumulator from the previous slice
+        sites: List of site dictionaries
+
+    Returns:
+        (site rows for every day in the slice, updated accumulator)
+    """
+    split = grid_days(grid_data)
+    if split is not None:
+        days, grid_lat, grid_lon, values = split
+        grid_dhw = update_grid_dhw(grid_dhw, grid_lat, grid_lon, values)
+        return interpolate_site_days(days, grid_lat, grid_lon, values, sites), grid_dhw
+
+    # Cells differ between days (e.g. a window missing one day): go day by day
+    frames = []
+    for _, day_grid in grid_data.groupby("time", sort=True):
+        days, grid_lat, grid_lon, values = grid_days(day_grid)
+        grid_dhw = update_grid_dhw(grid_dhw, grid_lat, grid_lon, values)
+        frames.append(interpolate_site_days(days, grid_lat, grid_lon, values, sites))
+    return pd.concat(frames, ignore_index=True), grid_dhw
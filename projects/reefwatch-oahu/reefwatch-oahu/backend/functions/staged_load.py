@@ -0,0 +1,63 @@
+"""
+Idempotent reloads of backfill chunks into ocean_conditions_daily.
+
+A forced backfill reloads dates that are already in the table, so
+appending would leave a second copy of every row. Instead the chunk is
+loaded into its own staging table (truncated on each load) and MERGEd on
+(date, site_name): rows that exist are replaced, missing ones inserted.
+The MERGE is a single statement, so a failed reload leaves the table as
+it was.
+"""
+
+from datetime import date
+from typing import Sequence
+
+# A site has one row per day
+MERGE_KEYS = ("date", "site_name")
+
+
+def staging_table_id(table_id: str, chunk_start: date, chunk_end: date) -> str:
+    """Staging table for one chunk, next to the target table."""
+    return f"{table_id}_staging_{chunk_start:%Y%m%d}_{chunk_end:%Y%m%d}"
+
+
+def merge_query(table_id: str, staging_id: str, columns: Sequence[str]) -> str:
+    """MERGE statement upserting the staging rows into the target on MERGE_KEYS."""
+    on = " AND ".join(f"target.{key} = source.{key}" for key in MERGE_KEYS)
+    updates = ", ".join(f"{column} = source.{column}" for column in columns if column not in MERGE_KEYS)
+    names = ", ".join(columns)
+    values = ", ".join(f"source.{column}" for column in columns)
+    return (
+        f"MERGE `{table_id}` AS target\n"
+        f"USING `{staging_id}` AS source\n"
+        f"ON {on}\n"
+        f"WHEN MATCHED THEN UPDATE SET {updates}\n"
+        f"WHEN NOT MATCHED THEN INSERT ({names}) VALUES ({values})"
+    )
+
+
+class MergedLoad:
+    """
+    A staging load followed by its MERGE, waited on like a LoadJob.
+
+    Args:
+        client: BigQuery client
+        load_job: Running load job into the staging table
+        table_id: Fully qualified target table ID
+        staging_id: Fully qualified staging table ID
+        columns: Columns to copy
+    """
+
+    def __init__(self, client, load_job, table_id: str, staging_id: str, columns: Sequence[str]):
+        self.client = client
+        self.load_job = load_job
+        self.table_id = table_id
+        self.staging_id = staging_id
+        self.columns = list(columns)
+
+    def result(self) -> "MergedLoad":
+        """Wait for the staging load, then MERGE it and drop the staging table."""
+        self.load_job.result()
+        self.client.query(merge_query(self.table_id, self.staging_id, self.columns)).result()
+        self.client.delete_table(self.staging_id, not_found_ok=True)
+        return self
@@ -187,6 +187,7 @@ def mock_forecast_service():
     with patch("app.api.routes.forecast_service") as mock:
         mock.get_all_forecasts = AsyncMock(return_value=[mock_forecast])
         mock.get_site_forecast = AsyncMock(return_value=mock_forecast)
+        mock.max_forecast_days = MagicMock(return_value=30)
         mock.get_best_sites_for_date = AsyncMock(return_value=[
             {
                 "site_id": "hanauma-bay",
@@ -209,5 +210,5 @@ def mock_chat_service():
             "test-session-123"
         ))
         mock.chat_stream = AsyncMock()
-        mock.clear_session = MagicMock(return_value=True)
+        mock.clear_session = AsyncMock(return_value=True)
         yield mock
@@ -0,0 +1,156 @@
+"""
+Tests for the LLM admission controller.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.admission_controller import AdmissionController, AdmissionRejected
+
+
+def _controller(**overrides):
+    options = {
+        "max_concurrency": 1,
+        "max_queue": 10,
+        "max_queue_per_key": 5,
+        "max_wait_seconds": 5.0,
+    }
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestAdmissionController:
+    """Tests for AdmissionController."""
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_capacity(self):
+        """Test that turns are admitted immediately while slots are free."""
+        controller = _controller(max_concurrency=2)
+        await controller.acquire("a")
+        await controller.acquire("b")
+
+        assert controller.in_flight == 2
+        assert controller.queue_depth == 0
+
+        controller.release()
+        controller.release()
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_round_robin_across_sessions(self):
+        """Test that a busy session can't starve another one."""
+        controller = _controller()
+        await controller.acquire("holder")
+        order = []
+
+        async def turn(key, label):
+            async with controller.slot(key):
+                order.append(label)
+
+        tasks = [
+            asyncio.create_task(turn("busy", "busy-1")),
+            asyncio.create_task(turn("busy", "busy-2")),
+            asyncio.create_task(turn("busy", "busy-3")),
+            asyncio.create_task(turn("quiet", "quiet-1")),
+        ]
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 4
+
+        controller.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["busy-1", "quiet-1", "busy-2", "busy-3"]
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_per_session_limit_returns_429(self):
+        """Test that one session can only queue a few turns."""
+        controller = _controller(max_queue_per_key=1)
+        await controller.acquire("holder")
+        waiter = asyncio.create_task(controller.acquire("a"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire("a")
+
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after >= 1
+
+        controller.release()
+        await waiter
+
+    @pytest.mark.asyncio
+    async def test_full_queue_returns_503(self):
+        """Test that a saturated instance rejects immediately."""
+        controller = _controller(max_queue=1)
+        await controller.acquire("holder")
+        waiter = asyncio.create_task(controller.acquire("a"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire("b")
+
+        assert exc.value.status_code == 503
+        assert controller.stats()["rejected"] == 1
+
+        controller.release()
+        await waiter
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout(self):
+        """Test that queued turns give up after max_wait_seconds."""
+        controller = _controller(max_wait_seconds=0.01)
+        await controller.acquire("holder")
+
+        with pytest.raises(AdmissionRejected) as exc:
+            await controller.acquire("a")
+
+        assert exc.value.status_code == 503
+        assert controller.queue_depth == 0
+        assert controller.stats()["timed_out"] == 1
+
+        controller.release()
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_removed(self):
+        """Test that a cancelled waiter doesn't hold a queue place."""
+        controller = _controller()
+        await controller.acquire("holder")
+        waiter = asyncio.create_task(controller.acquire("a"))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert controller.queue_depth == 0
+        controller.release()
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_slot_releases_on_error(self):
+        """Test that the slot is freed when the turn raises."""
+        controller = _controller()
+
+        with pytest.raises(ValueError):
+            async with controller.slot("a"):
+                raise ValueError("boom")
+
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_stats_track_waits(self):
+        """Test that wait-time metrics are recorded."""
+        controller = _controller()
+        await controller.acquire("holder")
+        waiter = asyncio.create_task(controller.acquire("a"))
+        await asyncio.sleep(0.01)
+        controller.release(service_seconds=1.0)
+        await waiter
+
+        stats = controller.stats()
+        assert stats["admitted"] == 2
+        assert stats["max_wait_seconds"] > 0
+        assert stats["in_flight"] == 1
@@ -0,0 +1,107 @@
+"""
+Tests for the first-turn answer cache.
+"""
+
+from app.services.answer_cache import AnswerCache, normalize_question, replay_chunks
+
+
+def _cache(**overrides):
+    options = {"max_entries": 10, "ttl_seconds": 60, "max_question_chars": 200}
+    options.update(overrides)
+    return AnswerCache(**options)
+
+
+class TestNormalizeQuestion:
+    """Tests for normalize_question."""
+
+    def test_ignores_case_punctuation_and_spacing(self):
+        """Test that trivially different phrasings share a key."""
+        assert normalize_question("What is DHW?") == "what is dhw"
+        assert normalize_question("  what   is dhw ") == "what is dhw"
+
+    def test_drops_apostrophes(self):
+        """Test that contractions and ʻokina normalize consistently."""
+        assert normalize_question("What's Koʻolina like?") == normalize_question("whats koolina like")
+
+
+class TestReplayChunks:
+    """Tests for replay_chunks."""
+
+    def test_chunks_join_back_to_original(self):
+        """Test that replaying an answer reproduces it exactly."""
+        text = "Aloha! DHW measures accumulated heat stress.\n\nBelow 4 is low risk.  "
+        chunks = list(replay_chunks(text, chunk_chars=10))
+
+        assert "".join(chunks) == text
+        assert len(chunks) > 1
+
+    def test_splits_on_word_boundaries(self):
+        """Test that chunks don't cut words in half."""
+        for chunk in replay_chunks("coral reef bleaching threshold", chunk_chars=5):
+            assert chunk.strip() in {"coral", "reef", "bleaching", "threshold"}
+
+
+class TestAnswerCache:
+    """Tests for AnswerCache."""
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted and the hit rate is reported."""
+        cache = _cache()
+        key = cache.key("What is DHW?", False, "full", 1)
+
+        assert cache.get(key) is None
+        cache.put(key, "Degree Heating Weeks...")
+        assert cache.get(cache.key("what is dhw", False, "full", 1)) == "Degree Heating Weeks..."
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["stores"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_key_includes_pidgin_and_data_version(self):
+        """Test that Pidgin replies and new data snapshots don't reuse answers."""
+        cache = _cache()
+        cache.put(cache.key("Is it safe to snorkel today?", False, "full", 1), "Yes")
+
+        assert cache.get(cache.key("Is it safe to snorkel today?", True, "full", 1)) is None
+        assert cache.get(cache.key("Is it safe to snorkel today?", False, "full", 2)) is None
+
+    def test_long_and_empty_questions_not_cached(self):
+        """Test that long or wordless questions bypass the cache."""
+        cache = _cache(max_question_chars=20)
+
+        assert cache.key("Tell me everything about every reef on the island", False, "full", 1) is None
+        assert cache.key("???", False, "full", 1) is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used answer is evicted when full."""
+        cache = _cache(max_entries=2)
+        first = cache.key("first", False, "full", 1)
+        second = cache.key("second", False, "full", 1)
+        third = cache.key("third", False, "full", 1)
+
+        cache.put(first, "1")
+        cache.put(second, "2")
+        cache.get(first)
+        cache.put(third, "3")
+
+        assert cache.get(first) == "1"
+        assert cache.get(second) is None
+
+    def test_entries_expire(self):
+        """Test that answers expire after the TTL."""
+        cache = _cache(ttl_seconds=60)
+        key = cache.key("what is dhw", False, "full", 1)
+
+        cache.put(key, "answer")
+        cache._entries.expire(cache._entries.timer() + 61)
+
+        assert cache.get(key) is None
+
+    def test_blank_answers_not_stored(self):
+        """Test that empty responses aren't cached."""
+        cache = _cache()
+        cache.put(cache.key("hello", False, "full", 1), "  ")
+
+        assert len(cache) == 0
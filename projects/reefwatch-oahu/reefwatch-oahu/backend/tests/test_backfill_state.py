@@ -0,0 +1,141 @@
+"""
+Tests for resumable backfill checkpoints.
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "functions"))
+
+from backfill_state import (  # noqa: E402
+    CHUNK_DONE,
+    CHUNK_FAILED,
+    CHUNK_LOADING,
+    BigQueryCheckpointStore,
+    FileCheckpointStore,
+    backfill_job_id,
+    plan_chunks,
+)
+
+
+class TestPlanChunks:
+    """Tests for planning chunks over pending dates."""
+
+    def test_splits_range_into_chunks(self):
+        """Test a fresh range is split into slices of chunk_days."""
+        chunks = plan_chunks(date(2024, 1, 1), date(2024, 1, 10), set(), 4)
+
+        assert chunks == [
+            (date(2024, 1, 1), date(2024, 1, 4)),
+            (date(2024, 1, 5), date(2024, 1, 8)),
+            (date(2024, 1, 9), date(2024, 1, 10)),
+        ]
+
+    def test_skips_completed_dates(self):
+        """Test completed dates split runs and are never planned."""
+        completed = {date(2024, 1, d) for d in range(3, 6)}
+
+        chunks = plan_chunks(date(2024, 1, 1), date(2024, 1, 8), completed, 30)
+
+        assert chunks == [
+            (date(2024, 1, 1), date(2024, 1, 2)),
+            (date(2024, 1, 6), date(2024, 1, 8)),
+        ]
+
+    def test_fully_completed_range_has_no_chunks(self):
+        """Test nothing is planned when every date is done."""
+        completed = {date(2024, 1, 1), date(2024, 1, 2)}
+
+        assert plan_chunks(date(2024, 1, 1), date(2024, 1, 2), completed, 30) == []
+
+    def test_job_id_is_stable(self):
+        """Test reruns of the same range get the same job ID."""
+        assert backfill_job_id(date(2024, 1, 1), date(2024, 3, 31)) == "backfill-20240101-20240331"
+
+
+class TestFileCheckpointStore:
+    """Tests for the JSON-lines checkpoint store."""
+
+    def test_completed_dates_persist_across_instances(self, tmp_path):
+        """Test a new store (a rerun) sees chunks recorded by the last one."""
+        path = tmp_path / "state.jsonl"
+        FileCheckpointStore(path).record("job", "chunk", date(2024, 1, 1), date(2024, 1, 3), CHUNK_DONE, rows=3)
+
+        completed = FileCheckpointStore(path).completed_dates(date(2024, 1, 1), date(2024, 1, 10))
+
+        assert completed == {date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)}
+
+    def test_latest_status_wins(self, tmp_path):
+        """Test only chunks whose latest status is done count as completed."""
+        store = FileCheckpointStore(tmp_path / "state.jsonl")
+        store.record("job", "chunk", date(2024, 1, 1), date(2024, 1, 2), CHUNK_LOADING)
+        store.record("job", "chunk", date(2024, 1, 3), date(2024, 1, 4), CHUNK_DONE, rows=2)
+        store.record("job", "chunk", date(2024, 1, 3), date(2024, 1, 4), CHUNK_FAILED, error="reloaded")
+
+        assert store.completed_dates(date(2024, 1, 1), date(2024, 1, 4)) == set()
+
+    def test_completed_dates_cover_other_jobs(self, tmp_path):
+        """Test overlapping jobs reuse each other's chunks, clipped to the range."""
+        store = FileCheckpointStore(tmp_path / "state.jsonl")
+        store.record("earlier", "chunk", date(2024, 1, 1), date(2024, 1, 10), CHUNK_DONE, rows=10)
+
+        completed = store.completed_dates(date(2024, 1, 8), date(2024, 1, 20))
+
+        assert completed == {date(2024, 1, 8), date(2024, 1, 9), date(2024, 1, 10)}
+
+    def test_missing_file_has_no_checkpoints(self, tmp_path):
+        """Test a store with no file yet reports nothing done."""
+        store = FileCheckpointStore(tmp_path / "missing" / "state.jsonl")
+
+        assert store.completed_dates(date(2024, 1, 1), date(2024, 1, 2)) == set()
+        assert store.job_status("backfill-20240101-20240102") is None
+
+
+class TestJobStatus:
+    """Tests for backfill job status polling."""
+
+    def test_reports_progress(self, tmp_path):
+        """Test status includes completed days, rows and chunk states."""
+        store = FileCheckpointStore(tmp_path / "state.jsonl")
+        store.record("job", "job", date(2024, 1, 1), date(2024, 1, 4), "running")
+        store.record("job", "chunk", date(2024, 1, 1), date(2024, 1, 2), CHUNK_DONE, rows=6)
+        store.record("job", "chunk", date(2024, 1, 3), date(2024, 1, 4), CHUNK_FAILED, error="No data")
+
+        status = store.job_status("job")
+
+        assert status["status"] == "running"
+        assert status["total_days"] == 4
+        assert status["completed_days"] == 2
+        assert status["rows"] == 6
+        assert status["chunks"][1] == {
+            "start_date": "2024-01-03", "end_date": "2024-01-04",
+            "status": CHUNK_FAILED, "rows": 0, "error": "No data"
+        }
+
+    def test_complete_when_other_jobs_filled_the_gaps(self, tmp_path):
+        """Test a job counts as complete once all its dates are loaded by any job."""
+        store = FileCheckpointStore(tmp_path / "state.jsonl")
+        store.record("job", "job", date(2024, 1, 1), date(2024, 1, 4), "incomplete")
+        store.record("job", "chunk", date(2024, 1, 1), date(2024, 1, 2), CHUNK_DONE, rows=6)
+        store.record("other", "chunk", date(2024, 1, 3), date(2024, 1, 9), CHUNK_DONE, rows=21)
+
+        assert store.job_status("job")["status"] == "complete"
+
+
+class TestBigQueryCheckpointStore:
+    """Tests for the BigQuery checkpoint store."""
+
+    def test_record_streams_one_row(self):
+        """Test records are appended with insert_rows_json."""
+        client = MagicMock()
+        client.insert_rows_json.return_value = []
+        store = BigQueryCheckpointStore(client, "project.reefwatch.backfill_checkpoints")
+
+        store.record("job", "chunk", date(2024, 1, 1), date(2024, 1, 2), CHUNK_DONE, rows=6)
+
+        table_id, rows = client.insert_rows_json.call_args[0]
+        assert table_id == "project.reefwatch.backfill_checkpoints"
+        assert rows[0]["start_date"] == "2024-01-01"
+        assert rows[0]["row_count"] == 6
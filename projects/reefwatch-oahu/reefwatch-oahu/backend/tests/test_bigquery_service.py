@@ -97,6 +97,153 @@ class TestClearCache:
         # Should not raise
         clear_cache()
 
+    @staticmethod
+    async def _fetch_snapshot(rows):
+        """Fetch current conditions from fresh query results."""
+        from app.services.bigquery_service import get_current_conditions
+
+        clear_cache()
+        with patch("app.services.bigquery_service.run_query", AsyncMock(return_value=rows)), \
+                patch("app.services.bigquery_service._get_temperature_trend", AsyncMock(return_value="stable")):
+            return await get_current_conditions()
+
+    @pytest.mark.asyncio
+    async def test_refetching_same_data_keeps_data_version(self):
+        """Test that a refresh returning identical data keeps the snapshot version."""
+        from app.services.bigquery_service import get_data_version
+
+        rows = [{"site_name": "Hanauma Bay", "date": date(2024, 8, 1), "sst": 28.1, "dhw": 1.2}]
+        await self._fetch_snapshot(rows)
+        version = get_data_version()
+        await self._fetch_snapshot(rows)
+
+        assert get_data_version() == version
+
+    @pytest.mark.asyncio
+    async def test_changed_data_bumps_data_version(self):
+        """Test that new data produces a new snapshot version."""
+        from app.services.bigquery_service import get_data_version
+
+        await self._fetch_snapshot([{"site_name": "Hanauma Bay", "date": date(2024, 8, 1), "sst": 28.1}])
+        version = get_data_version()
+        await self._fetch_snapshot([{"site_name": "Hanauma Bay", "date": date(2024, 8, 2), "sst": 28.4}])
+
+        assert get_data_version() != version
+
+    @pytest.mark.asyncio
+    async def test_error_fallback_has_no_data_version(self):
+        """Test that the error fallback is unversioned and recovery restores the version."""
+        from google.api_core.exceptions import GoogleAPIError
+        from app.services.bigquery_service import get_current_conditions, get_data_version
+
+        rows = [{"site_name": "Hanauma Bay", "date": date(2024, 8, 1), "sst": 28.1}]
+        await self._fetch_snapshot(rows)
+        version = get_data_version()
+
+        clear_cache()
+        with patch("app.services.bigquery_service.run_query", AsyncMock(side_effect=GoogleAPIError("down"))):
+            await get_current_conditions()
+        assert get_data_version() is None
+
+        await self._fetch_snapshot(rows)
+        assert get_data_version() == version
+
+    @pytest.mark.asyncio
+    async def test_cached_conditions_keep_data_version(self):
+        """Test that cache hits do not change the data snapshot."""
+        from app.services.bigquery_service import get_current_conditions, get_data_version
+
+        with patch("app.services.bigquery_service.get_bq_client") as mock_client:
+            mock_query_job = MagicMock()
+            mock_query_job.result.return_value = []
+            mock_client.return_value.query.return_value = mock_query_job
+
+            clear_cache()
+            await get_current_conditions()
+            version = get_data_version()
+            await get_current_conditions()
+
+            assert get_data_version() == version
+
+
+class TestRunQuery:
+    """Tests for run_query."""
+
+    @pytest.mark.asyncio
+    async def test_returns_rows(self):
+        """Test that rows are returned as a list."""
+        from app.services.bigquery_service import run_query
+
+        with patch("app.services.bigquery_service.get_bq_client") as mock_client:
+            mock_client.return_value.query.return_value.result.return_value = iter([{"a": 1}])
+            rows = await run_query("SELECT 1")
+
+        assert rows == [{"a": 1}]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_query_cancels_job(self):
+        """Test that a cancelled caller cancels the BigQuery job."""
+        import asyncio
+        import threading
+
+        from app.services.bigquery_service import get_cancellation_stats, run_query
+
+        release = threading.Event()
+        job = MagicMock()
+        job.result.side_effect = lambda: release.wait(5) and []
+        job.estimated_bytes_processed = 10_000
+        job.total_bytes_billed = 0
+        job.cancel.side_effect = lambda: release.set()
+
+        before = get_cancellation_stats()
+        with patch("app.services.bigquery_service.get_bq_client") as mock_client:
+            mock_client.return_value.query.return_value = job
+            task = asyncio.create_task(run_query("SELECT big"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            for _ in range(100):
+                if job.reload.called:
+                    break
+                await asyncio.sleep(0.01)
+
+        after = get_cancellation_stats()
+        job.cancel.assert_called_once()
+        assert after["jobs_cancelled"] == before["jobs_cancelled"] + 1
+        assert after["bytes_saved_estimate"] == before["bytes_saved_estimate"] + 10_000
+
+    @pytest.mark.asyncio
+    async def test_cancelled_during_submission_cancels_job(self):
+        """Test that a caller cancelled before the job is created still cancels it."""
+        import asyncio
+        import threading
+
+        from app.services.bigquery_service import run_query
+
+        submitted = threading.Event()
+        job = MagicMock()
+        job.estimated_bytes_processed = 0
+        job.total_bytes_billed = 0
+
+        with patch("app.services.bigquery_service.get_bq_client") as mock_client:
+            mock_client.return_value.query.side_effect = lambda *args, **kwargs: submitted.wait(5) and job
+            task = asyncio.create_task(run_query("SELECT big"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            submitted.set()
+            for _ in range(100):
+                if job.cancel.called:
+                    break
+                await asyncio.sleep(0.01)
+
+        job.cancel.assert_called_once()
+        job.result.assert_not_called()
+
 
 class TestGetCurrentConditions:
     """Tests for get_current_conditions function."""
@@ -0,0 +1,177 @@
+"""
+Tests for the batched chat analytics writer.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.chat_analytics import (
+    AnalyticsSink,
+    ChatAnalytics,
+    FileSink,
+    MemorySink,
+    build_rows,
+    detect_topics,
+)
+
+CREATED = datetime(2024, 1, 15, 10, 0, 0)
+
+
+def _analytics(sink=None, **overrides):
+    options = {"max_queue": 100, "batch_size": 10, "flush_seconds": 0.05}
+    options.update(overrides)
+    return ChatAnalytics(sink or MemorySink(), **options)
+
+
+class TestDetectTopics:
+    """Tests for detect_topics."""
+
+    def test_keywords_and_sites(self):
+        """Test that topic keywords and mentioned sites are both reported."""
+        topics = detect_topics("Is Hanauma Bay safe, or is the coral bleaching?")
+
+        assert "safety" in topics
+        assert "bleaching" in topics
+        assert "hanauma-bay" in topics
+
+    def test_no_topics(self):
+        """Test that small talk yields no topics."""
+        assert detect_topics("Aloha!") == []
+
+
+class TestBuildRows:
+    """Tests for build_rows."""
+
+    def test_one_row_per_session(self):
+        """Test that turns from one session are condensed into a single row."""
+        events = [
+            {"session_id": "a", "created_at": CREATED, "timestamp": datetime(2024, 1, 15, 10, 1),
+             "message": "What is DHW?", "message_count": 2},
+            {"session_id": "b", "created_at": CREATED, "timestamp": datetime(2024, 1, 15, 10, 2),
+             "message": "Hello", "message_count": 2},
+            {"session_id": "a", "created_at": CREATED, "timestamp": datetime(2024, 1, 15, 10, 3),
+             "message": "Any turtles at Waikiki?", "message_count": 2},
+        ]
+
+        rows = {row["session_id"]: row for row in build_rows(events)}
+
+        assert len(rows) == 2
+        assert rows["a"]["message_count"] == 4
+        assert rows["a"]["created_at"] == "2024-01-15T10:00:00"
+        assert rows["a"]["last_activity"] == "2024-01-15T10:03:00"
+        assert rows["a"]["topics_discussed"] == ["bleaching", "marine_life", "waikiki-beach"]
+
+
+class TestChatAnalytics:
+    """Tests for ChatAnalytics."""
+
+    @pytest.mark.asyncio
+    async def test_flushes_after_interval(self):
+        """Test that a partial batch is written once flush_seconds pass."""
+        sink = MemorySink()
+        analytics = _analytics(sink)
+        analytics.start()
+
+        analytics.record("s1", CREATED, "Hello")
+        await asyncio.sleep(0.15)
+
+        assert len(sink.rows) == 1
+        assert analytics.stats()["written_events"] == 1
+        await analytics.stop()
+
+    @pytest.mark.asyncio
+    async def test_flushes_by_size(self):
+        """Test that a full batch is written without waiting for the interval."""
+        sink = MemorySink()
+        analytics = _analytics(sink, batch_size=3, flush_seconds=60)
+        analytics.start()
+
+        for i in range(3):
+            analytics.record(f"s{i}", CREATED, "Hello")
+        await asyncio.sleep(0.01)
+
+        assert sink.batches == 1
+        assert len(sink.rows) == 3
+        await analytics.stop()
+
+    @pytest.mark.asyncio
+    async def test_drops_when_full(self):
+        """Test that events beyond the queue bound are dropped and counted."""
+        analytics = _analytics(max_queue=2)
+
+        assert analytics.record("s1", CREATED, "one") is True
+        assert analytics.record("s1", CREATED, "two") is True
+        assert analytics.record("s1", CREATED, "three") is False
+
+        stats = analytics.stats()
+        assert stats["enqueued"] == 2
+        assert stats["dropped"] == 1
+        assert stats["queued"] == 2
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_remaining(self):
+        """Test that shutdown writes events still waiting in the queue."""
+        sink = MemorySink()
+        analytics = _analytics(sink, flush_seconds=60)
+        analytics.start()
+
+        analytics.record("s1", CREATED, "Hello")
+        analytics.record("s2", CREATED, "Hello")
+        await asyncio.sleep(0)
+        await analytics.stop()
+
+        assert len(sink.rows) == 2
+        assert analytics.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_sink_failure_counted(self):
+        """Test that a failing sink doesn't stop the writer."""
+        class FailingSink(AnalyticsSink):
+            async def write(self, rows):
+                raise RuntimeError("load job failed")
+
+        analytics = _analytics(FailingSink())
+        analytics.record("s1", CREATED, "Hello")
+        await analytics.stop()
+
+        assert analytics.stats()["failed_events"] == 1
+        assert analytics.stats()["flushes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_file_sink_writes_json_lines(self, tmp_path):
+        """Test that the file sink appends one JSON row per line."""
+        path = tmp_path / "analytics.jsonl"
+        analytics = _analytics(FileSink(str(path)))
+        analytics.record("s1", CREATED, "What is DHW?")
+        await analytics.stop()
+
+        rows = [json.loads(line) for line in path.read_text().splitlines()]
+        assert rows[0]["session_id"] == "s1"
+        assert rows[0]["topics_discussed"] == ["bleaching"]
+
+
+class TestChatIntegration:
+    """Tests for analytics events from chat turns."""
+
+    @pytest.mark.asyncio
+    async def test_chat_turn_records_event(self):
+        """Test that a completed chat turn queues an analytics event."""
+        analytics = _analytics()
+        mock_client = MagicMock()
+        response = MagicMock()
+        response.content = [MagicMock(type="text", text="Aloha!")]
+        response.stop_reason = "end_turn"
+        mock_client.messages.create = AsyncMock(return_value=response)
+
+        with patch("app.services.chat_service.get_chat_analytics", return_value=analytics), \
+                patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.build_system_prompt",
+                      AsyncMock(return_value=[{"type": "text", "text": "System"}])):
+            from app.services.chat_service import chat
+            await chat("Hello", session_id="analytics-session")
+
+        assert analytics.stats()["enqueued"] == 1
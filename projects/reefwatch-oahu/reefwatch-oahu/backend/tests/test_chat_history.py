@@ -0,0 +1,159 @@
+"""
+Tests for conversation history shaping.
+"""
+
+from app.services.chat_history import (
+    MESSAGE_OVERHEAD_TOKENS,
+    estimate_message_tokens,
+    estimate_tokens,
+    summarize_extractive,
+    split_history,
+    trim_history,
+)
+
+
+def _turns(*contents):
+    """Build an alternating user/assistant history."""
+    roles = ["user", "assistant"]
+    return [{"role": roles[i % 2], "content": c} for i, c in enumerate(contents)]
+
+
+class TestEstimateTokens:
+    """Tests for the local token estimator."""
+
+    def test_empty(self):
+        """Test that empty text costs nothing."""
+        assert estimate_tokens("") == 0
+
+    def test_rounds_up(self):
+        """Test that partial tokens round up."""
+        assert estimate_tokens("abcde") == 2
+
+    def test_message_overhead(self):
+        """Test that messages include framing overhead."""
+        message = {"role": "user", "content": "abcd"}
+        assert estimate_message_tokens(message) == 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+class TestTrimHistory:
+    """Tests for trim_history."""
+
+    def test_everything_fits(self):
+        """Test that short histories are unchanged."""
+        history = _turns("hi", "aloha", "how's the water?")
+        assert trim_history(history, 1000) == history
+
+    def test_keeps_most_recent_turns(self):
+        """Test that the oldest turns are dropped first."""
+        history = _turns("a" * 400, "b" * 400, "c" * 40, "d" * 40, "e" * 40)
+        result = trim_history(history, 50)
+
+        assert [m["content"][0] for m in result] == ["c", "d", "e"]
+
+    def test_starts_with_user(self):
+        """Test that a leading assistant message is dropped."""
+        history = _turns("a" * 400, "b" * 40, "c" * 40)
+        result = trim_history(history, 30)
+
+        assert result[0]["role"] == "user"
+        assert [m["content"][0] for m in result] == ["c"]
+
+    def test_latest_message_always_kept(self):
+        """Test that an oversized latest message is still sent."""
+        history = _turns("hi", "aloha", "x" * 10000)
+        result = trim_history(history, 10)
+
+        assert result == [{"role": "user", "content": "x" * 10000}]
+
+    def test_merges_consecutive_roles(self):
+        """Test that repeated user messages are merged to keep alternation."""
+        history = [
+            {"role": "user", "content": "first try"},
+            {"role": "user", "content": "second try"},
+        ]
+        result = trim_history(history, 1000)
+
+        assert result == [{"role": "user", "content": "first try\n\nsecond try"}]
+
+    def test_does_not_mutate_input(self):
+        """Test that stored history is left untouched."""
+        history = [
+            {"role": "user", "content": "one"},
+            {"role": "user", "content": "two"},
+        ]
+        trim_history(history, 1000)
+
+        assert history[0] == {"role": "user", "content": "one"}
+
+
+class TestSplitHistory:
+    """Tests for split_history."""
+
+    def test_counts_dropped_stored_messages(self):
+        """Test that the dropped count covers every stored message not sent."""
+        history = _turns("a" * 400, "b" * 400, "c" * 40, "d" * 40, "e" * 40)
+        dropped, kept = split_history(history, 50)
+
+        assert dropped == 2
+        assert kept == history[2:]
+
+    def test_counts_merged_and_leading_messages(self):
+        """Test that merged runs and a dropped leading assistant reply are counted."""
+        history = [
+            {"role": "user", "content": "a" * 400},
+            {"role": "assistant", "content": "b" * 40},
+            {"role": "user", "content": "first try"},
+            {"role": "user", "content": "second try"},
+        ]
+        dropped, kept = split_history(history, 20)
+
+        assert dropped == 2
+        assert kept == [{"role": "user", "content": "first try\n\nsecond try"}]
+
+    def test_nothing_dropped_when_everything_fits(self):
+        """Test that short histories drop nothing."""
+        history = _turns("hi", "aloha")
+
+        assert split_history(history, 1000) == (0, history)
+
+    def test_unsummarized_and_dropped_turns_stay_in_request(self):
+        """Test that turns awaiting their summary are still sent, ahead of the stored ones."""
+        pending = _turns("old question", "old answer")
+        history = _turns("a" * 400, "b" * 400, "c" * 40, "d" * 40, "e" * 40)
+
+        dropped, kept = split_history(history, 50, unsummarized=pending)
+
+        assert dropped == 2
+        assert kept == pending + history
+
+
+class TestSummarizeExtractive:
+    """Tests for the local extractive summarizer."""
+
+    def test_first_sentence_per_message(self):
+        """Test that each message contributes its first sentence."""
+        messages = _turns(
+            "Is Hanauma Bay good tomorrow? We have kids.",
+            "Yes, conditions look calm. Go early."
+        )
+        summary = summarize_extractive("", messages, max_chars=1000)
+
+        assert summary == (
+            "- User asked: Is Hanauma Bay good tomorrow?\n"
+            "- Assistant said: Yes, conditions look calm."
+        )
+
+    def test_appends_to_previous(self):
+        """Test that new lines follow the existing summary."""
+        summary = summarize_extractive("- User asked: Hi.", _turns("Next question."), 1000)
+
+        assert summary.splitlines() == ["- User asked: Hi.", "- User asked: Next question."]
+
+    def test_bounded_length(self):
+        """Test that the oldest lines are dropped to fit max_chars."""
+        summary = ""
+        for i in range(50):
+            summary = summarize_extractive(summary, _turns(f"Question number {i}."), 200)
+
+        assert len(summary) <= 200
+        assert summary.endswith("Question number 49.")
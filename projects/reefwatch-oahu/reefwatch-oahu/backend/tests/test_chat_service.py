@@ -2,6 +2,7 @@
 Tests for chat service.
 """
 
+import asyncio
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -54,9 +55,9 @@ class TestSessionManagement:
         """Clear sessions before each test."""
         _sessions.clear()
 
-    def test_get_session_creates_new(self):
+    async def test_get_session_creates_new(self):
         """Test that get_session creates a new session if none exists."""
-        session = get_session("test-session-1")
+        session = await get_session("test-session-1")
 
         assert session is not None
         assert session["id"] == "test-session-1"
@@ -65,92 +66,92 @@ class TestSessionManagement:
         assert "created_at" in session
         assert "last_activity" in session
 
-    def test_get_session_returns_existing(self):
+    async def test_get_session_returns_existing(self):
         """Test that get_session returns existing session."""
-        session1 = get_session("test-session-2")
+        session1 = await get_session("test-session-2")
         session1["messages"].append({"role": "user", "content": "Hello"})
 
-        session2 = get_session("test-session-2")
+        session2 = await get_session("test-session-2")
 
         assert session1 is session2
         assert len(session2["messages"]) == 1
 
-    def test_update_session_adds_message(self):
+    async def test_update_session_adds_message(self):
         """Test that update_session adds a message."""
-        get_session("test-session-3")
-        update_session("test-session-3", "user", "Hello")
+        await get_session("test-session-3")
+        await update_session("test-session-3", "user", "Hello")
 
-        session = get_session("test-session-3")
+        session = await get_session("test-session-3")
         assert len(session["messages"]) == 1
         assert session["messages"][0]["role"] == "user"
         assert session["messages"][0]["content"] == "Hello"
 
-    def test_update_session_updates_activity(self):
+    async def test_update_session_updates_activity(self):
         """Test that update_session updates last_activity."""
-        session = get_session("test-session-4")
+        session = await get_session("test-session-4")
         old_activity = session["last_activity"]
 
         # Small delay to ensure time difference
         import time
         time.sleep(0.01)
 
-        update_session("test-session-4", "user", "Test")
+        await update_session("test-session-4", "user", "Test")
 
         assert session["last_activity"] > old_activity
 
-    def test_update_session_limits_messages(self):
+    async def test_update_session_limits_messages(self):
         """Test that update_session limits to 20 messages."""
-        get_session("test-session-5")
+        await get_session("test-session-5")
 
         # Add 25 messages
         for i in range(25):
-            update_session("test-session-5", "user", f"Message {i}")
+            await update_session("test-session-5", "user", f"Message {i}")
 
-        session = get_session("test-session-5")
+        session = await get_session("test-session-5")
         assert len(session["messages"]) == 20
         # Should have the last 20 messages
         assert session["messages"][0]["content"] == "Message 5"
 
-    def test_get_session_history(self):
+    async def test_get_session_history(self):
         """Test getting session history."""
-        get_session("test-session-6")
-        update_session("test-session-6", "user", "Hello")
-        update_session("test-session-6", "assistant", "Hi there!")
+        await get_session("test-session-6")
+        await update_session("test-session-6", "user", "Hello")
+        await update_session("test-session-6", "assistant", "Hi there!")
 
-        history = get_session_history("test-session-6")
+        history = await get_session_history("test-session-6")
 
         assert len(history) == 2
         assert history[0]["role"] == "user"
         assert history[1]["role"] == "assistant"
 
-    def test_get_session_history_nonexistent(self):
+    async def test_get_session_history_nonexistent(self):
         """Test getting history for nonexistent session."""
-        history = get_session_history("nonexistent-session")
+        history = await get_session_history("nonexistent-session")
         assert history == []
 
-    def test_clear_session(self):
+    async def test_clear_session(self):
         """Test clearing a session."""
-        get_session("test-session-7")
-        result = clear_session("test-session-7")
+        await get_session("test-session-7")
+        result = await clear_session("test-session-7")
 
         assert result is True
         assert "test-session-7" not in _sessions
 
-    def test_clear_session_nonexistent(self):
+    async def test_clear_session_nonexistent(self):
         """Test clearing nonexistent session returns False."""
-        result = clear_session("nonexistent-session")
+        result = await clear_session("nonexistent-session")
         assert result is False
 
-    def test_cleanup_old_sessions(self):
+    async def test_cleanup_old_sessions(self):
         """Test cleaning up old sessions."""
         # Create sessions with different ages
-        session1 = get_session("old-session")
+        session1 = await get_session("old-session")
         session1["last_activity"] = datetime.utcnow() - timedelta(hours=48)
 
-        session2 = get_session("new-session")
+        session2 = await get_session("new-session")
         session2["last_activity"] = datetime.utcnow()
 
-        cleaned = cleanup_old_sessions(max_age_hours=24)
+        cleaned = await cleanup_old_sessions(max_age_hours=24)
 
         assert cleaned == 1
         assert "old-session" not in _sessions
@@ -213,6 +214,30 @@ class TestBuildContextPrompt:
             assert "Ocean Conditions" in result
             assert "26.5" in result
 
+    @pytest.mark.asyncio
+    async def test_build_context_prompt_summary_only(self):
+        """Test that site detail lines can be left out."""
+        with patch("app.services.chat_service.get_data_summary") as mock_summary:
+            mock_summary.return_value = {
+                "date": "2024-01-15",
+                "total_sites": 15,
+                "sites_with_data": 15,
+                "average_sst": 26.5,
+                "max_sst": 28.0,
+                "average_dhw": 2.5,
+                "max_dhw": 5.0,
+                "risk_distribution": {"low": 10, "moderate": 3, "high": 2, "severe": 0},
+                "sites": [
+                    {"name": "Hanauma Bay", "sst": 26.5, "dhw": 2.1, "risk": "Low"}
+                ]
+            }
+
+            from app.services.chat_service import build_context_prompt
+            result = await build_context_prompt(include_sites=False)
+
+            assert "Risk Distribution" in result
+            assert "Hanauma Bay" not in result
+
     @pytest.mark.asyncio
     async def test_build_context_prompt_handles_error(self):
         """Test that build_context_prompt handles errors gracefully."""
@@ -225,6 +250,136 @@ class TestBuildContextPrompt:
             assert "unavailable" in result.lower()
 
 
+class TestBuildRelevantSitesPrompt:
+    """Tests for build_relevant_sites_prompt function."""
+
+    @pytest.mark.asyncio
+    async def test_only_mentioned_sites(self, mock_sites_list):
+        """Test that only sites named in the message are included."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_sites_list
+
+            from app.services.chat_service import build_relevant_sites_prompt
+            context = await build_relevant_sites_prompt("Is Sharks Cove good tomorrow?")
+
+            assert "Sharks Cove" in context
+            assert "Hanauma Bay" not in context
+
+    @pytest.mark.asyncio
+    async def test_no_mention(self):
+        """Test that no data is fetched when no site is mentioned."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock) as mock:
+            from app.services.chat_service import build_relevant_sites_prompt
+            context = await build_relevant_sites_prompt("What is DHW?")
+
+            assert context is None
+            mock.assert_not_awaited()
+
+
+class TestBuildSystemPrompt:
+    """Tests for build_system_prompt function."""
+
+    def setup_method(self):
+        """Clear memoized prompts before each test."""
+        from app.services.chat_service import _system_prompt_cache
+        _system_prompt_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_blocks_mark_cacheable_prefixes(self):
+        """Test that static prompt and context are cacheable prefixes."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock), \
+                patch("app.services.chat_service.get_data_version", return_value=1), \
+                patch("app.services.chat_service.build_context_prompt", new_callable=AsyncMock) as mock_context:
+            mock_context.return_value = "Context"
+
+            from app.services.chat_service import build_system_prompt
+            blocks = await build_system_prompt(pidgin_mode=True)
+
+            assert blocks[0]["text"] == SYSTEM_PROMPT
+            assert blocks[0]["cache_control"] == {"type": "ephemeral"}
+            assert blocks[1]["text"] == "Context"
+            assert blocks[1]["cache_control"] == {"type": "ephemeral"}
+            assert "pidgin" in blocks[2]["text"].lower()
+            assert "cache_control" not in blocks[2]
+
+    @pytest.mark.asyncio
+    async def test_tools_mode_skips_context(self):
+        """Test that tools mode describes the tools instead of fetching data."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock) as mock_conditions, \
+                patch("app.services.chat_service.build_context_prompt", new_callable=AsyncMock) as mock_context:
+            from app.services.chat_service import build_system_prompt
+            from app.services.chat_tools import TOOLS_NOTE
+            blocks = await build_system_prompt(pidgin_mode=False, context_mode="tools")
+
+            assert [b["text"] for b in blocks] == [SYSTEM_PROMPT, TOOLS_NOTE]
+            mock_conditions.assert_not_awaited()
+            mock_context.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_relevant_mode_omits_site_details(self):
+        """Test that relevant mode caches only the island-wide summary."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock), \
+                patch("app.services.chat_service.get_data_version", return_value=1), \
+                patch("app.services.chat_service.build_context_prompt", new_callable=AsyncMock) as mock_context:
+            mock_context.return_value = "Island summary"
+
+            from app.services.chat_service import build_system_prompt
+            blocks = await build_system_prompt(pidgin_mode=False, context_mode="relevant")
+
+            mock_context.assert_awaited_once_with(include_sites=False)
+            assert blocks[1]["text"] == "Island summary"
+
+    @pytest.mark.asyncio
+    async def test_memoized_per_snapshot(self):
+        """Test that context is rendered once per data snapshot."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock), \
+                patch("app.services.chat_service.get_data_version") as mock_version, \
+                patch("app.services.chat_service.build_context_prompt", new_callable=AsyncMock) as mock_context:
+            mock_context.return_value = "Context"
+            mock_version.return_value = 1
+
+            from app.services.chat_service import build_system_prompt
+            first = await build_system_prompt(pidgin_mode=False)
+            second = await build_system_prompt(pidgin_mode=False)
+            assert first is second
+            assert mock_context.await_count == 1
+
+            # Pidgin mode is memoized separately
+            await build_system_prompt(pidgin_mode=True)
+            assert mock_context.await_count == 2
+
+            # A new snapshot re-renders
+            mock_version.return_value = 2
+            await build_system_prompt(pidgin_mode=False)
+            assert mock_context.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_unavailable_context_not_memoized(self):
+        """Test that fallback context is retried on the next turn."""
+        from app.services.chat_service import CONTEXT_UNAVAILABLE
+
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock), \
+                patch("app.services.chat_service.get_data_version", return_value=1), \
+                patch("app.services.chat_service.build_context_prompt", new_callable=AsyncMock) as mock_context:
+            mock_context.return_value = CONTEXT_UNAVAILABLE
+
+            from app.services.chat_service import build_system_prompt
+            await build_system_prompt(pidgin_mode=False)
+            await build_system_prompt(pidgin_mode=False)
+
+            assert mock_context.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_without_context(self):
+        """Test that no data is fetched when context is disabled."""
+        with patch("app.services.chat_service.get_current_conditions", new_callable=AsyncMock) as mock_conditions:
+            from app.services.chat_service import build_system_prompt
+            blocks = await build_system_prompt(pidgin_mode=False, include_context=False)
+
+            assert len(blocks) == 1
+            mock_conditions.assert_not_awaited()
+
+
 class TestChat:
     """Tests for chat function."""
 
@@ -232,18 +387,24 @@ class TestChat:
         """Clear sessions before each test."""
         _sessions.clear()
 
+    @staticmethod
+    def _mock_client(text="Hello!"):
+        """Build an async client mock whose messages.create returns text."""
+        mock_client = MagicMock()
+        mock_response = MagicMock()
+        mock_response.content = [MagicMock(type="text", text=text)]
+        mock_response.stop_reason = "end_turn"
+        mock_client.messages.create = AsyncMock(return_value=mock_response)
+        return mock_client
+
     @pytest.mark.asyncio
     async def test_chat_creates_session(self):
         """Test that chat creates a new session if none provided."""
-        with patch("app.services.chat_service.anthropic") as mock_anthropic:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.content = [MagicMock(text="Hello!")]
-            mock_client.messages.create.return_value = mock_response
-            mock_anthropic.Anthropic.return_value = mock_client
+        with patch("app.services.chat_service.get_client") as mock_get_client:
+            mock_get_client.return_value = self._mock_client()
 
-            with patch("app.services.chat_service.build_context_prompt") as mock_context:
-                mock_context.return_value = "Context"
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
 
                 from app.services.chat_service import chat
                 response, session_id = await chat("Hello")
@@ -251,18 +412,189 @@ class TestChat:
                 assert session_id is not None
                 assert len(session_id) > 0
 
+    @pytest.mark.asyncio
+    async def test_chat_trims_history_to_token_budget(self):
+        """Test that only recent history within the token budget is sent."""
+        for i in range(4):
+            await update_session("budget-session", "user", f"{i}" * 4000)
+            await update_session("budget-session", "assistant", "ok")
+
+        with patch("app.services.chat_service.get_client") as mock_get_client:
+            mock_client = self._mock_client()
+            mock_get_client.return_value = mock_client
+
+            with patch("app.services.chat_service.build_system_prompt") as mock_system, \
+                    patch("app.services.chat_service.settings.chat_history_token_budget", 1100):
+                mock_system.return_value = [{"type": "text", "text": "System"}]
+
+                from app.services.chat_service import chat
+                await chat("Latest question", session_id="budget-session")
+
+            sent = mock_client.messages.create.call_args.kwargs["messages"]
+            assert sent[0]["role"] == "user"
+            assert sent[0]["content"].startswith("3")
+            assert sent[-1] == {"role": "user", "content": "Latest question"}
+
+    @pytest.mark.asyncio
+    async def test_chat_tools_mode_runs_tool_loop(self):
+        """Test that tool calls are executed and their results sent back."""
+        tool_call = MagicMock(type="tool_use", id="call-1", input={"site": "Hanauma Bay"})
+        tool_call.name = "get_site_conditions"
+        tool_response = MagicMock(content=[tool_call], stop_reason="tool_use")
+        final_response = MagicMock(
+            content=[MagicMock(type="text", text="Hanauma is calm.")],
+            stop_reason="end_turn"
+        )
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(side_effect=[tool_response, final_response])
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.settings.chat_context_mode", "tools"), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system, \
+                patch("app.services.chat_service.execute_tool", new_callable=AsyncMock) as mock_tool:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+            mock_tool.return_value = '{"risk_level": "Low"}'
+
+            from app.services.chat_service import chat
+            response, session_id = await chat("How's Hanauma?", session_id="tools-session")
+
+        assert response == "Hanauma is calm."
+        mock_system.assert_awaited_once_with(False, True, "tools")
+        mock_tool.assert_awaited_once_with("get_site_conditions", {"site": "Hanauma Bay"})
+
+        second_call = mock_client.messages.create.call_args_list[1].kwargs
+        assert "tools" in second_call
+        assert second_call["messages"][-1]["content"] == [
+            {"type": "tool_result", "tool_use_id": "call-1", "content": '{"risk_level": "Low"}'}
+        ]
+        assert await get_session_history("tools-session") == [
+            {"role": "user", "content": "How's Hanauma?"},
+            {"role": "assistant", "content": "Hanauma is calm."},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_chat_tool_rounds_exhausted(self):
+        """Test that running out of tool rounds returns an error and stores nothing."""
+        from app.services.answer_cache import get_answer_cache
+        from app.services.chat_service import INCOMPLETE_ANSWER
+
+        tool_call = MagicMock(type="tool_use", id="call-1", input={"site": "Hanauma Bay"})
+        tool_call.name = "get_site_conditions"
+        tool_response = MagicMock(
+            content=[MagicMock(type="text", text="Let me check."), tool_call],
+            stop_reason="tool_use"
+        )
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(return_value=tool_response)
+        get_answer_cache().clear()
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.settings.chat_context_mode", "tools"), \
+                patch("app.services.chat_service.settings.chat_max_tool_rounds", 1), \
+                patch("app.services.chat_service._answer_cache_key",
+                      AsyncMock(return_value=("how's hanauma?", False, (True, "tools"), None))), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system, \
+                patch("app.services.chat_service.execute_tool", new_callable=AsyncMock) as mock_tool:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+            mock_tool.return_value = '{"risk_level": "Low"}'
+
+            from app.services.chat_service import chat
+            response, _ = await chat("How's Hanauma?", session_id="exhausted-session")
+
+        assert response == INCOMPLETE_ANSWER
+        assert mock_client.messages.create.await_count == 2
+        mock_tool.assert_awaited_once()
+        assert await get_session_history("exhausted-session") == [
+            {"role": "user", "content": "How's Hanauma?"},
+        ]
+        assert len(get_answer_cache()) == 0
+
+    @pytest.mark.asyncio
+    async def test_chat_empty_answer_not_stored(self):
+        """Test that a reply with no text isn't stored as an empty assistant turn."""
+        from app.services.chat_service import INCOMPLETE_ANSWER
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(return_value=MagicMock(content=[], stop_reason="end_turn"))
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+
+            from app.services.chat_service import chat
+            response, _ = await chat("Hello", session_id="empty-session")
+
+        assert response == INCOMPLETE_ANSWER
+        assert await get_session_history("empty-session") == [{"role": "user", "content": "Hello"}]
+
+    @pytest.mark.asyncio
+    async def test_chat_rejected_leaves_history_untouched(self):
+        """Test that a turn rejected by admission control isn't stored."""
+        from app.services.admission_controller import AdmissionController, AdmissionRejected
+
+        busy = AdmissionController(max_concurrency=1, max_queue=0, max_queue_per_key=1, max_wait_seconds=1)
+        await busy.acquire("someone-else")
+
+        with patch("app.services.chat_service.get_admission_controller", return_value=busy), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+
+            from app.services.chat_service import chat
+            with pytest.raises(AdmissionRejected):
+                await chat("Hello", session_id="rejected-session")
+
+        assert await get_session_history("rejected-session") == []
+
+    @pytest.mark.asyncio
+    async def test_blocking_store_keeps_event_loop_free(self):
+        """Test that a network-backed store's round trips don't stall other coroutines."""
+        import asyncio
+        import time
+        from app.services.session_store import RedisSessionStore
+        from tests.test_session_store import FakePipeline, FakeRedis
+
+        class SlowPipeline(FakePipeline):
+            def execute(self):
+                time.sleep(0.05)  # One Redis round trip
+                return super().execute()
+
+        class SlowRedis(FakeRedis):
+            def pipeline(self, transaction=True):
+                return SlowPipeline(self)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        store = RedisSessionStore(SlowRedis(), prefix="slow:")
+        with patch("app.services.chat_service._sessions", store), \
+                patch("app.services.chat_service.get_client", return_value=self._mock_client()), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+
+            from app.services.chat_service import chat
+            ticking = asyncio.create_task(ticker())
+            await chat("Hello", session_id="slow-session")
+            ticking.cancel()
+
+        # Four 50 ms round trips; a blocked loop would only tick between them
+        assert ticks >= 20
+        assert [m["content"] for m in store.get_messages("slow-session")] == ["Hello", "Hello!"]
+
     @pytest.mark.asyncio
     async def test_chat_uses_existing_session(self):
         """Test that chat uses existing session ID."""
-        with patch("app.services.chat_service.anthropic") as mock_anthropic:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.content = [MagicMock(text="Hello!")]
-            mock_client.messages.create.return_value = mock_response
-            mock_anthropic.Anthropic.return_value = mock_client
+        with patch("app.services.chat_service.get_client") as mock_get_client:
+            mock_get_client.return_value = self._mock_client()
 
-            with patch("app.services.chat_service.build_context_prompt") as mock_context:
-                mock_context.return_value = "Context"
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
 
                 from app.services.chat_service import chat
                 response, session_id = await chat("Hello", session_id="my-session")
@@ -272,32 +604,520 @@ class TestChat:
     @pytest.mark.asyncio
     async def test_chat_detects_pidgin(self):
         """Test that chat detects and enables Pidgin mode."""
-        with patch("app.services.chat_service.anthropic") as mock_anthropic:
-            mock_client = MagicMock()
-            mock_response = MagicMock()
-            mock_response.content = [MagicMock(text="Shoots!")]
-            mock_client.messages.create.return_value = mock_response
-            mock_anthropic.Anthropic.return_value = mock_client
+        with patch("app.services.chat_service.get_client") as mock_get_client:
+            mock_get_client.return_value = self._mock_client("Shoots!")
 
-            with patch("app.services.chat_service.build_context_prompt") as mock_context:
-                mock_context.return_value = "Context"
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
 
                 from app.services.chat_service import chat
                 await chat("Eh brah, howzit?", session_id="pidgin-test")
 
-                session = get_session("pidgin-test")
+                session = await get_session("pidgin-test")
                 assert session["pidgin_mode"] is True
 
+    @pytest.mark.asyncio
+    async def test_chat_awaits_async_client(self):
+        """Test that chat awaits the shared async client."""
+        with patch("app.services.chat_service.get_client") as mock_get_client:
+            mock_client = self._mock_client()
+            mock_get_client.return_value = mock_client
+
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
+
+                from app.services.chat_service import chat
+                response, _ = await chat("Hello")
+
+                assert response == "Hello!"
+                mock_client.messages.create.assert_awaited_once()
+
     @pytest.mark.asyncio
     async def test_chat_handles_api_error(self):
         """Test that chat handles API errors gracefully."""
-        with patch("app.services.chat_service.anthropic") as mock_anthropic:
-            mock_anthropic.Anthropic.side_effect = Exception("API Error")
+        with patch("app.services.chat_service.get_client") as mock_get_client:
+            mock_get_client.side_effect = Exception("API Error")
 
-            with patch("app.services.chat_service.build_context_prompt") as mock_context:
-                mock_context.return_value = "Context"
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
 
                 from app.services.chat_service import chat
                 response, session_id = await chat("Hello")
 
                 assert "error" in response.lower() or "trouble" in response.lower()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_turns_in_session_are_serialized(self):
+        """Test that a second message waits for the first turn to be stored."""
+        import asyncio
+
+        seen_histories = []
+
+        async def slow_create(messages, **kwargs):
+            seen_histories.append([m["content"] for m in messages])
+            await asyncio.sleep(0.01)
+            response = MagicMock()
+            response.content = [MagicMock(type="text", text=f"Reply {len(seen_histories)}")]
+            response.stop_reason = "end_turn"
+            return response
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(side_effect=slow_create)
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+
+            from app.services.chat_service import chat, _turn_locks
+            await asyncio.gather(
+                chat("First", session_id="serial-session"),
+                chat("Second", session_id="serial-session")
+            )
+
+        assert seen_histories == [["First"], ["First", "Reply 1", "Second"]]
+        assert [m["content"] for m in await get_session_history("serial-session")] == [
+            "First", "Reply 1", "Second", "Reply 2"
+        ]
+        assert "serial-session" not in _turn_locks
+
+    @pytest.mark.asyncio
+    async def test_turn_outlasting_the_session_wait_returns_429(self):
+        """Test that a follow-up behind a long turn waits on its own timeout, then gets 429."""
+        from app.services.admission_controller import AdmissionRejected
+        from app.services.chat_service import chat, _turn_locks
+
+        assert await _turn_locks.acquire("busy-session")
+        try:
+            with patch("app.services.chat_service.settings.chat_queue_timeout_seconds", 0.01), \
+                    patch("app.services.chat_service.settings.chat_session_turn_wait_seconds", 0.05):
+                waiter = asyncio.create_task(chat("Second", session_id="busy-session"))
+
+                # Still queued past the upstream queue timeout
+                await asyncio.sleep(0.02)
+                assert not waiter.done()
+
+                with pytest.raises(AdmissionRejected) as exc:
+                    await waiter
+        finally:
+            _turn_locks.release("busy-session")
+
+        assert exc.value.status_code == 429
+        assert exc.value.retry_after >= 1
+        assert "busy-session" not in _turn_locks
+
+
+class TestChatStream:
+    """Tests for chat_stream function."""
+
+    def setup_method(self):
+        """Clear sessions before each test."""
+        _sessions.clear()
+
+    @pytest.mark.asyncio
+    async def test_chat_stream_yields_async_chunks(self):
+        """Test that chat_stream iterates the async text stream."""
+        async def text_stream():
+            for text in ["Aloha", " there"]:
+                yield text
+
+        mock_stream = MagicMock()
+        mock_stream.text_stream = text_stream()
+        mock_stream_manager = MagicMock()
+        mock_stream_manager.__aenter__ = AsyncMock(return_value=mock_stream)
+        mock_stream_manager.__aexit__ = AsyncMock(return_value=False)
+
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = mock_stream_manager
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client):
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
+
+                from app.services.chat_service import chat_stream
+                chunks = [c async for c in chat_stream("Hello", session_id="stream-test")]
+
+        assert [c[0] for c in chunks[:-1]] == ["Aloha", " there"]
+        assert chunks[-1] == ("", True, "stream-test")
+        assert (await get_session_history("stream-test"))[-1]["content"] == "Aloha there"
+
+    @pytest.mark.asyncio
+    async def test_chat_stream_tool_rounds_exhausted(self):
+        """Test that a stream out of tool rounds ends with an error and stores nothing."""
+        from app.services.chat_service import INCOMPLETE_ANSWER
+
+        tool_call = MagicMock(type="tool_use", id="call-1", input={"site": "Hanauma Bay"})
+        tool_call.name = "get_site_conditions"
+
+        def stream_round(*args, **kwargs):
+            async def text_stream():
+                yield "Let me check."
+
+            mock_stream = MagicMock()
+            mock_stream.text_stream = text_stream()
+            mock_stream.get_final_message = AsyncMock(return_value=MagicMock(
+                content=[MagicMock(type="text", text="Let me check."), tool_call],
+                stop_reason="tool_use"
+            ))
+            manager = MagicMock()
+            manager.__aenter__ = AsyncMock(return_value=mock_stream)
+            manager.__aexit__ = AsyncMock(return_value=False)
+            return manager
+
+        mock_client = MagicMock()
+        mock_client.messages.stream.side_effect = stream_round
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.settings.chat_context_mode", "tools"), \
+                patch("app.services.chat_service.settings.chat_max_tool_rounds", 1), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system, \
+                patch("app.services.chat_service.execute_tool", new_callable=AsyncMock) as mock_tool:
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+            mock_tool.return_value = '{"risk_level": "Low"}'
+
+            from app.services.chat_service import chat_stream
+            chunks = [c async for c in chat_stream("How's Hanauma?", session_id="stream-exhausted")]
+
+        assert mock_client.messages.stream.call_count == 2
+        assert chunks[-1] == (INCOMPLETE_ANSWER, True, "stream-exhausted")
+        assert await get_session_history("stream-exhausted") == [
+            {"role": "user", "content": "How's Hanauma?"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_closing_stream_cancels_upstream(self):
+        """Test that closing the generator mid-response closes the LLM stream."""
+        async def text_stream():
+            for text in ["Aloha", " there", " and more"]:
+                yield text
+
+        mock_stream = MagicMock()
+        mock_stream.text_stream = text_stream()
+        mock_stream_manager = MagicMock()
+        mock_stream_manager.__aenter__ = AsyncMock(return_value=mock_stream)
+        mock_stream_manager.__aexit__ = AsyncMock(return_value=False)
+
+        mock_client = MagicMock()
+        mock_client.messages.stream.return_value = mock_stream_manager
+
+        from app.services.chat_service import chat_stream, get_cancellation_stats, _turn_locks
+
+        # Typical completed answers run ~200 tokens
+        with patch.dict("app.services.chat_service._turn_stats", {
+            "completed_turns": 1, "completed_output_tokens": 200,
+            "cancelled_turns": 0, "output_tokens_saved_estimate": 0
+        }), patch("app.services.chat_service.get_client", return_value=mock_client):
+            with patch("app.services.chat_service.build_system_prompt") as mock_system:
+                mock_system.return_value = [{"type": "text", "text": "System"}]
+
+                stream = chat_stream("Hello", session_id="stream-closed")
+                assert (await stream.__anext__())[0] == "Aloha"
+                await stream.aclose()
+
+            stats = get_cancellation_stats()
+
+        mock_stream_manager.__aexit__.assert_awaited_once()
+        assert stats["cancelled_turns"] == 1
+        assert stats["output_tokens_saved_estimate"] == 198
+        assert "stream-closed" not in _turn_locks
+
+class TestAnswerCaching:
+    """Tests for serving repeated first-turn questions from the answer cache."""
+
+    def setup_method(self):
+        """Clear sessions and cached answers before each test."""
+        from app.services.answer_cache import get_answer_cache
+        _sessions.clear()
+        get_answer_cache().clear()
+
+    @staticmethod
+    def _patches(mock_client):
+        return (
+            patch("app.services.chat_service.settings.chat_answer_cache", True),
+            patch("app.services.chat_service.get_client", return_value=mock_client),
+            patch("app.services.chat_service.build_system_prompt",
+                  AsyncMock(return_value=[{"type": "text", "text": "System"}])),
+            patch("app.services.chat_service.get_current_conditions", AsyncMock(return_value=[])),
+            patch("app.services.chat_service.get_data_version", return_value=7),
+        )
+
+    @pytest.mark.asyncio
+    async def test_repeated_first_question_skips_model(self):
+        """Test that a second session asking the same question gets the cached answer."""
+        mock_client = TestChat._mock_client("DHW is accumulated heat stress.")
+        p1, p2, p3, p4, p5 = self._patches(mock_client)
+
+        with p1, p2, p3, p4, p5:
+            from app.services.chat_service import chat
+            first, _ = await chat("What is DHW?", session_id="faq-1")
+            second, _ = await chat("what is dhw", session_id="faq-2")
+
+        assert first == second == "DHW is accumulated heat stress."
+        mock_client.messages.create.assert_awaited_once()
+        assert [m["content"] for m in await get_session_history("faq-2")] == [
+            "what is dhw", "DHW is accumulated heat stress."
+        ]
+
+    @pytest.mark.asyncio
+    async def test_follow_up_turns_bypass_cache(self):
+        """Test that sessions with history always reach the model."""
+        mock_client = TestChat._mock_client("Answer")
+        p1, p2, p3, p4, p5 = self._patches(mock_client)
+
+        with p1, p2, p3, p4, p5:
+            from app.services.chat_service import chat
+            await chat("What is DHW?", session_id="faq-1")
+            await chat("Earlier question", session_id="faq-2")
+            await chat("What is DHW?", session_id="faq-2")
+
+        assert mock_client.messages.create.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_new_data_snapshot_misses(self):
+        """Test that answers aren't reused across data snapshots."""
+        mock_client = TestChat._mock_client("Answer")
+        p1, p2, p3, p4, _ = self._patches(mock_client)
+
+        with p1, p2, p3, p4:
+            from app.services.chat_service import chat
+            with patch("app.services.chat_service.get_data_version", return_value=1):
+                await chat("Is it safe to snorkel today?", session_id="faq-1")
+            with patch("app.services.chat_service.get_data_version", return_value=2):
+                await chat("Is it safe to snorkel today?", session_id="faq-2")
+
+        assert mock_client.messages.create.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_unavailable_data_bypasses_cache(self):
+        """Test that answers written while ocean data is unavailable aren't cached."""
+        from app.services.answer_cache import get_answer_cache
+
+        mock_client = TestChat._mock_client("Data is unavailable right now.")
+        p1, p2, p3, p4, _ = self._patches(mock_client)
+
+        with p1, p2, p3, p4, patch("app.services.chat_service.get_data_version", return_value=None):
+            from app.services.chat_service import chat
+            await chat("Is it safe to snorkel today?", session_id="faq-1")
+            await chat("Is it safe to snorkel today?", session_id="faq-2")
+
+        assert mock_client.messages.create.await_count == 2
+        assert len(get_answer_cache()) == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_replays_cached_answer(self):
+        """Test that a cache hit on the stream endpoint is replayed as chunks."""
+        mock_client = TestChat._mock_client("Aloha! Water is 26C at most sites today, brah.")
+        p1, p2, p3, p4, p5 = self._patches(mock_client)
+
+        with p1, p2, p3, p4, p5:
+            from app.services.chat_service import chat, chat_stream
+            await chat("Howzit?", session_id="faq-1")
+            chunks = [c async for c in chat_stream("Howzit?", session_id="faq-2")]
+
+        assert len(chunks) > 2
+        assert "".join(c[0] for c in chunks) == "Aloha! Water is 26C at most sites today, brah."
+        assert chunks[-1] == ("", True, "faq-2")
+        mock_client.messages.stream.assert_not_called()
+
+class TestClientLifecycle:
+    """Tests for the shared async client."""
+
+    @pytest.mark.asyncio
+    async def test_init_and_close_client(self):
+        """Test that the client is created once and closed cleanly."""
+        from app.services import chat_service
+
+        client = chat_service.init_client()
+        assert chat_service.get_client() is client
+
+        await chat_service.close_client()
+        assert chat_service._client is None
+
+
+class TestSessionSweeper:
+    """Tests for the background session sweeper and accounting."""
+
+    def setup_method(self):
+        """Clear sessions before each test."""
+        _sessions.clear()
+
+    async def test_get_session_stats(self):
+        """Test that stats report session count and stored bytes."""
+        from app.services.chat_service import get_session_stats
+
+        await update_session("stats-session", "user", "Howzit")
+        stats = await get_session_stats()
+
+        assert stats["sessions"] == 1
+        assert stats["message_bytes"] == len("Howzit")
+        assert "evictions" in stats
+        assert "expirations" in stats
+
+    @pytest.mark.asyncio
+    async def test_sweeper_removes_idle_sessions(self):
+        """Test that the periodic sweeper drops idle sessions."""
+        import asyncio
+        from app.services import chat_service
+
+        (await get_session("idle-session"))["last_activity"] = datetime.utcnow() - timedelta(hours=48)
+        await get_session("active-session")
+
+        chat_service.start_session_sweeper(interval_seconds=0.01, max_age_hours=24)
+        await asyncio.sleep(0.05)
+        await chat_service.stop_session_sweeper()
+
+        assert "idle-session" not in _sessions
+        assert "active-session" in _sessions
+        assert chat_service._sweeper_task is None
+
+
+class TestRollingSummary:
+    """Tests for summarizing turns evicted from session history."""
+
+    def setup_method(self):
+        """Clear sessions before each test."""
+        _sessions.clear()
+
+    @pytest.mark.asyncio
+    async def test_evicted_turns_summarized_in_background(self):
+        """Test that evicted turns are folded into the session summary."""
+        from app.services import chat_service
+
+        with patch("app.services.chat_service.settings.chat_summary_mode", "extractive"), \
+                patch("app.services.chat_service.settings.chat_session_max_messages", 2):
+            await update_session("summary-session", "user", "Is Hanauma Bay open Monday?")
+            await update_session("summary-session", "assistant", "It is closed on Mondays.")
+            await update_session("summary-session", "user", "What about Tuesday?")
+
+            await chat_service._summary_tasks["summary-session"]
+
+        session = await get_session("summary-session")
+        assert session["summary"] == "- User asked: Is Hanauma Bay open Monday?"
+        assert "summary-session" not in chat_service._summary_tasks
+
+    async def test_off_by_default(self):
+        """Test that nothing is scheduled when summaries are disabled."""
+        from app.services import chat_service
+
+        with patch("app.services.chat_service.settings.chat_session_max_messages", 1):
+            await update_session("plain-session", "user", "one")
+            await update_session("plain-session", "assistant", "two")
+
+        assert "plain-session" not in chat_service._summary_tasks
+        assert (await get_session("plain-session"))["summary"] == ""
+
+    @pytest.mark.asyncio
+    async def test_turns_over_token_budget_summarized(self):
+        """Test that long turns trimmed by the token budget (under the message cap) are summarized."""
+        from app.services import chat_service
+
+        for i in range(4):
+            await update_session("long-session", "user", f"Question {i} about the reef. " + "x" * 4000)
+            await update_session("long-session", "assistant", f"Answer {i}.")
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(return_value=MagicMock(
+            content=[MagicMock(type="text", text="Reply.")],
+            stop_reason="end_turn"
+        ))
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system, \
+                patch("app.services.chat_service.settings.chat_summary_mode", "extractive"), \
+                patch("app.services.chat_service.settings.chat_history_token_budget", 1100):
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+
+            from app.services.chat_service import chat
+            await chat("Latest question", session_id="long-session")
+
+            # The summary isn't waited for: this turn still sends the dropped turns
+            first = mock_client.messages.create.call_args.kwargs
+            assert first["messages"][0]["content"].startswith("Question 0")
+            assert first["system"] == [{"type": "text", "text": "System"}]
+
+            await chat_service._summary_tasks["long-session"]
+            await chat("Next question", session_id="long-session")
+
+        expected = [
+            f"- {label}: {text}"
+            for i in range(3)
+            for label, text in (("User asked", f"Question {i} about the reef."), ("Assistant said", f"Answer {i}."))
+        ]
+        sent = mock_client.messages.create.call_args.kwargs
+        assert sent["messages"][0]["content"].startswith("Question 3")
+        assert sent["system"][-1]["text"].endswith("\n".join(expected))
+        assert "long-session" not in chat_service._unsummarized
+
+        # Dropped turns leave the stored history, so each is summarized once
+        session = await get_session("long-session")
+        assert session["summary"] == "\n".join(expected)
+        assert [m["content"][:10] for m in session["messages"]] == [
+            "Question 3", "Answer 3.", "Latest que", "Reply.", "Next quest", "Reply."
+        ]
+
+    @pytest.mark.asyncio
+    async def test_slow_summary_never_delays_the_answer(self):
+        """Test that a pending model summary neither blocks the turn nor drops its turns."""
+        from app.services import chat_service
+
+        for i in range(3):
+            await update_session("slow-session", "user", f"Question {i}. " + "x" * 4000)
+            await update_session("slow-session", "assistant", f"Answer {i}.")
+
+        release = asyncio.Event()
+
+        async def slow_summary(previous, messages):
+            await release.wait()
+            return "Summary."
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(return_value=MagicMock(
+            content=[MagicMock(type="text", text="Reply.")],
+            stop_reason="end_turn"
+        ))
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.build_system_prompt") as mock_system, \
+                patch("app.services.chat_service.summarize_turns", side_effect=slow_summary), \
+                patch("app.services.chat_service.settings.chat_summary_mode", "model"), \
+                patch("app.services.chat_service.settings.chat_history_token_budget", 1100):
+            mock_system.return_value = [{"type": "text", "text": "System"}]
+
+            from app.services.chat_service import chat
+            await asyncio.wait_for(chat("First", session_id="slow-session"), timeout=1)
+            await asyncio.wait_for(chat("Second", session_id="slow-session"), timeout=1)
+
+            # Both turns answered while the summary is pending, each with every turn
+            for call in mock_client.messages.create.call_args_list:
+                assert call.kwargs["messages"][0]["content"].startswith("Question 0")
+
+            release.set()
+            await chat_service._summary_tasks["slow-session"]
+
+        assert (await get_session("slow-session"))["summary"] == "Summary."
+        assert "slow-session" not in chat_service._unsummarized
+
+    def test_summary_appended_to_system_prompt(self):
+        """Test that the summary follows the cached system blocks."""
+        from app.services.chat_service import SUMMARY_HEADER, _with_summary
+
+        blocks = [{"type": "text", "text": "System"}]
+        result = _with_summary(blocks, "- User asked: Hi.")
+
+        assert result[0] is blocks[0]
+        assert result[-1]["text"] == SUMMARY_HEADER + "- User asked: Hi."
+        assert "cache_control" not in result[-1]
+        assert len(blocks) == 1
+
+    @pytest.mark.asyncio
+    async def test_model_summary_falls_back_to_extractive(self):
+        """Test that a failed model call still produces a summary."""
+        from app.services.chat_service import summarize_turns
+
+        mock_client = MagicMock()
+        mock_client.messages.create = AsyncMock(side_effect=Exception("overloaded"))
+
+        with patch("app.services.chat_service.get_client", return_value=mock_client), \
+                patch("app.services.chat_service.settings.chat_summary_mode", "model"):
+            summary = await summarize_turns("", [{"role": "user", "content": "Hi there."}])
+
+        assert summary == "- User asked: Hi there."
@@ -0,0 +1,138 @@
+"""
+Tests for chat tools.
+"""
+
+import json
+from datetime import date, datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.schemas import ForecastDataPoint, RiskLevel, SiteForecastResponse
+from app.services.chat_tools import TOOLS, execute_tool, get_tools, resolve_site
+
+
+class TestResolveSite:
+    """Tests for resolve_site."""
+
+    def test_by_id(self):
+        """Test lookup by site ID."""
+        assert resolve_site("sharks-cove")["name"] == "Sharks Cove"
+
+    def test_by_name_case_insensitive(self):
+        """Test lookup by site name."""
+        assert resolve_site("hanauma bay")["id"] == "hanauma-bay"
+
+    def test_partial_name(self):
+        """Test lookup by part of a name."""
+        assert resolve_site("Hanauma")["id"] == "hanauma-bay"
+
+    def test_alias(self):
+        """Test lookup by local alias."""
+        assert resolve_site("Kaimana")["id"] == "sans-souci"
+
+    def test_unknown(self):
+        """Test that unknown sites return None."""
+        assert resolve_site("Atlantis") is None
+
+
+class TestGetTools:
+    """Tests for tool definitions."""
+
+    def test_last_tool_cacheable(self):
+        """Test that the tool list ends with a cache breakpoint."""
+        tools = get_tools()
+
+        assert [t["name"] for t in tools] == [t["name"] for t in TOOLS]
+        assert tools[-1]["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in TOOLS[-1]
+
+
+class TestExecuteTool:
+    """Tests for execute_tool."""
+
+    @pytest.mark.asyncio
+    async def test_get_site_conditions(self, mock_sites_list):
+        """Test that conditions come from the cached current conditions."""
+        with patch("app.services.chat_tools.get_current_conditions", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_sites_list
+            result = json.loads(await execute_tool("get_site_conditions", {"site": "Sharks Cove"}))
+
+        assert result["site_id"] == "sharks-cove"
+        assert result["dhw"] == 5.5
+        assert result["risk_level"] == "Moderate"
+
+    @pytest.mark.asyncio
+    async def test_unknown_site(self):
+        """Test that unknown sites are reported to the model."""
+        result = json.loads(await execute_tool("get_site_conditions", {"site": "Atlantis"}))
+
+        assert "error" in result
+
+    @pytest.mark.asyncio
+    async def test_get_site_forecast_clamps_days(self):
+        """Test that forecast days are clamped to the configured maximum."""
+        forecast = SiteForecastResponse(
+            site_id="hanauma-bay",
+            site_name="Hanauma Bay",
+            forecast=[
+                ForecastDataPoint(
+                    date=date.today(),
+                    predicted_sst=26.5,
+                    predicted_dhw=2.1,
+                    predicted_risk=RiskLevel.LOW,
+                    confidence=0.9
+                )
+            ],
+            generated_at=datetime.utcnow()
+        )
+
+        with patch("app.services.chat_tools.get_site_forecast", new_callable=AsyncMock) as mock:
+            mock.return_value = forecast
+            result = json.loads(await execute_tool("get_site_forecast", {"site": "hanauma-bay", "days": 999}))
+
+        # No climatology loaded, so the short-range horizon applies
+        mock.assert_awaited_once_with("hanauma-bay", days=7)
+        assert result["forecast"][0]["risk_level"] == "Low"
+
+    @pytest.mark.asyncio
+    async def test_get_alerts(self, mock_alert):
+        """Test that alerts are summarized."""
+        with patch("app.services.chat_tools.get_active_alerts", new_callable=AsyncMock) as mock:
+            mock.return_value = [mock_alert]
+            result = json.loads(await execute_tool("get_alerts", {}))
+
+        assert result["count"] == 1
+        assert result["alerts"][0]["affected_sites"] == ["sharks-cove", "pupukea"]
+
+    @pytest.mark.asyncio
+    async def test_find_nearest_sites(self, mock_sites_list):
+        """Test that sites are ordered by distance."""
+        with patch("app.services.chat_tools.get_current_conditions", new_callable=AsyncMock) as mock:
+            mock.return_value = mock_sites_list
+            result = json.loads(await execute_tool(
+                "find_nearest_sites",
+                {"latitude": 21.27, "longitude": -157.70, "limit": 2}
+            ))
+
+        sites = result["sites"]
+        assert sites[0]["site_id"] == "hanauma-bay"
+        assert sites[0]["risk_level"] == "Low"
+        assert len(sites) == 2
+        assert sites[0]["distance_km"] <= sites[1]["distance_km"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool(self):
+        """Test that unknown tools return an error result."""
+        result = json.loads(await execute_tool("launch_submarine", {}))
+
+        assert "error" in result
+
+    @pytest.mark.asyncio
+    async def test_handler_error_returned(self):
+        """Test that handler failures are returned, not raised."""
+        with patch("app.services.chat_tools.get_active_alerts", new_callable=AsyncMock) as mock:
+            mock.side_effect = Exception("BigQuery down")
+            result = json.loads(await execute_tool("get_alerts", {}))
+
+        assert "error" in result
@@ -0,0 +1,130 @@
+"""
+Tests for climatology service.
+"""
+
+import pytest
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services.climatology_service import (
+    CLIMATOLOGY_FIELDS,
+    DAYS_PER_YEAR,
+    Climatology,
+    build_climatology,
+    get_climatology,
+    load_climatology,
+    save_climatology,
+    set_climatology,
+)
+
+
+def _seasonal_records(site_id="hanauma-bay", years=(2021, 2022, 2023)):
+    """Daily SST with a warm September and cool March."""
+    records = []
+    for year in years:
+        day = date(year, 1, 1)
+        while day.year == year:
+            doy = day.timetuple().tm_yday
+            sst = 25.5 + 1.5 * np.sin(2 * np.pi * (doy - 150) / 365)
+            records.append((site_id, day, float(sst)))
+            day += timedelta(days=1)
+    return records
+
+
+class TestBuildClimatology:
+    """Tests for build_climatology function."""
+
+    def test_table_shape(self):
+        """Test that the table covers every day of year for every site."""
+        records = _seasonal_records() + _seasonal_records("sharks-cove")
+        clim = build_climatology(records)
+
+        assert clim.site_ids == ["hanauma-bay", "sharks-cove"]
+        assert clim.table.shape == (2, DAYS_PER_YEAR, len(CLIMATOLOGY_FIELDS))
+        assert clim.table.dtype == np.float32
+
+    def test_seasonal_cycle(self):
+        """Test that the climatology follows the seasonal cycle."""
+        clim = build_climatology(_seasonal_records())
+
+        september = clim.mean_sst("hanauma-bay", date(2025, 9, 15))
+        march = clim.mean_sst("hanauma-bay", date(2025, 3, 15))
+
+        assert september > march
+
+    def test_percentiles_ordered(self):
+        """Test that percentiles bracket the median."""
+        clim = build_climatology(_seasonal_records())
+        point = clim.lookup("hanauma-bay", date(2025, 6, 1))
+
+        assert point["sst_p10"] <= point["sst_p50"] <= point["sst_p90"]
+
+    def test_maximum_monthly_mean(self):
+        """Test that MMM is the warmest monthly mean."""
+        clim = build_climatology(_seasonal_records())
+        mmm = clim.maximum_monthly_mean("hanauma-bay")
+
+        assert mmm is not None
+        assert 26.5 < mmm <= 27.0
+
+    def test_skips_missing_values(self):
+        """Test that None SST values are ignored."""
+        records = [("hanauma-bay", date(2024, 1, 1), None)] + _seasonal_records()
+        clim = build_climatology(records)
+
+        assert not np.isnan(clim.table).all()
+
+    def test_window_wraps_year_end(self):
+        """Test that day-of-year pooling wraps around December/January."""
+        records = [("hanauma-bay", date(2024, 12, 30), 25.0)]
+        clim = build_climatology(records, window_days=5)
+
+        assert clim.mean_sst("hanauma-bay", date(2025, 1, 2)) == pytest.approx(25.0)
+        assert clim.mean_sst("hanauma-bay", date(2025, 6, 1)) is None
+
+
+class TestClimatologyLookup:
+    """Tests for Climatology lookups."""
+
+    def test_unknown_site(self):
+        """Test that unknown sites return None."""
+        clim = build_climatology(_seasonal_records())
+
+        assert clim.has_site("nonexistent") is False
+        assert clim.lookup("nonexistent", date.today()) is None
+        assert clim.mean_sst("nonexistent", date.today()) is None
+        assert clim.maximum_monthly_mean("nonexistent") is None
+
+    def test_rejects_bad_shape(self):
+        """Test that a malformed table is rejected."""
+        with pytest.raises(ValueError):
+            Climatology(["a"], np.zeros((1, 10, 4)), np.zeros(1))
+
+
+class TestLoadClimatology:
+    """Tests for saving and loading the climatology archive."""
+
+    def teardown_method(self):
+        """Reset the loaded table after each test."""
+        set_climatology(None)
+
+    def test_round_trip(self, tmp_path):
+        """Test that a saved table loads back identically."""
+        clim = build_climatology(_seasonal_records())
+        path = str(tmp_path / "climatology.npz")
+        save_climatology(clim, path)
+
+        loaded = load_climatology(path)
+
+        assert loaded is get_climatology()
+        assert loaded.site_ids == clim.site_ids
+        np.testing.assert_array_equal(loaded.table, clim.table)
+        np.testing.assert_array_equal(loaded.mmm, clim.mmm)
+
+    def test_missing_file(self, tmp_path):
+        """Test that a missing archive leaves climatology unloaded."""
+        result = load_climatology(str(tmp_path / "missing.npz"))
+
+        assert result is None
+        assert get_climatology() is None
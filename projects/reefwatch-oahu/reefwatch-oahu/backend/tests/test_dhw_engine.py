@@ -0,0 +1,134 @@
+"""
+Tests for the DHW engine.
+"""
+
+import pytest
+
+import numpy as np
+
+from app.services.dhw_engine import (
+    DHW_WINDOW_DAYS,
+    DHWAccumulator,
+    dhw_contribution,
+    hotspot_from_sst,
+    propagate_dhw,
+)
+
+
+def _reference_dhw(hotspots):
+    """Direct 84-day sum of qualifying HotSpots, in °C-weeks."""
+    window = np.asarray(hotspots[-DHW_WINDOW_DAYS:], dtype=float)
+    return window[window >= 1.0].sum() / 7.0
+
+
+class TestHotspot:
+    """Tests for HotSpot helpers."""
+
+    def test_hotspot_from_sst(self):
+        """Test that HotSpot is the positive excess over MMM."""
+        result = hotspot_from_sst([27.0, 28.5, 26.0], 27.5)
+        np.testing.assert_allclose(result, [0.0, 1.0, 0.0])
+
+    def test_hotspot_nan_passthrough(self):
+        """Test that missing SST gives a missing HotSpot."""
+        assert np.isnan(hotspot_from_sst(np.nan, 27.5))
+
+    def test_contribution_threshold(self):
+        """Test that only HotSpots of at least 1°C contribute."""
+        result = dhw_contribution([0.5, 1.0, 2.5, np.nan])
+        np.testing.assert_allclose(result, [0.0, 1.0, 2.5, 0.0])
+
+
+class TestDHWAccumulator:
+    """Tests for DHWAccumulator."""
+
+    def test_matches_direct_sum(self):
+        """Test that the rolling sum matches a direct 12-week sum."""
+        rng = np.random.default_rng(42)
+        hotspots = rng.uniform(0, 3, size=200)
+        accumulator = DHWAccumulator(1)
+
+        for i, value in enumerate(hotspots):
+            dhw = accumulator.push(value)
+            assert dhw[0] == pytest.approx(_reference_dhw(hotspots[: i + 1]))
+
+    def test_vectorized_over_sites(self):
+        """Test that one accumulator tracks many sites independently."""
+        rng = np.random.default_rng(7)
+        hotspots = rng.uniform(0, 3, size=(100, 15))
+        accumulator = DHWAccumulator(15)
+
+        for day in hotspots:
+            accumulator.push(day)
+
+        expected = [_reference_dhw(hotspots[:, s]) for s in range(15)]
+        np.testing.assert_allclose(accumulator.dhw, expected)
+
+    def test_grid_shape(self):
+        """Test that the accumulator works over a 2-D grid."""
+        accumulator = DHWAccumulator((3, 4))
+        accumulator.push(np.full((3, 4), 2.0))
+
+        assert accumulator.dhw.shape == (3, 4)
+        np.testing.assert_allclose(accumulator.dhw, 2.0 / 7.0)
+
+    def test_is_warm(self):
+        """Test that the accumulator reports a full window."""
+        accumulator = DHWAccumulator(1)
+        for _ in range(DHW_WINDOW_DAYS - 1):
+            accumulator.push(0.0)
+        assert accumulator.is_warm is False
+
+        accumulator.push(0.0)
+        assert accumulator.is_warm is True
+
+    def test_old_days_drop_out(self):
+        """Test that heat stress expires after 12 weeks."""
+        accumulator = DHWAccumulator(1)
+        accumulator.push(7.0)
+        assert accumulator.dhw[0] == pytest.approx(1.0)
+
+        for _ in range(DHW_WINDOW_DAYS):
+            accumulator.push(0.0)
+        assert accumulator.dhw[0] == pytest.approx(0.0)
+
+    def test_copy_is_independent(self):
+        """Test that a copy does not share state."""
+        accumulator = DHWAccumulator(1)
+        accumulator.push(2.0)
+        clone = accumulator.copy()
+        clone.push(5.0)
+
+        assert accumulator.dhw[0] == pytest.approx(2.0 / 7.0)
+        assert clone.dhw[0] == pytest.approx(7.0 / 7.0)
+
+    def test_from_history(self):
+        """Test seeding from a HotSpot history."""
+        history = np.linspace(0, 3, 120)
+        accumulator = DHWAccumulator.from_history(history)
+
+        assert accumulator.dhw[0] == pytest.approx(_reference_dhw(history))
+
+
+class TestPropagateDhw:
+    """Tests for propagate_dhw."""
+
+    def test_no_stress_holds_then_decays(self):
+        """Test that zero forecast HotSpots only drop expiring days."""
+        history = [2.0] * 10 + [0.0] * 74
+        result = propagate_dhw(4.0, history, [0.0] * 5)
+
+        # Oldest five days (2°C each) leave the window
+        np.testing.assert_allclose(result, 4.0 - np.arange(1, 6) * 2.0 / 7.0)
+
+    def test_stress_accumulates(self):
+        """Test that forecast HotSpots add to the observed DHW."""
+        result = propagate_dhw(1.0, [0.0] * 84, [1.4] * 5)
+
+        np.testing.assert_allclose(result, 1.0 + np.arange(1, 6) * 0.2)
+
+    def test_never_negative(self):
+        """Test that propagated DHW is floored at zero."""
+        result = propagate_dhw(0.0, [3.0] * 84, [0.0] * 10)
+
+        assert (result >= 0).all()
@@ -0,0 +1,63 @@
+"""
+Tests for client-disconnect cancellation.
+"""
+
+import asyncio
+
+import pytest
+
+from app.api.disconnect import ClientDisconnected, cancel_on_disconnect, get_disconnect_stats
+
+
+class FakeRequest:
+    """Request stand-in whose receive() reports a disconnect once triggered."""
+
+    def __init__(self):
+        self.gone = asyncio.Event()
+
+    async def receive(self):
+        await self.gone.wait()
+        return {"type": "http.disconnect"}
+
+
+class TestCancelOnDisconnect:
+    """Tests for cancel_on_disconnect."""
+
+    @pytest.mark.asyncio
+    async def test_returns_result_when_client_stays(self):
+        """Test that finished work is returned normally."""
+        async def work():
+            return "done"
+
+        assert await cancel_on_disconnect(FakeRequest(), work()) == "done"
+
+    @pytest.mark.asyncio
+    async def test_propagates_work_errors(self):
+        """Test that exceptions from the work reach the caller."""
+        async def work():
+            raise ValueError("bad")
+
+        with pytest.raises(ValueError):
+            await cancel_on_disconnect(FakeRequest(), work())
+
+    @pytest.mark.asyncio
+    async def test_cancels_work_on_disconnect(self):
+        """Test that work is cancelled as soon as the client leaves."""
+        request = FakeRequest()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        before = get_disconnect_stats()["requests_cancelled"]
+        asyncio.get_running_loop().call_later(0.01, request.gone.set)
+
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(request, work())
+
+        assert cancelled.is_set()
+        assert get_disconnect_stats()["requests_cancelled"] == before + 1
@@ -0,0 +1,301 @@
+"""
+Tests for the ingestion ERDDAP transport.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "functions"))
+
+from erddap import (  # noqa: E402
+    fetch_ahead,
+    fetch_griddap,
+    fetch_griddap_windows,
+    parse_csv,
+    parse_json,
+    parse_nc,
+    plan_site_windows,
+    window_query,
+)
+
+FIXTURES = Path(__file__).parent / "data" / "erddap"
+
+
+def _fixture(fmt):
+    return (FIXTURES / f"dhw_5km_oahu.{fmt}").read_bytes()
+
+
+def _response(content=b"", status=200):
+    response = MagicMock()
+    response.content = content
+    response.status_code = status
+    if status >= 400:
+        response.raise_for_status.side_effect = Exception(f"HTTP {status}")
+    return response
+
+
+class TestParsers:
+    """Tests for the per-format parsers."""
+
+    def test_csv_matches_json(self):
+        """Test that .csv and .json responses give the same frame."""
+        from_csv = parse_csv(_fixture("csv"))
+        from_json = parse_json(_fixture("json"))
+
+        pd.testing.assert_frame_equal(from_csv, from_json)
+
+    def test_typed_columns(self):
+        """Test that coordinates and variables come out as float64, time as UTC."""
+        df = parse_csv(_fixture("csv"))
+
+        assert str(df["time"].dt.tz) == "UTC"
+        for column in ["latitude", "longitude", "CRW_SST", "CRW_DHW"]:
+            assert df[column].dtype == np.float64
+
+    def test_land_cells_are_nan(self):
+        """Test that masked cells parse as NaN in both formats."""
+        from_csv = parse_csv(_fixture("csv"))
+        from_json = parse_json(_fixture("json"))
+
+        assert from_csv["CRW_SST"].isna().any()
+        np.testing.assert_array_equal(from_csv["CRW_SST"].isna(), from_json["CRW_SST"].isna())
+
+    def test_json_without_table(self):
+        """Test that a JSON body without a table gives an empty frame."""
+        assert parse_json(b'{"error": "none"}').empty
+
+    def test_nc_matches_json(self, tmp_path):
+        """Test that a netCDF grid expands to the same rows as the table formats."""
+        netCDF4 = pytest.importorskip("netCDF4")
+        table = parse_json(_fixture("json"))
+        times = table["time"].unique()
+        lats = table["latitude"].unique()
+        lons = table["longitude"].unique()
+
+        path = tmp_path / "dhw.nc"
+        with netCDF4.Dataset(path, "w", format="NETCDF3_64BIT_OFFSET") as dataset:
+            for name, values in [("time", times), ("latitude", lats), ("longitude", lons)]:
+                dataset.createDimension(name, len(values))
+            dataset.createVariable("time", "f8", ("time",))[:] = (
+                pd.DatetimeIndex(times).asi8 // 10**9
+            )
+            dataset.createVariable("latitude", "f8", ("latitude",))[:] = lats
+            dataset.createVariable("longitude", "f8", ("longitude",))[:] = lons
+            for name in ["CRW_SST", "CRW_SSTANOMALY", "CRW_HOTSPOT", "CRW_DHW"]:
+                variable = dataset.createVariable(
+                    name, "f4", ("time", "latitude", "longitude"), fill_value=-999.0
+                )
+                values = table[name].to_numpy().reshape(len(times), len(lats), len(lons))
+                variable[:] = np.where(np.isnan(values), -999.0, values)
+
+        df = parse_nc(path.read_bytes())
+
+        pd.testing.assert_frame_equal(df, table, check_exact=False, rtol=1e-6, check_dtype=False)
+
+
+class TestFetchGriddap:
+    """Tests for fetch_griddap."""
+
+    def test_requests_preferred_format(self):
+        """Test that the compact format is requested and parsed."""
+        with patch("erddap.requests.get", return_value=_response(_fixture("csv"))) as get:
+            df = fetch_griddap("https://example.org/griddap/dhw_5km", "CRW_SST[0]", fmt="csv")
+
+        assert get.call_args[0][0] == "https://example.org/griddap/dhw_5km.csv?CRW_SST[0]"
+        assert len(df) == 980
+
+    def test_falls_back_to_json(self):
+        """Test that a failed compact request is retried as .json."""
+        responses = [_response(status=500), _response(_fixture("json"))]
+        with patch("erddap.requests.get", side_effect=responses) as get:
+            df = fetch_griddap("https://example.org/griddap/dhw_5km", "q", fmt="csv")
+
+        assert get.call_args[0][0].endswith(".json?q")
+        assert len(df) == 980
+
+    def test_json_failure_raises(self):
+        """Test that a failed fallback surfaces the error (for the retry decorator)."""
+        with patch("erddap.requests.get", return_value=_response(status=500)):
+            with pytest.raises(Exception, match="HTTP 500"):
+                fetch_griddap("https://example.org/griddap/dhw_5km", "q", fmt="csv")
+
+    def test_unknown_format(self):
+        """Test that an unsupported format is rejected."""
+        with pytest.raises(ValueError):
+            fetch_griddap("https://example.org/griddap/dhw_5km", "q", fmt="xml")
+
+
+def _cells(windows, step=0.05):
+    return sum(
+        (round((lat_max - lat_min) / step) + 1) * (round((lon_max - lon_min) / step) + 1)
+        for lat_min, lat_max, lon_min, lon_max in windows
+    )
+
+
+class TestPlanSiteWindows:
+    """Tests for the site window planner."""
+
+    def test_windows_cover_site_neighbourhoods(self):
+        """Test that every site's cell and two cells either side fall in some window."""
+        site_lat, site_lon = [21.2693, 21.6447, 21.3558], [-157.6943, -158.0631, -158.1467]
+        windows = plan_site_windows(site_lat, site_lon, 0.05, origin=0.025, margin_cells=2)
+
+        for lat, lon in zip(site_lat, site_lon):
+            cell_lat = 0.025 + round((lat - 0.025) / 0.05) * 0.05
+            cell_lon = 0.025 + round((lon - 0.025) / 0.05) * 0.05
+            assert any(
+                w[0] <= cell_lat - 0.1 + 1e-9 and cell_lat + 0.1 - 1e-9 <= w[1]
+                and w[2] <= cell_lon - 0.1 + 1e-9 and cell_lon + 0.1 - 1e-9 <= w[3]
+                for w in windows
+            )
+
+    def test_windows_snapped_to_grid(self):
+        """Test that window edges fall on grid cell centres."""
+        windows = plan_site_windows([21.2693], [-157.6943], 0.05, origin=0.025, margin_cells=1)
+
+        assert windows == [(21.225, 21.325, -157.725, -157.625)]
+
+    def test_nearby_sites_share_a_window(self):
+        """Test that overlapping neighbourhoods are fetched in one request."""
+        windows = plan_site_windows([21.6447, 21.6439], [-158.0631, -158.0678], 0.05, 0.025)
+        assert len(windows) == 1
+
+    def test_bytes_scale_with_sites_not_area(self):
+        """Test that sites on distant islands don't pull in the ocean between them."""
+        rng = np.random.default_rng(1)
+        islands = [(21.45, -157.97), (22.05, -159.5), (20.8, -156.3), (19.6, -155.5)]
+        site_lat = np.concatenate([lat + rng.normal(0, 0.1, 20) for lat, _ in islands])
+        site_lon = np.concatenate([lon + rng.normal(0, 0.1, 20) for _, lon in islands])
+
+        windows = plan_site_windows(site_lat, site_lon, 0.05, 0.025)
+        box = [(site_lat.min(), site_lat.max(), site_lon.min(), site_lon.max())]
+
+        assert len(windows) >= len(islands)
+        assert _cells(windows) < _cells(box) / 4
+
+    def test_windows_clipped_to_bounds(self):
+        """Test that margins don't reach past the configured bounds."""
+        windows = plan_site_windows(
+            [21.2693, 21.7069], [-157.6943, -157.9922], 0.05, 0.025,
+            bounds=(21.2, 21.7, -158.3, -157.6)
+        )
+
+        assert min(w[0] for w in windows) >= 21.2
+        assert max(w[1] for w in windows) <= 21.7
+        assert max(w[3] for w in windows) <= -157.6
+
+    def test_no_sites(self):
+        """Test that no sites plan no requests."""
+        assert plan_site_windows([], [], 0.05) == []
+
+
+class TestFetchGriddapWindows:
+    """Tests for concurrent window fetching."""
+
+    def test_stitches_windows(self):
+        """Test that windows are fetched separately and stitched without duplicates."""
+        grid = parse_json(_fixture("json"))
+        windows = [(21.225, 21.375, -158.275, -158.125), (21.325, 21.475, -158.175, -158.025)]
+
+        def fake_fetch(endpoint, query, fmt, timeout):
+            window = next(w for w in windows if window_query(["CRW_SST"], "[0]", w) == query)
+            inside = grid["latitude"].between(window[0], window[1]) & grid["longitude"].between(window[2], window[3])
+            return grid[inside].sample(frac=1, random_state=0)
+
+        with patch("erddap.fetch_griddap", side_effect=fake_fetch) as fetch:
+            df = fetch_griddap_windows("https://example.org/griddap/dhw_5km", ["CRW_SST"], "[0]", windows)
+
+        assert fetch.call_count == 2
+        assert not df.duplicated(["time", "latitude", "longitude"]).any()
+        assert len(df) == 7 * (16 + 16 - 4)
+        assert df.equals(df.sort_values(["time", "latitude", "longitude"]).reset_index(drop=True))
+
+    def test_no_windows(self):
+        """Test that an empty plan fetches nothing."""
+        with patch("erddap.fetch_griddap") as fetch:
+            assert fetch_griddap_windows("https://example.org", ["CRW_SST"], "[0]", []).empty
+        fetch.assert_not_called()
+
+
+class TestFetchAhead:
+    """Tests for ordered fetch-ahead."""
+
+    def test_results_in_order(self):
+        """Test that results come back in input order even when later fetches finish first."""
+        def fetch(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 10
+
+        assert list(fetch_ahead(range(5), fetch, max_workers=3)) == [(i, i * 10) for i in range(5)]
+
+    def test_exceptions_passed_through(self):
+        """Test that a failed fetch is yielded as its exception and the rest still run."""
+        def fetch(item):
+            if item == 1:
+                raise ValueError("no data")
+            return item
+
+        results = list(fetch_ahead([0, 1, 2], fetch, max_workers=2))
+
+        assert [item for item, _ in results] == [0, 1, 2]
+        assert isinstance(results[1][1], ValueError)
+        assert [results[0][1], results[2][1]] == [0, 2]
+
+    def test_bounded_in_flight(self):
+        """Test that at most max_workers fetches run at once."""
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def fetch(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return item
+
+        assert len(list(fetch_ahead(range(8), fetch, max_workers=2))) == 8
+        assert peak[0] <= 2
+
+    def test_no_fetches_after_deadline(self):
+        """Test that items left when the deadline passes are never fetched."""
+        fetched = []
+
+        def fetch(item):
+            fetched.append(item)
+            time.sleep(0.02)
+            return item
+
+        deadline = time.monotonic() + 0.05
+        results = list(fetch_ahead(range(20), fetch, max_workers=1, deadline=deadline))
+
+        assert 0 < len(results) < 20
+        assert [item for item, _ in results] == fetched == list(range(len(fetched)))
+
+    def test_close_does_not_wait_for_running_fetches(self):
+        """Test that leaving early returns without waiting for fetches still in flight."""
+        release = threading.Event()
+
+        def fetch(item):
+            if item > 0:
+                release.wait(5)
+            return item
+
+        results = fetch_ahead(range(10), fetch, max_workers=3)
+        assert next(results) == (0, 0)
+
+        started = time.monotonic()
+        results.close()
+        elapsed = time.monotonic() - started
+        release.set()
+
+        assert elapsed < 1
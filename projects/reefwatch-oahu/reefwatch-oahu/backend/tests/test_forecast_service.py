@@ -6,12 +6,15 @@ import pytest
 from datetime import date, timedelta
 from unittest.mock import AsyncMock, patch
 
+from app.core.config import get_settings
 from app.models.schemas import RiskLevel, HistoricalDataPoint
 from app.services.forecast_service import (
     _calculate_risk_from_dhw,
     _simple_persistence_forecast,
 )
 
+settings = get_settings()
+
 
 class TestCalculateRiskFromDhw:
     """Tests for _calculate_risk_from_dhw function."""
@@ -126,6 +129,60 @@ class TestSimplePersistenceForecast:
         result = _simple_persistence_forecast(sst, dhw, 3)
         assert len(result) == 3
 
+    def test_extended_range_relaxes_to_climatology(self):
+        """Test that long leads converge on the climatological mean."""
+        sst = [28.0, 28.2, 28.4, 28.6, 28.8, 29.0, 29.2]
+        dhw = [2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0]
+        climatology = [26.0] * 30
+
+        result = _simple_persistence_forecast(sst, dhw, 30, climatology_sst=climatology)
+
+        assert len(result) == 30
+        assert abs(result[-1]["predicted_sst"] - 26.0) < abs(result[0]["predicted_sst"] - 26.0)
+        assert result[-1]["predicted_sst"] == pytest.approx(26.0, abs=0.2)
+
+    def test_missing_climatology_days_use_persistence(self):
+        """Test that days without climatology fall back to persistence."""
+        sst = [26.0] * 7
+        dhw = [2.0] * 7
+
+        with_gaps = _simple_persistence_forecast(sst, dhw, 3, climatology_sst=[None, None, None])
+        without = _simple_persistence_forecast(sst, dhw, 3)
+
+        assert [p["predicted_sst"] for p in with_gaps] == [p["predicted_sst"] for p in without]
+
+    def test_extended_range_dhw_held(self):
+        """Test that the DHW trend is not extrapolated past the short range."""
+        sst = [27.0] * 7
+        dhw = [1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0]
+
+        result = _simple_persistence_forecast(sst, dhw, 30)
+
+        assert result[7]["predicted_dhw"] <= result[6]["predicted_dhw"]
+        assert result[-1]["predicted_dhw"] == result[7]["predicted_dhw"]
+
+    def test_dhw_propagated_from_hotspots(self):
+        """Test that a known MMM drives DHW through predicted HotSpots."""
+        sst = [28.5] * 7
+        dhw = [3.0] * 7
+        hotspot = [0.0] * 84
+
+        # SST stays 1.4°C above MMM, adding 0.2 °C-weeks per day
+        result = _simple_persistence_forecast(
+            sst, dhw, 5, mmm=27.1, recent_hotspot=hotspot
+        )
+
+        assert [p["predicted_dhw"] for p in result] == [3.2, 3.4, 3.6, 3.8, 4.0]
+
+    def test_dhw_propagation_below_mmm(self):
+        """Test that SST below MMM adds no heat stress."""
+        sst = [26.0] * 7
+        dhw = [1.0] * 7
+
+        result = _simple_persistence_forecast(sst, dhw, 5, mmm=27.5, recent_hotspot=[0.0] * 84)
+
+        assert all(p["predicted_dhw"] == 1.0 for p in result)
+
 
 class TestGetSiteForecast:
     """Tests for get_site_forecast function."""
@@ -169,6 +226,62 @@ class TestGetSiteForecast:
             for point in result.forecast:
                 assert point.confidence == 0.2
 
+    @pytest.mark.asyncio
+    async def test_get_site_forecast_uses_loaded_climatology(self):
+        """Test that a loaded climatology drives the no-history fallback."""
+        from app.services.climatology_service import build_climatology, set_climatology
+
+        start = date.today() - timedelta(days=400)
+        records = [("hanauma-bay", start + timedelta(days=i), 25.0) for i in range(800)]
+        set_climatology(build_climatology(records))
+
+        try:
+            with patch("app.services.forecast_service.get_site_history") as mock_history:
+                mock_history.return_value = []
+
+                from app.services.forecast_service import get_site_forecast
+                result = await get_site_forecast("hanauma-bay", 30)
+
+                assert len(result.forecast) == 30
+                assert all(p.predicted_sst == 25.0 for p in result.forecast)
+        finally:
+            set_climatology(None)
+
+
+    @pytest.mark.asyncio
+    async def test_get_site_forecast_capped_without_climatology(self):
+        """Test that without climatology the forecast stops at the short-range horizon."""
+        with patch("app.services.forecast_service.get_site_history") as mock_history:
+            mock_history.return_value = [
+                HistoricalDataPoint(date=date.today() - timedelta(days=i), sst=26.0, dhw=2.0)
+                for i in range(14)
+            ]
+
+            from app.services.forecast_service import get_site_forecast
+            result = await get_site_forecast("hanauma-bay", 30)
+
+            assert len(result.forecast) == settings.forecast_days
+
+
+class TestMaxForecastDays:
+    """Tests for max_forecast_days."""
+
+    def test_with_and_without_climatology(self):
+        """Test the horizon for a loaded table, a site it lacks, and no table."""
+        from app.services.climatology_service import build_climatology, set_climatology
+        from app.services.forecast_service import max_forecast_days
+
+        assert max_forecast_days() == settings.forecast_days
+
+        start = date.today() - timedelta(days=400)
+        set_climatology(build_climatology([("hanauma-bay", start + timedelta(days=i), 25.0) for i in range(800)]))
+        try:
+            assert max_forecast_days() == settings.forecast_max_days
+            assert max_forecast_days("hanauma-bay") == settings.forecast_max_days
+            assert max_forecast_days("sharks-cove") == settings.forecast_days
+        finally:
+            set_climatology(None)
+
 
 class TestGetAllForecasts:
     """Tests for get_all_forecasts function."""
@@ -233,3 +346,104 @@ class TestGetBestSitesForDate:
             result = await get_best_sites_for_date(target)
 
             assert isinstance(result, list)
+
+
+class TestRankSitesForRange:
+    """Tests for rank_sites_for_range function."""
+
+    @staticmethod
+    def _forecast(site_id, risks, confidence=0.9):
+        from datetime import datetime
+        from app.models.schemas import SiteForecastResponse, ForecastDataPoint
+
+        return SiteForecastResponse(
+            site_id=site_id,
+            site_name=site_id,
+            forecast=[
+                ForecastDataPoint(
+                    date=date.today() + timedelta(days=i + 1),
+                    predicted_sst=26.0,
+                    predicted_dhw=2.0,
+                    predicted_risk=risk,
+                    confidence=confidence
+                )
+                for i, risk in enumerate(risks)
+            ],
+            generated_at=datetime.utcnow()
+        )
+
+    @pytest.mark.asyncio
+    async def test_ranks_every_day_from_one_forecast(self):
+        """Test that one forecast run yields a ranking per day."""
+        with patch("app.services.forecast_service.get_all_forecasts", new_callable=AsyncMock) as mock_forecasts:
+            mock_forecasts.return_value = [
+                self._forecast("hanauma-bay", [RiskLevel.LOW, RiskLevel.HIGH, RiskLevel.LOW]),
+                self._forecast("sharks-cove", [RiskLevel.MODERATE, RiskLevel.LOW, RiskLevel.LOW]),
+            ]
+
+            from app.services.forecast_service import rank_sites_for_range
+            start = date.today() + timedelta(days=1)
+            result = await rank_sites_for_range(start, start + timedelta(days=2))
+
+            mock_forecasts.assert_awaited_once()
+            assert [d.date for d in result] == [start + timedelta(days=i) for i in range(3)]
+            assert result[0].sites[0].site_id == "hanauma-bay"
+            assert result[1].sites[0].site_id == "sharks-cove"
+            assert [s.rank for s in result[0].sites] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_top_k(self):
+        """Test that top_k limits sites per day."""
+        with patch("app.services.forecast_service.get_all_forecasts", new_callable=AsyncMock) as mock_forecasts:
+            mock_forecasts.return_value = [
+                self._forecast("hanauma-bay", [RiskLevel.LOW]),
+                self._forecast("sharks-cove", [RiskLevel.LOW]),
+                self._forecast("waimea-bay", [RiskLevel.LOW]),
+            ]
+
+            from app.services.forecast_service import rank_sites_for_range
+            start = date.today() + timedelta(days=1)
+            result = await rank_sites_for_range(start, start, top_k=2)
+
+            assert len(result[0].sites) == 2
+
+    @pytest.mark.asyncio
+    async def test_filters_restrict_forecast(self):
+        """Test that type filters are applied before forecasting."""
+        from app.models.schemas import SiteType
+
+        with patch("app.services.forecast_service.get_all_forecasts", new_callable=AsyncMock) as mock_forecasts:
+            mock_forecasts.return_value = [self._forecast("hanauma-bay", [RiskLevel.LOW])]
+
+            from app.services.forecast_service import rank_sites_for_range
+            start = date.today() + timedelta(days=1)
+            await rank_sites_for_range(start, start, site_type=SiteType.BAY)
+
+            site_ids = mock_forecasts.await_args.kwargs["site_ids"]
+            assert set(site_ids) == {"hanauma-bay", "waimea-bay"}
+
+    @pytest.mark.asyncio
+    async def test_distance_breaks_ties(self):
+        """Test that closer sites rank higher when risk is equal."""
+        with patch("app.services.forecast_service.get_all_forecasts", new_callable=AsyncMock) as mock_forecasts:
+            mock_forecasts.return_value = [
+                self._forecast("hanauma-bay", [RiskLevel.LOW]),
+                self._forecast("sharks-cove", [RiskLevel.LOW]),
+            ]
+
+            from app.services.forecast_service import rank_sites_for_range
+            start = date.today() + timedelta(days=1)
+            # Near Sharks Cove on the North Shore
+            result = await rank_sites_for_range(start, start, latitude=21.64, longitude=-158.06)
+
+            assert result[0].sites[0].site_id == "sharks-cove"
+            assert result[0].sites[0].distance_km < result[0].sites[1].distance_km
+
+    @pytest.mark.asyncio
+    async def test_invalid_range(self):
+        """Test that past or inverted ranges return nothing."""
+        from app.services.forecast_service import rank_sites_for_range
+
+        today = date.today()
+        assert await rank_sites_for_range(today, today + timedelta(days=2)) == []
+        assert await rank_sites_for_range(today + timedelta(days=3), today + timedelta(days=1)) == []
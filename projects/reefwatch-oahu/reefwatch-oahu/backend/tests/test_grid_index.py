@@ -0,0 +1,194 @@
+"""
+Tests for the ingestion site-to-grid-cell mapping.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "functions"))
+
+from grid_index import (  # noqa: E402
+    build_grid_index,
+    build_grid_weights,
+    get_grid_index,
+    get_grid_weights,
+)
+
+
+def _grid(lat_min=21.2, lat_max=21.7, lon_min=-158.3, lon_max=-157.6, step=0.05):
+    """Rows of a regular grid in ERDDAP order (latitude outer, longitude inner)."""
+    lats = np.arange(lat_min, lat_max + step / 2, step)
+    lons = np.arange(lon_min, lon_max + step / 2, step)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    return grid_lat.ravel(), grid_lon.ravel()
+
+
+def _reference_rows(grid_lat, grid_lon, site_lat, site_lon):
+    """Per-site Euclidean argmin, as the interpolator used to do it."""
+    return np.array([
+        np.argmin((grid_lat - lat) ** 2 + (grid_lon - lon) ** 2)
+        for lat, lon in zip(site_lat, site_lon)
+    ])
+
+
+def _sites(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(21.15, 21.75, count), rng.uniform(-158.35, -157.55, count)
+
+
+class TestBuildGridIndex:
+    """Tests for build_grid_index."""
+
+    def test_regular_grid_matches_reference(self):
+        """Test that index arithmetic picks the same cells as a full search."""
+        grid_lat, grid_lon = _grid()
+        site_lat, site_lon = _sites(500)
+
+        index = build_grid_index(grid_lat, grid_lon, site_lat, site_lon)
+        expected = _reference_rows(grid_lat, grid_lon, site_lat, site_lon)
+
+        np.testing.assert_allclose(
+            index.distances,
+            np.hypot(grid_lat[expected] - site_lat, grid_lon[expected] - site_lon)
+        )
+
+    def test_shuffled_rows(self):
+        """Test that rows don't have to arrive in grid order."""
+        grid_lat, grid_lon = _grid()
+        order = np.random.default_rng(1).permutation(len(grid_lat))
+        site_lat, site_lon = _sites(50)
+
+        index = build_grid_index(grid_lat[order], grid_lon[order], site_lat, site_lon)
+        plain = build_grid_index(grid_lat, grid_lon, site_lat, site_lon)
+
+        np.testing.assert_array_equal(order[index.rows], plain.rows)
+
+    def test_irregular_grid_falls_back(self):
+        """Test that a grid with missing cells still maps to the nearest one."""
+        grid_lat, grid_lon = _grid()
+        keep = np.random.default_rng(2).random(len(grid_lat)) > 0.3
+        grid_lat, grid_lon = grid_lat[keep], grid_lon[keep]
+        site_lat, site_lon = _sites(200)
+
+        index = build_grid_index(grid_lat, grid_lon, site_lat, site_lon)
+
+        np.testing.assert_array_equal(
+            index.rows, _reference_rows(grid_lat, grid_lon, site_lat, site_lon)
+        )
+
+    def test_sites_outside_grid_clamped(self):
+        """Test that a site beyond the grid maps to the edge cell."""
+        grid_lat, grid_lon = _grid()
+        index = build_grid_index(grid_lat, grid_lon, [22.5], [-157.0])
+
+        row = index.rows[0]
+        assert np.isclose(grid_lat[row], grid_lat.max())
+        assert np.isclose(grid_lon[row], grid_lon.max())
+
+    def test_gather_all_variables(self):
+        """Test that a 2D per-cell array is gathered row-wise for every site."""
+        grid_lat, grid_lon = _grid()
+        values = np.column_stack([grid_lat, grid_lon])
+        index = build_grid_index(grid_lat, grid_lon, [21.3], [-157.8])
+
+        np.testing.assert_allclose(index.gather(values), [[21.3, -157.8]], atol=1e-9)
+
+
+class TestBuildGridWeights:
+    """Tests for the NaN-aware interpolation weights."""
+
+    def test_idw_skips_land_cells(self):
+        """Test that a site whose nearest cell is land gets ocean values."""
+        grid_lat, grid_lon = _grid()
+        values = np.full(len(grid_lat), 27.0)
+        nearest = build_grid_index(grid_lat, grid_lon, [21.27], [-157.69]).rows[0]
+        valid = np.ones(len(grid_lat), dtype=bool)
+        valid[nearest] = False
+        values[nearest] = np.nan
+
+        weights = build_grid_weights(grid_lat, grid_lon, valid, [21.27], [-157.69], mode="idw")
+
+        assert nearest not in weights.rows[0]
+        np.testing.assert_allclose(weights.interpolate(values), [27.0])
+        assert weights.distances[0] > 0
+
+    def test_idw_exact_hit(self):
+        """Test that a site on a cell centre takes that cell's value."""
+        grid_lat, grid_lon = _grid()
+        valid = np.ones(len(grid_lat), dtype=bool)
+        weights = build_grid_weights(grid_lat, grid_lon, valid, [grid_lat[7]], [grid_lon[7]])
+
+        np.testing.assert_allclose(weights.interpolate(np.arange(len(grid_lat), dtype=float)), [7.0])
+        assert weights.distances[0] == 0
+
+    def test_bilinear_reproduces_linear_field(self):
+        """Test that bilinear weights are exact for a linear field."""
+        grid_lat, grid_lon = _grid()
+        valid = np.ones(len(grid_lat), dtype=bool)
+        site_lat, site_lon = np.array([21.33, 21.52]), np.array([-158.01, -157.77])
+
+        weights = build_grid_weights(grid_lat, grid_lon, valid, site_lat, site_lon, mode="bilinear")
+        field = 2 * grid_lat + 3 * grid_lon
+
+        np.testing.assert_allclose(weights.interpolate(field), 2 * site_lat + 3 * site_lon)
+
+    def test_bilinear_all_land_falls_back_to_idw(self):
+        """Test that a site surrounded by land still gets a value."""
+        grid_lat, grid_lon = _grid()
+        valid = ~((np.abs(grid_lat - 21.4) < 0.06) & (np.abs(grid_lon + 157.9) < 0.06))
+
+        weights = build_grid_weights(grid_lat, grid_lon, valid, [21.41], [-157.91], mode="bilinear")
+
+        assert valid[weights.rows[0][weights.weights[0] > 0]].all()
+        assert not np.isnan(weights.interpolate(np.ones(len(grid_lat))))[0]
+
+    def test_missing_variable_renormalized(self):
+        """Test that a cell missing one variable that day is dropped for it only."""
+        grid_lat, grid_lon = _grid()
+        valid = np.ones(len(grid_lat), dtype=bool)
+        weights = build_grid_weights(grid_lat, grid_lon, valid, [21.33], [-158.01], mode="idw")
+
+        values = np.column_stack([np.full(len(grid_lat), 27.0), np.full(len(grid_lat), 1.5)])
+        values[weights.rows[0][0], 1] = np.nan
+        values[weights.rows[0], 0] = np.nan
+
+        result = weights.interpolate(values)
+        assert np.isnan(result[0, 0])
+        np.testing.assert_allclose(result[0, 1], 1.5)
+
+    def test_unknown_mode(self):
+        """Test that an unknown mode is rejected."""
+        grid_lat, grid_lon = _grid()
+        with pytest.raises(ValueError):
+            build_grid_weights(grid_lat, grid_lon, np.ones(len(grid_lat), dtype=bool), [21.3], [-157.8], mode="cubic")
+
+
+class TestGetGridIndex:
+    """Tests for the cached lookup."""
+
+    def test_same_geometry_reuses_index(self):
+        """Test that a repeated grid geometry skips the search."""
+        grid_lat, grid_lon = _grid()
+        site_lat, site_lon = _sites(10)
+
+        first = get_grid_index(grid_lat, grid_lon, site_lat, site_lon)
+        again = get_grid_index(grid_lat.copy(), grid_lon.copy(), site_lat, site_lon)
+        other = get_grid_index(grid_lat, grid_lon, site_lat[:5], site_lon[:5])
+
+        assert again is first
+        assert other is not first
+
+    def test_weights_keyed_by_land_mask(self):
+        """Test that a different land mask gets its own weights."""
+        grid_lat, grid_lon = _grid()
+        valid = np.ones(len(grid_lat), dtype=bool)
+        masked = valid.copy()
+        masked[0] = False
+
+        first = get_grid_weights(grid_lat, grid_lon, valid, [21.3], [-157.8])
+
+        assert get_grid_weights(grid_lat, grid_lon, valid.copy(), [21.3], [-157.8]) is first
+        assert get_grid_weights(grid_lat, grid_lon, masked, [21.3], [-157.8]) is not first
@@ -0,0 +1,69 @@
+"""
+Tests for language-mode detection.
+"""
+
+import csv
+from pathlib import Path
+
+import pytest
+
+from app.services.language_detector import (
+    DEFAULT_PIDGIN_MARKERS,
+    MarkerDetector,
+    get_pidgin_detector,
+    tokenize,
+)
+
+CORPUS_PATH = Path(__file__).parent / "data" / "pidgin_corpus.csv"
+
+
+def _load_corpus():
+    with open(CORPUS_PATH, newline="", encoding="utf-8") as f:
+        return [(row["text"], row["is_pidgin"] == "1") for row in csv.DictReader(f)]
+
+
+class TestTokenize:
+    """Tests for tokenize."""
+
+    def test_lowercases_and_splits_on_punctuation(self):
+        """Test that tokens are lowercase whole words."""
+        assert tokenize("Eh BRAH, howzit?!") == {"eh", "brah", "howzit"}
+
+    def test_no_partial_words(self):
+        """Test that markers inside longer words are not tokens."""
+        assert "da" not in tokenize("Today is a data day")
+
+
+class TestMarkerDetector:
+    """Tests for MarkerDetector."""
+
+    def test_score_counts_distinct_markers(self):
+        """Test that repeated markers only count once."""
+        detector = MarkerDetector({"brah", "shoots"})
+        assert detector.score("brah brah brah") == 1
+        assert detector.score("shoots brah") == 2
+
+    def test_custom_threshold(self):
+        """Test that the threshold is configurable."""
+        detector = MarkerDetector({"brah", "shoots"}, threshold=1)
+        assert detector.detect("Hey brah") is True
+
+    def test_custom_vocabulary(self):
+        """Test that the vocabulary is configurable and case-insensitive."""
+        detector = MarkerDetector({"Aloha", "Mahalo"})
+        assert detector("ALOHA and mahalo") is True
+        assert detector("brah howzit") is False
+
+    def test_matches(self):
+        """Test that matched markers are reported."""
+        detector = MarkerDetector(DEFAULT_PIDGIN_MARKERS)
+        assert detector.matches("Shoots, da water stay good!") == {"shoots", "da", "stay"}
+
+
+class TestPidginCorpus:
+    """Tests against the labelled Pidgin corpus."""
+
+    @pytest.mark.parametrize("text,expected", _load_corpus())
+    def test_corpus(self, text, expected):
+        """Test that each labelled message is classified correctly."""
+        assert get_pidgin_detector().detect(text) is expected
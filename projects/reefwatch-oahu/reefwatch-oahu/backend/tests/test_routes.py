@@ -189,14 +189,29 @@ class TestForecastEndpoints:
         response = client.get("/api/forecast?days=3")
         assert response.status_code == 200
 
+    def test_get_forecast_extended_range(self, client, mock_forecast_service):
+        """Test that climatology-blended outlooks allow up to 30 days."""
+        response = client.get("/api/forecast?days=30")
+        assert response.status_code == 200
+        mock_forecast_service.get_all_forecasts.assert_awaited_with(30)
+
     def test_get_forecast_invalid_days(self, client):
         """Test getting forecast with invalid days parameter."""
         response = client.get("/api/forecast?days=0")
         assert response.status_code == 422
 
-        response = client.get("/api/forecast?days=10")
+        response = client.get("/api/forecast?days=31")
         assert response.status_code == 422
 
+    def test_get_forecast_without_climatology(self, client, mock_forecast_service):
+        """Test that extended outlooks are rejected when no climatology is loaded."""
+        mock_forecast_service.max_forecast_days.return_value = 7
+
+        assert client.get("/api/forecast?days=7").status_code == 200
+        assert client.get("/api/forecast?days=8").status_code == 422
+        assert client.get("/api/forecast/hanauma-bay?days=30").status_code == 422
+        mock_forecast_service.get_site_forecast.assert_not_awaited()
+
     def test_get_site_forecast(self, client, mock_forecast_service):
         """Test getting forecast for a specific site."""
         response = client.get("/api/forecast/hanauma-bay")
@@ -233,6 +248,51 @@ class TestForecastEndpoints:
         response = client.get(f"/api/recommendations?target_date={far_date}")
         assert response.status_code == 400
 
+    def test_get_recommendations_range(self, client, mock_forecast_service):
+        """Test getting ranked sites for a date range."""
+        mock_forecast_service.rank_sites_for_range = AsyncMock(return_value=[])
+        start = (date.today() + timedelta(days=1)).isoformat()
+        end = (date.today() + timedelta(days=7)).isoformat()
+
+        response = client.get(
+            f"/api/recommendations/range?start_date={start}&end_date={end}"
+            "&top_k=3&type=beach&lat=21.28&lon=-157.83"
+        )
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["start_date"] == start
+        assert data["end_date"] == end
+        assert "days" in data
+        mock_forecast_service.rank_sites_for_range.assert_awaited_once()
+
+    def test_get_recommendations_range_invalid(self, client, mock_forecast_service):
+        """Test that invalid ranges and half locations return 400."""
+        today = date.today()
+        cases = [
+            (today, today + timedelta(days=2), ""),
+            (today + timedelta(days=3), today + timedelta(days=1), ""),
+            (today + timedelta(days=1), today + timedelta(days=40), ""),
+            (today + timedelta(days=1), today + timedelta(days=2), "&lat=21.3"),
+        ]
+        for start, end, extra in cases:
+            response = client.get(
+                f"/api/recommendations/range?start_date={start}&end_date={end}{extra}"
+            )
+            assert response.status_code == 400
+
+    def test_get_recommendations_range_without_climatology(self, client, mock_forecast_service):
+        """Test that ranges past the short-range horizon need a climatology."""
+        mock_forecast_service.max_forecast_days.return_value = 7
+        mock_forecast_service.rank_sites_for_range = AsyncMock(return_value=[])
+        start = date.today() + timedelta(days=1)
+
+        response = client.get(
+            f"/api/recommendations/range?start_date={start}&end_date={start + timedelta(days=10)}"
+        )
+        assert response.status_code == 400
+        mock_forecast_service.rank_sites_for_range.assert_not_awaited()
+
 
 class TestChatEndpoints:
     """Tests for the /api/chat endpoints."""
@@ -273,6 +333,85 @@ class TestChatEndpoints:
         )
         assert response.status_code == 200
 
+    def test_chat_rejected_returns_retry_after(self, client, mock_chat_service):
+        """Test that an admission rejection maps to 429 with Retry-After."""
+        from app.services.admission_controller import AdmissionRejected
+
+        mock_chat_service.chat.side_effect = AdmissionRejected(429, 3, "Too many messages")
+        response = client.post("/api/chat", json={"message": "Hello"})
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "3"
+
+    def test_chat_stream(self, client, mock_chat_service):
+        """Test that streamed chunks are sent as SSE frames."""
+        async def fake_stream(**kwargs):
+            yield ("Aloha", False, "s-1")
+            yield ("", True, "s-1")
+
+        mock_chat_service.chat_stream = fake_stream
+        response = client.post("/api/chat/stream", json={"message": "Hello"})
+
+        assert response.status_code == 200
+        assert 'data: {"content":"Aloha"}' in response.text
+        assert 'data: {"done":true,"session_id":"s-1"}' in response.text
+
+    def test_chat_stream_resumes_from_last_event_id(self, client, mock_chat_service):
+        """Test that a reconnect replays the missed frames without a new model call."""
+        calls = []
+
+        async def fake_stream(**kwargs):
+            calls.append(kwargs)
+            yield ("Aloha", False, "s-1")
+            yield (" from Hanauma", False, "s-1")
+            yield ("", True, "s-1")
+
+        mock_chat_service.chat_stream = fake_stream
+        first = client.post("/api/chat/stream", json={"message": "Hello"})
+        first_id = first.text.split("\n", 1)[0].removeprefix("id: ")
+
+        resumed = client.post(
+            "/api/chat/stream",
+            json={"message": "Hello", "session_id": "s-1"},
+            headers={"Last-Event-ID": first_id}
+        )
+
+        assert resumed.status_code == 200
+        assert len(calls) == 1
+        assert "Aloha" not in resumed.text
+        assert 'data: {"content":" from Hanauma"}' in resumed.text
+        assert 'data: {"done":true,"session_id":"s-1"}' in resumed.text
+
+    def test_chat_stream_unknown_event_id_starts_fresh(self, client, mock_chat_service):
+        """Test that an expired or unknown Last-Event-ID gets a new answer."""
+        async def fake_stream(**kwargs):
+            yield ("Aloha", False, "s-1")
+            yield ("", True, "s-1")
+
+        mock_chat_service.chat_stream = fake_stream
+        response = client.post(
+            "/api/chat/stream",
+            json={"message": "Hello"},
+            headers={"Last-Event-ID": "expired:3"}
+        )
+
+        assert response.status_code == 200
+        assert 'data: {"content":"Aloha"}' in response.text
+
+    def test_chat_stream_rejected_before_headers(self, client, mock_chat_service):
+        """Test that a rejected stream gets a real 503 instead of an SSE body."""
+        from app.services.admission_controller import AdmissionRejected
+
+        async def rejected_stream(**kwargs):
+            raise AdmissionRejected(503, 5, "Chat is busy")
+            yield
+
+        mock_chat_service.chat_stream = rejected_stream
+        response = client.post("/api/chat/stream", json={"message": "Hello"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+
     def test_chat_empty_message_fails(self, client):
         """Test that empty message fails validation."""
         response = client.post("/api/chat", json={"message": ""})
@@ -298,7 +437,7 @@ class TestChatEndpoints:
     def test_clear_nonexistent_session(self, client):
         """Test clearing nonexistent session returns 404."""
         with patch("app.api.routes.chat_service") as mock:
-            mock.clear_session.return_value = False
+            mock.clear_session = AsyncMock(return_value=False)
             response = client.delete("/api/chat/nonexistent-session")
             assert response.status_code == 404
 
@@ -327,6 +466,14 @@ class TestAdminEndpoints:
         data = response.json()
         assert "data_summary" in data
         assert "cache_info" in data
+        assert "sessions" in data["chat_sessions"]
+        assert "message_bytes" in data["chat_sessions"]
+        assert "queue_depth" in data["llm_admission"]
+        assert "hit_rate" in data["chat_answer_cache"]
+        assert "sink" in data["chat_analytics"]
+        assert "requests_cancelled" in data["disconnects"]
+        assert "cancelled_turns" in data["disconnects"]["chat"]
+        assert "resumed" in data["chat_streams"]
 
 
 class TestRootEndpoint:
@@ -0,0 +1,109 @@
+"""
+Tests for per-session turn locks.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.session_locks import KeyedLocks
+
+
+class TestKeyedLocks:
+    """Tests for KeyedLocks."""
+
+    @pytest.mark.asyncio
+    async def test_same_key_runs_in_order(self):
+        """Test that holders of one key run one at a time, in arrival order."""
+        locks = KeyedLocks()
+        events = []
+
+        async def turn(name):
+            async with locks.hold("s1"):
+                events.append(f"{name} start")
+                await asyncio.sleep(0.01)
+                events.append(f"{name} end")
+
+        await asyncio.gather(turn("first"), turn("second"), turn("third"))
+
+        assert events == [
+            "first start", "first end",
+            "second start", "second end",
+            "third start", "third end",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_in_parallel(self):
+        """Test that one session's turn doesn't block another's."""
+        locks = KeyedLocks()
+        await locks.acquire("s1")
+
+        assert await locks.acquire("s2", timeout=0.1) is True
+
+        locks.release("s1")
+        locks.release("s2")
+
+    @pytest.mark.asyncio
+    async def test_locks_dropped_when_idle(self):
+        """Test that entries exist only while a turn holds or waits."""
+        locks = KeyedLocks()
+        await locks.acquire("s1")
+        waiter = asyncio.create_task(locks.acquire("s1"))
+        await asyncio.sleep(0)
+
+        assert "s1" in locks
+        assert locks.waiting("s1") == 1
+
+        locks.release("s1")
+        await waiter
+        assert locks.waiting("s1") == 0
+
+        locks.release("s1")
+        assert "s1" not in locks
+        assert len(locks) == 0
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_false_and_cleans_up(self):
+        """Test that a timed-out waiter doesn't leave its reference behind."""
+        locks = KeyedLocks()
+        await locks.acquire("s1")
+
+        assert await locks.acquire("s1", timeout=0.01) is False
+        assert locks.waiting("s1") == 0
+
+        locks.release("s1")
+        assert len(locks) == 0
+
+    @pytest.mark.asyncio
+    async def test_release_as_timeout_fires_never_leaks(self):
+        """Test that a lock released just as a waiter times out stays usable."""
+        locks = KeyedLocks()
+        await locks.acquire("s1")
+        waiter = asyncio.create_task(locks.acquire("s1", timeout=0.01))
+        await asyncio.sleep(0)
+
+        # Block the loop past both deadlines so the release and the timeout
+        # are handled in the same iteration
+        asyncio.get_running_loop().call_later(0.005, locks.release, "s1")
+        time.sleep(0.02)
+
+        if await waiter:
+            locks.release("s1")
+        assert len(locks) == 0
+        assert await locks.acquire("s1", timeout=0.01) is True
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_cleans_up(self):
+        """Test that a cancelled waiter (e.g. client disconnect) is forgotten."""
+        locks = KeyedLocks()
+        await locks.acquire("s1")
+        waiter = asyncio.create_task(locks.acquire("s1"))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        locks.release("s1")
+        assert len(locks) == 0
@@ -0,0 +1,311 @@
+"""
+Tests for chat session stores.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.session_store import InMemorySessionStore, RedisSessionStore
+
+
+class FakeRedis:
+    """Minimal in-process stand-in for the Redis commands the store uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = self.data.setdefault(key, {})
+        if field is not None:
+            fields[field] = value
+        fields.update(mapping or {})
+
+    def hsetnx(self, key, field, value):
+        self.data.setdefault(key, {}).setdefault(field, value)
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+
+    def ltrim(self, key, start, end):
+        items = self.data.get(key, [])
+        end = len(items) if end == -1 else end + 1
+        self.data[key] = items[start:end] if start >= 0 else items[max(len(items) + start, 0):end]
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return list(items[start:] if end == -1 else items[start:end + 1])
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def hincrby(self, key, field, amount=1):
+        fields = self.data.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    def hmget(self, key, fields):
+        return [self.data.get(key, {}).get(field) for field in fields]
+
+    def hdel(self, key, *fields):
+        return sum(1 for field in fields if self.data.get(key, {}).pop(field, None) is not None)
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, *members):
+        return sum(1 for member in members if self.data.get(key, {}).pop(member, None) is not None)
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zrangebyscore(self, key, low, high):
+        low = float(low)
+        return sorted(
+            (m for m, score in self.data.get(key, {}).items() if low <= score <= float(high)),
+            key=self.data[key].get
+        ) if key in self.data else []
+
+    # No SCAN/KEYS: the store must never walk the keyspace
+
+
+class FakePipeline:
+    """Queues commands and runs them on execute()."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class TestInMemorySessionStore:
+    """Tests for InMemorySessionStore."""
+
+    def test_get_or_create(self):
+        """Test that sessions are created once and reused."""
+        store = InMemorySessionStore()
+        session = store.get_or_create("a")
+
+        assert session["messages"] == []
+        assert store.get_or_create("a") is session
+        assert len(store) == 1
+
+    def test_append_trims_history(self):
+        """Test that appends keep only the most recent messages."""
+        store = InMemorySessionStore()
+        for i in range(5):
+            store.append_message("a", "user", f"msg {i}", max_messages=3)
+
+        messages = store.get_messages("a")
+        assert [m["content"] for m in messages] == ["msg 2", "msg 3", "msg 4"]
+        assert store.total_bytes == len("msg 2") * 3
+
+    def test_append_returns_dropped(self):
+        """Test that trimmed messages are returned to the caller."""
+        store = InMemorySessionStore()
+        assert store.append_message("a", "user", "one", max_messages=1) == []
+
+        dropped = store.append_message("a", "assistant", "two", max_messages=1)
+        assert dropped == [{"role": "user", "content": "one"}]
+
+    def test_drop_oldest(self):
+        """Test that the oldest messages are removed and returned."""
+        store = InMemorySessionStore()
+        for i in range(4):
+            store.append_message("a", "user", f"msg {i}", max_messages=20)
+
+        dropped = store.drop_oldest("a", 3)
+
+        assert [m["content"] for m in dropped] == ["msg 0", "msg 1", "msg 2"]
+        assert store.get_messages("a") == [{"role": "user", "content": "msg 3"}]
+        assert store.total_bytes == len("msg 3")
+
+    def test_lru_eviction_by_count(self):
+        """Test that the least recently used session is evicted."""
+        store = InMemorySessionStore(max_sessions=2)
+        store.get_or_create("a")
+        store.get_or_create("b")
+        store.get("a")
+        store.get_or_create("c")
+
+        assert "a" in store
+        assert "b" not in store
+        assert store.evictions == 1
+
+    def test_eviction_by_bytes(self):
+        """Test that the memory limit evicts old sessions."""
+        store = InMemorySessionStore(max_bytes=100)
+        store.append_message("a", "user", "x" * 60, max_messages=20)
+        store.append_message("b", "user", "y" * 60, max_messages=20)
+
+        assert "a" not in store
+        assert "b" in store
+        assert store.total_bytes == 60
+
+    def test_ttl_expiry(self):
+        """Test that idle sessions expire on access."""
+        store = InMemorySessionStore(ttl_seconds=60)
+        session = store.get_or_create("a")
+        session["last_activity"] = datetime.utcnow() - timedelta(seconds=120)
+
+        assert store.get("a") is None
+        assert len(store) == 0
+        assert store.expirations == 1
+
+    def test_sweep(self):
+        """Test that sweep removes sessions older than max_age."""
+        store = InMemorySessionStore()
+        store.get_or_create("old")["last_activity"] = datetime.utcnow() - timedelta(hours=48)
+        store.get_or_create("new")
+
+        assert store.sweep(timedelta(hours=24)) == 1
+        assert "old" not in store
+        assert "new" in store
+
+    def test_delete(self):
+        """Test deleting a session."""
+        store = InMemorySessionStore()
+        store.append_message("a", "user", "hi", max_messages=20)
+
+        assert store.delete("a") is True
+        assert store.delete("a") is False
+        assert store.total_bytes == 0
+
+
+class TestRedisSessionStore:
+    """Tests for RedisSessionStore against a local stand-in."""
+
+    @pytest.fixture
+    def store(self):
+        return RedisSessionStore(FakeRedis(), ttl_seconds=3600, prefix="test:")
+
+    def test_get_missing(self, store):
+        """Test that unknown sessions return None."""
+        assert store.get("missing") is None
+        assert "missing" not in store
+
+    def test_round_trip(self, store):
+        """Test that messages and metadata survive a round trip."""
+        store.append_message("a", "user", "Howzit", max_messages=20)
+        store.append_message("a", "assistant", "Aloha!", max_messages=20)
+        store.update("a", pidgin_mode=True)
+
+        session = store.get("a")
+        assert session["messages"] == [
+            {"role": "user", "content": "Howzit"},
+            {"role": "assistant", "content": "Aloha!"},
+        ]
+        assert session["pidgin_mode"] is True
+        assert isinstance(session["last_activity"], datetime)
+
+    def test_messages_stored_compactly(self, store):
+        """Test that messages are stored as role-code prefixed strings."""
+        store.append_message("a", "user", "hi", max_messages=20)
+
+        assert store.client.data["test:a:msgs"] == ["uhi"]
+
+    def test_append_trims_and_refreshes_ttl(self, store):
+        """Test that appends trim history and set key TTLs."""
+        for i in range(5):
+            store.append_message("a", "user", f"msg {i}", max_messages=2)
+
+        assert [m["content"] for m in store.get_messages("a")] == ["msg 3", "msg 4"]
+        assert store.client.ttls["test:a:meta"] == 3600
+        assert store.client.ttls["test:a:msgs"] == 3600
+
+    def test_append_returns_dropped(self, store):
+        """Test that trimmed messages are returned from the transaction."""
+        assert store.append_message("a", "user", "one", max_messages=1) == []
+
+        dropped = store.append_message("a", "assistant", "two", max_messages=1)
+        assert dropped == [{"role": "user", "content": "one"}]
+
+    def test_get_or_create(self, store):
+        """Test that get_or_create persists a new session."""
+        session = store.get_or_create("a")
+
+        assert session["pidgin_mode"] is False
+        assert store.get("a") is not None
+        assert len(store) == 1
+
+    def test_delete(self, store):
+        """Test deleting a session removes both keys."""
+        store.append_message("a", "user", "hi", max_messages=20)
+
+        assert store.delete("a") is True
+        assert "test:a:meta" not in store.client.data
+        assert "test:a:msgs" not in store.client.data
+        assert store.stats()["message_bytes"] == 0
+        assert store.delete("a") is False
+
+    def test_sweep(self, store):
+        """Test that sweep removes sessions older than max_age."""
+        store.append_message("old", "user", "hi", max_messages=20)
+        store.update("old", last_activity=datetime.utcnow() - timedelta(hours=48))
+        store.append_message("new", "user", "hi", max_messages=20)
+
+        assert store.sweep(timedelta(hours=24)) == 1
+        assert store.get("old") is None
+        assert store.get("new") is not None
+
+    def test_stats(self, store):
+        """Test that stats report session count and message sizes from counters."""
+        store.append_message("a", "user", "hi", max_messages=20)
+        store.append_message("b", "assistant", "aloha", max_messages=20)
+
+        stats = store.stats()
+        assert stats["sessions"] == 2
+        assert stats["message_bytes"] == len("hi") + len("aloha")
+
+    def test_stats_follow_trims(self, store):
+        """Test that bytes of trimmed messages are subtracted."""
+        for i in range(5):
+            store.append_message("a", "user", f"msg {i}", max_messages=2)
+
+        assert store.stats()["message_bytes"] == len("msg 3") + len("msg 4")
+
+    def test_drop_oldest(self, store):
+        """Test that the oldest messages are removed and their bytes subtracted."""
+        for i in range(4):
+            store.append_message("a", "user", f"msg {i}", max_messages=20)
+
+        dropped = store.drop_oldest("a", 3)
+
+        assert [m["content"] for m in dropped] == ["msg 0", "msg 1", "msg 2"]
+        assert store.get_messages("a") == [{"role": "user", "content": "msg 3"}]
+        assert store.stats()["message_bytes"] == len("msg 3")
+
+    def test_stats_prune_sessions_expired_by_redis(self, store):
+        """Test that sessions whose keys expired server-side drop out of the counts."""
+        store.append_message("a", "user", "hi", max_messages=20)
+        store.append_message("b", "user", "aloha", max_messages=20)
+
+        # Simulate Redis expiring session a's keys after its TTL
+        del store.client.data["test:a:meta"], store.client.data["test:a:msgs"]
+        store.client.data["test:index"]["a"] -= 7200
+
+        stats = store.stats()
+        assert stats["sessions"] == 1
+        assert stats["message_bytes"] == len("aloha")
+        assert stats["expirations"] == 1
+        assert len(store) == 1
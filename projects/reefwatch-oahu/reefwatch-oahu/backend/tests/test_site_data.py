@@ -0,0 +1,225 @@
+"""
+Tests for the ingestion grid-to-site processing.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "functions"))
+
+from site_data import (  # noqa: E402
+    SITE_VARIABLES,
+    backfill_chunk,
+    bleaching_risk_columns,
+    calculate_bleaching_risk,
+    grid_days,
+    interpolate_site_data,
+    interpolate_site_days,
+    seed_grid_dhw,
+    update_grid_dhw,
+)
+
+SITES = [
+    {"name": "Hanauma Bay", "lat": 21.2693, "lon": -157.6943, "type": "bay", "description": "Bay"},
+    {"name": "Waikiki Beach", "lat": 21.2793, "lon": -157.8294, "type": "beach", "description": "Beach"},
+    {"name": "Lanikai Beach", "lat": 21.3950, "lon": -157.7181, "type": "beach", "description": "Beach"},
+]
+
+
+def _grid(n_days=3, seed=0):
+    """Multi-day CRW grid in ERDDAP order, with the same two cells land-masked every day."""
+    rng = np.random.default_rng(seed)
+    lats = np.arange(21.225, 21.45, 0.05)
+    lons = np.arange(-157.875, -157.65, 0.05)
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    frames = []
+    for day in pd.date_range("2024-08-01T12:00:00", periods=n_days, freq="D"):
+        frame = pd.DataFrame({
+            "time": day,
+            "latitude": grid_lat.ravel(),
+            "longitude": grid_lon.ravel(),
+            "CRW_SST": rng.uniform(26, 29, grid_lat.size),
+            "CRW_SSTANOMALY": rng.uniform(-1, 2, grid_lat.size),
+            "CRW_HOTSPOT": rng.uniform(0, 1.5, grid_lat.size),
+            "CRW_DHW": rng.uniform(0, 10, grid_lat.size),
+        })
+        frame.loc[[0, 7], list(SITE_VARIABLES.values())] = np.nan
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _per_day(grid_df, mode="nearest"):
+    """interpolate_site_data applied one day at a time, with the date column added."""
+    frames = []
+    for time, day_grid in grid_df.groupby("time", sort=True):
+        site_df = interpolate_site_data(day_grid.reset_index(drop=True), SITES, mode)
+        site_df.insert(0, "date", pd.Timestamp(time).strftime("%Y-%m-%d"))
+        frames.append(site_df)
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestGridDays:
+    """Tests for grid_days."""
+
+    def test_splits_days_over_shared_cells(self):
+        """Test that a multi-day grid becomes a (days, cells, variables) array."""
+        grid_df = _grid(n_days=3)
+
+        days, grid_lat, grid_lon, values = grid_days(grid_df)
+
+        assert len(days) == 3
+        assert values.shape == (3, len(grid_lat), len(SITE_VARIABLES))
+        assert len(grid_lon) == len(grid_df) // 3
+
+    def test_missing_cell_returns_none(self):
+        """Test that a day with fewer cells can't be stacked."""
+        grid_df = _grid(n_days=2).drop(index=45)
+
+        assert grid_days(grid_df) is None
+
+    def test_different_cells_return_none(self):
+        """Test that days with the same count but different cells can't be stacked."""
+        grid_df = _grid(n_days=2)
+        grid_df.loc[grid_df.index[-1], "longitude"] += 0.5
+
+        assert grid_days(grid_df) is None
+
+    def test_missing_variable_is_nan(self):
+        """Test that variables absent from the grid are NaN."""
+        _, _, _, values = grid_days(_grid(n_days=1).drop(columns="CRW_DHW"))
+
+        assert np.isnan(values[:, :, list(SITE_VARIABLES).index("dhw")]).all()
+
+
+class TestUpdateGridDhw:
+    """Tests for update_grid_dhw."""
+
+    def test_same_geometry_keeps_accumulating(self):
+        """Test that consecutive slices over one grid share the accumulator."""
+        days, grid_lat, grid_lon, values = grid_days(_grid(n_days=3))
+
+        accumulator = update_grid_dhw(None, grid_lat, grid_lon, values)
+        same = update_grid_dhw(accumulator, grid_lat.copy(), grid_lon.copy(), values.copy())
+
+        assert same is accumulator
+        assert same.days_seen == 6
+
+    def test_new_geometry_with_same_cell_count_resets(self):
+        """Test that a shifted grid of the same size starts a fresh accumulator."""
+        days, grid_lat, grid_lon, values = grid_days(_grid(n_days=3))
+        accumulator = update_grid_dhw(None, grid_lat, grid_lon, values)
+
+        shifted = update_grid_dhw(accumulator, grid_lat + 0.05, grid_lon, values.copy())
+
+        assert shifted is not accumulator
+        assert shifted.shape == accumulator.shape
+        assert shifted.days_seen == 3
+
+    def test_fills_missing_dhw_once_warm(self):
+        """Test that missing DHW is filled from the HotSpot stream after a full window."""
+        grid_lat = np.array([21.3, 21.35])
+        grid_lon = np.array([-157.8, -157.8])
+        values = np.zeros((84, 2, len(SITE_VARIABLES)))
+        values[:, :, list(SITE_VARIABLES).index("hotspot")] = 1.0
+        values[:, 0, list(SITE_VARIABLES).index("dhw")] = np.nan
+
+        update_grid_dhw(None, grid_lat, grid_lon, values)
+
+        dhw = values[:, :, list(SITE_VARIABLES).index("dhw")]
+        assert np.isnan(dhw[:-1, 0]).all()
+        assert dhw[-1, 0] == pytest.approx(12.0)
+        assert (dhw[:, 1] == 0).all()
+
+
+class TestInterpolateSiteDays:
+    """Tests for interpolate_site_days."""
+
+    @pytest.mark.parametrize("mode", ["nearest", "idw", "bilinear"])
+    def test_matches_interpolate_site_data_per_day(self, mode):
+        """Test that the stacked pass gives the same rows as one call per day."""
+        grid_df = _grid(n_days=3)
+
+        days, grid_lat, grid_lon, values = grid_days(grid_df)
+        site_df = interpolate_site_days(days, grid_lat, grid_lon, values, SITES, mode)
+
+        pd.testing.assert_frame_equal(site_df, _per_day(grid_df, mode), check_dtype=False)
+
+
+class TestBackfillChunk:
+    """Tests for backfill_chunk."""
+
+    def test_stacked_slice_matches_per_day(self):
+        """Test that a regular slice gives the same site rows as the daily path."""
+        grid_df = _grid(n_days=3)
+
+        site_df, accumulator = backfill_chunk(grid_df, None, SITES)
+
+        assert accumulator is not None
+        pd.testing.assert_frame_equal(site_df, _per_day(grid_df), check_dtype=False)
+
+    def test_falls_back_day_by_day(self):
+        """Test that a slice whose days cover different cells is processed per day."""
+        grid_df = _grid(n_days=3).drop(index=70).reset_index(drop=True)
+        assert grid_days(grid_df) is None
+
+        site_df, accumulator = backfill_chunk(grid_df, None, SITES)
+
+        assert len(site_df) == 3 * len(SITES)
+        assert list(site_df["date"].unique()) == ["2024-08-01", "2024-08-02", "2024-08-03"]
+        pd.testing.assert_frame_equal(site_df, _per_day(grid_df), check_dtype=False)
+        assert accumulator is not None
+
+
+class TestSeedGridDhw:
+    """Tests for seed_grid_dhw."""
+
+    def test_resumed_slice_matches_uninterrupted_run(self):
+        """Test that seeding from the prior 84 days of HotSpots reproduces the streamed DHW."""
+        grid_df = _grid(n_days=100)
+        grid_df["CRW_DHW"] = np.nan  # every site's DHW has to come from the HotSpot stream
+        days = sorted(grid_df["time"].unique())
+        first, last = grid_df[grid_df["time"] < days[90]], grid_df[grid_df["time"] >= days[90]]
+
+        # Uninterrupted: stream through the first 90 days, then the last slice
+        _, streamed = backfill_chunk(first.copy(), None, SITES)
+        expected, _ = backfill_chunk(last.copy(), streamed, SITES)
+
+        # Resumed: only the HotSpots of the 84 days before the slice are downloaded
+        history = first[first["time"] >= days[6]][["time", "latitude", "longitude", "CRW_HOTSPOT"]]
+        resumed, _ = backfill_chunk(last.copy(), seed_grid_dhw(history), SITES)
+        cold, _ = backfill_chunk(last.copy(), None, SITES)
+
+        pd.testing.assert_frame_equal(resumed, expected)
+        assert resumed["dhw"].notna().all()
+        assert cold["dhw"].isna().all()
+
+    def test_empty_history(self):
+        """Test that no history gives no accumulator."""
+        assert seed_grid_dhw(_grid(n_days=1).iloc[0:0]) is None
+
+
+class TestBleachingRiskColumns:
+    """Tests for bleaching_risk_columns."""
+
+    def test_matches_calculate_bleaching_risk(self):
+        """Test that every row matches the scalar calculation, including NaN inputs."""
+        dhw = [0.0, 3.99, 4.0, 7.99, 8.0, 11.99, 12.0, 20.0, np.nan, 2.0, 5.0, 13.0, np.nan]
+        anomaly = [0.5, 1.5, np.nan, 1.0, 1.01, 2.0, 0.0, 3.0, 2.0, np.nan, -0.5, 1.5, np.nan]
+
+        risk = bleaching_risk_columns(dhw, anomaly)
+
+        for i, (d, a) in enumerate(zip(dhw, anomaly)):
+            expected = calculate_bleaching_risk(d, a)
+            assert risk["risk_level"][i] == expected["risk_level"]
+            assert risk["risk_color"][i] == expected["risk_color"]
+            assert risk["risk_score"][i] == expected["risk_score"]
+
+    def test_nan_dhw_is_unknown(self):
+        """Test that missing DHW is Unknown/gray with score -1, whatever the anomaly."""
+        risk = bleaching_risk_columns([np.nan], [2.0])
+
+        assert risk.iloc[0].to_dict() == {"risk_level": "Unknown", "risk_color": "gray", "risk_score": -1}
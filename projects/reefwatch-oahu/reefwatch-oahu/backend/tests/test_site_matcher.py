@@ -0,0 +1,75 @@
+"""
+Tests for site mention matching.
+"""
+
+import time
+
+import pytest
+
+from app.core.config import OAHU_SITES
+from app.services.site_matcher import SiteMatcher, get_site_matcher
+
+
+class TestSiteMatcher:
+    """Tests for SiteMatcher."""
+
+    @pytest.fixture
+    def matcher(self):
+        return get_site_matcher()
+
+    @pytest.mark.parametrize("message,expected", [
+        ("How's Hanauma?", ["hanauma-bay"]),
+        ("Sharks Cove tomorrow?", ["sharks-cove"]),
+        ("Is Kaimana calm today?", ["sans-souci"]),
+        ("Snorkeling at Ko'olina this weekend", ["ko-olina-lagoons"]),
+        ("turtles at turtle bay?", ["kuilima-cove"]),
+        ("Waimea Bay or Three Tables?", ["three-tables", "waimea-bay"]),
+    ])
+    def test_names_and_aliases(self, matcher, message, expected):
+        """Test matching by site name and alias."""
+        assert matcher.match(message) == expected
+
+    def test_fuzzy_typo(self, matcher):
+        """Test that a one-letter typo still matches."""
+        assert matcher.match("hanuma bay conditions") == ["hanauma-bay"]
+        assert matcher.match("lanikia this morning") == ["lanikai-beach"]
+
+    def test_region(self, matcher):
+        """Test that a region expands to its sites."""
+        result = matcher.match("Where should I snorkel on the North Shore?")
+
+        assert "sharks-cove" in result
+        assert "waimea-bay" in result
+        assert "hanauma-bay" not in result
+
+    def test_no_mention(self, matcher):
+        """Test that generic questions match nothing."""
+        assert matcher.match("What is the water temperature?") == []
+        assert matcher.match("Are there sharks at the beach?") == []
+
+    def test_custom_catalog(self):
+        """Test that the matcher is built from the catalog it's given."""
+        matcher = SiteMatcher(
+            [{"id": "molokini", "name": "Molokini Crater"}],
+            aliases={"molokini": ["the crater"]}
+        )
+
+        assert matcher.match("Is the crater clear?") == ["molokini"]
+        assert matcher.match("Molokini crater trip") == ["molokini"]
+
+    def test_match_is_fast(self, matcher):
+        """Test that matching runs in microseconds per message."""
+        message = "Howzit brah, how da water stay at Sharks Cove tomorrow? Planning a trip"
+        matcher.match(message)
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            matcher.match(message)
+        per_message = (time.perf_counter() - start) / 1000
+
+        assert per_message < 500e-6
+
+    def test_all_sites_match_by_name(self, matcher):
+        """Test that every catalog name resolves to its own site."""
+        for site in OAHU_SITES:
+            assert site["id"] in matcher.match(site["name"])
@@ -0,0 +1,163 @@
+"""
+Tests for SSE framing of chat streams.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.api.sse import HEARTBEAT, encode_chat_stream, encode_event
+
+
+async def _events(chunks, delay=0.0, session_id="s-1"):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield (chunk, False, session_id)
+    yield ("", True, session_id)
+
+
+def _payloads(writes):
+    """Decode the data frames in a list of writes."""
+    payloads = []
+    for write in writes:
+        for frame in write.decode().split("\n\n"):
+            if frame.startswith("data: "):
+                payloads.append(json.loads(frame[6:]))
+    return payloads
+
+
+async def _collect(stream):
+    return [write async for write in stream]
+
+
+class TestEncodeEvent:
+    """Tests for encode_event."""
+
+    def test_escapes_quotes_and_control_characters(self):
+        """Test that awkward text round-trips through the frame."""
+        text = 'He said "aloha"\\n\ttab\x00\x1b\u2028 ʻokina'
+        frame = encode_event({"content": text})
+
+        assert frame.startswith(b"data: ")
+        assert frame.endswith(b"\n\n")
+        assert b"\n" not in frame[:-2]
+        assert json.loads(frame[6:]) == {"content": text}
+
+
+class TestEncodeChatStream:
+    """Tests for encode_chat_stream."""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_fast_deltas(self):
+        """Test that deltas arriving together share frames."""
+        chunks = ["Al", "oha", "! ", "The ", "water ", "is ", "26C ", "today."]
+        writes = await _collect(encode_chat_stream(_events(chunks), flush_interval=0.05, flush_bytes=256))
+        payloads = _payloads(writes)
+
+        # First delta immediately, the rest with the done frame
+        assert len(writes) == 2
+        assert payloads[0] == {"content": "Al"}
+        assert "".join(p.get("content", "") for p in payloads) == "".join(chunks)
+        assert payloads[-1] == {"done": True, "session_id": "s-1"}
+
+    @pytest.mark.asyncio
+    async def test_flushes_by_size(self):
+        """Test that a full byte budget is flushed without waiting."""
+        chunks = ["x" * 10] * 10
+        writes = await _collect(encode_chat_stream(_events(chunks), flush_interval=10, flush_bytes=30))
+
+        contents = [p["content"] for p in _payloads(writes) if "content" in p]
+        assert contents[0] == "x" * 10
+        assert all(len(c) <= 30 for c in contents)
+        assert "".join(contents) == "x" * 100
+
+    @pytest.mark.asyncio
+    async def test_flushes_by_time(self):
+        """Test that slow deltas are sent once the window passes."""
+        writes = await _collect(encode_chat_stream(
+            _events(["a", "b", "c"], delay=0.03), flush_interval=0.01, flush_bytes=256
+        ))
+
+        assert [p.get("content") for p in _payloads(writes)][:3] == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_when_idle(self):
+        """Test that a quiet stream gets comment heartbeats."""
+        writes = await _collect(encode_chat_stream(
+            _events(["slow"], delay=0.05), flush_interval=0.01, heartbeat_seconds=0.02
+        ))
+
+        assert HEARTBEAT in writes
+        assert _payloads(writes)[0] == {"content": "slow"}
+
+    @pytest.mark.asyncio
+    async def test_final_text_sent_before_done(self):
+        """Test that text on the final event (e.g. an error notice) is delivered."""
+        async def events():
+            yield ("Sorry, I encountered an error.", True, "s-1")
+
+        writes = await _collect(encode_chat_stream(events()))
+
+        assert len(writes) == 1
+        assert _payloads(writes) == [
+            {"content": "Sorry, I encountered an error."},
+            {"done": True, "session_id": "s-1"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_reads_ahead_only_to_buffer_limit(self):
+        """Test that a stalled client pauses the upstream stream."""
+        produced = 0
+
+        async def events():
+            nonlocal produced
+            for _ in range(100):
+                produced += 1
+                yield ("x", False, "s-1")
+            yield ("", True, "s-1")
+
+        stream = encode_chat_stream(events(), buffer_events=4)
+        await stream.__anext__()
+        await asyncio.sleep(0.02)
+
+        # One delta sent, the queue full, and one more held by the producer
+        assert produced <= 1 + 4 + 1
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_closing_encoder_closes_upstream(self):
+        """Test that a disconnect mid-stream closes the chat generator."""
+        closed = asyncio.Event()
+
+        async def events():
+            try:
+                yield ("first", False, "s-1")
+                await asyncio.sleep(10)
+                yield ("never", False, "s-1")
+            finally:
+                closed.set()
+
+        stream = encode_chat_stream(events())
+        await stream.__anext__()
+        await stream.aclose()
+
+        assert closed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_frames_tagged_with_last_event_id(self):
+        """Test that each frame carries the ID of the last event it contains."""
+        async def events():
+            yield ("Aloha", False, "s-1", "abc:1")
+            yield (" a", False, "s-1", "abc:2")
+            yield (" b", False, "s-1", "abc:3")
+            yield ("", True, "s-1", "abc:4")
+
+        writes = [w async for w in encode_chat_stream(events(), flush_interval=10)]
+
+        assert writes == [
+            b'id: abc:1\ndata: {"content":"Aloha"}\n\n',
+            b'id: abc:3\ndata: {"content":" a b"}\n\n'
+            b'id: abc:4\ndata: {"done":true,"session_id":"s-1"}\n\n',
+        ]
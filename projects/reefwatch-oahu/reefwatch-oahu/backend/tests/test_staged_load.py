@@ -0,0 +1,106 @@
+"""
+Tests for idempotent backfill reloads.
+"""
+
+import re
+import sys
+from datetime import date
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "functions"))
+
+from staged_load import MERGE_KEYS, MergedLoad, merge_query, staging_table_id  # noqa: E402
+
+TABLE = "project.reefwatch.ocean_conditions_daily"
+COLUMNS = ["date", "site_name", "sst", "dhw"]
+SITES = ["Hanauma Bay", "Sharks Cove", "Waikiki Beach"]
+
+
+class FakeBigQuery:
+    """Tables as row lists; runs the MERGE statements MergedLoad issues."""
+
+    def __init__(self):
+        self.tables = {}
+
+    def append(self, table_id, records):
+        self.tables.setdefault(table_id, []).extend(dict(r) for r in records)
+
+    def stage(self, table_id, records):
+        self.tables[table_id] = [dict(r) for r in records]
+        return MagicMock()
+
+    def query(self, sql):
+        target, source = re.match(r"MERGE `(.+?)` AS target\nUSING `(.+?)` AS source", sql).groups()
+        rows = self.tables.setdefault(target, [])
+        for new in self.tables[source]:
+            matches = [row for row in rows if all(row[k] == new[k] for k in MERGE_KEYS)]
+            for row in matches:
+                row.update(new)
+            if not matches:
+                rows.append(dict(new))
+        return MagicMock()
+
+    def delete_table(self, table_id, not_found_ok=False):
+        self.tables.pop(table_id, None)
+
+
+def _rows(days, sst):
+    return [
+        {"date": f"2024-01-{day:02d}", "site_name": site, "sst": sst, "dhw": 1.0}
+        for day in days
+        for site in SITES
+    ]
+
+
+class TestMergeQuery:
+    """Tests for merge_query."""
+
+    def test_matches_on_date_and_site(self):
+        """Test that rows are matched on (date, site_name) and only other columns are updated."""
+        sql = merge_query(TABLE, "project.reefwatch.staging", COLUMNS)
+
+        assert "ON target.date = source.date AND target.site_name = source.site_name" in sql
+        assert "UPDATE SET sst = source.sst, dhw = source.dhw" in sql
+        assert "INSERT (date, site_name, sst, dhw)" in sql
+
+    def test_staging_table_per_chunk(self):
+        """Test that each chunk gets its own staging table."""
+        assert staging_table_id(TABLE, date(2024, 1, 1), date(2024, 1, 30)) == (
+            f"{TABLE}_staging_20240101_20240130"
+        )
+
+
+class TestMergedLoad:
+    """Tests for MergedLoad."""
+
+    def test_forced_rerun_leaves_one_row_per_site_per_day(self):
+        """Test that reloading loaded dates replaces their rows instead of duplicating them."""
+        client = FakeBigQuery()
+        client.append(TABLE, _rows(range(1, 4), sst=26.0))
+
+        staging = staging_table_id(TABLE, date(2024, 1, 1), date(2024, 1, 5))
+        for _ in range(2):
+            load_job = client.stage(staging, _rows(range(1, 6), sst=27.0))
+            MergedLoad(client, load_job, TABLE, staging, COLUMNS).result()
+            load_job.result.assert_called_once()
+
+        rows = client.tables[TABLE]
+        keys = [(row["date"], row["site_name"]) for row in rows]
+        assert len(keys) == len(set(keys)) == 5 * len(SITES)
+        assert all(row["sst"] == 27.0 for row in rows)
+        assert staging not in client.tables
+
+    def test_failed_staging_load_leaves_table_untouched(self):
+        """Test that nothing is merged when the staging load fails."""
+        client = FakeBigQuery()
+        client.append(TABLE, _rows([1], sst=26.0))
+        load_job = MagicMock()
+        load_job.result.side_effect = RuntimeError("load failed")
+
+        with pytest.raises(RuntimeError):
+            MergedLoad(client, load_job, TABLE, "project.reefwatch.staging", COLUMNS).result()
+
+        assert client.tables[TABLE] == _rows([1], sst=26.0)
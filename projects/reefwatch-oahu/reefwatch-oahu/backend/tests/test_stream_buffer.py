@@ -0,0 +1,211 @@
+"""
+Tests for resumable chat stream buffering.
+"""
+
+import asyncio
+
+import pytest
+
+from app.services.stream_buffer import STREAM_ERROR, STREAM_INTERRUPTED, StreamRegistry
+
+
+def _registry(**overrides):
+    options = {"max_streams": 10, "ttl_seconds": 60, "grace_seconds": 5}
+    options.update(overrides)
+    return StreamRegistry(**options)
+
+
+def _gated_stream(chunks, gate, session_id="s-1"):
+    """Chat stream that pauses before the final event until gate is set."""
+    state = {"closed": False}
+
+    async def stream():
+        try:
+            for chunk in chunks:
+                yield (chunk, False, session_id)
+            await gate.wait()
+            yield ("", True, session_id)
+        finally:
+            state["closed"] = True
+
+    return stream(), state
+
+
+async def _drain(events):
+    return [event async for event in events]
+
+
+class TestStreamRegistry:
+    """Tests for StreamRegistry and BufferedStream."""
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_missed_chunks_then_live_tail(self):
+        """Test that a reconnect gets what it missed and the rest of the answer."""
+        registry = _registry()
+        gate = asyncio.Event()
+        stream, _ = _gated_stream(["b", "c"], gate)
+
+        buffer = registry.start(("a", False, "s-1"), stream)
+        subscriber = buffer.subscribe()
+        first = await subscriber.__anext__()
+        await subscriber.aclose()  # connection dropped after the first chunk
+
+        assert first == ("a", False, "s-1", f"{buffer.stream_id}:1")
+
+        resumed = registry.resume(first[3], "s-1")
+        asyncio.get_running_loop().call_later(0.01, gate.set)
+        events = await _drain(resumed)
+
+        assert [e[0] for e in events] == ["b", "c", ""]
+        assert events[-1][1] is True
+        assert events[-1][3] == f"{buffer.stream_id}:4"
+        assert registry.stats()["resumed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_resume_after_completion(self):
+        """Test that a finished answer can still be replayed within the TTL."""
+        registry = _registry()
+        gate = asyncio.Event()
+        gate.set()
+        stream, state = _gated_stream(["b"], gate)
+
+        buffer = registry.start(("a", False, "s-1"), stream)
+        await buffer.task
+
+        events = await _drain(registry.resume(f"{buffer.stream_id}:1"))
+        assert [e[0] for e in events] == ["b", ""]
+        assert state["closed"] is True
+
+    @pytest.mark.asyncio
+    async def test_unwatched_stream_cancelled_after_grace(self):
+        """Test that generation stops if nobody reconnects in time."""
+        registry = _registry(grace_seconds=0.01)
+        stream, state = _gated_stream(["b"], asyncio.Event())
+
+        buffer = registry.start(("a", False, "s-1"), stream)
+        subscriber = buffer.subscribe()
+        await subscriber.__anext__()
+        await subscriber.aclose()
+        await asyncio.sleep(0.05)
+
+        assert buffer.task.cancelled()
+        assert buffer.done
+        assert state["closed"] is True
+
+        # A late reconnect gets the partial answer and a terminal event
+        events = await _drain(registry.resume(f"{buffer.stream_id}:1"))
+        assert [e[:2] for e in events] == [("b", False), (STREAM_INTERRUPTED, True)]
+
+    @pytest.mark.asyncio
+    async def test_reading_pauses_for_slow_subscriber(self):
+        """Test that the model stream is read at most read_ahead events past an attached client."""
+        registry = _registry(read_ahead=2)
+        pulled = []
+
+        async def stream():
+            for chunk in "bcdefg":
+                pulled.append(chunk)
+                yield (chunk, False, "s-1")
+            yield ("", True, "s-1")
+
+        buffer = registry.start(("a", False, "s-1"), stream())
+        subscriber = buffer.subscribe()
+        await subscriber.__anext__()
+        await asyncio.sleep(0.02)
+
+        assert len(buffer.events) == 3
+        assert pulled == ["b", "c"]
+
+        events = [("a", False)] + [e[:2] async for e in subscriber]
+        assert "".join(e[0] for e in events) == "abcdefg"
+        assert events[-1] == ("", True)
+
+    @pytest.mark.asyncio
+    async def test_unwatched_stream_reads_ahead_for_reconnect(self):
+        """Test that with no client attached the answer keeps filling the buffer."""
+        registry = _registry(read_ahead=2)
+        gate = asyncio.Event()
+        stream, _ = _gated_stream(list("bcdefg"), gate)
+
+        buffer = registry.start(("a", False, "s-1"), stream)
+        subscriber = buffer.subscribe()
+        await subscriber.__anext__()
+        await subscriber.aclose()
+        await asyncio.sleep(0.02)
+
+        assert "".join(chunk for chunk, _ in buffer.events) == "abcdefg"
+        gate.set()
+        await buffer.task
+
+    @pytest.mark.asyncio
+    async def test_reconnect_within_grace_keeps_stream(self):
+        """Test that resuming before the grace period ends keeps generating."""
+        registry = _registry(grace_seconds=0.05)
+        gate = asyncio.Event()
+        stream, _ = _gated_stream(["b"], gate)
+
+        buffer = registry.start(("a", False, "s-1"), stream)
+        subscriber = buffer.subscribe()
+        await subscriber.__anext__()
+        await subscriber.aclose()
+
+        resumed = registry.resume(f"{buffer.stream_id}:1")
+        await resumed.__anext__()
+        await asyncio.sleep(0.1)
+        gate.set()
+
+        assert [e[0] for e in await _drain(resumed)] == [""]
+        assert not buffer.task.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_unknown_expired_or_foreign_streams_not_resumed(self):
+        """Test that bad IDs, expired buffers and other sessions get None."""
+        registry = _registry(ttl_seconds=0)
+        gate = asyncio.Event()
+        gate.set()
+        stream, _ = _gated_stream([], gate)
+
+        buffer = registry.start(("a", False, "s-1"), stream)
+
+        assert registry.resume("nope:1") is None
+        assert registry.resume(f"{buffer.stream_id}:x") is None
+        assert registry.resume(f"{buffer.stream_id}:1", "someone-else") is None
+
+        await buffer.task
+        await asyncio.sleep(0.001)
+        assert registry.resume(f"{buffer.stream_id}:1") is None
+        assert len(registry) == 0
+
+    @pytest.mark.asyncio
+    async def test_bounded_streams(self):
+        """Test that finished buffers are evicted first and running ones never."""
+        registry = _registry(max_streams=1)
+        gate = asyncio.Event()
+        running, _ = _gated_stream([], gate)
+
+        first = registry.start(("a", False, "s-1"), running)
+        blocked, _ = _gated_stream([], asyncio.Event())
+        assert registry.start(("a", False, "s-2"), blocked) is None
+        assert registry.stats()["unbuffered"] == 1
+        await blocked.aclose()
+
+        gate.set()
+        await first.task
+        done_gate = asyncio.Event()
+        done_gate.set()
+        later, _ = _gated_stream([], done_gate)
+        assert registry.start(("a", False, "s-3"), later) is not None
+
+    @pytest.mark.asyncio
+    async def test_upstream_error_becomes_final_event(self):
+        """Test that an exception in the chat stream ends the buffer cleanly."""
+        registry = _registry()
+
+        async def failing():
+            raise RuntimeError("boom")
+            yield
+
+        buffer = registry.start(("a", False, "s-1"), failing())
+        events = await _drain(buffer.subscribe())
+
+        assert events[-1][:2] == (STREAM_ERROR, True)
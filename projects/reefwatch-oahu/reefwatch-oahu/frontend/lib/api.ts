@@ -113,6 +113,10 @@ export async function sendChatMessage(request: ChatRequest): Promise<ChatRespons
   });
 }
 
+// Reconnect attempts after a dropped stream, resuming from the last event ID
+const STREAM_RESUME_ATTEMPTS = 3;
+const STREAM_RESUME_DELAY_MS = 1000;
+
 export async function streamChatMessage(
   request: ChatRequest,
   onChunk: (chunk: string) => void,
@@ -120,53 +124,84 @@ export async function streamChatMessage(
   onError: (error: Error) => void
 ): Promise<void> {
   const url = `${API_BASE_URL}/api/chat/stream`;
+  let lastEventId: string | null = null;
+  let attempts = 0;
 
-  try {
-    const response = await fetch(url, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify(request),
-    });
-
-    if (!response.ok) {
-      throw new ApiError(response.status, 'Stream request failed');
-    }
+  while (true) {
+    let finished = false;
 
-    const reader = response.body?.getReader();
-    if (!reader) {
-      throw new Error('No response body');
-    }
-
-    const decoder = new TextDecoder();
+    try {
+      const headers: Record<string, string> = {
+        'Content-Type': 'application/json',
+      };
+      if (lastEventId) {
+        headers['Last-Event-ID'] = lastEventId;
+      }
 
-    while (true) {
-      const { done, value } = await reader.read();
+      const response = await fetch(url, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify(request),
+      });
 
-      if (done) break;
+      if (!response.ok) {
+        throw new ApiError(response.status, 'Stream request failed');
+      }
 
-      const text = decoder.decode(value);
-      const lines = text.split('\n');
+      const reader = response.body?.getReader();
+      if (!reader) {
+        throw new Error('No response body');
+      }
 
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const data = line.slice(6);
-          try {
-            const parsed = JSON.parse(data);
-            if (parsed.done) {
-              onComplete(parsed.session_id);
-            } else if (parsed.content) {
-              onChunk(parsed.content);
+      const decoder = new TextDecoder();
+      let buffered = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+
+        if (done) break;
+
+        // Frames can span reads; keep the trailing partial line for the next one
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop() ?? '';
+
+        for (const line of lines) {
+          if (line.startsWith('id: ')) {
+            lastEventId = line.slice(4);
+          } else if (line.startsWith('data: ')) {
+            const data = line.slice(6);
+            try {
+              const parsed = JSON.parse(data);
+              if (parsed.done) {
+                finished = true;
+                onComplete(parsed.session_id);
+              } else if (parsed.content) {
+                onChunk(parsed.content);
+              }
+            } catch {
+              // Ignore parse errors for incomplete chunks
             }
-          } catch {
-            // Ignore parse errors for incomplete chunks
           }
         }
       }
+
+      if (finished || !lastEventId) return;
+      throw new Error('Stream ended early');
+    } catch (error) {
+      // Only dropped connections on a resumable stream are retried
+      const resumable =
+        lastEventId !== null &&
+        !finished &&
+        !(error instanceof ApiError) &&
+        attempts < STREAM_RESUME_ATTEMPTS;
+      if (!resumable) {
+        onError(error as Error);
+        return;
+      }
+      attempts += 1;
+      await new Promise((resolve) => setTimeout(resolve, STREAM_RESUME_DELAY_MS * attempts));
     }
-  } catch (error) {
-    onError(error as Error);
   }
 }
 
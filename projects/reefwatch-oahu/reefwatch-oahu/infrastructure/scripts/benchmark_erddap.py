@@ -0,0 +1,120 @@
+"""
+ERDDAP Transport Benchmark for ReefWatch Oahu
+
+Parses recorded dhw_5km responses for the Oahu box in each format the
+ingestion functions support and reports payload bytes, parse time and
+peak parse memory, checking that every format yields the same frame.
+.nc is included when a recorded .nc fixture exists and netCDF4 is
+installed.
+
+Usage:
+    python benchmark_erddap.py --repeat 20
+    python benchmark_erddap.py --scale 50   # text formats, ~1 year of days
+    python benchmark_erddap.py --record 2024-08-01 --days 7   # refresh fixtures
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+FUNCTIONS_DIR = Path(__file__).resolve().parents[2] / "backend" / "functions"
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / "backend" / "tests" / "data" / "erddap"
+sys.path.insert(0, str(FUNCTIONS_DIR))
+
+from erddap import ERDDAP_FORMATS, PARSERS  # noqa: E402
+
+ENDPOINT = "https://pae-paha.pacioos.hawaii.edu/erddap/griddap/dhw_5km"
+VARIABLES = ["CRW_SST", "CRW_SSTANOMALY", "CRW_HOTSPOT", "CRW_DHW"]
+BOUNDS = "[(21.2):1:(21.7)][(-158.3):1:(-157.6)]"
+
+
+def record(start: str, days: int) -> None:
+    """Download the fixture window from ERDDAP in every format."""
+    import requests
+
+    first = datetime.strptime(start, "%Y-%m-%d")
+    last = first + pd.Timedelta(days=days - 1)
+    window = f"[({first:%Y-%m-%d}T12:00:00Z):1:({last:%Y-%m-%d}T12:00:00Z)]"
+    query = ",".join(f"{variable}{window}{BOUNDS}" for variable in VARIABLES)
+
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    for fmt in ERDDAP_FORMATS:
+        response = requests.get(f"{ENDPOINT}.{fmt}?{query}", timeout=120)
+        response.raise_for_status()
+        path = FIXTURE_DIR / f"dhw_5km_oahu.{fmt}"
+        path.write_bytes(response.content)
+        print(f"Recorded {path.name}: {len(response.content)} bytes")
+
+
+def scale_fixture(fmt: str, content: bytes, scale: int) -> bytes:
+    """Repeat a text fixture's data rows, standing in for a longer window."""
+    if scale == 1:
+        return content
+    if fmt == "csv":
+        header, units, rows = content.split(b"\n", 2)
+        return header + b"\n" + units + b"\n" + rows * scale
+    if fmt == "json":
+        data = json.loads(content)
+        data["table"]["rows"] *= scale
+        return json.dumps(data).encode()
+    raise ValueError(f"Can't scale .{fmt} fixtures")
+
+
+def measure(fmt: str, content: bytes, repeat: int) -> pd.DataFrame:
+    parser = PARSERS[fmt]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = parser(content)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parser(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{fmt:>5}: {len(content):8d} bytes  {len(df):6d} rows  "
+        f"parse {statistics.median(timings) * 1000:7.2f} ms  peak {peak / 1024:8.1f} KiB"
+    )
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ERDDAP response formats for ingestion")
+    parser.add_argument("--repeat", type=int, default=20, help="Parses per format (median reported)")
+    parser.add_argument("--record", metavar="YYYY-MM-DD", help="Re-record fixtures starting at this date")
+    parser.add_argument("--days", type=int, default=7, help="Days in a recorded fixture")
+    parser.add_argument("--scale", type=int, default=1, help="Repeat text fixture rows this many times")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.days)
+
+    frames = {}
+    for fmt in ERDDAP_FORMATS:
+        path = FIXTURE_DIR / f"dhw_5km_oahu.{fmt}"
+        if not path.exists():
+            print(f"{fmt:>5}: no fixture at {path}")
+            continue
+        try:
+            frames[fmt] = measure(fmt, scale_fixture(fmt, path.read_bytes(), args.scale), args.repeat)
+        except (ImportError, ValueError) as e:
+            print(f"{fmt:>5}: skipped ({e})")
+
+    reference = frames.get("json")
+    for fmt, df in frames.items():
+        if reference is not None and fmt != "json":
+            pd.testing.assert_frame_equal(df, reference, check_exact=False, rtol=1e-6)
+    print("All formats parse to the same frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Pidgin Detector Micro-benchmark for ReefWatch Oahu
+
+Times the single-pass token/set detector against the previous
+one-regex-per-marker implementation over the labelled test corpus.
+
+Usage:
+    python benchmark_pidgin.py --repeat 2000
+"""
+
+import argparse
+import csv
+import re
+import sys
+import timeit
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.services.language_detector import get_pidgin_detector  # noqa: E402
+
+CORPUS_PATH = BACKEND_DIR / "tests" / "data" / "pidgin_corpus.csv"
+
+# Previous implementation, kept here as the baseline
+REGEX_MARKERS = [
+    r'\bbrah\b', r'\bbruddah\b', r'\bsista\b', r'\bdah\b', r'\bda\b',
+    r'\bstay\b', r'\bshoots\b', r'\brain\b', r'\brajah\b', r'\bhowzit\b',
+    r'\bchoke\b', r'\bono\b', r'\bkine\b', r'\bwea\b', r'\bwen\b',
+    r'\bmoke\b', r'\bhaole\b', r'\bkeiki\b', r'\btutu\b', r'\bpuka\b',
+    r'\bpau\b', r'\bmahalos?\b', r'\beh\b'
+]
+
+
+def detect_regex(text: str) -> bool:
+    text_lower = text.lower()
+    return sum(1 for pattern in REGEX_MARKERS if re.search(pattern, text_lower)) >= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Pidgin detector")
+    parser.add_argument("--repeat", type=int, default=2000, help="Passes over the corpus")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, newline="", encoding="utf-8") as f:
+        messages = [row["text"] for row in csv.DictReader(f)]
+
+    detector = get_pidgin_detector()
+    calls = args.repeat * len(messages)
+
+    for name, detect in (("regex-per-marker", detect_regex), ("single-pass", detector.detect)):
+        elapsed = timeit.timeit(lambda: [detect(m) for m in messages], number=args.repeat)
+        print(f"{name:>18}: {elapsed / calls * 1e6:.2f} µs/message ({calls} messages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+SSE Framing Benchmark for ReefWatch Oahu
+
+Replays a simulated model stream (short text deltas at a steady token
+rate) through the coalescing SSE encoder and through the previous
+one-frame-per-delta framing, and reports frames, writes (one socket
+send, so roughly one syscall, each) and bytes per response.
+
+Usage:
+    python benchmark_sse.py --tokens 300 --interval-ms 12
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from app.api.sse import encode_chat_stream  # noqa: E402
+
+SAMPLE_TEXT = (
+    "Aloha! Conditions look good across the South Shore today. Hanauma Bay is at "
+    "26.4°C with a DHW of 1.2, so bleaching risk is low. Remember reef-safe "
+    "sunscreen, and please don't stand on the coral. "
+)
+
+
+def make_deltas(tokens: int) -> list:
+    """Split repeated sample text into ~4-character deltas, like model output."""
+    text = SAMPLE_TEXT * (tokens * 4 // len(SAMPLE_TEXT) + 1)
+    return [text[i:i + 4] for i in range(0, tokens * 4, 4)]
+
+
+async def model_stream(deltas: list, interval: float):
+    for delta in deltas:
+        await asyncio.sleep(interval)
+        yield (delta, False, "bench-session")
+    yield ("", True, "bench-session")
+
+
+async def legacy_frames(events):
+    # Previous route implementation, kept here as the baseline
+    async for chunk, is_final, session_id in events:
+        if is_final:
+            yield f"data: {{\"done\": true, \"session_id\": \"{session_id}\"}}\n\n"
+        else:
+            escaped = chunk.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            yield f"data: {{\"content\": \"{escaped}\"}}\n\n"
+
+
+async def measure(name: str, writes) -> None:
+    start = time.perf_counter()
+    first = None
+    count = frames = size = 0
+    async for write in writes:
+        data = write.encode() if isinstance(write, str) else write
+        first = first or time.perf_counter() - start
+        count += 1
+        frames += data.count(b"\n\n")
+        size += len(data)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>10}: {count:4d} writes  {frames:4d} frames  {size:6d} bytes  "
+        f"first byte {first * 1000:5.1f} ms  total {elapsed:5.2f} s"
+    )
+
+
+async def main_async(args) -> None:
+    deltas = make_deltas(args.tokens)
+    interval = args.interval_ms / 1000
+
+    print(f"{len(deltas)} deltas at {args.interval_ms} ms intervals")
+    await measure("legacy", legacy_frames(model_stream(deltas, interval)))
+    await measure("coalesced", encode_chat_stream(
+        model_stream(deltas, interval),
+        flush_interval=args.flush_ms / 1000,
+        flush_bytes=args.flush_bytes
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE framing for /chat/stream")
+    parser.add_argument("--tokens", type=int, default=300, help="Deltas in the simulated response")
+    parser.add_argument("--interval-ms", type=float, default=12, help="Time between deltas")
+    parser.add_argument("--flush-ms", type=float, default=40, help="Coalescing window")
+    parser.add_argument("--flush-bytes", type=int, default=256, help="Coalescing size limit")
+    args = parser.parse_args()
+
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
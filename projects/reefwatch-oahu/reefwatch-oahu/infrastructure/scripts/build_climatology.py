@@ -0,0 +1,72 @@
+"""
+Climatology Table Builder for ReefWatch Oahu
+
+Builds the per-site, day-of-year SST climatology (mean, percentiles and
+Maximum Monthly Mean) from the ocean_conditions_daily archive and writes
+it as a compact NumPy archive that the backend loads at startup.
+Run offline whenever the archive has grown substantially (e.g. yearly).
+
+Usage:
+    python build_climatology.py --project-id YOUR_PROJECT_ID --dataset reefwatch \
+        --output backend/app/data/climatology.npz
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from google.cloud import bigquery
+
+# Reuse the backend's builder so the archive format stays in one place
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+
+from app.core.config import OAHU_SITES  # noqa: E402
+from app.services.climatology_service import build_climatology, save_climatology  # noqa: E402
+
+
+def fetch_archive(client: bigquery.Client, dataset_id: str):
+    """Yield (site_id, date, sst) for every archived observation."""
+    site_ids = {site["name"]: site["id"] for site in OAHU_SITES}
+
+    query = f"""
+    SELECT site_name, date, AVG(sst) AS sst
+    FROM `{client.project}.{dataset_id}.ocean_conditions_daily`
+    WHERE sst IS NOT NULL
+    GROUP BY site_name, date
+    """
+
+    for row in client.query(query).result():
+        site_id = site_ids.get(row["site_name"])
+        if site_id:
+            yield site_id, row["date"], row["sst"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the ReefWatch Oahu SST climatology table")
+    parser.add_argument("--project-id", required=True, help="GCP Project ID")
+    parser.add_argument("--dataset", default="reefwatch", help="BigQuery dataset name")
+    parser.add_argument("--output", default="backend/app/data/climatology.npz", help="Output archive path")
+    parser.add_argument("--window-days", type=int, default=15, help="Day-of-year pooling half-width")
+
+    args = parser.parse_args()
+
+    client = bigquery.Client(project=args.project_id)
+
+    print(f"Building climatology from {args.project_id}.{args.dataset}")
+    print("-" * 50)
+
+    records = list(fetch_archive(client, args.dataset))
+    print(f"Fetched {len(records)} daily observations")
+
+    climatology = build_climatology(records, window_days=args.window_days)
+    save_climatology(climatology, args.output)
+
+    for site_id in climatology.site_ids:
+        print(f"{site_id}: MMM {climatology.maximum_monthly_mean(site_id)}")
+
+    print("-" * 50)
+    print(f"Wrote climatology for {len(climatology.site_ids)} sites to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
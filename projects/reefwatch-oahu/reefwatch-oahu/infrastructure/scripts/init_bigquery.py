@@ -220,6 +220,41 @@ def create_chat_sessions_table(client: bigquery.Client, dataset_id: str) -> None
         print(f"Table chat_sessions already exists")
 
 
+def create_backfill_checkpoints_table(client: bigquery.Client, dataset_id: str) -> None:
+    """
+    Create the append-only checkpoint table for resumable manual backfills.
+    """
+    table_id = f"{client.project}.{dataset_id}.backfill_checkpoints"
+
+    schema = [
+        bigquery.SchemaField("job_id", "STRING", mode="REQUIRED",
+                            description="Backfill job ID (derived from the date range)"),
+        bigquery.SchemaField("kind", "STRING", mode="REQUIRED",
+                            description="Record kind: job or chunk"),
+        bigquery.SchemaField("start_date", "DATE", mode="REQUIRED",
+                            description="First date covered"),
+        bigquery.SchemaField("end_date", "DATE", mode="REQUIRED",
+                            description="Last date covered (inclusive)"),
+        bigquery.SchemaField("status", "STRING", mode="REQUIRED",
+                            description="Job: running, incomplete, complete; chunk: loading, done, failed"),
+        bigquery.SchemaField("row_count", "INT64",
+                            description="Rows loaded"),
+        bigquery.SchemaField("error", "STRING",
+                            description="Error message, if any"),
+        bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED",
+                            description="When this status was recorded"),
+    ]
+
+    table = bigquery.Table(table_id, schema=schema)
+    table.description = "Backfill job and chunk progress; latest record per job/chunk wins"
+
+    try:
+        table = client.create_table(table)
+        print(f"Created table {table.full_table_id}")
+    except Conflict:
+        print(f"Table backfill_checkpoints already exists")
+
+
 def create_views(client: bigquery.Client, dataset_id: str) -> None:
     """Create useful views for the API."""
 
@@ -359,6 +394,7 @@ def main():
     create_sensor_readings_table(client, args.dataset)
     create_alerts_table(client, args.dataset)
     create_chat_sessions_table(client, args.dataset)
+    create_backfill_checkpoints_table(client, args.dataset)
 
     # Create views
     create_views(client, args.dataset)
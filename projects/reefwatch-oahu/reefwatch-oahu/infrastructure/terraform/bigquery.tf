@@ -185,6 +185,68 @@ resource "google_bigquery_table" "alerts" {
   }
 }
 
+# Backfill checkpoints (append-only; latest record per job/chunk wins)
+resource "google_bigquery_table" "backfill_checkpoints" {
+  dataset_id          = google_bigquery_dataset.reefwatch.dataset_id
+  table_id            = "backfill_checkpoints"
+  deletion_protection = false
+
+  schema = jsonencode([
+    {
+      name        = "job_id"
+      type        = "STRING"
+      mode        = "REQUIRED"
+      description = "Backfill job ID (derived from the date range)"
+    },
+    {
+      name        = "kind"
+      type        = "STRING"
+      mode        = "REQUIRED"
+      description = "Record kind: job or chunk"
+    },
+    {
+      name        = "start_date"
+      type        = "DATE"
+      mode        = "REQUIRED"
+      description = "First date covered"
+    },
+    {
+      name        = "end_date"
+      type        = "DATE"
+      mode        = "REQUIRED"
+      description = "Last date covered (inclusive)"
+    },
+    {
+      name        = "status"
+      type        = "STRING"
+      mode        = "REQUIRED"
+      description = "Job: running, incomplete, complete; chunk: loading, done, failed"
+    },
+    {
+      name        = "row_count"
+      type        = "INT64"
+      mode        = "NULLABLE"
+      description = "Rows loaded"
+    },
+    {
+      name        = "error"
+      type        = "STRING"
+      mode        = "NULLABLE"
+      description = "Error message, if any"
+    },
+    {
+      name        = "updated_at"
+      type        = "TIMESTAMP"
+      mode        = "REQUIRED"
+      description = "When this status was recorded"
+    }
+  ])
+
+  labels = {
+    environment = var.environment
+  }
+}
+
 # Grant service accounts access to dataset
 resource "google_bigquery_dataset_iam_member" "backend_access" {
   dataset_id = google_bigquery_dataset.reefwatch.dataset_id
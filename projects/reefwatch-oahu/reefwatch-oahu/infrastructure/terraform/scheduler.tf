@@ -49,8 +49,9 @@ resource "google_cloudfunctions2_function" "fetch_ocean_data" {
     service_account_email = google_service_account.functions.email
 
     environment_variables = {
-      GCP_PROJECT_ID   = var.project_id
-      BIGQUERY_DATASET = var.bigquery_dataset
+      GCP_PROJECT_ID     = var.project_id
+      BIGQUERY_DATASET   = var.bigquery_dataset
+      SITE_INTERPOLATION = var.site_interpolation
     }
   }
 
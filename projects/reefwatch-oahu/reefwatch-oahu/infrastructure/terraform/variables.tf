@@ -85,6 +85,17 @@ variable "bigquery_dataset" {
   default     = "reefwatch"
 }
 
+variable "site_interpolation" {
+  description = "How ingestion maps the NOAA grid to sites: nearest, idw or bilinear"
+  type        = string
+  default     = "nearest"
+
+  validation {
+    condition     = contains(["nearest", "idw", "bilinear"], var.site_interpolation)
+    error_message = "site_interpolation must be nearest, idw or bilinear."
+  }
+}
+
 variable "bigquery_location" {
   description = "BigQuery dataset location"
   type        = string